@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""KINTONE クライアントのベンチマーク
+
+ローカルのフェイクサーバーに対して主要な処理のスループットを計測し、JSON で出力します。
+乱数シードを固定しているため、コミット間で結果を比較できます。
+
+使用例:
+    python3 benchmarks/bench_kintone.py --output results.json
+    python3 benchmarks/bench_kintone.py --baseline results.json --threshold 0.2
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from kintone_fake_server import FakeKintoneServer
+
+APP_ID = 1
+WRITE_APP_ID = 2
+
+# ベンチマーク用アプリのフィールド（幅広のフォームを想定）
+FIELDS = {
+    **{f"文字列{i}": "SINGLE_LINE_TEXT" for i in range(10)},
+    **{f"数値{i}": "NUMBER" for i in range(5)},
+    "日付": "DATE",
+    "ステータス区分": "DROP_DOWN",
+    "タグ": "CHECK_BOX",
+    "備考": "MULTI_LINE_TEXT",
+}
+
+
+def make_records(rng: random.Random, count: int) -> list[dict]:
+    """FIELDS に沿ったランダムなレコード（通常の値）を生成"""
+    records = []
+    for _ in range(count):
+        record = {f"文字列{i}": f"テキスト{rng.randint(0, 99999)}" for i in range(10)}
+        record.update({f"数値{i}": rng.randint(0, 1_000_000) for i in range(5)})
+        record["日付"] = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        record["ステータス区分"] = rng.choice(["未着手", "進行中", "完了"])
+        record["タグ"] = rng.sample(["A", "B", "C", "D"], rng.randint(0, 3))
+        record["備考"] = "備考" * rng.randint(1, 50)
+        records.append(record)
+    return records
+
+
+def _best(repeat: int, func: Callable[[], float]) -> float:
+    """func（所要秒数を返す）を repeat 回実行して最短時間を返す"""
+    return min(func() for _ in range(repeat))
+
+
+class Bench:
+    """ベンチマーク一式（フェイクサーバーと設定を保持）"""
+
+    def __init__(self, server: FakeKintoneServer, records: int, file_mb: float, repeat: int, seed: int):
+        from kintone_config import get_config
+
+        self.server = server
+        self.records = records
+        self.file_mb = file_mb
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.config = get_config()
+        self.data = make_records(self.rng, records)
+        server.add_app(APP_ID, "Benchmark", FIELDS)
+        server.add_records(APP_ID, self.data)
+
+    def search_all(self) -> dict:
+        from kintone_crud import KintoneCRUD
+
+        crud = KintoneCRUD()
+
+        def run():
+            start = time.perf_counter()
+            count = sum(1 for _ in crud.search_all(APP_ID))
+            assert count == self.records, count
+            return time.perf_counter() - start
+
+        return {"value": self.records / _best(self.repeat, run), "unit": "records/s", "higher_is_better": True}
+
+    def search_all_stream(self) -> dict:
+        from kintone_crud import KintoneCRUD
+
+        crud = KintoneCRUD()
+
+        def run():
+            start = time.perf_counter()
+            count = sum(1 for _ in crud.search_all(APP_ID, stream=True))
+            assert count == self.records, count
+            return time.perf_counter() - start
+
+        return {"value": self.records / _best(self.repeat, run), "unit": "records/s", "higher_is_better": True}
+
+    def add_many(self) -> dict:
+        from kintone_crud import KintoneCRUD
+
+        crud = KintoneCRUD()
+
+        def run():
+            self.server.add_app(WRITE_APP_ID, "Write", FIELDS)
+            start = time.perf_counter()
+            results = crud.add_many(WRITE_APP_ID, self.data)
+            assert all(r.success for r in results)
+            return time.perf_counter() - start
+
+        return {"value": self.records / _best(self.repeat, run), "unit": "records/s", "higher_is_better": True}
+
+    def update_many(self) -> dict:
+        from kintone_crud import KintoneCRUD
+
+        crud = KintoneCRUD()
+        updates = [{"id": i + 1, "数値0": i, "備考": "更新"} for i in range(self.records)]
+
+        def run():
+            start = time.perf_counter()
+            results = crud.update_many(APP_ID, updates)
+            assert all(r.success for r in results)
+            return time.perf_counter() - start
+
+        return {"value": self.records / _best(self.repeat, run), "unit": "records/s", "higher_is_better": True}
+
+    def upload(self) -> dict:
+        from kintone_file import KintoneFileManager
+
+        manager = KintoneFileManager()
+        content = self.rng.randbytes(int(self.file_mb * 1024 * 1024))
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(content)
+
+        def run():
+            start = time.perf_counter()
+            result = manager.upload(f.name)
+            assert result.success, result.error
+            return time.perf_counter() - start
+
+        try:
+            return {"value": self.file_mb / _best(self.repeat, run), "unit": "MB/s", "higher_is_better": True}
+        finally:
+            os.unlink(f.name)
+
+    def download(self) -> dict:
+        from kintone_client import KintoneClient
+
+        client = KintoneClient(self.config)
+        file_key = self.server.add_file(self.rng.randbytes(int(self.file_mb * 1024 * 1024)))
+
+        def run():
+            start = time.perf_counter()
+            client.download_file(file_key)
+            return time.perf_counter() - start
+
+        return {"value": self.file_mb / _best(self.repeat, run), "unit": "MB/s", "higher_is_better": True}
+
+    def format_record(self) -> dict:
+        from kintone_crud import KintoneCRUD
+
+        crud = KintoneCRUD()
+        loops = max(1, 100_000 // self.records)
+
+        def run():
+            start = time.perf_counter()
+            for _ in range(loops):
+                for record in self.data:
+                    crud._format_record(record)
+            return time.perf_counter() - start
+
+        per_record = _best(self.repeat, run) / (loops * self.records)
+        return {"value": per_record * 1e6, "unit": "us/record", "higher_is_better": False}
+
+    def schema_cache_hit(self) -> dict:
+        from kintone_schema import SchemaManager
+
+        manager = SchemaManager(self.config)
+        manager.get_schema(APP_ID, refresh=True)
+        calls = 200
+
+        def run():
+            start = time.perf_counter()
+            for _ in range(calls):
+                manager.get_schema(APP_ID)
+            return time.perf_counter() - start
+
+        return {"value": _best(self.repeat, run) / calls * 1e3, "unit": "ms/call", "higher_is_better": False}
+
+
+# フェイクサーバーを指す設定（実行中のみ上書き）
+# KintoneConfig.from_env が読む環境変数（すべて差し替え、残りは消して実環境のトークンを使わない）
+ENV_KEYS = (
+    "KINTONE_DOMAIN", "KINTONE_API_TOKEN", "KINTONE_CACHE_DIR",
+    "KINTONE_APP_TOKENS", "KINTONE_DEFAULT_APP", "KINTONE_CACHE_TTL",
+)
+
+BENCHMARKS = [
+    "search_all", "search_all_stream", "add_many", "update_many",
+    "upload", "download", "format_record", "schema_cache_hit",
+]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    names: Optional[list[str]] = None,
+    records: int = 5000,
+    file_mb: float = 8.0,
+    repeat: int = 3,
+    seed: int = 42,
+    latency: float = 0.0,
+) -> dict:
+    """ベンチマークを実行して結果を返す"""
+    saved_env = {key: os.environ.get(key) for key in ENV_KEYS}
+    with FakeKintoneServer(latency=latency, seed=seed) as server, tempfile.TemporaryDirectory() as cache_dir:
+        for key in ENV_KEYS:
+            os.environ.pop(key, None)
+        os.environ.update(zip(ENV_KEYS, (server.base_url, "benchmark", cache_dir)))
+        try:
+            bench = Bench(server, records, file_mb, repeat, seed)
+            results = {}
+            for name in names or BENCHMARKS:
+                results[name] = getattr(bench, name)()
+                print(f"  {name:<18} {results[name]['value']:>12.2f} {results[name]['unit']}", file=sys.stderr)
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "records": records,
+            "file_mb": file_mb,
+            "repeat": repeat,
+            "seed": seed,
+            "latency": latency,
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2) -> list[str]:
+    """ベースラインから threshold（割合）を超えて悪化した項目を返す"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base["value"]:
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        if not result["higher_is_better"]:
+            change = -change
+        if change < -threshold:
+            regressions.append(
+                f"{name}: {base['value']:.2f} -> {result['value']:.2f} {result['unit']} ({change:+.1%})"
+            )
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KINTONE client benchmarks")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmarks to run")
+    parser.add_argument("--records", type=int, default=5000, help="Number of records")
+    parser.add_argument("--file-mb", type=float, default=8.0, help="File size for upload/download (MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions (best is reported)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake server latency per request (seconds)")
+    parser.add_argument("--output", "-o", help="Write results JSON to file")
+    parser.add_argument("--baseline", help="Compare with a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression ratio (default: 0.2)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.records, args.file_mb, args.repeat, args.seed, args.latency)
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("❌ Regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,15 +20,25 @@ Commands:
   schema clear [app_id]        スキーマキャッシュをクリア
   get <app_id> <record_id>     レコードを1件取得
   search <app_id> [query]      レコードを検索（--all で全件取得）
+  agg <app_id> [query]         集計（--group-by, --sum/--avg/--min/--max, --partitions）
   add <app_id> <json>          レコードを追加
   update <app_id> <id> <json>  レコードを更新
   delete <app_id> <ids>        レコードを削除（カンマ区切り）
+  delete <app_id> --where <query>  クエリに一致するレコードを並列に一括削除（--bulk, --workers N）
   status <app_id> <id> <action>  ステータスを更新（ワークフロー）
+  status <app_id> --where <query> <action>  クエリに一致するレコードのステータスを一括更新
   comment <app_id> <id> <subcmd> コメント操作（add/list/delete）
   file upload <path>           ファイルをアップロード
   file download <fileKey>      ファイルをダウンロード
   file list <app_id> <record_id> <field>  添付ファイル一覧
-  query <text>                 自然言語クエリを変換
+  query <text> [--app <id>]    自然言語クエリを変換（--app でスキーマを参照）
+  watch <app_ids>              変更を NDJSON イベントで出力（カンマ区切りで複数アプリ）
+  cursors                      カーソル枠のリース一覧（終了したプロセスのカーソルを回収）
+  quota [app_ids]              今日のアプリごとのリクエスト数と残り回数（--read/--write で見込み）
+  copy <src_app> <dst_app> [query]  アプリ間でレコードをコピー（--map で対応表、中断しても再開）
+  backup <dir> [--apps ids]    全アプリのスキーマ・レコード・添付ファイルを保存（2回目以降は差分）
+  restore <dir> [--to src:dst] スナップショットのレコードをアプリに書き戻す
+  fts "<text>" [--app ids]     ローカルの全文検索インデックスでレコードを検索（--sync で更新）
   help                         このヘルプを表示
 
 Options:
@@ -36,13 +46,17 @@ Options:
   --refresh                    キャッシュを更新（schema）
   --limit N                    取得件数制限（search）
   --offset N                   オフセット（search）
-  --all                        全件取得（search、Cursor API使用）
+  --all                        全件取得（search、件数に応じて取得方法を自動選択）
+  --explain                    取得方法の判断過程を表示（search --all）
+  --spool                      カーソルを先にディスクへ退避して読む（search --all、遅い処理向け）
   --assignee USER              担当者（status）
+  --ignore-revision            他の人が更新したレコードもリビジョンを確かめずに更新（status --where）
   --output PATH                出力先パス（file download）
 
 Environment Variables:
   KINTONE_DOMAIN              KINTONE ドメイン（必須）
-  KINTONE_API_TOKEN           API トークン（必須）
+  KINTONE_API_TOKEN           API トークン（必須、KINTONE_APP_TOKENS のみでも可）
+  KINTONE_APP_TOKENS          アプリごとの API トークン（例: "123:tokA;456:tokB,tokC"）
   KINTONE_DEFAULT_APP         デフォルトアプリID
   KINTONE_CACHE_DIR           キャッシュディレクトリ
   KINTONE_CACHE_TTL           キャッシュ有効期限（秒）
@@ -65,6 +79,10 @@ Examples:
   kintone search 123 'ステータス = "完了"'
   kintone search 123 --query 'ステータスが完了'  # 自然言語
 
+  # 集計（件数は常に表示）
+  kintone agg 123 --group-by ステータス --sum 金額
+  kintone agg 123 '受注日 >= "2024-01-01"' --group-by 担当者 --sum 金額 --avg 金額 --partitions 4
+
   # レコード追加
   kintone add 123 '{"タイトル": "新規タスク", "担当者": "田中"}'
 
@@ -73,6 +91,7 @@ Examples:
 
   # レコード削除
   kintone delete 123 1,2,3
+  kintone delete 123 --where '作成日時 < "2024-01-01T00:00:00Z"' --workers 8
 
   # 全件取得（500件超）
   kintone search 123 --all
@@ -81,6 +100,7 @@ Examples:
   # ステータス更新（ワークフロー）
   kintone status 123 1 "承認"
   kintone status 123 1 "承認" --assignee tanaka
+  kintone status 123 --where 'ステータス = "申請中"' "承認"
 
   # コメント操作
   kintone comment 123 1 add "確認しました"
@@ -92,6 +112,29 @@ Examples:
   kintone file download abc123def456
   kintone file list 123 1 添付ファイル  # 添付ファイル一覧
 
+  # 変更フィード（create/update/delete を NDJSON で出力）
+  kintone watch 123,456
+  kintone watch 123 --from beginning --detect-deletes 10
+  kintone watch 123 --once      # 1回だけポーリング（cron 向け）
+
+  # 日次リクエスト数（1アプリ 10,000 回/日）
+  kintone quota
+  kintone quota 123 --read 200000 --priority low   # 実行前の見込み（保留なら終了コード 2）
+
+  # アプリ間のレコードコピー（添付ファイルも再アップロード）
+  kintone copy 123 456 --dry-run                   # フィールド対応表を確認
+  kintone copy 123 456 '作成日時 < "2024-01-01T00:00:00Z"' --map '旧顧客名=顧客名,メモ='
+
+  # バックアップとリストア
+  kintone backup /backup/kintone                   # 初回は全件、以降は差分
+  kintone backup /backup/kintone --list            # スナップショット一覧
+  kintone restore /backup/kintone --to 123:456     # アプリ 123 の最新の状態をアプリ 456 へ
+
+  # オフライン全文検索（API を使わず複数アプリを検索）
+  kintone fts --sync --app 123,456                 # 前回以降の変更をインデックスに反映
+  kintone fts "請求書 株式会社" --field 件名,備考
+  kintone watch 123 | kintone fts --events -       # 変更フィードから更新
+
 EOF
 }
 
@@ -184,6 +227,26 @@ case "$1" in
         python3 "${SCRIPT_DIR}/kintone_crud.py" search --app "$APP_ID" --query "$QUERY" "$@"
         ;;
 
+    agg)
+        shift
+        APP_ID="$1"
+        shift
+
+        if [[ -z "$APP_ID" ]]; then
+            echo "Error: App ID is required"
+            echo "Usage: kintone agg <app_id> [query] --group-by <fields> [--sum <fields>] [--avg <fields>]"
+            exit 1
+        fi
+
+        QUERY=""
+        if [[ -n "$1" && ! "$1" =~ ^-- ]]; then
+            QUERY="$1"
+            shift
+        fi
+
+        python3 "${SCRIPT_DIR}/kintone_crud.py" agg --app "$APP_ID" --query "$QUERY" "$@"
+        ;;
+
     add)
         shift
         APP_ID="$1"
@@ -218,12 +281,30 @@ case "$1" in
     delete)
         shift
         APP_ID="$1"
-        IDS="$2"
-        shift 2
+        shift
+
+        # --where '<query>' で対象レコードをまとめて選択
+        if [[ "$1" == "--where" ]]; then
+            WHERE="$2"
+            shift 2 2>/dev/null || true
+
+            if [[ -z "$APP_ID" || -z "$WHERE" ]]; then
+                echo "Error: App ID and query are required"
+                echo "Usage: kintone delete <app_id> --where '<query>' [--bulk] [--workers N]"
+                exit 1
+            fi
+
+            python3 "${SCRIPT_DIR}/kintone_crud.py" delete --app "$APP_ID" --query "$WHERE" "$@"
+            exit $?
+        fi
+
+        IDS="$1"
+        shift
 
         if [[ -z "$APP_ID" || -z "$IDS" ]]; then
             echo "Error: App ID and Record IDs are required"
             echo "Usage: kintone delete <app_id> <id1,id2,...>"
+            echo "       kintone delete <app_id> --where '<query>' [--bulk] [--workers N]"
             exit 1
         fi
 
@@ -233,13 +314,32 @@ case "$1" in
     status)
         shift
         APP_ID="$1"
-        RECORD_ID="$2"
-        ACTION="$3"
-        shift 3
+        shift
+
+        # --where '<query>' で対象レコードをまとめて選択
+        if [[ "$1" == "--where" ]]; then
+            WHERE="$2"
+            ACTION="$3"
+            shift 3 2>/dev/null || true
+
+            if [[ -z "$APP_ID" || -z "$WHERE" || -z "$ACTION" ]]; then
+                echo "Error: App ID, query, and Action are required"
+                echo "Usage: kintone status <app_id> --where '<query>' <action> [--assignee <user>] [--ignore-revision]"
+                exit 1
+            fi
+
+            python3 "${SCRIPT_DIR}/kintone_crud.py" status --app "$APP_ID" --query "$WHERE" --action "$ACTION" "$@"
+            exit $?
+        fi
+
+        RECORD_ID="$1"
+        ACTION="$2"
+        shift 2
 
         if [[ -z "$APP_ID" || -z "$RECORD_ID" || -z "$ACTION" ]]; then
             echo "Error: App ID, Record ID, and Action are required"
             echo "Usage: kintone status <app_id> <record_id> <action> [--assignee <user>]"
+            echo "       kintone status <app_id> --where '<query>' <action> [--assignee <user>]"
             exit 1
         fi
 
@@ -340,12 +440,71 @@ case "$1" in
     query)
         shift
         TEXT="$1"
+        shift
         if [[ -z "$TEXT" ]]; then
             echo "Error: Query text is required"
-            echo "Usage: kintone query '<natural language query>'"
+            echo "Usage: kintone query '<natural language query>' [--app <app_id>]"
             exit 1
         fi
-        python3 "${SCRIPT_DIR}/kintone_search.py" --natural "$TEXT"
+        python3 "${SCRIPT_DIR}/kintone_search.py" --natural "$TEXT" "$@"
+        ;;
+
+    watch)
+        shift
+        APPS="$1"
+        shift
+        if [[ -z "$APPS" ]]; then
+            echo "Error: App IDs are required"
+            echo "Usage: kintone watch <app_id>[,<app_id>...] [--from now|beginning] [--once]"
+            exit 1
+        fi
+        python3 "${SCRIPT_DIR}/kintone_watch.py" "$APPS" "$@"
+        ;;
+
+    cursors)
+        shift
+        python3 "${SCRIPT_DIR}/kintone_lease.py" "$@"
+        ;;
+
+    quota)
+        shift
+        python3 "${SCRIPT_DIR}/kintone_quota.py" "$@"
+        ;;
+
+    copy)
+        shift
+        SOURCE_APP="$1"
+        TARGET_APP="$2"
+        if [[ -z "$SOURCE_APP" || -z "$TARGET_APP" ]]; then
+            echo "Error: Source and target app IDs are required"
+            echo "Usage: kintone copy <src_app> <dst_app> [query] [--map SRC=DST,...] [--reader keyset] [--restart]"
+            exit 1
+        fi
+        shift 2
+        python3 "${SCRIPT_DIR}/kintone_copy.py" "$SOURCE_APP" "$TARGET_APP" "$@"
+        ;;
+
+    backup|restore)
+        COMMAND="$1"
+        shift
+        DIRECTORY="$1"
+        if [[ -z "$DIRECTORY" ]]; then
+            echo "Error: Backup directory is required"
+            echo "Usage: kintone backup <dir> [--apps <ids>] [--full] [--no-files] [--list]"
+            echo "       kintone restore <dir> [--snapshot <name>] [--to <src:dst,...>] [--restart] [--force]"
+            exit 1
+        fi
+        shift
+        if [[ "$COMMAND" == "backup" && "$1" == "--list" ]]; then
+            shift
+            COMMAND="list"
+        fi
+        python3 "${SCRIPT_DIR}/kintone_backup.py" "$COMMAND" "$DIRECTORY" "$@"
+        ;;
+
+    fts)
+        shift
+        python3 "${SCRIPT_DIR}/kintone_fts.py" "$@"
         ;;
 
     help|--help|-h)
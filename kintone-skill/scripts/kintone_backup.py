@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""KINTONE ドメインのバックアップとリストア
+
+ドメインのアプリを列挙し、アプリごとにスキーマ・レコード・添付ファイルを保存します。
+
+    <directory>/
+      files/ab/abcdef...                  添付ファイル（内容の SHA-256 で重複排除、スナップショット間で共有）
+      files/index.sqlite                  fileKey -> SHA-256（保存済みのファイルは再ダウンロードしない）
+      snapshots/20240101T000000Z/
+        manifest.json                     スナップショットの内容（すべて書き終わってから作成）
+        apps/123/schema.json              AppSchema
+        apps/123/records-000000.ndjson.gz レコード（$id 昇順、gzip 圧縮の NDJSON）
+        apps/123/ids.json.gz              スナップショット時点の全 $id（削除されたレコードの判定用）
+
+- アプリは並列にバックアップし、カーソル枠（CursorLeaseManager）と日次リクエスト数
+  （QuotaScheduler）の範囲で進めます。リクエスト数の足りないアプリは保留して次回に回します
+- 2回目以降は、前回のスナップショットのウォーターマーク（更新日時）以降に更新された
+  レコードだけを保存する差分バックアップです（full=True で全件）
+- リストアはスナップショットをさかのぼって各レコードの最新版を $id 順に並べ、
+  RecordCopier の並列書き込みでアプリに追加します（アプリ自体は作成しません）
+"""
+
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+from kintone_client import KintoneClient, json_dumps, json_loads
+from kintone_copy import CopyResult, FieldMap, RecordCopier
+from kintone_crud import MAX_CURSORS, PAGE_SIZE, KintoneCRUD, batched, field_value
+from kintone_schema import AppSchema, SchemaManager
+from kintone_search import quote
+
+MANIFEST_VERSION = 1
+DEFAULT_SEGMENT_RECORDS = 5000  # 1セグメントのレコード数
+APPS_PAGE_SIZE = 100  # アプリ一覧の1ページの件数（最大100）
+
+
+def _snapshot_name(now: Optional[float] = None) -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+
+
+def _file_items(record: dict) -> Iterator[dict]:
+    """レコード内の添付ファイル（テーブル内を含む）"""
+    for cell in record.values():
+        if not isinstance(cell, dict):
+            continue
+        if cell.get("type") == "FILE":
+            yield from cell.get("value") or []
+        elif cell.get("type") == "SUBTABLE":
+            for row in cell.get("value") or []:
+                for inner in row.get("value", {}).values():
+                    if inner.get("type") == "FILE":
+                        yield from inner.get("value") or []
+
+
+def _write_atomic(path: Path, content: bytes):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class FileStore:
+    """添付ファイルの保存先（内容の SHA-256 で重複排除）
+
+    レコードの fileKey と SHA-256 の対応を記録し、同じ fileKey のファイルは
+    次回以降のバックアップでダウンロードしません。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.downloaded = 0  # ダウンロードしたファイル数
+        self.stored = 0  # 新しく保存したファイル数（重複を除く）
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS keys (file_key TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        return closing(sqlite3.connect(str(self.path / "index.sqlite"), timeout=30, isolation_level=None))
+
+    def _blob(self, digest: str) -> Path:
+        return self.path / digest[:2] / digest
+
+    def put(self, content: bytes) -> str:
+        """内容を保存して SHA-256 を返す（保存済みなら何もしない）"""
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self._blob(digest)
+        if not blob.exists():
+            blob.parent.mkdir(exist_ok=True)
+            _write_atomic(blob, content)
+            with self._lock:
+                self.stored += 1
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        """SHA-256 のファイルの内容"""
+        blob = self._blob(digest)
+        if not blob.exists():
+            raise RuntimeError(f"File not in backup: {digest}")
+        return blob.read_bytes()
+
+    def fetch(self, client: KintoneClient, app_id: int, item: dict) -> str:
+        """レコードの添付ファイルを保存して SHA-256 を返す"""
+        file_key = item["fileKey"]
+        with self._connect() as conn:
+            row = conn.execute("SELECT sha256 FROM keys WHERE file_key = ?", (file_key,)).fetchone()
+        if row is not None and self._blob(row[0]).exists():
+            return row[0]
+        digest = self.put(client.download_file(file_key, app_id=app_id))
+        with self._lock:
+            self.downloaded += 1
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO keys VALUES (?, ?)", (file_key, digest))
+        return digest
+
+
+class _SegmentWriter:
+    """レコードを gzip 圧縮の NDJSON セグメントに書き出す"""
+
+    def __init__(self, directory: Path, segment_records: int):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.segments: list[str] = []
+        self.records = 0
+        self._file: Optional[Any] = None
+        self._count = 0
+
+    def write(self, record: dict):
+        if self._file is None:
+            name = f"records-{len(self.segments):06d}.ndjson.gz"
+            self._file = gzip.open(self.directory / name, "wb", compresslevel=6)
+            self.segments.append(name)
+        self._file.write(json_dumps(record) + b"\n")
+        self.records += 1
+        self._count += 1
+        if self._count >= self.segment_records:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._count = 0
+
+
+@dataclass
+class AppBackup:
+    """スナップショット内のアプリ1件の内容"""
+    app_id: int
+    name: str
+    status: str = "done"  # done / deferred（リクエスト数が足りず次回に回した）/ failed
+    full: bool = True  # 全件（False なら前回までのスナップショットとの差分）
+    records: int = 0
+    files: int = 0
+    segments: list[str] = field(default_factory=list)
+    updated_at: str = ""  # ウォーターマーク（保存したレコードの最大の更新日時）
+    error: str = ""
+
+
+@dataclass
+class Snapshot:
+    """バックアップのスナップショット"""
+    name: str
+    path: Path
+    created_at: str
+    base: Optional[str]  # 差分の元になったスナップショット
+    include_files: bool
+    apps: dict[int, AppBackup] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @classmethod
+    def load(cls, path: Path) -> "Snapshot":
+        with open(path / "manifest.json") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported backup version: {data.get('version')}")
+        return cls(
+            name=data["name"],
+            path=path,
+            created_at=data["created_at"],
+            base=data.get("base"),
+            include_files=data.get("include_files", True),
+            apps={int(k): AppBackup(**v) for k, v in data["apps"].items()},
+            elapsed=data.get("elapsed", 0.0),
+        )
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "name": self.name,
+            "created_at": self.created_at,
+            "base": self.base,
+            "include_files": self.include_files,
+            "elapsed": round(self.elapsed, 3),
+            "apps": {str(app_id): asdict(app) for app_id, app in sorted(self.apps.items())},
+        }
+        _write_atomic(self.path / "manifest.json", json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    @property
+    def success(self) -> bool:
+        """すべてのアプリを保存できたか"""
+        return all(app.status == "done" for app in self.apps.values())
+
+
+class BackupManager:
+    """ドメインのバックアップとリストア
+
+    使用例:
+        manager = BackupManager(crud, "/backup/kintone", scheduler=QuotaScheduler(tracker))
+        snapshot = manager.backup()            # 初回は全件、以降は差分
+        manager.restore(apps={123: 456})       # 最新のスナップショットをアプリ 456 に書き込む
+    """
+
+    def __init__(
+        self,
+        crud: KintoneCRUD,
+        directory: Union[str, Path],
+        max_apps: int = 4,
+        file_workers: int = 4,
+        include_files: bool = True,
+        scheduler: Optional[Any] = None,
+        segment_records: int = DEFAULT_SEGMENT_RECORDS,
+    ):
+        """
+        Args:
+            crud: KintoneCRUD（カーソル枠を共有するなら crud.leases を設定）
+            directory: バックアップの保存先
+            max_apps: 並列にバックアップするアプリ数（カーソル上限まで）
+            file_workers: 並列にダウンロードする添付ファイル数
+            include_files: 添付ファイルを保存する
+            scheduler: QuotaScheduler（指定するとリクエスト数の見込みが足りないアプリを保留）
+            segment_records: 1セグメントのレコード数
+        """
+        self.crud = crud
+        self.client = crud.client
+        self.path = Path(directory)
+        self.max_apps = min(max(max_apps, 1), MAX_CURSORS)
+        self.file_workers = max(file_workers, 1)
+        self.include_files = include_files
+        self.scheduler = scheduler
+        self.segment_records = segment_records
+        self.files = FileStore(self.path / "files")
+        self.schemas = SchemaManager(client=crud.client)
+
+    # === スナップショット ===
+
+    def snapshots(self) -> list[Snapshot]:
+        """完了したスナップショット（古い順）"""
+        root = self.path / "snapshots"
+        if not root.exists():
+            return []
+        return [Snapshot.load(p) for p in sorted(root.iterdir()) if (p / "manifest.json").exists()]
+
+    def snapshot(self, name: Optional[str] = None) -> Snapshot:
+        """名前のスナップショット（省略時は最新）"""
+        if name is None:
+            snapshots = self.snapshots()
+            if not snapshots:
+                raise ValueError(f"No snapshots in {self.path}")
+            return snapshots[-1]
+        path = self.path / "snapshots" / name
+        if not (path / "manifest.json").exists():
+            raise ValueError(f"Snapshot not found: {name}")
+        return Snapshot.load(path)
+
+    def app_chain(self, snapshot: Snapshot, app_id: int) -> list[tuple[Snapshot, AppBackup]]:
+        """アプリのデータを持つスナップショット（新しい順、全件のスナップショットまで）"""
+        chain = []
+        current: Optional[Snapshot] = snapshot
+        while current is not None:
+            app = current.apps.get(app_id)
+            if app is not None and app.status == "done":
+                chain.append((current, app))
+                if app.full:
+                    return chain
+            current = self.snapshot(current.base) if current.base else None
+        return chain if chain and chain[-1][1].full else []
+
+    def read_records(self, snapshot: Snapshot, app: AppBackup) -> Iterator[dict]:
+        """スナップショットに保存したアプリのレコード（$id 昇順）"""
+        for segment in app.segments:
+            with gzip.open(snapshot.path / "apps" / str(app.app_id) / segment, "rb") as f:
+                for line in f:
+                    yield json_loads(line)
+
+    def read_ids(self, snapshot: Snapshot, app_id: int) -> set[int]:
+        """スナップショット時点のアプリの全 $id"""
+        with gzip.open(snapshot.path / "apps" / str(app_id) / "ids.json.gz", "rb") as f:
+            return set(json_loads(f.read()))
+
+    def latest_records(self, snapshot: Snapshot, app_id: int) -> Iterator[dict]:
+        """スナップショット時点のアプリのレコード（$id 昇順）
+
+        差分のスナップショットをさかのぼり、$id ごとに最新のスナップショットの版を返します。
+        スナップショット時点で削除されていたレコードは除きます。
+        """
+        chain = self.app_chain(snapshot, app_id)
+        if not chain:
+            raise ValueError(f"App {app_id} is not in snapshot {snapshot.name}")
+        current = self.read_ids(chain[0][0], app_id)
+
+        def stream(index: int, source: Snapshot, app: AppBackup) -> Iterator[tuple[int, int, dict]]:
+            for record in self.read_records(source, app):
+                yield int(field_value(record, "$id")), index, record
+
+        # 同じ $id は新しいスナップショット（index が小さい）の版が先に来る
+        merged = heapq.merge(*(stream(i, s, a) for i, (s, a) in enumerate(chain)), key=lambda r: r[:2])
+        last_id = None
+        for record_id, _, record in merged:
+            if record_id != last_id and record_id in current:
+                yield record
+            last_id = record_id
+
+    # === バックアップ ===
+
+    def list_apps(self, app_ids: Optional[list[int]] = None) -> list[tuple[int, str]]:
+        """ドメインのアプリ（ID, 名前）を全ページ取得"""
+        apps = []
+        offset = 0
+        while True:
+            response = self.client.get_apps(ids=app_ids, limit=APPS_PAGE_SIZE, offset=offset)
+            if not response.success:
+                raise RuntimeError(f"Failed to get apps: {response.error}")
+            page = response.data.get("apps", [])
+            apps.extend((int(app["appId"]), app.get("name", "")) for app in page)
+            if len(page) < APPS_PAGE_SIZE:
+                return apps
+            offset += APPS_PAGE_SIZE
+
+    def _watermark(self, snapshot: Optional[Snapshot], app_id: int) -> str:
+        """前回までのスナップショットでのアプリのウォーターマーク（なければ空）"""
+        if snapshot is None:
+            return ""
+        chain = self.app_chain(snapshot, app_id)
+        return chain[0][1].updated_at if chain else ""
+
+    def _backup_app(self, snapshot: Snapshot, app_id: int, name: str, watermark: str, pool: ThreadPoolExecutor) -> AppBackup:
+        app = AppBackup(app_id, name)
+        try:
+            app_dir = snapshot.path / "apps" / str(app_id)
+            app_dir.mkdir(parents=True, exist_ok=True)
+            schema = self.schemas.get_schema(app_id, refresh=True)
+            if schema is None:
+                raise RuntimeError(f"Failed to get schema of app {app_id}")
+            _write_atomic(app_dir / "schema.json",
+                          json.dumps(schema.to_dict(), ensure_ascii=False, indent=2).encode("utf-8"))
+
+            updated_field = next((code for code, info in schema.fields.items() if info.type == "UPDATED_TIME"), None)
+            app.full = not (watermark and updated_field)
+            query = "" if app.full else f"{updated_field} >= {quote(watermark)}"
+            if self.scheduler is not None:
+                from kintone_quota import LOW, estimate_read
+
+                estimate = estimate_read(self.crud.plan_read(app_id, query))
+                if not app.full:
+                    estimate += self.crud.count(app_id) // PAGE_SIZE + 1  # $id 一覧
+                [projection] = self.scheduler.project({app_id: estimate}, LOW)
+                if not projection.allowed:
+                    app.status, app.error = "deferred", projection.describe()
+                    return app
+
+            writer = _SegmentWriter(app_dir, self.segment_records)
+            ids: Optional[list[int]] = [] if app.full else None
+            app.updated_at = watermark
+            try:
+                source = self.crud.search_all(app_id, f"{query} order by $id asc".strip())
+                for records in batched(source, PAGE_SIZE):
+                    items = [item for record in records for item in _file_items(record)] if self.include_files else []
+                    for item, digest in zip(items, pool.map(lambda i: self.files.fetch(self.client, app_id, i), items)):
+                        item["sha256"] = digest
+                    app.files += len(items)
+                    for record in records:
+                        writer.write(record)
+                        if updated_field:
+                            app.updated_at = max(app.updated_at, record.get(updated_field, {}).get("value") or "")
+                        if ids is not None:
+                            ids.append(int(field_value(record, "$id")))
+            finally:
+                writer.close()
+            if ids is None:
+                ids = [int(field_value(r, "$id")) for r in self.crud._read_keyset(app_id, "", ["$id"])]
+            with gzip.open(app_dir / "ids.json.gz", "wb") as f:
+                f.write(json_dumps(ids))
+            app.records, app.segments = writer.records, writer.segments
+        except Exception as e:
+            app.status, app.error = "failed", str(e)
+        return app
+
+    def backup(
+        self,
+        app_ids: Optional[list[int]] = None,
+        full: bool = False,
+        progress: Optional[Callable[[AppBackup], None]] = None,
+    ) -> Snapshot:
+        """アプリをバックアップしてスナップショットを作成
+
+        Args:
+            app_ids: バックアップするアプリ（省略時はドメインのすべてのアプリ）
+            full: 前回のスナップショットを使わず全件を保存
+            progress: アプリが終わるたびに AppBackup で呼ばれる関数
+
+        Returns:
+            Snapshot: 保留・失敗したアプリは status で確認（次回のバックアップで再取得）
+        """
+        started = time.monotonic()
+        base = None
+        if not full:
+            snapshots = self.snapshots()
+            base = snapshots[-1] if snapshots else None
+        name = _snapshot_name()
+        while (self.path / "snapshots" / name).exists():
+            time.sleep(1)
+            name = _snapshot_name()
+        snapshot = Snapshot(
+            name=name,
+            path=self.path / "snapshots" / name,
+            created_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            base=base.name if base else None,
+            include_files=self.include_files,
+        )
+        snapshot.path.mkdir(parents=True)
+        apps = self.list_apps(app_ids)
+
+        lock = threading.Lock()
+
+        def run(app: tuple[int, str]) -> AppBackup:
+            result = self._backup_app(snapshot, app[0], app[1], self._watermark(base, app[0]), file_pool)
+            with lock:
+                snapshot.apps[result.app_id] = result
+                if progress is not None:
+                    progress(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="kintone-backup-file") as file_pool:
+            with ThreadPoolExecutor(max_workers=self.max_apps, thread_name_prefix="kintone-backup") as app_pool:
+                list(app_pool.map(run, apps))
+        snapshot.elapsed = time.monotonic() - started
+        snapshot.save()
+        return snapshot
+
+    # === リストア ===
+
+    def restore(
+        self,
+        name: Optional[str] = None,
+        apps: Optional[dict[int, int]] = None,
+        resume: bool = True,
+        progress: Optional[Callable[[int, CopyResult], None]] = None,
+        force: bool = False,
+        **copier_options: Any,
+    ) -> dict[int, CopyResult]:
+        """スナップショットのレコードをアプリに追加
+
+        レコードは追加されるだけなので、既にレコードがあるアプリ（バックアップ元のアプリなど）に
+        書き込むと重複する。書き込み先にレコードがあれば、force=True でない限り ValueError にする
+        （再開できるチェックポイントがある場合は除く）。
+
+        Args:
+            name: スナップショット名（省略時は最新）
+            apps: バックアップしたアプリ ID -> 書き込むアプリ ID（省略時は同じアプリにすべて）
+            resume: 中断したリストアの続きから再開する
+            progress: バッチを追加するたびに (アプリ ID, CopyResult) で呼ばれる関数
+            force: 書き込み先にレコードがあっても追加する
+            copier_options: SnapshotRestorer（RecordCopier）の引数（write_workers など）
+
+        Returns:
+            dict: バックアップしたアプリ ID -> CopyResult
+        """
+        snapshot = self.snapshot(name)
+        targets = apps or {app_id: app_id for app_id in snapshot.apps}
+        restorers = {
+            app_id: SnapshotRestorer(self.crud, self, snapshot, app_id, target_app, **copier_options)
+            for app_id, target_app in targets.items()
+        }
+        if not force:
+            # 書き込みを始める前にすべての書き込み先を確かめる
+            for app_id, restorer in restorers.items():
+                if resume and restorer.checkpoint_path("").exists():
+                    continue
+                existing = self.crud.count(restorer.target_app)
+                if existing:
+                    raise ValueError(
+                        f"App {restorer.target_app} already has {existing} records; restoring app {app_id} "
+                        f"would duplicate them. Restore into an empty app or use force"
+                    )
+
+        results = {}
+        for app_id, restorer in restorers.items():
+            callback = (lambda result, app_id=app_id: progress(app_id, result)) if progress else None
+            results[app_id] = restorer.copy(resume=resume, progress=callback)
+        return results
+
+
+class SnapshotRestorer(RecordCopier):
+    """スナップショットのレコード（BackupManager.latest_records）をアプリに書き込む RecordCopier"""
+
+    def __init__(
+        self,
+        crud: KintoneCRUD,
+        manager: BackupManager,
+        snapshot: Snapshot,
+        app_id: int,
+        target_app: Optional[int] = None,
+        mapping: Optional[dict[str, Optional[str]]] = None,
+        preserve_meta: bool = True,
+        **options: Any,
+    ):
+        target_app = target_app if target_app is not None else app_id
+        self.manager = manager
+        self.snapshot = snapshot
+        self.chain = manager.app_chain(snapshot, app_id)
+        if not self.chain:
+            raise ValueError(f"App {app_id} is not in snapshot {snapshot.name}")
+        with open(self.chain[0][0].path / "apps" / str(app_id) / "schema.json") as f:
+            source = AppSchema.from_dict(json.load(f))
+        target = SchemaManager(client=crud.client).get_schema(target_app, refresh=True)
+        if target is None:
+            raise RuntimeError(f"Failed to get schema of app {target_app}")
+        field_map = FieldMap.compile(source, target, mapping, preserve_meta)
+        if not snapshot.include_files:
+            field_map.skipped.update({r.source: "files not in backup" for r in field_map.rules if r.source_type == "FILE"})
+            field_map.rules = [r for r in field_map.rules if r.source_type != "FILE"]
+        options.setdefault("checkpoint", manager.path / "restore" / f"{snapshot.name}-{app_id}-{target_app}.json")
+        super().__init__(crud, app_id, target_app, field_map=field_map, **options)
+
+    def _file_content(self, item: dict) -> bytes:
+        if "sha256" not in item:
+            raise RuntimeError(f"File not in backup: {item.get('name')}")
+        return self.manager.files.read(item["sha256"])
+
+    def _source(
+        self, query: str, after_id: int, retry_ids: list[int], reader: str, pending: set[int],
+        skip: list[tuple[int, int]] = (),
+    ) -> Iterator[dict]:
+        retry = set(retry_ids)
+        for record in self.manager.latest_records(self.snapshot, self.source_app):
+            record_id = int(field_value(record, "$id"))
+            skipped = any(lo <= record_id <= hi for lo, hi in skip)
+            if (record_id > after_id and not skipped) or record_id in retry:
+                retry.discard(record_id)
+                yield record
+        with self._lock:
+            pending.difference_update(retry)  # スナップショットにないレコードは再試行しない
+
+
+def print_snapshot(snapshot: Snapshot, as_json: bool = False):
+    """スナップショットの内容を表示"""
+    if as_json:
+        data = {"name": snapshot.name, "base": snapshot.base, "elapsed": round(snapshot.elapsed, 3),
+                "apps": {str(k): asdict(v) for k, v in sorted(snapshot.apps.items())}}
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    kind = f"incremental (base: {snapshot.base})" if snapshot.base else "full"
+    print(f"📦 {snapshot.name} — {kind}, {len(snapshot.apps)} apps ({snapshot.elapsed:.1f}s)")
+    for app in sorted(snapshot.apps.values(), key=lambda a: a.app_id):
+        mark = {"done": "✅", "deferred": "⏸", "failed": "❌"}.get(app.status, "?")
+        detail = f"{app.records} records, {app.files} files" + ("" if app.full else " (changed)")
+        print(f"  {mark} {app.app_id} {app.name}: {detail if app.status == 'done' else app.error}")
+
+
+def _parse_ids(text: Optional[str]) -> Optional[list[int]]:
+    return [int(i) for i in text.split(",") if i.strip()] if text else None
+
+
+def _parse_targets(text: str) -> dict[int, int]:
+    """"123:456,124:457" 形式のリストア先"""
+    targets = {}
+    for entry in text.split(","):
+        source, sep, target = entry.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid target: {entry!r} (expected SOURCE:TARGET)")
+        targets[int(source)] = int(target)
+    return targets
+
+
+def main():
+    import argparse
+    import sys
+
+    from kintone_lease import CursorLeaseManager
+    from kintone_quota import QuotaScheduler, QuotaTracker
+
+    parser = argparse.ArgumentParser(description="Back up and restore KINTONE apps")
+    parser.add_argument("command", choices=["backup", "restore", "list"], help="Operation")
+    parser.add_argument("directory", help="Backup directory")
+    parser.add_argument("--apps", type=str, help="App IDs comma-separated (default: all apps)")
+    parser.add_argument("--full", action="store_true", help="Full backup (ignore the previous snapshot)")
+    parser.add_argument("--no-files", action="store_true", help="Don't back up attachments")
+    parser.add_argument("--workers", type=int, default=4, help="Apps backed up in parallel / add requests in flight")
+    parser.add_argument("--file-workers", type=int, default=4, help="Concurrent attachment downloads / uploads")
+    parser.add_argument("--snapshot", type=str, help="Snapshot to restore (default: latest)")
+    parser.add_argument("--to", type=str, help="Restore targets: SOURCE:TARGET,... (default: same app)")
+    parser.add_argument("--no-meta", action="store_true", help="Don't restore creator/modifier and timestamps")
+    parser.add_argument("--restart", action="store_true", help="Ignore the restore checkpoint")
+    parser.add_argument("--force", action="store_true", help="Restore into apps that already have records")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    crud = KintoneCRUD()
+    tracker = QuotaTracker(crud.config)
+    crud.client.add_hook(tracker)
+    crud.leases = CursorLeaseManager(crud.client)
+    manager = BackupManager(
+        crud, args.directory,
+        max_apps=args.workers,
+        file_workers=args.file_workers,
+        include_files=not args.no_files,
+        scheduler=QuotaScheduler(tracker),
+    )
+
+    try:
+        if args.command == "list":
+            for snapshot in manager.snapshots():
+                print_snapshot(snapshot, args.json)
+            return
+
+        if args.command == "backup":
+            def report(app: AppBackup):
+                print(f"  {app.app_id} {app.name}: {app.status} ({app.records} records)", file=sys.stderr)
+
+            snapshot = manager.backup(_parse_ids(args.apps), full=args.full, progress=None if args.json else report)
+            print_snapshot(snapshot, args.json)
+            if not snapshot.success:
+                sys.exit(1)
+            return
+
+        targets = _parse_targets(args.to) if args.to else None
+        if targets is None and args.apps:
+            targets = {app_id: app_id for app_id in _parse_ids(args.apps)}
+
+        def progress(app_id: int, result: CopyResult):
+            print(f"\r📦 {app_id}: {result.copied}/{result.read} 件", end="", file=sys.stderr, flush=True)
+
+        results = manager.restore(
+            args.snapshot, targets, resume=not args.restart, progress=None if args.json else progress, force=args.force,
+            preserve_meta=not args.no_meta, write_workers=args.workers, file_workers=args.file_workers,
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps({
+            str(app_id): {"copied": r.copied, "files": r.files, "failed": {str(k): v for k, v in r.failed.items()}}
+            for app_id, r in results.items()
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(file=sys.stderr)
+        for app_id, result in results.items():
+            mark = "✅" if result.success else "❌"
+            print(f"{mark} {app_id}: {result.copied} records, {result.files} files ({result.elapsed:.1f}s)")
+            for record_id, error in sorted(result.failed.items())[:20]:
+                print(f"   Record {record_id}: {error}")
+    if not all(r.success for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""KINTONE GET レスポンスのキャッシュ
+
+KintoneClient(cache=ResponseCache()) で有効になる読み取りキャッシュです。
+
+- エンドポイントごとの TTL（TTL のないエンドポイントはキャッシュしない）
+- メモリの LRU（件数上限あり）と、任意でプロセス間で共有するディスク層（SQLite）
+- 同じクライアントからの書き込みが成功すると、対象アプリのレコード検索と
+  対象レコードのエントリを削除
+
+他のクライアント・プロセスからの書き込みは検知できないため、TTL の間は
+古い値を返すことがあります（ディスク層の削除は共有されます）。
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from kintone_client import _encode_params, json_dumps, json_loads
+
+# エンドポイントごとの TTL（秒）
+DEFAULT_TTLS = {
+    "record.json": 30,
+    "app.json": 300,
+    "apps.json": 300,
+    "app/form/fields.json": 600,
+}
+DEFAULT_MAX_ENTRIES = 10000
+
+# 書き込みでアプリ内のエントリを無効化するエンドポイント
+_WRITE_ENDPOINTS = {
+    "record.json",
+    "records.json",
+    "record/status.json",
+    "records/status.json",
+}
+# アプリ全体に影響する読み取り（書き込みのたびに無効化）
+_APP_SCOPED_READS = {"records.json"}
+
+
+@dataclass
+class _Entry:
+    endpoint: str
+    app_id: Optional[int]
+    record_id: Optional[int]
+    expires_at: float
+    body: bytes
+
+
+def _scope(endpoint: str, params: dict) -> tuple[Optional[int], Optional[int]]:
+    """エントリが属するアプリ ID とレコード ID"""
+    if endpoint == "app.json":
+        return int(params["id"]), None
+    app_id = params.get("app")
+    if app_id is None:
+        return None, None
+    record_id = params.get("id") if endpoint == "record.json" else None
+    return int(app_id), int(record_id) if record_id is not None else None
+
+
+def _written_records(method: str, endpoint: str, data: dict) -> Optional[list[int]]:
+    """書き込みリクエストの対象レコード ID（updateKey 指定などで特定できなければ None）"""
+    if method == "POST":
+        return []  # 追加: 既存レコードのエントリは変わらない
+    if "ids" in data:
+        return [int(i) for i in data["ids"]]
+    items = [data] if endpoint in ("record.json", "record/status.json") else data.get("records", [])
+    if not all(isinstance(item, dict) and "id" in item for item in items):
+        return None
+    return [int(item["id"]) for item in items]
+
+
+class ResponseCache:
+    """GET レスポンスのキャッシュ（メモリ LRU + 任意のディスク層）
+
+    使用例:
+        cache = ResponseCache(path=config.cache_dir / "responses.sqlite", ttls={"record.json": 10})
+        client = KintoneClient(config, cache=cache)
+        client.get_record(123, 1)
+        client.get_record(123, 1)   # キャッシュから返す
+        cache.stats()               # {"hits": 1, "misses": 1, ...}
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[dict[str, float]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        """
+        Args:
+            ttls: エンドポイントごとの TTL（DEFAULT_TTLS を上書き、0 でキャッシュしない）
+            max_entries: メモリに保持するエントリ数
+            path: ディスク層の SQLite ファイル（省略時はメモリのみ）
+        """
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.invalidations = 0
+        # 無効化のたびに増える世代（無効化の前に始まった GET の結果を保存しないため）
+        self.generation = 0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, endpoint TEXT, app INTEGER, record INTEGER, expires_at REAL, body BLOB)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS responses_app ON responses (app)")
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        return closing(sqlite3.connect(str(self.path), timeout=30, isolation_level=None))
+
+    def cacheable(self, endpoint: str) -> bool:
+        """エンドポイントをキャッシュするか"""
+        return self.ttls.get(endpoint, 0) > 0
+
+    @staticmethod
+    def key(config: Any, endpoint: str, params: Optional[dict], token: Optional[str] = None) -> str:
+        """ドメイン・API トークン・エンドポイント・パラメーターから作るキー
+
+        権限の異なるトークン間でレスポンスを共有しないよう、リクエストに使う
+        トークン（省略時は既定のトークン）のハッシュを含めます。
+        """
+        token = token if token is not None else config.api_token
+        token = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+        query = _encode_params(dict(sorted((params or {}).items())))
+        return f"{config.base_url}|{token}|{endpoint}?{query}"
+
+    def _remember(self, key: str, entry: _Entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """有効なエントリのデータ（なければ None）"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry.expires_at < now:
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self.path is not None:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT endpoint, app, record, expires_at, body FROM responses "
+                        "WHERE key = ? AND expires_at >= ?",
+                        (key, now),
+                    ).fetchone()
+                if row is not None:
+                    entry = _Entry(*row)
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # 呼び出し側がデータを変更してもキャッシュに影響しないよう毎回デコード
+        return json_loads(entry.body)
+
+    def put(self, key: str, endpoint: str, params: Optional[dict], data: Any, generation: Optional[int] = None):
+        """レスポンスを保存
+
+        generation を渡すと、取得中に無効化があった場合は保存しません（古い値を残さない）。
+        """
+        app_id, record_id = _scope(endpoint, params or {})
+        entry = _Entry(endpoint, app_id, record_id, time.time() + self.ttls[endpoint], json_dumps(data))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remember(key, entry)
+            if self.path is not None:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, entry.endpoint, entry.app_id, entry.record_id, entry.expires_at, entry.body),
+                    )
+
+    def invalidate(self, app_id: int, record_ids: Optional[list[int]] = None):
+        """アプリのレコード検索と、指定レコード（省略時はアプリの全レコード）のエントリを削除"""
+        ids = set(record_ids) if record_ids is not None else None
+
+        def affected(endpoint: str, entry_app: Optional[int], entry_record: Optional[int]) -> bool:
+            if entry_app != app_id:
+                return False
+            if endpoint in _APP_SCOPED_READS:
+                return True
+            return endpoint == "record.json" and (ids is None or entry_record in ids)
+
+        with self._lock:
+            self.generation += 1
+            stale = [k for k, e in self._memory.items() if affected(e.endpoint, e.app_id, e.record_id)]
+            for key in stale:
+                del self._memory[key]
+            removed = len(stale)
+            if self.path is not None:
+                with self._connect() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    rows = conn.execute(
+                        "SELECT key, endpoint, record FROM responses WHERE app = ?", (app_id,)
+                    ).fetchall()
+                    keys = [(key,) for key, endpoint, record in rows if affected(endpoint, app_id, record)]
+                    conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+                    conn.execute("COMMIT")
+                removed = max(removed, len(keys))
+            self.invalidations += removed
+
+    def invalidate_write(self, method: str, endpoint: str, data: Optional[dict]):
+        """成功した書き込みリクエストに応じて無効化（bulkRequest は各リクエストごと）"""
+        if not data:
+            return
+        if endpoint == "bulkRequest.json":
+            for request in data.get("requests", []):
+                api = request.get("api", "").rsplit("/v1/", 1)[-1]
+                self.invalidate_write(request.get("method", ""), api, request.get("payload"))
+            return
+        if endpoint not in _WRITE_ENDPOINTS or "app" not in data:
+            return
+        self.invalidate(int(data["app"]), _written_records(method, endpoint, data))
+
+    def clear(self):
+        """すべてのエントリを削除"""
+        with self._lock:
+            self._memory.clear()
+            if self.path is not None:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, int]:
+        """ヒット・ミスの回数"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "invalidations": self.invalidations,
+                "entries": len(self._memory),
+            }
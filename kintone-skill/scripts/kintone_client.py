@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 """KINTONE API クライアントモジュール"""
 
+import gzip
 import json
+import os
+import threading
+import time
 import urllib.request
 import urllib.error
 import urllib.parse
-from typing import Any, Optional
+import zlib
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
 from dataclasses import dataclass
 
+try:
+    import orjson  # 任意: インストールされていれば JSON デコードに使用
+except ImportError:
+    orjson = None
+
 from kintone_config import KintoneConfig, get_config
+from kintone_metrics import (
+    RequestMetrics,
+    build_timed_opener,
+    get_connection_timing,
+    reset_connection_timing,
+    take_retries,
+)
+from kintone_pool import DEFAULT_MAX_CONNECTIONS, ConnectionPool
+
+if TYPE_CHECKING:
+    from kintone_cache import ResponseCache
+    from kintone_stream import JsonArrayStream
 
 
 @dataclass
@@ -20,29 +42,420 @@ class KintoneResponse:
     error_code: Optional[str] = None
 
 
+# レスポンスの圧縮転送（KINTONE_ACCEPT_ENCODING=identity で無効化）
+ACCEPT_ENCODING = os.environ.get("KINTONE_ACCEPT_ENCODING", "gzip, deflate")
+
+# JSON デコーダー（KINTONE_JSON_BACKEND=json で標準ライブラリを強制）
+JSON_BACKEND = "orjson" if orjson and os.environ.get("KINTONE_JSON_BACKEND", "orjson") == "orjson" else "json"
+
+
+def json_loads(data: bytes) -> Any:
+    """bytes から直接 JSON をデコード（str への変換コピーを作らない）"""
+    if JSON_BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any) -> bytes:
+    """1行の UTF-8 JSON にエンコード（NDJSON の書き出し用）"""
+    if JSON_BACKEND == "orjson":
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _content_encoding(headers: Any) -> Optional[str]:
+    """レスポンスヘッダーの Content-Encoding（小文字）"""
+    try:
+        value = headers.get("Content-Encoding")
+    except AttributeError:
+        return None
+    return value.strip().lower() if isinstance(value, str) else None
+
+
+def _decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Content-Encoding に従ってレスポンス本文を展開"""
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:  # zlib ヘッダーなしの raw deflate を返すサーバーもある
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+class _StreamDecompressor:
+    """Content-Encoding に従って chunk ごとに展開"""
+
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        self._started = False
+        if encoding == "gzip":
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._obj = zlib.decompressobj()
+        else:
+            self._obj = None
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._obj is None:
+            return chunk
+        try:
+            data = self._obj.decompress(chunk)
+        except zlib.error:
+            if self.encoding != "deflate" or self._started:
+                raise
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)  # raw deflate
+            data = self._obj.decompress(chunk)
+        self._started = True
+        return data
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj is not None else b""
+
+
+def _error_code(body: bytes) -> Optional[str]:
+    """エラーレスポンスからエラーコードを取り出す"""
+    try:
+        return json_loads(body).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _encode_params(params: dict) -> str:
+    """GET パラメータをエンコード（配列は fields[0]=a&fields[1]=b 形式）"""
+    pairs = []
+    for key, value in params.items():
+        if isinstance(value, (list, tuple)):
+            pairs.extend((f"{key}[{i}]", item) for i, item in enumerate(value))
+        else:
+            pairs.append((key, value))
+    return urllib.parse.urlencode(pairs)
+
+
+def _parse_response(ok: bool, body: bytes) -> KintoneResponse:
+    """レスポンス本文から KintoneResponse を作成"""
+    if ok:
+        return KintoneResponse(success=True, data=json_loads(body))
+    error_body = json_loads(body)
+    return KintoneResponse(
+        success=False,
+        error=error_body.get("message", "HTTP Error"),
+        error_code=error_body.get("code"),
+    )
+
+
+# 同時に実行中の同じ GET を1回にまとめない（取得のたびに位置が進む）エンドポイント
+_UNCOALESCED_GETS = {"records/cursor.json"}
+
+
+class _Flight:
+    """実行中の GET リクエスト（同じ URL を待つスレッドに結果を渡す）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[tuple[bool, bytes]] = None
+        self.error: Optional[BaseException] = None
+
+
+# KintoneClient.shared() が返すプロセス共有のクライアント
+_shared_clients: dict[Optional[tuple[str, tuple]], "KintoneClient"] = {}
+_shared_lock = threading.Lock()
+
+
 class KintoneClient:
-    """KINTONE REST API クライアント"""
+    """KINTONE REST API クライアント
+
+    リクエストごとの状態はすべてローカル変数（接続時間はスレッドローカル）に持つため、
+    1つのインスタンスを複数スレッドから同時に使用できます。
 
-    def __init__(self, config: Optional[KintoneConfig] = None):
+    API トークンはリクエストごとに対象アプリから選びます（config.app_tokens）。
+    接続プールはトークンの組み合わせごとに分けるため、アプリごとにトークンの
+    異なる並列処理も1つのインスタンスで実行できます。
+    """
+
+    def __init__(
+        self,
+        config: Optional[KintoneConfig] = None,
+        hooks: Optional[list[Callable[[RequestMetrics], None]]] = None,
+        pool: Optional["ConnectionPool"] = None,
+        cache: Optional["ResponseCache"] = None,
+        coalesce: bool = True,
+    ):
         self.config = config or get_config()
+        # リクエストごとに RequestMetrics を受け取るフック（MetricsRecorder など）
+        self.hooks: list[Callable[[RequestMetrics], None]] = list(hooks or [])
+        # keep-alive 接続プール（None なら urllib で毎回接続）
+        self.pool = pool
+        # GET レスポンスのキャッシュ（None なら毎回リクエスト）
+        self.cache = cache
+        # 同じ URL の GET が実行中なら、新たに送信せずその結果を共有する
+        self.coalesce = coalesce
+        self.coalesced = 0  # 結果を共有して送信を省いた回数
+        # 書き込みリクエストが完了するたびに進める（それより前に始まった GET の結果は共有しない）
+        self._write_generation = 0
+        self._inflight: dict[tuple[int, str], _Flight] = {}
+        self._inflight_lock = threading.Lock()
+        # 既定以外のトークンの接続プール（pool があるときに遅延作成）
+        self._token_pools: dict[str, "ConnectionPool"] = {}
+        # 作成したカーソルのアプリ（カーソルの取得・削除に同じトークンを使う）
+        self._cursor_apps: dict[str, int] = {}
+        self._routing_lock = threading.Lock()
+        self._timed_opener = build_timed_opener()
+
+    @classmethod
+    def shared(
+        cls,
+        config: Optional[KintoneConfig] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> "KintoneClient":
+        """プロセス共有のクライアントを返す（接続プール付き・スレッドセーフ）
+
+        config 省略時は最初の呼び出しで get_config() を1回だけ実行します。
+        同じドメイン・API トークン（アプリごとのトークンを含む）には同じインスタンスを返します。
+        """
+        with _shared_lock:
+            key = (config.base_url, config.credentials) if config else None
+            client = _shared_clients.get(key)
+            if client is None:
+                config = config or get_config()
+                client = cls(config, pool=ConnectionPool(config.base_url, max_connections))
+                _shared_clients[key] = client
+                _shared_clients[(config.base_url, config.credentials)] = client
+            return client
+
+    @classmethod
+    def reset_shared(cls):
+        """共有クライアントを破棄（設定変更時・テスト用）"""
+        with _shared_lock:
+            for client in set(_shared_clients.values()):
+                client.close_pools()
+            _shared_clients.clear()
+
+    def close_pools(self):
+        """接続プール（トークンごとのプールを含む）の接続をすべて閉じる"""
+        if self.pool is not None:
+            self.pool.close()
+        with self._routing_lock:
+            pools = list(self._token_pools.values())
+            self._token_pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def add_hook(self, hook: Callable[[RequestMetrics], None]):
+        """計測フックを追加"""
+        self.hooks.append(hook)
+
+    def _pool_for(self, token: Optional[str]) -> "ConnectionPool":
+        """トークンの組み合わせに対応する接続プール（既定のトークンは self.pool）"""
+        if token is None or token == self.config.token_for():
+            return self.pool
+        with self._routing_lock:
+            pool = self._token_pools.get(token)
+            if pool is None:
+                pool = self._token_pools[token] = ConnectionPool(self.config.base_url, self.pool.max_connections)
+            return pool
+
+    def _urlopen(self, req: urllib.request.Request, timeout: int):
+        """リクエストを開く（プール、またはフック登録時は DNS/接続時間を計測するオープナーを使用）"""
+        if self.pool is not None:
+            return self._pool_for(req.get_header("X-cybozu-api-token")).open(req, timeout)
+        if self.hooks:
+            return self._timed_opener.open(req, timeout=timeout)
+        return urllib.request.urlopen(req, timeout=timeout)
+
+    def _send(
+        self,
+        req: urllib.request.Request,
+        endpoint: str,
+        timeout: int = 30,
+        apps: tuple[int, ...] = (),
+    ) -> tuple[bool, bytes]:
+        """リクエストを送信して (成功したか, レスポンス本文) を返す
 
-    def _make_request(
+        HTTP エラーも本文（エラー JSON）とともに返し、通信エラーは送出します。
+        フックが登録されていれば計測結果を通知します。
+        """
+        method = req.get_method()
+        metrics = RequestMetrics(
+            method=method,
+            endpoint=endpoint,
+            request_bytes=len(req.data or b""),
+            apps=apps,
+        )
+        reset_connection_timing()
+        start = time.perf_counter()
+        try:
+            try:
+                with self._urlopen(req, timeout) as response:
+                    metrics.ttfb = time.perf_counter() - start
+                    body = response.read()
+                    metrics.status = getattr(response, "status", None)
+                    encoding = _content_encoding(response.headers)
+                    ok = True
+            except urllib.error.HTTPError as e:
+                metrics.ttfb = time.perf_counter() - start
+                body = e.read()
+                metrics.status = e.code
+                encoding = _content_encoding(e.headers)
+                ok = False
+            metrics.response_bytes = len(body)  # 転送量（圧縮後）
+            body = _decompress(body, encoding)
+            if not ok:
+                metrics.error_code = _error_code(body)
+            return ok, body
+        except Exception as e:
+            metrics.error_code = type(e).__name__
+            raise
+        finally:
+            metrics.total = time.perf_counter() - start
+            metrics.dns, metrics.connect = get_connection_timing()
+            metrics.retries = take_retries()
+            if method != "GET":
+                # 失敗しても書き込まれた可能性があるため、応答の成否に関係なく進める
+                with self._inflight_lock:
+                    self._write_generation += 1
+            for hook in self.hooks:
+                hook(metrics)
+
+    def _send_once(
+        self,
+        req: urllib.request.Request,
+        endpoint: str,
+        timeout: int = 30,
+        apps: tuple[int, ...] = (),
+    ) -> tuple[bool, bytes]:
+        """同じ URL の GET が実行中ならその結果を待って共有し、なければ送信する
+
+        結果はレスポンス本文（bytes）で共有し、呼び出し側ごとに解析するため
+        返されるデータは呼び出し側ごとに別のオブジェクトになります。
+        書き込みの完了後に始めた GET は、それより前に始まった GET の結果を共有しません
+        （書き込んだ内容をすぐに読み直せるように）。
+        """
+        with self._inflight_lock:
+            key = (self._write_generation, req.full_url)
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._send(req, endpoint, timeout, apps)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _stream(
+        self,
+        req: urllib.request.Request,
+        endpoint: str,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        apps: tuple[int, ...] = (),
+    ) -> Iterator[bytes]:
+        """レスポンス本文を展開しながら受信した分ずつ返す
+
+        HTTP エラーは RuntimeError を送出します。計測結果は読み終えた時点（または中断時）に通知します。
+        """
+        method = req.get_method()
+        metrics = RequestMetrics(
+            method=method,
+            endpoint=endpoint,
+            request_bytes=len(req.data or b""),
+            apps=apps,
+        )
+        reset_connection_timing()
+        start = time.perf_counter()
+        try:
+            try:
+                response = self._urlopen(req, timeout)
+            except urllib.error.HTTPError as e:
+                metrics.ttfb = time.perf_counter() - start
+                metrics.status = e.code
+                body = e.read()
+                metrics.response_bytes = len(body)
+                error = _parse_response(False, _decompress(body, _content_encoding(e.headers)))
+                metrics.error_code = error.error_code
+                raise RuntimeError(f"{error.error} ({error.error_code})")
+
+            with response:
+                metrics.ttfb = time.perf_counter() - start
+                metrics.status = getattr(response, "status", None)
+                decompressor = _StreamDecompressor(_content_encoding(response.headers))
+                read = getattr(response, "read1", response.read)
+                while True:
+                    chunk = read(chunk_size)
+                    if not chunk:
+                        break
+                    metrics.response_bytes += len(chunk)
+                    data = decompressor.decompress(chunk)
+                    if data:
+                        yield data
+                data = decompressor.flush()
+                if data:
+                    yield data
+        except Exception as e:
+            metrics.error_code = metrics.error_code or type(e).__name__
+            raise
+        finally:
+            metrics.total = time.perf_counter() - start
+            metrics.dns, metrics.connect = get_connection_timing()
+            metrics.retries = take_retries()
+            for hook in self.hooks:
+                hook(metrics)
+
+    def _request_apps(self, endpoint: str, data: Optional[dict], params: Optional[dict]) -> tuple[int, ...]:
+        """リクエストの対象アプリ ID（特定できなければ空）"""
+        payload = params or data or {}
+        if endpoint == "bulkRequest.json":
+            return tuple(dict.fromkeys(
+                int(request["payload"]["app"])
+                for request in payload.get("requests", [])
+                if "app" in (request.get("payload") or {})
+            ))
+        if endpoint == "records/cursor.json" and "id" in payload:
+            with self._routing_lock:
+                app_id = self._cursor_apps.get(str(payload["id"]))
+            return (app_id,) if app_id is not None else ()
+        if endpoint == "app.json" and "id" in payload:
+            return (int(payload["id"]),)
+        if "app" in payload:
+            return (int(payload["app"]),)
+        return ()
+
+    def _build_request(
         self,
         method: str,
         endpoint: str,
         data: Optional[dict] = None,
         params: Optional[dict] = None,
-    ) -> KintoneResponse:
-        """API リクエストを実行"""
+        token: Optional[str] = None,
+    ) -> urllib.request.Request:
+        """API リクエストを組み立てる（token 省略時は対象アプリのトークン）"""
         url = f"{self.config.base_url}/k/v1/{endpoint}"
 
         # GET リクエストの場合、パラメータを URL に追加
         if method == "GET" and params:
-            query_string = urllib.parse.urlencode(params)
-            url = f"{url}?{query_string}"
+            url = f"{url}?{_encode_params(params)}"
 
+        if token is None:
+            token = self.config.token_for(self._request_apps(endpoint, data, params))
         headers = {
-            "X-Cybozu-API-Token": self.config.api_token,
+            "X-Cybozu-API-Token": token,
+            "Accept-Encoding": ACCEPT_ENCODING,
         }
 
         request_data = None
@@ -50,27 +463,52 @@ class KintoneClient:
             request_data = json.dumps(data).encode("utf-8")
             headers["Content-Type"] = "application/json"
 
-        req = urllib.request.Request(
+        return urllib.request.Request(
             url,
             data=request_data,
             headers=headers,
             method=method,
         )
 
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[dict] = None,
+        params: Optional[dict] = None,
+    ) -> KintoneResponse:
+        """API リクエストを実行
+
+        同じ GET が他のスレッドで実行中なら結果を共有します（カーソルの取得を除く）。
+        cache があれば GET はキャッシュを経由し、書き込みが成功したら無効化します。
+        """
+        apps = self._request_apps(endpoint, data, params)
+        token = self.config.token_for(apps)
+        cache_key = None
+        if self.cache is not None and method == "GET" and self.cache.cacheable(endpoint):
+            cache_key = self.cache.key(self.config, endpoint, params, token)
+            generation = self.cache.generation
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return KintoneResponse(success=True, data=cached)
+
+        req = self._build_request(method, endpoint, data, params, token)
         try:
-            with urllib.request.urlopen(req, timeout=30) as response:
-                response_data = json.loads(response.read().decode("utf-8"))
-                return KintoneResponse(success=True, data=response_data)
-        except urllib.error.HTTPError as e:
-            error_body = json.loads(e.read().decode("utf-8"))
-            return KintoneResponse(
-                success=False,
-                error=error_body.get("message", str(e)),
-                error_code=error_body.get("code"),
-            )
+            if method == "GET" and self.coalesce and endpoint not in _UNCOALESCED_GETS:
+                ok, body = self._send_once(req, endpoint, apps=apps)
+            else:
+                ok, body = self._send(req, endpoint, apps=apps)
+            response = _parse_response(ok, body)
         except Exception as e:
             return KintoneResponse(success=False, error=str(e))
 
+        if self.cache is not None and response.success:
+            if cache_key is not None:
+                self.cache.put(cache_key, endpoint, params, response.data, generation)
+            elif method != "GET":
+                self.cache.invalidate_write(method, endpoint, data)
+        return response
+
     # === レコード操作 ===
 
     def get_record(self, app_id: int, record_id: int) -> KintoneResponse:
@@ -201,7 +639,11 @@ class KintoneClient:
         if fields:
             data["fields"] = fields
 
-        return self._make_request("POST", "records/cursor.json", data=data)
+        response = self._make_request("POST", "records/cursor.json", data=data)
+        if response.success and response.data:
+            with self._routing_lock:
+                self._cursor_apps[str(response.data["id"])] = app_id
+        return response
 
     def get_cursor_records(self, cursor_id: str) -> KintoneResponse:
         """カーソルからレコードを取得
@@ -218,6 +660,25 @@ class KintoneClient:
             params={"id": cursor_id},
         )
 
+    def stream_cursor_records(self, cursor_id: str) -> "JsonArrayStream":
+        """カーソルからレコードを逐次取得
+
+        ページ全体の解析を待たずに、受信したレコードから1件ずつ返します。
+        next は読み終えた後に stream.fields["next"] で参照できます。
+
+        Args:
+            cursor_id: カーソル ID
+
+        Returns:
+            JsonArrayStream: レコードのイテレーター（失敗時は RuntimeError）
+        """
+        from kintone_stream import JsonArrayStream
+
+        params = {"id": cursor_id}
+        req = self._build_request("GET", "records/cursor.json", params=params)
+        apps = self._request_apps("records/cursor.json", None, params)
+        return JsonArrayStream(self._stream(req, "records/cursor.json", apps=apps), key="records")
+
     def delete_cursor(self, cursor_id: str) -> KintoneResponse:
         """カーソルを削除
 
@@ -227,11 +688,14 @@ class KintoneClient:
         Returns:
             KintoneResponse with data: {}
         """
-        return self._make_request(
+        response = self._make_request(
             "DELETE",
             "records/cursor.json",
             data={"id": cursor_id},
         )
+        with self._routing_lock:
+            self._cursor_apps.pop(str(cursor_id), None)
+        return response
 
     # === ステータス操作 ===
 
@@ -267,6 +731,30 @@ class KintoneClient:
 
         return self._make_request("PUT", "record/status.json", data=data)
 
+    def update_statuses(self, app_id: int, records: list[dict]) -> KintoneResponse:
+        """複数レコードのステータスを一括更新（ワークフロー）
+
+        Args:
+            app_id: アプリ ID
+            records: 更新内容の配列（最大 100 件）
+                [{"id": 1, "action": "承認", "assignee": "tanaka", "revision": 3}]
+
+        Returns:
+            KintoneResponse with data: {"records": [{"id": "1", "revision": "5"}]}
+        """
+        if len(records) > 100:
+            return KintoneResponse(
+                success=False,
+                error="Status update limit is 100",
+                error_code="LIMIT_EXCEEDED",
+            )
+
+        return self._make_request(
+            "PUT",
+            "records/status.json",
+            data={"app": app_id, "records": records},
+        )
+
     # === コメント操作 ===
 
     def add_comment(
@@ -378,54 +866,53 @@ class KintoneClient:
 
     # === ファイル操作 ===
 
-    def download_file(self, file_key: str) -> bytes:
-        """ファイルをダウンロード"""
+    def download_file(self, file_key: str, app_id: Optional[int] = None) -> bytes:
+        """ファイルをダウンロード（app_id を渡すとそのアプリのトークンを使用）"""
         url = f"{self.config.base_url}/k/v1/file.json?fileKey={file_key}"
-        headers = {"X-Cybozu-API-Token": self.config.api_token}
+        headers = {"X-Cybozu-API-Token": self.config.token_for([app_id] if app_id is not None else [])}
 
         req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=60) as response:
-            return response.read()
+        ok, body = self._send(req, "file.json", timeout=60, apps=(app_id,) if app_id is not None else ())
+        if not ok:
+            raise RuntimeError(f"Download failed: {_parse_response(ok, body).error}")
+        return body
 
-    def upload_file(self, file_path: str, file_name: str) -> KintoneResponse:
-        """ファイルをアップロード"""
+    def upload_file(self, file_path: str, file_name: str, app_id: Optional[int] = None) -> KintoneResponse:
+        """ファイルをアップロード（app_id を渡すとそのアプリのトークンを使用）"""
         import mimetypes
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.base import MIMEBase
-        from email import encoders
-
-        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
 
         with open(file_path, "rb") as f:
             file_content = f.read()
 
         content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        return self.upload_bytes(file_content, file_name, content_type, app_id)
+
+    def upload_bytes(
+        self,
+        content: bytes,
+        file_name: str,
+        content_type: str = "application/octet-stream",
+        app_id: Optional[int] = None,
+    ) -> KintoneResponse:
+        """メモリ上のデータをファイルとしてアップロード（ダウンロードしたファイルの再アップロードなど）"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
 
         body = (
             f"--{boundary}\r\n"
             f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
             f"Content-Type: {content_type}\r\n\r\n"
-        ).encode("utf-8") + file_content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
 
         url = f"{self.config.base_url}/k/v1/file.json"
         headers = {
-            "X-Cybozu-API-Token": self.config.api_token,
+            "X-Cybozu-API-Token": self.config.token_for([app_id] if app_id is not None else []),
             "Content-Type": f"multipart/form-data; boundary={boundary}",
         }
 
         req = urllib.request.Request(url, data=body, headers=headers, method="POST")
 
-        try:
-            with urllib.request.urlopen(req, timeout=60) as response:
-                response_data = json.loads(response.read().decode("utf-8"))
-                return KintoneResponse(success=True, data=response_data)
-        except urllib.error.HTTPError as e:
-            error_body = json.loads(e.read().decode("utf-8"))
-            return KintoneResponse(
-                success=False,
-                error=error_body.get("message", str(e)),
-                error_code=error_body.get("code"),
-            )
+        ok, response_body = self._send(req, "file.json", timeout=60, apps=(app_id,) if app_id is not None else ())
+        return _parse_response(ok, response_body)
 
 
 if __name__ == "__main__":
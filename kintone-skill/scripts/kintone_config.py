@@ -4,29 +4,56 @@
 import os
 import json
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+
+def _split_tokens(value: Any) -> list[str]:
+    """カンマ区切りの文字列・リストを API トークンのリストにする"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [token.strip() for token in value if token and token.strip()]
+
+
+def _parse_app_tokens(value: str) -> dict[int, str]:
+    """KINTONE_APP_TOKENS（例: "123:tokA,tokB;456:tokC"）を解析"""
+    app_tokens: dict[int, str] = {}
+    for entry in value.split(";"):
+        if not entry.strip():
+            continue
+        app_id, sep, tokens = entry.partition(":")
+        if not sep or not app_id.strip().isdigit() or not _split_tokens(tokens):
+            raise ValueError(f"Invalid KINTONE_APP_TOKENS entry: {entry.strip()!r} (expected APP_ID:TOKEN[,TOKEN])")
+        app_tokens[int(app_id)] = ",".join(_split_tokens(tokens))
+    return app_tokens
 
 
 @dataclass
 class KintoneConfig:
-    """KINTONE 接続設定"""
+    """KINTONE 接続設定
+
+    api_token は既定のトークン、app_tokens はアプリ ID ごとのトークン
+    （カンマ区切りで複数指定可）です。リクエストごとに token_for() で
+    対象アプリのトークンを選びます。
+    """
     domain: str
     api_token: str
     default_app_id: Optional[int] = None
     cache_dir: Path = Path.home() / ".cache" / "kintone-skill"
     cache_ttl: int = 3600  # 秒
+    app_tokens: dict[int, str] = field(default_factory=dict)
 
     @classmethod
     def from_env(cls) -> "KintoneConfig":
         """環境変数から設定を読み込む"""
         domain = os.environ.get("KINTONE_DOMAIN")
-        api_token = os.environ.get("KINTONE_API_TOKEN")
+        api_token = os.environ.get("KINTONE_API_TOKEN", "")
+        app_tokens = _parse_app_tokens(os.environ.get("KINTONE_APP_TOKENS", ""))
 
         if not domain:
             raise ValueError("KINTONE_DOMAIN environment variable is required")
-        if not api_token:
-            raise ValueError("KINTONE_API_TOKEN environment variable is required")
+        if not api_token and not app_tokens:
+            raise ValueError("KINTONE_API_TOKEN (or KINTONE_APP_TOKENS) environment variable is required")
 
         default_app = os.environ.get("KINTONE_DEFAULT_APP")
         cache_dir = os.environ.get("KINTONE_CACHE_DIR")
@@ -38,6 +65,7 @@ class KintoneConfig:
             default_app_id=int(default_app) if default_app else None,
             cache_dir=Path(cache_dir) if cache_dir else cls.cache_dir,
             cache_ttl=int(cache_ttl) if cache_ttl else cls.cache_ttl,
+            app_tokens=app_tokens,
         )
 
     @classmethod
@@ -46,19 +74,61 @@ class KintoneConfig:
         with open(config_path) as f:
             data = json.load(f)
 
+        app_tokens = {
+            int(app_id): ",".join(_split_tokens(tokens))
+            for app_id, tokens in data.get("app_tokens", {}).items()
+        }
+        if not data.get("api_token") and not app_tokens:
+            raise ValueError(f"api_token (or app_tokens) is required in {config_path}")
+
         return cls(
             domain=data["domain"],
-            api_token=data["api_token"],
+            api_token=data.get("api_token", ""),
             default_app_id=data.get("default_app_id"),
             cache_dir=Path(data.get("cache_dir", cls.cache_dir)),
             cache_ttl=data.get("cache_ttl", cls.cache_ttl),
+            app_tokens=app_tokens,
         )
 
     @property
     def base_url(self) -> str:
-        """API ベース URL"""
+        """API ベース URL（domain にスキームを含めた場合はそのまま使用）"""
+        if self.domain.startswith(("http://", "https://")):
+            return self.domain.rstrip("/")
         return f"https://{self.domain}"
 
+    @property
+    def credentials(self) -> tuple:
+        """トークンの組み合わせ（同じ設定かどうかの比較用）"""
+        return (self.api_token, tuple(sorted(self.app_tokens.items())))
+
+    def add_app_token(self, app_id: int, *tokens: str):
+        """アプリのトークンを追加（既存のトークンに連結）"""
+        current = _split_tokens(self.app_tokens.get(int(app_id), ""))
+        merged = list(dict.fromkeys(current + _split_tokens(list(tokens))))
+        if not merged:
+            raise ValueError(f"No API token given for app {app_id}")
+        self.app_tokens[int(app_id)] = ",".join(merged)
+
+    def token_for(self, app_ids: Iterable[Any] = ()) -> str:
+        """リクエストに使う X-Cybozu-API-Token ヘッダーの値
+
+        対象アプリのトークンをカンマで連結します（ルックアップ先や
+        bulkRequest の各アプリなど、複数アプリにまたがるリクエスト用）。
+        トークンが登録されていないアプリがあれば既定のトークンも加えます。
+        """
+        tokens: list[str] = []
+        fallback = False
+        for app_id in app_ids:
+            app_token = self.app_tokens.get(int(app_id))
+            if app_token is None:
+                fallback = True
+            else:
+                tokens.extend(_split_tokens(app_token))
+        if fallback or not tokens:
+            tokens.extend(_split_tokens(self.api_token))
+        return ",".join(dict.fromkeys(tokens))
+
     def ensure_cache_dir(self) -> Path:
         """キャッシュディレクトリを作成して返す"""
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -69,7 +139,9 @@ def get_config() -> KintoneConfig:
     """設定を取得する（環境変数優先）"""
     config_file = Path.home() / ".config" / "kintone-skill" / "config.json"
 
-    if os.environ.get("KINTONE_DOMAIN") and os.environ.get("KINTONE_API_TOKEN"):
+    if os.environ.get("KINTONE_DOMAIN") and (
+        os.environ.get("KINTONE_API_TOKEN") or os.environ.get("KINTONE_APP_TOKENS")
+    ):
         return KintoneConfig.from_env()
     elif config_file.exists():
         return KintoneConfig.from_file(config_file)
@@ -88,6 +160,7 @@ if __name__ == "__main__":
         print(f"Domain: {config.domain}")
         print(f"Base URL: {config.base_url}")
         print(f"Default App: {config.default_app_id}")
+        print(f"App Tokens: {sorted(config.app_tokens)}")
         print(f"Cache Dir: {config.cache_dir}")
     except ValueError as e:
         print(f"Error: {e}")
@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""KINTONE アプリ間のレコードコピー（移行）
+
+コピー元を $id 順にカーソル（またはキーセット）で読み、フィールド対応表で変換して、
+コピー先へ100件ずつ並列に追加するパイプラインです。段階の間は件数に上限のある
+キューでつなぐため、全件をメモリに載せずに移行できます。
+
+    読み取り ─▶ [キュー] ─▶ 変換・添付ファイルの再アップロード（並列） ─▶ [キュー] ─▶ 追加（並列）
+
+- フィールド対応表は両アプリのスキーマ（AppSchema）から作成し、型の合わないフィールドや
+  コピー先で書き込めないフィールドをコピーの前に検出します
+- 添付ファイルはコピー元からダウンロードし、コピー先に再アップロードします
+- 追加が済んだ $id をチェックポイントに記録し、中断しても続きから再開します
+  （再実行すると、前回以降に追加されたレコードだけをコピーします）
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+from kintone_crud import LIMIT_RE, ORDER_BY_RE, KintoneCRUD, and_query, batched, field_value
+
+CHECKPOINT_VERSION = 1
+DEFAULT_BATCH_SIZE = 100  # 1回の追加件数（最大100）
+DEFAULT_QUEUE_BATCHES = 8  # 段階の間のキューに置けるバッチ数
+
+# コピー先で書き込めないフィールド
+_READONLY_TYPES = frozenset({
+    "__ID__", "__REVISION__", "RECORD_NUMBER", "STATUS", "STATUS_ASSIGNEE", "CATEGORY",
+    "CALC", "GROUP", "REFERENCE_TABLE", "LABEL", "SPACER", "HR",
+})
+# 追加時だけ指定できる作成者・更新者・日時（preserve_meta で引き継ぐ）
+_META_TYPES = frozenset({"CREATOR", "CREATED_TIME", "MODIFIER", "UPDATED_TIME"})
+_TEXT_TYPES = frozenset({"SINGLE_LINE_TEXT", "MULTI_LINE_TEXT", "RICH_TEXT", "LINK"})
+_SCALAR_TYPES = _TEXT_TYPES | {"NUMBER", "CALC", "RECORD_NUMBER", "DROP_DOWN", "RADIO_BUTTON", "DATE", "TIME", "DATETIME"}
+_CHOICE_TYPES = frozenset({"DROP_DOWN", "RADIO_BUTTON"})
+_MULTI_CHOICE_TYPES = frozenset({"CHECK_BOX", "MULTI_SELECT"})
+
+
+def compatible(source_type: str, target_type: str) -> bool:
+    """コピー元の型の値をコピー先の型に書き込めるか"""
+    if source_type == target_type:
+        return True
+    if target_type in _TEXT_TYPES:
+        return source_type in _SCALAR_TYPES
+    if target_type in _CHOICE_TYPES:
+        return source_type in _CHOICE_TYPES or source_type == "SINGLE_LINE_TEXT"
+    if target_type in _MULTI_CHOICE_TYPES:
+        return source_type in _MULTI_CHOICE_TYPES
+    if target_type == "NUMBER":
+        return source_type in ("CALC", "RECORD_NUMBER", "SINGLE_LINE_TEXT")
+    if target_type == "DATETIME":
+        return source_type in ("CREATED_TIME", "UPDATED_TIME")
+    if target_type == "USER_SELECT":
+        return source_type in ("CREATOR", "MODIFIER")
+    return False
+
+
+def _convert(value: Any, source_type: str, target_type: str) -> Any:
+    """値をコピー先の型の形式にする（添付ファイル・テーブル以外）"""
+    if source_type in ("CREATOR", "MODIFIER"):
+        user = {"code": value["code"]} if value else None
+        return [user] if target_type == "USER_SELECT" and user else user
+    if target_type in ("USER_SELECT", "ORGANIZATION_SELECT", "GROUP_SELECT") and value:
+        return [{"code": entity["code"]} for entity in value]
+    return value
+
+
+@dataclass
+class FieldRule:
+    """コピー元のフィールドとコピー先のフィールドの対応"""
+    source: str
+    target: str
+    source_type: str
+    target_type: str
+    rules: Optional[list["FieldRule"]] = None  # テーブル内のフィールドの対応（None なら行をそのままコピー）
+
+
+def _check(info: Any, target_info: Any, lookup_filled: set[str], preserve_meta: bool) -> Optional[str]:
+    """コピー先に書き込めない理由（書き込めるなら None）"""
+    if target_info is None:
+        return "not in target"
+    if target_info.type in _READONLY_TYPES:
+        return f"read-only in target ({target_info.type})"
+    if target_info.type in _META_TYPES and not preserve_meta:
+        return "metadata not preserved"
+    if target_info.code in lookup_filled:
+        return "filled by lookup in target"
+    if not compatible(info.type, target_info.type):
+        return f"type {info.type} -> {target_info.type}"
+    return None
+
+
+def _lookup_filled(fields: dict[str, Any]) -> set[str]:
+    """ルックアップでコピーされるフィールド（キーから自動で入る、テーブル内も含む）"""
+    filled = set()
+    for info in fields.values():
+        if info.lookup:
+            filled.update(m["field"] for m in info.lookup.get("fieldMappings", []))
+        if info.fields:
+            filled |= _lookup_filled(info.fields)
+    return filled
+
+
+@dataclass
+class FieldMap:
+    """コピー元 → コピー先のフィールド対応表"""
+    rules: list[FieldRule]
+    skipped: dict[str, str] = field(default_factory=dict)  # コピーしないフィールド -> 理由
+
+    @classmethod
+    def compile(
+        cls,
+        source: Any,
+        target: Any,
+        mapping: Optional[dict[str, Optional[str]]] = None,
+        preserve_meta: bool = True,
+    ) -> "FieldMap":
+        """両アプリのスキーマから対応表を作成
+
+        同じフィールドコードどうしを対応させ、mapping で変更（None で除外）します。
+        テーブル内のフィールドも同じ規則で対応させます（mapping のキーは "テーブル.フィールド"）。
+        作成者・作成日時などは preserve_meta のとき型で対応させます。
+        コピー先にない・書き込めない・型が合わないフィールドは、mapping で明示した
+        ものは ValueError、それ以外は skipped に理由を記録します。
+
+        Args:
+            source: コピー元の AppSchema
+            target: コピー先の AppSchema
+            mapping: コピー元フィールドコード -> コピー先フィールドコード（None で除外）
+            preserve_meta: 作成者・作成日時・更新者・更新日時を引き継ぐ
+        """
+        mapping = dict(mapping or {})
+        inner_mapping: dict[str, dict[str, Optional[str]]] = {}
+        for key in [key for key in mapping if "." in key]:
+            table, _, inner = key.partition(".")
+            target_code = mapping.pop(key)
+            if target_code is not None:
+                target_code = target_code.rpartition(".")[2]
+            inner_mapping.setdefault(table, {})[inner] = target_code
+        unknown = [code for code in mapping if code not in source.fields]
+        unknown += [
+            f"{table}.{inner}" for table, inners in inner_mapping.items() for inner in inners
+            if inner not in ((source.fields[table].fields or {}) if table in source.fields else {})
+        ]
+        if unknown:
+            raise ValueError(f"Unknown source fields: {', '.join(unknown)}")
+        lookup_filled = _lookup_filled(target.fields)
+        meta_targets = {info.type: code for code, info in target.fields.items() if info.type in _META_TYPES}
+
+        rules: list[FieldRule] = []
+        skipped: dict[str, str] = {}
+        errors: list[str] = []
+        for code, info in source.fields.items():
+            explicit = code in mapping or code in inner_mapping
+            if info.type in ("__ID__", "__REVISION__") and not explicit:
+                continue  # コピー先で採番される
+            if code in mapping:
+                target_code = mapping[code]
+                if target_code is None:
+                    skipped[code] = "excluded"
+                    continue
+            elif info.type in _META_TYPES:
+                target_code = meta_targets.get(info.type) if preserve_meta else None
+            else:
+                target_code = code
+
+            target_info = target.fields.get(target_code) if target_code else None
+            reason = _check(info, target_info, lookup_filled, preserve_meta)
+            if reason is None:
+                rule = FieldRule(code, target_code, info.type, target_info.type)
+                if info.type == "SUBTABLE" and info.fields is not None and target_info.fields is not None:
+                    rule.rules = cls._compile_table(
+                        code, info, target_info, inner_mapping.get(code, {}), lookup_filled, skipped, errors,
+                    )
+                    if not rule.rules:
+                        reason = "no copyable fields in table"
+                elif code in inner_mapping:
+                    reason = "fields in table unknown"
+                if reason is None:
+                    rules.append(rule)
+                    continue
+            if explicit:
+                errors.append(f"{code} -> {target_code}: {reason}")
+            else:
+                skipped[code] = reason
+
+        targets = [rule.target for rule in rules]
+        duplicates = sorted({code for code in targets if targets.count(code) > 1})
+        if duplicates:
+            errors.append(f"mapped more than once: {', '.join(duplicates)}")
+        if errors:
+            raise ValueError(f"Invalid field mapping: {'; '.join(errors)}")
+        return cls(rules, skipped)
+
+    @staticmethod
+    def _compile_table(
+        table: str,
+        source_info: Any,
+        target_info: Any,
+        mapping: dict[str, Optional[str]],
+        lookup_filled: set[str],
+        skipped: dict[str, str],
+        errors: list[str],
+    ) -> list[FieldRule]:
+        """テーブル内のフィールドの対応（skipped・errors には "テーブル.フィールド" で記録）"""
+        rules: list[FieldRule] = []
+        for code, info in source_info.fields.items():
+            explicit = code in mapping
+            target_code = mapping[code] if explicit else code
+            if target_code is None:
+                skipped[f"{table}.{code}"] = "excluded"
+                continue
+            inner_target = target_info.fields.get(target_code)
+            reason = _check(info, inner_target, lookup_filled, preserve_meta=False)
+            if reason is None:
+                rules.append(FieldRule(code, target_code, info.type, inner_target.type))
+            elif explicit:
+                errors.append(f"{table}.{code} -> {target_info.code}.{target_code}: {reason}")
+            else:
+                skipped[f"{table}.{code}"] = reason
+        targets = [rule.target for rule in rules]
+        duplicates = sorted({code for code in targets if targets.count(code) > 1})
+        if duplicates:
+            errors.append(f"mapped more than once in {target_info.code}: {', '.join(duplicates)}")
+        return rules
+
+    @property
+    def source_fields(self) -> list[str]:
+        """コピー元から取得するフィールド"""
+        return list(dict.fromkeys(["$id", *(rule.source for rule in self.rules)]))
+
+    def describe(self) -> str:
+        """対応表を文字列で返す"""
+        lines = []
+        for rule in self.rules:
+            lines.append(f"{rule.source} -> {rule.target}")
+            lines += [f"{rule.source}.{inner.source} -> {rule.target}.{inner.target}" for inner in rule.rules or []]
+        lines += [f"{code}: skipped ({reason})" for code, reason in self.skipped.items()]
+        return "\n".join(lines)
+
+
+@dataclass
+class CopyResult:
+    """コピーの結果"""
+    read: int = 0
+    copied: int = 0
+    files: int = 0  # 再アップロードした添付ファイル数
+    failed: dict[int, str] = field(default_factory=dict)  # コピー元 $id -> エラー
+    last_id: int = 0  # ここまでのコピー元 $id はコピー済み（チェックポイント）
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        """全件コピーできたか"""
+        return not self.failed
+
+
+class _Stop(Exception):
+    """パイプラインの停止"""
+
+
+class RecordCopier:
+    """アプリ間のレコードコピー
+
+    使用例:
+        copier = RecordCopier(crud, 123, 456, mapping={"旧顧客名": "顧客名", "メモ": None})
+        print(copier.field_map.describe())
+        result = copier.copy('作成日時 < "2024-01-01T00:00:00Z"')
+        result.copied, result.failed
+
+    コピー元を $id 昇順で読むため、query に order by / limit は指定できません。
+    """
+
+    def __init__(
+        self,
+        crud: KintoneCRUD,
+        source_app: int,
+        target_app: int,
+        mapping: Optional[dict[str, Optional[str]]] = None,
+        preserve_meta: bool = True,
+        field_map: Optional[FieldMap] = None,
+        checkpoint: Optional[Union[str, Path]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        write_workers: int = 4,
+        file_workers: int = 4,
+        queue_batches: int = DEFAULT_QUEUE_BATCHES,
+    ):
+        """
+        Args:
+            crud: KintoneCRUD（コピー元・コピー先のトークンは config.app_tokens で指定）
+            source_app: コピー元アプリ ID
+            target_app: コピー先アプリ ID
+            mapping: フィールド対応の変更（FieldMap.compile を参照）
+            preserve_meta: 作成者・作成日時・更新者・更新日時を引き継ぐ
+            field_map: 作成済みの対応表（省略時は両アプリのスキーマから作成）
+            checkpoint: チェックポイントファイル（省略時は cache_dir/copy/ 以下）
+            batch_size: 1回の追加件数（最大100）
+            write_workers: 並列に実行する追加リクエスト数
+            file_workers: 並列に変換（添付ファイルを再アップロード）するバッチ数
+            queue_batches: 段階の間のキューに置けるバッチ数
+        """
+        self.crud = crud
+        self.client = crud.client
+        self.source_app = source_app
+        self.target_app = target_app
+        if field_map is None:
+            from kintone_schema import SchemaManager
+
+            schemas = SchemaManager(client=crud.client)
+            source, target = schemas.get_schema(source_app), schemas.get_schema(target_app)
+            if source is None or target is None:
+                raise RuntimeError(f"Failed to get schema of app {source_app if source is None else target_app}")
+            field_map = FieldMap.compile(source, target, mapping, preserve_meta)
+        self.field_map = field_map
+        self.checkpoint = Path(checkpoint) if checkpoint else None
+        self.batch_size = min(max(batch_size, 1), 100)
+        self.write_workers = max(write_workers, 1)
+        self.file_workers = max(file_workers, 1)
+        self.queue_batches = max(queue_batches, 1)
+        self._lock = threading.Lock()
+
+    def checkpoint_path(self, query: str) -> Path:
+        """query ごとのチェックポイントファイル"""
+        if self.checkpoint is not None:
+            return self.checkpoint
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:12]
+        return self.crud.config.cache_dir / "copy" / f"{self.source_app}-{self.target_app}-{digest}.json"
+
+    def _load_checkpoint(self, path: Path) -> dict:
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != CHECKPOINT_VERSION:
+            return {}
+        return data
+
+    def _save_checkpoint(
+        self, path: Path, query: str, result: CopyResult, pending: set[int], ranges: list[tuple[int, int]] = (),
+    ):
+        """チェックポイントを保存
+
+        Args:
+            pending: 前回失敗してまだ再試行していないレコード
+            ranges: last_id より後で、順番が前後して追加が済んだ $id の範囲 [lo, hi]
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "source": self.source_app,
+            "target": self.target_app,
+            "query": query,
+            "last_id": result.last_id,
+            "ranges": sorted([lo, hi] for lo, hi in ranges),
+            "failed": sorted(set(result.failed) | pending),
+        }
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # === 読み取り ===
+
+    def _source(
+        self, query: str, after_id: int, retry_ids: list[int], reader: str, pending: set[int],
+        skip: list[tuple[int, int]] = (),
+    ) -> Iterator[dict]:
+        """コピー対象を $id 昇順で返す（前回失敗したレコードを先に、skip の範囲は除く）"""
+        fields = self.field_map.source_fields
+        for chunk in batched(iter(retry_ids), 100):
+            condition = f"$id in ({', '.join(str(i) for i in chunk)})"
+            response = self.client.get_records(
+                self.source_app, f"{and_query(query, condition)} order by $id asc limit 100", fields
+            )
+            if not response.success:
+                raise RuntimeError(f"Failed to get records: {response.error}")
+            records = response.data.get("records", [])
+            # 削除された・条件に一致しなくなったレコードは再試行しない
+            found = {int(field_value(record, "$id")) for record in records}
+            with self._lock:
+                pending.difference_update(set(chunk) - found)
+            yield from records
+        for lo, hi in skip:
+            query = and_query(query, f"($id < {lo} or $id > {hi})")
+        if reader == "keyset":
+            yield from self.crud._read_keyset(self.source_app, query, fields, after_id)
+        else:
+            yield from self.crud.search_all(
+                self.source_app, f"{and_query(query, f'$id > {after_id}')} order by $id asc", fields
+            )
+
+    # === 変換 ===
+
+    def _file_content(self, item: dict) -> bytes:
+        """コピー元の添付ファイルの内容"""
+        return self.client.download_file(item["fileKey"], app_id=self.source_app)
+
+    def _copy_files(self, items: Optional[list[dict]]) -> list[dict]:
+        """添付ファイルをコピー先に再アップロードして新しい fileKey を返す"""
+        copied = []
+        for item in items or []:
+            content = self._file_content(item)
+            response = self.client.upload_bytes(
+                content, item.get("name", "file"), item.get("contentType") or "application/octet-stream",
+                app_id=self.target_app,
+            )
+            if not response.success:
+                raise RuntimeError(f"Failed to upload {item.get('name')}: {response.error}")
+            copied.append({"fileKey": response.data["fileKey"]})
+        with self._lock:
+            self._result.files += len(copied)
+        return copied
+
+    def _convert_value(self, rule: FieldRule, value: Any) -> Any:
+        """値をコピー先のフィールドの形式にする（添付ファイルは再アップロード）"""
+        if rule.source_type == "FILE":
+            return self._copy_files(value)
+        if rule.source_type == "SUBTABLE":
+            return self._copy_rows(value, rule.rules)
+        return _convert(value, rule.source_type, rule.target_type)
+
+    def _copy_rows(self, rows: Optional[list[dict]], rules: Optional[list[FieldRule]] = None) -> list[dict]:
+        """テーブルの行（行 ID を除き、行内のフィールドも対応表で変換）
+
+        rules が None（スキーマにテーブル内のフィールドがない）なら同じコードのままコピーします。
+        """
+        copied = []
+        for row in rows or []:
+            values = row.get("value", {})
+            row_rules = rules if rules is not None else [
+                FieldRule(code, code, cell.get("type", ""), cell.get("type", "")) for code, cell in values.items()
+            ]
+            cells = {}
+            for rule in row_rules:
+                cell = values.get(rule.source)
+                if cell is not None:
+                    cells[rule.target] = {"value": self._convert_value(rule, cell.get("value"))}
+            copied.append({"value": cells})
+        return copied
+
+    def transform(self, record: dict) -> dict:
+        """コピー元のレコードをコピー先の追加用レコードに変換"""
+        converted = {}
+        for rule in self.field_map.rules:
+            cell = record.get(rule.source)
+            if cell is None:
+                continue
+            value = cell.get("value") if isinstance(cell, dict) else cell
+            converted[rule.target] = {"value": self._convert_value(rule, value)}
+        return converted
+
+    # === 書き込み ===
+
+    def _write(self, batch: list[tuple[int, dict]]):
+        """バッチを追加（失敗したら1件ずつ追加して失敗レコードを特定）"""
+        response = self.client.add_records(self.target_app, [record for _, record in batch])
+        if response.success:
+            with self._lock:
+                self._result.copied += len(batch)
+            return
+        for source_id, record in batch:
+            single = self.client.add_record(self.target_app, record)
+            with self._lock:
+                if single.success:
+                    self._result.copied += 1
+                else:
+                    self._result.failed[source_id] = single.error or "Unknown error"
+
+    # === パイプライン ===
+
+    def copy(
+        self,
+        query: str = "",
+        reader: str = "cursor",
+        resume: bool = True,
+        progress: Optional[Callable[[CopyResult], None]] = None,
+    ) -> CopyResult:
+        """query に一致するレコードをコピー
+
+        Args:
+            query: コピーするレコードの条件（order by / limit は指定不可）
+            reader: "cursor"（カーソル）または "keyset"（$id 順のページング、カーソル枠を使わない）
+            resume: チェックポイントから再開する（False なら最初から）
+            progress: バッチを追加するたびに CopyResult で呼ばれる関数
+
+        Returns:
+            CopyResult: 件数と失敗したレコード（コピー元 $id -> エラー）
+        """
+        if ORDER_BY_RE.search(query) or LIMIT_RE.search(query):
+            raise ValueError("query must not contain order by / limit (records are copied in $id order)")
+        if reader not in ("cursor", "keyset"):
+            raise ValueError(f"reader must be 'cursor' or 'keyset': {reader}")
+
+        path = self.checkpoint_path(query)
+        saved = self._load_checkpoint(path) if resume else {}
+        result = self._result = CopyResult(last_id=int(saved.get("last_id", 0)))
+        # 前回、順番が前後して追加が済んだ範囲は読み飛ばす
+        skip = [(int(lo), int(hi)) for lo, hi in saved.get("ranges", []) if int(hi) > result.last_id]
+        # 追加が済んでいない範囲のレコードは続きとして読むので、再試行には入れない
+        retry_ids = [
+            record_id for record_id in (int(i) for i in saved.get("failed", []))
+            if record_id <= result.last_id or _in_ranges(record_id, skip)
+        ]
+        retry = set(retry_ids)
+        pending = set(retry_ids)
+        started = time.monotonic()
+
+        read_queue: queue.Queue = queue.Queue(maxsize=self.queue_batches)
+        write_queue: queue.Queue = queue.Queue(maxsize=self.queue_batches)
+        stop = threading.Event()
+        errors: list[BaseException] = []
+        # 追加が済んだバッチの $id の範囲（連続して済んだところまで last_id を進め、
+        # 順番が前後して済んだ範囲はチェックポイントに残して再開時に読み飛ばす）
+        done: dict[int, Optional[tuple[int, int]]] = {}
+        next_seq = [0]
+        transformers_left = [self.file_workers]
+
+        def put(target: queue.Queue, item: Any):
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            raise _Stop
+
+        def save():
+            # 書き込み中は self._lock を持って呼ぶ
+            ranges = [span for span in skip + list(done.values()) if span and span[1] > result.last_id]
+            self._save_checkpoint(path, query, result, pending, ranges)
+
+        def fail(e: BaseException):
+            with self._lock:
+                errors.append(e)
+            stop.set()
+
+        def read():
+            source = None
+            try:
+                source = self._source(query, result.last_id, retry_ids, reader, pending, skip)
+                for seq, records in enumerate(batched(source, self.batch_size)):
+                    with self._lock:
+                        result.read += len(records)
+                    put(read_queue, (seq, records))
+            except _Stop:
+                pass
+            except BaseException as e:
+                fail(e)
+            finally:
+                if source is not None:
+                    source.close()  # カーソルを削除
+                for _ in range(self.file_workers):
+                    read_queue.put(None)
+
+        # 停止後も各段階はキューを最後まで読み捨てる（上流が put で止まらないように）
+        def convert():
+            while True:
+                item = read_queue.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    continue
+                seq, records = item
+                try:
+                    batch = []
+                    for record in records:
+                        source_id = int(field_value(record, "$id"))
+                        try:
+                            batch.append((source_id, self.transform(record)))
+                        except Exception as e:
+                            with self._lock:
+                                result.failed[source_id] = str(e)
+                    # 再試行したレコードを除くと、バッチは続きの $id の連続した範囲になる
+                    ids = [int(field_value(record, "$id")) for record in records]
+                    ids = [record_id for record_id in ids if record_id not in retry]
+                    span = (min(ids), max(ids)) if ids else None
+                    put(write_queue, (seq, span, batch))
+                except _Stop:
+                    pass
+                except BaseException as e:
+                    fail(e)
+            with self._lock:
+                transformers_left[0] -= 1
+                last = transformers_left[0] == 0
+            if last:
+                for _ in range(self.write_workers):
+                    write_queue.put(None)
+
+        def write():
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    continue
+                seq, span, batch = item
+                try:
+                    if batch:
+                        self._write(batch)
+                    with self._lock:
+                        pending.difference_update(source_id for source_id, _ in batch)
+                        done[seq] = span
+                        while next_seq[0] in done:
+                            span = done.pop(next_seq[0])
+                            if span:
+                                result.last_id = max(result.last_id, span[1])
+                            next_seq[0] += 1
+                        save()
+                        if progress is not None:
+                            progress(result)
+                except BaseException as e:
+                    fail(e)
+
+        threads = [threading.Thread(target=read, name="kintone-copy-read", daemon=True)]
+        threads += [threading.Thread(target=convert, name="kintone-copy-convert", daemon=True)
+                    for _ in range(self.file_workers)]
+        threads += [threading.Thread(target=write, name="kintone-copy-write", daemon=True)
+                    for _ in range(self.write_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result.elapsed = time.monotonic() - started
+        save()
+        if errors:
+            raise RuntimeError(f"Copy stopped at $id {result.last_id}: {errors[0]}") from errors[0]
+        return result
+
+
+def _in_ranges(record_id: int, ranges: list[tuple[int, int]]) -> bool:
+    return any(lo <= record_id <= hi for lo, hi in ranges)
+
+
+def parse_mapping(text: str) -> dict[str, Optional[str]]:
+    """"旧=新,メモ=" 形式の対応表（右辺が空なら除外）"""
+    mapping: dict[str, Optional[str]] = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        source, sep, target = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid mapping entry: {entry!r} (expected SOURCE=TARGET)")
+        mapping[source.strip()] = target.strip() or None
+    return mapping
+
+
+def main():
+    import argparse
+    import sys
+
+    from kintone_lease import CursorLeaseManager
+    from kintone_quota import QuotaTracker
+
+    parser = argparse.ArgumentParser(description="Copy records between KINTONE apps")
+    parser.add_argument("source", type=int, help="Source app ID")
+    parser.add_argument("target", type=int, help="Target app ID")
+    parser.add_argument("query", nargs="?", default="", help="Records to copy (no order by / limit)")
+    parser.add_argument("--map", type=str, default="", help="Field mapping: SOURCE=TARGET,... (TABLE.FIELD for fields in a table, empty TARGET excludes)")
+    parser.add_argument("--no-meta", action="store_true", help="Don't preserve creator/modifier and timestamps")
+    parser.add_argument("--reader", choices=["cursor", "keyset"], default="cursor", help="How to read the source app")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent add requests")
+    parser.add_argument("--file-workers", type=int, default=4, help="Batches converted concurrently (file re-upload)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and copy from the beginning")
+    parser.add_argument("--dry-run", action="store_true", help="Print the field mapping and exit")
+    parser.add_argument("--json", action="store_true", help="Output result as JSON")
+    args = parser.parse_args()
+
+    crud = KintoneCRUD()
+    # 日次リクエスト数の記録とカーソル枠の共有（kintone crud と同じ）
+    crud.client.add_hook(QuotaTracker(crud.config))
+    crud.leases = CursorLeaseManager(crud.client)
+    try:
+        copier = RecordCopier(
+            crud, args.source, args.target,
+            mapping=parse_mapping(args.map),
+            preserve_meta=not args.no_meta,
+            write_workers=args.workers,
+            file_workers=args.file_workers,
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    if args.dry_run:
+        print(copier.field_map.describe())
+        return
+    if not args.json:
+        print(copier.field_map.describe(), file=sys.stderr)
+
+    def report(result: CopyResult):
+        print(f"\r📦 {result.copied}/{result.read} 件 (files: {result.files})", end="", file=sys.stderr, flush=True)
+
+    try:
+        result = copier.copy(args.query, reader=args.reader, resume=not args.restart,
+                             progress=None if args.json else report)
+    except (ValueError, RuntimeError) as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps({
+            "read": result.read, "copied": result.copied, "files": result.files,
+            "last_id": result.last_id, "elapsed": round(result.elapsed, 3),
+            "failed": {str(k): v for k, v in result.failed.items()},
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(file=sys.stderr)
+        print(f"✅ Copied: {result.copied} 件, files: {result.files} ({result.elapsed:.1f}s)")
+        if result.failed:
+            print(f"❌ Failed: {len(result.failed)} 件（再実行すると再試行します）")
+            for source_id, error in sorted(result.failed.items())[:20]:
+                print(f"   Record {source_id}: {error}")
+    if not result.success:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,324 @@
 """KINTONE CRUD 操作モジュール"""
 
 import json
+import math
+import queue
+import re
 import sys
-from typing import Optional, Any, Iterator
+import threading
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Any, Callable, Iterator
 
 from kintone_config import get_config
 from kintone_client import KintoneClient, KintoneResponse
+from kintone_metrics import count_retry
+from kintone_search import query as build_query, chunk_in_values
+
+# リビジョン不一致（他ユーザーが先に更新した）を示すエラーコード
+REVISION_CONFLICT_CODE = "GAIA_CO02"
+# レコードが存在しない（すでに削除された）ことを示すエラーコード
+RECORD_NOT_FOUND_CODE = "GAIA_RE01"
+BULK_REQUEST_LIMIT = 20  # bulkRequest 1回のリクエスト数
+
+
+@dataclass
+class StatusChangeResult:
+    """ステータス一括更新の結果"""
+    succeeded: dict[int, str] = field(default_factory=dict)  # record_id -> 新リビジョン
+    failed: dict[int, KintoneResponse] = field(default_factory=dict)  # record_id -> エラー
+
+    @property
+    def success(self) -> bool:
+        """全件成功したか"""
+        return not self.failed
+
+
+@dataclass
+class DeleteResult:
+    """クエリ指定の一括削除の結果"""
+    deleted: int = 0
+    missing: int = 0  # 削除する前に他から削除されていたレコード数
+    failed: dict[int, KintoneResponse] = field(default_factory=dict)  # record_id -> エラー
+    requests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        """全件削除できたか"""
+        return not self.failed
+
+    def merge(self, other: "DeleteResult"):
+        """並列に実行したバッチの結果を加える"""
+        self.deleted += other.deleted
+        self.missing += other.missing
+        self.failed.update(other.failed)
+        self.requests += other.requests
+
+
+def batched(items: Iterator, size: int) -> Iterator[list]:
+    """イテレーターを size 件ずつのリストに分ける"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _run_concurrently(func: Callable, items: list, max_workers: int) -> list:
+    """items の各要素に func を並列適用し、入力順で結果を返す"""
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+# === 読み取り戦略 ===
+
+MAX_CURSORS = 10  # ドメインあたりのカーソル上限
+PAGE_SIZE = 500  # 1リクエストの最大取得件数
+DEFAULT_FIELD_WIDTH = 50  # fields 未指定時に想定するフィールド数
+PARALLEL_COST_THRESHOLD = 1_000_000  # 件数 × フィールド数がこれを超えたら並列カーソル
+RECORDS_PER_PARTITION = 5000  # 並列カーソル1本あたりの目安件数
+
+ORDER_BY_RE = re.compile(r"\border\s+by\b", re.IGNORECASE)
+LIMIT_RE = re.compile(r"\b(limit|offset)\s+\d+", re.IGNORECASE)
+# order by 句（limit / offset の手前まで）
+_ORDER_BY_CLAUSE_RE = re.compile(r"\border\s+by\b.*?(?=\b(?:limit|offset)\s+\d+|$)", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class ReadPlan:
+    """レコード読み取りの実行計画"""
+    strategy: str  # "single_page" | "keyset" | "cursor" | "parallel_cursor"
+    total_count: int
+    width: int  # 取得フィールド数（推定）
+    partitions: list[tuple[int, int]] = field(default_factory=list)  # 並列カーソルの $id 範囲 [lo, hi)
+    trace: list[str] = field(default_factory=list)
+
+    def explain(self) -> str:
+        """判断過程を文字列で返す"""
+        return "\n".join([f"strategy: {self.strategy}", *(f"  - {t}" for t in self.trace)])
+
+
+def and_query(query: str, condition: str) -> str:
+    """既存のクエリ条件に AND 条件を追加"""
+    return f"({query}) and {condition}" if query else condition
+
+
+def query_condition(query: str) -> str:
+    """クエリから order by / limit / offset を除いた条件部分"""
+    return LIMIT_RE.sub("", _ORDER_BY_CLAUSE_RE.sub("", query)).strip()
+
+
+def _merge_concurrently(factories: list[Callable[[], Iterator]], max_workers: int) -> Iterator:
+    """複数のイテレーターを並列に消費し、届いた順に要素を返す
+
+    呼び出し側が途中で読み取りをやめた場合も、各イテレーターを close して
+    （カーソルの後始末を含め）ワーカーを終了させます。
+    """
+    items: queue.Queue = queue.Queue(maxsize=PAGE_SIZE * 2)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(factory):
+        try:
+            iterator = factory()
+            try:
+                for item in iterator:
+                    if not put((None, item)):
+                        return
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+        except Exception as e:
+            put((e, None))
+        finally:
+            put((None, done))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(factories))))
+    for factory in factories:
+        executor.submit(drain, factory)
+
+    remaining = len(factories)
+    try:
+        while remaining:
+            error, item = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def field_value(record: dict, *keys: str) -> Any:
+    """レコードから最初に見つかったキーの値を取り出す（KINTONE 形式にも対応）"""
+    for key in keys:
+        if key in record:
+            value = record[key]
+            if isinstance(value, dict) and "value" in value:
+                return value["value"]
+            return value
+    return None
+
+
+# === 集計 ===
+
+AGGREGATE_FUNCTIONS = ("sum", "avg", "min", "max")
+
+
+def _group_value(value: Any) -> str:
+    """グループ化のキーに使う文字列（ユーザー・複数選択などはまとめて1つの値に）"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return str(value.get("name") or value.get("code") or "")
+    if isinstance(value, list):
+        return ", ".join(sorted(_group_value(v) for v in value))
+    return str(value)
+
+
+def _number(value: Any) -> Optional[Decimal]:
+    """数値に変換（空欄・数値でない値は None）"""
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+@dataclass
+class Aggregation:
+    """group by 集計の途中結果
+
+    レコードを1件ずつ add() で加えるため、メモリはグループ数にだけ比例します。
+    並列に集計した途中結果は merge() でまとめられます。
+    数値は Decimal で合計し、空欄や数値でない値は sum/avg/min/max から除外します。
+    """
+    group_by: list[str]
+    metrics: list[tuple[str, str]]  # (関数, フィールドコード)
+    # グループキー -> [件数, 指標ごとの状態（sum/avg は [合計, 件数]、min/max は値）]
+    groups: dict[tuple, list] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for function, _ in self.metrics:
+            if function not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f"Unknown aggregate function: {function}")
+
+    @property
+    def fields(self) -> list[str]:
+        """集計に必要なフィールド"""
+        return list(dict.fromkeys([*self.group_by, *(code for _, code in self.metrics)]))
+
+    def _new_state(self) -> list:
+        return [0, *([Decimal(0), 0] if function in ("sum", "avg") else None for function, _ in self.metrics)]
+
+    def add(self, record: dict):
+        """レコードを1件集計に加える"""
+        key = tuple(_group_value(field_value(record, code)) for code in self.group_by)
+        state = self.groups.get(key)
+        if state is None:
+            state = self.groups[key] = self._new_state()
+        state[0] += 1
+        for i, (function, code) in enumerate(self.metrics, 1):
+            number = _number(field_value(record, code))
+            if number is None:
+                continue
+            if function in ("sum", "avg"):
+                state[i][0] += number
+                state[i][1] += 1
+            elif state[i] is None or (number < state[i] if function == "min" else number > state[i]):
+                state[i] = number
+
+    def merge(self, other: "Aggregation") -> "Aggregation":
+        """別の途中結果（同じ集計条件）を合算"""
+        for key, theirs in other.groups.items():
+            ours = self.groups.get(key)
+            if ours is None:
+                self.groups[key] = [theirs[0], *(list(v) if isinstance(v, list) else v for v in theirs[1:])]
+                continue
+            ours[0] += theirs[0]
+            for i, (function, _) in enumerate(self.metrics, 1):
+                if function in ("sum", "avg"):
+                    ours[i][0] += theirs[i][0]
+                    ours[i][1] += theirs[i][1]
+                elif theirs[i] is not None and (
+                    ours[i] is None or (theirs[i] < ours[i] if function == "min" else theirs[i] > ours[i])
+                ):
+                    ours[i] = theirs[i]
+        return self
+
+    @property
+    def columns(self) -> list[str]:
+        """rows() の列名"""
+        return [*self.group_by, "count", *(f"{function}({code})" for function, code in self.metrics)]
+
+    def rows(self) -> list[dict]:
+        """グループごとの集計結果（グループキー順）"""
+        rows = []
+        for key in sorted(self.groups):
+            state = self.groups[key]
+            row: dict[str, Any] = dict(zip(self.group_by, key))
+            row["count"] = state[0]
+            for i, (function, code) in enumerate(self.metrics, 1):
+                if function == "sum":
+                    value = state[i][0]
+                elif function == "avg":
+                    value = state[i][0] / state[i][1] if state[i][1] else None
+                else:
+                    value = state[i]
+                row[f"{function}({code})"] = value
+            rows.append(row)
+        return rows
 
 
 class KintoneCRUD:
     """KINTONE CRUD 操作クラス"""
 
-    def __init__(self):
-        self.config = get_config()
-        self.client = KintoneClient(self.config)
+    def __init__(self, client: Optional[KintoneClient] = None):
+        """
+        Args:
+            client: 使用するクライアント（KintoneClient.shared() などを渡すと再利用）
+        """
+        if client is None:
+            self.config = get_config()
+            self.client = KintoneClient(self.config)
+        else:
+            self.config = client.config
+            self.client = client
+        # lookup_many のキャッシュ: (app_id, field, fields) -> {キー値: [レコード]}
+        self._lookup_cache: dict[tuple, dict[str, list[dict]]] = {}
+        # fields 未指定の取得に適用する射影（FieldProjector、任意）
+        self.projector: Optional[Any] = None
+        # プロセス間で共有するカーソル枠（CursorLeaseManager、任意）
+        self.leases: Optional[Any] = None
+
+    def _fields(self, app_id: int, fields: Optional[list[str]]) -> Optional[list[str]]:
+        """射影が設定されていれば fields 未指定時の取得フィールドを補う"""
+        if self.projector is None:
+            return fields
+        return self.projector.fields_for(app_id, fields)
 
     def get(self, app_id: int, record_id: int) -> KintoneResponse:
         """レコードを1件取得"""
@@ -36,7 +341,7 @@ class KintoneCRUD:
         if offset:
             full_query = f"{full_query} offset {offset}"
 
-        return self.client.get_records(app_id, full_query.strip(), fields, total_count=True)
+        return self.client.get_records(app_id, full_query.strip(), self._fields(app_id, fields), total_count=True)
 
     def search_all(
         self,
@@ -44,6 +349,8 @@ class KintoneCRUD:
         query: str = "",
         fields: Optional[list[str]] = None,
         batch_size: int = 500,
+        stream: bool = False,
+        spool: bool = False,
     ) -> Iterator[dict]:
         """全レコードをイテレーターで取得（500件超対応）
 
@@ -54,28 +361,334 @@ class KintoneCRUD:
             query: 検索条件（limit/offset は使用不可）
             fields: 取得フィールド
             batch_size: 1回の取得件数（1-500）
+            stream: ページを逐次解析し、受信したレコードから返す
+                （SUBTABLE の多い幅広アプリでメモリと最初の1件までの時間を削減）
+            spool: カーソルを全速で読み切って cache_dir/spool に圧縮して退避し、そこから返す
+                （1ページの処理に10分以上かかる遅い呼び出し側でもカーソルが失効しない）
 
         Yields:
             dict: レコード
         """
-        cursor = self.client.create_cursor(app_id, query, fields, batch_size)
+        if spool:
+            from kintone_spool import RecordSpool
+
+            yield from RecordSpool(
+                self.search_all(app_id, query, fields, batch_size, stream),
+                directory=self.config.cache_dir / "spool",
+            )
+            return
+
+        # leases が設定されていれば、カーソル枠が空くまで待ってから作成
+        lease = self.leases.acquire() if self.leases is not None else None
+        try:
+            cursor = self.client.create_cursor(app_id, query, self._fields(app_id, fields), batch_size)
+        except BaseException:
+            if lease is not None:
+                lease.release()
+            raise
         if not cursor.success:
+            if lease is not None:
+                lease.release()
             raise RuntimeError(f"Failed to create cursor: {cursor.error}")
 
         cursor_id = cursor.data["id"]
+        if lease is not None:
+            lease.attach(cursor_id)
         try:
             while True:
-                result = self.client.get_cursor_records(cursor_id)
-                if not result.success:
-                    raise RuntimeError(f"Failed to get cursor records: {result.error}")
+                if lease is not None:
+                    lease.touch()
+                if stream:
+                    page = self.client.stream_cursor_records(cursor_id)
+                    try:
+                        yield from page
+                    except (RuntimeError, ValueError) as e:
+                        raise RuntimeError(f"Failed to get cursor records: {e}") from e
+                    has_next = page.fields.get("next", False)
+                else:
+                    result = self.client.get_cursor_records(cursor_id)
+                    if not result.success:
+                        raise RuntimeError(f"Failed to get cursor records: {result.error}")
 
-                for record in result.data.get("records", []):
-                    yield record
+                    for record in result.data.get("records", []):
+                        yield record
+                    has_next = result.data.get("next", False)
 
-                if not result.data.get("next", False):
+                if not has_next:
                     break
         finally:
             self.client.delete_cursor(cursor_id)
+            if lease is not None:
+                lease.release()
+
+    def plan_read(
+        self,
+        app_id: int,
+        query: str = "",
+        fields: Optional[list[str]] = None,
+        available_cursors: Optional[int] = None,
+        field_count: Optional[int] = None,
+        max_partitions: int = 4,
+    ) -> ReadPlan:
+        """件数を事前に確認して最適な読み取り方法を決める
+
+        limit 1 + totalCount の軽いリクエストで件数を調べ、件数・フィールド数・
+        空きカーソル数から次のいずれかを選びます。
+
+        - single_page: 500件以下（1リクエスト）
+        - keyset: $id 順のページング（カーソルが空いていない場合）
+        - cursor: カーソル1本（order by 指定時など）
+        - parallel_cursor: $id 範囲で分割した複数カーソルを並列実行
+
+        Args:
+            app_id: アプリ ID
+            query: 検索条件
+            fields: 取得フィールド
+            available_cursors: 使用可能なカーソル数（省略時は leases の空き、なければ上限）
+            field_count: fields 未指定時のフィールド数（スキーマから渡す）
+            max_partitions: 並列カーソルの最大数
+
+        Returns:
+            ReadPlan: 実行計画（trace に判断過程）
+        """
+        fields = self._fields(app_id, fields)
+        if available_cursors is None:
+            available_cursors = self.leases.available() if self.leases is not None else MAX_CURSORS
+        # totalCount は limit / offset に関係なく条件に一致する件数（limit を重ねると KINTONE はエラー）
+        probe = self.client.get_records(
+            app_id, f"{query_condition(query)} limit 1".strip(), ["$id"], total_count=True
+        )
+        if not probe.success:
+            raise RuntimeError(f"Failed to count records: {probe.error}")
+        total = int(probe.data.get("totalCount") or 0)
+        width = len(fields) if fields else (field_count or DEFAULT_FIELD_WIDTH)
+        plan = ReadPlan(strategy="cursor", total_count=total, width=width)
+        plan.trace.append(f"totalCount={total}, width={width}, available_cursors={available_cursors}")
+
+        if LIMIT_RE.search(query):
+            plan.strategy = "single_page"
+            plan.trace.append("query has limit/offset: run as is")
+        elif total <= PAGE_SIZE:
+            plan.strategy = "single_page"
+            plan.trace.append(f"totalCount <= {PAGE_SIZE}: one request")
+        elif ORDER_BY_RE.search(query):
+            plan.strategy = "cursor"
+            plan.trace.append("query has order by: single cursor keeps the order")
+        elif available_cursors <= 0:
+            plan.strategy = "keyset"
+            plan.trace.append("no cursor available: keyset pagination on $id")
+        elif total * width > PARALLEL_COST_THRESHOLD and available_cursors >= 2 and max_partitions >= 2:
+            count = min(max_partitions, available_cursors, math.ceil(total / RECORDS_PER_PARTITION))
+            plan.partitions = self._id_partitions(app_id, query, count)
+            plan.strategy = "parallel_cursor" if len(plan.partitions) > 1 else "cursor"
+            plan.trace.append(
+                f"cost {total}x{width} > {PARALLEL_COST_THRESHOLD}: "
+                f"{len(plan.partitions)} cursors over $id ranges {plan.partitions}"
+            )
+        else:
+            plan.strategy = "cursor"
+            plan.trace.append("single cursor")
+        return plan
+
+    def read(
+        self,
+        app_id: int,
+        query: str = "",
+        fields: Optional[list[str]] = None,
+        plan: Optional[ReadPlan] = None,
+        **plan_options: Any,
+    ) -> Iterator[dict]:
+        """実行計画に従って全レコードを取得
+
+        plan を省略すると plan_read() で計画を立てます。
+        parallel_cursor では、order by なしのためレコードの順序は保証されません。
+
+        Yields:
+            dict: レコード
+        """
+        fields = self._fields(app_id, fields)
+        if plan is None:
+            plan = self.plan_read(app_id, query, fields, **plan_options)
+
+        if plan.strategy == "single_page":
+            full_query = query if LIMIT_RE.search(query) else f"{query} limit {PAGE_SIZE}".strip()
+            response = self.client.get_records(app_id, full_query, fields)
+            if not response.success:
+                raise RuntimeError(f"Failed to get records: {response.error}")
+            yield from response.data.get("records", [])
+        elif plan.strategy == "keyset":
+            yield from self._read_keyset(app_id, query, fields)
+        elif plan.strategy == "parallel_cursor":
+            factories = [
+                (lambda lo=lo, hi=hi: self.search_all(
+                    app_id, and_query(query, f"$id >= {lo} and $id < {hi}"), fields
+                ))
+                for lo, hi in plan.partitions
+            ]
+            yield from _merge_concurrently(factories, len(factories))
+        else:
+            yield from self.search_all(app_id, query, fields)
+
+    def _read_keyset(
+        self,
+        app_id: int,
+        query: str = "",
+        fields: Optional[list[str]] = None,
+        after_id: int = 0,
+    ) -> Iterator[dict]:
+        """$id 順のキーセットページングで全レコードを取得（カーソル不要、after_id より後から）"""
+        if fields and "$id" not in fields:
+            fields = [*fields, "$id"]
+        last_id = after_id
+        while True:
+            page_query = f"{and_query(query, f'$id > {last_id}')} order by $id asc limit {PAGE_SIZE}"
+            response = self.client.get_records(app_id, page_query, fields)
+            if not response.success:
+                raise RuntimeError(f"Failed to get records: {response.error}")
+            records = response.data.get("records", [])
+            yield from records
+            if len(records) < PAGE_SIZE:
+                break
+            last_id = int(field_value(records[-1], "$id"))
+
+    def _id_partitions(self, app_id: int, query: str, count: int) -> list[tuple[int, int]]:
+        """$id の最小値・最大値を調べ、count 個の範囲 [lo, hi) に分割（query の order by / limit は使わない）"""
+        query = query_condition(query)
+        bounds = []
+        for direction in ("asc", "desc"):
+            response = self.client.get_records(
+                app_id, f"{and_query(query, '$id > 0')} order by $id {direction} limit 1", ["$id"]
+            )
+            records = response.data.get("records", []) if response.success else []
+            if not records:
+                return []
+            bounds.append(int(field_value(records[0], "$id")))
+        low, high = bounds[0], bounds[1] + 1
+        step = max(1, math.ceil((high - low) / count))
+        return [(lo, min(lo + step, high)) for lo in range(low, high, step)]
+
+    def aggregate(
+        self,
+        app_id: int,
+        group_by: Optional[list[str]] = None,
+        metrics: Optional[list[tuple[str, str]]] = None,
+        query: str = "",
+        partitions: int = 1,
+    ) -> Aggregation:
+        """レコードを逐次取得しながら group by 集計
+
+        集計に使うフィールドだけを取得し、レコードは保持せずに集計します。
+        partitions > 1 なら $id 範囲ごとのカーソルを並列に実行し、途中結果を合算します。
+
+        Args:
+            app_id: アプリ ID
+            group_by: グループ化するフィールドコード（省略時は全体で1グループ）
+            metrics: (関数, フィールドコード) のリスト（関数は sum/avg/min/max、件数は常に集計）
+            query: 検索条件
+            partitions: 並列に集計する $id 範囲の数（カーソル上限以下）
+
+        Returns:
+            Aggregation: 集計結果（rows() で行を取得）
+
+        Raises:
+            ValueError: 未知の集計関数、partitions > 1 で query に limit / offset がある
+            RuntimeError: 取得に失敗
+        """
+        result = Aggregation(list(group_by or []), list(metrics or []))
+        fields = result.fields or ["$id"]
+
+        if partitions <= 1:
+            for record in self.read(app_id, query, fields):
+                result.add(record)
+            return result
+
+        if LIMIT_RE.search(query):
+            raise ValueError("query must not contain limit / offset when aggregating in partitions")
+        # 集計に並び順は関係ないので、$id 範囲の条件を付けられるよう order by を外す
+        query = query_condition(query)
+
+        def aggregate_range(bounds: tuple[int, int]) -> Aggregation:
+            partial = Aggregation(result.group_by, result.metrics)
+            lo, hi = bounds
+            for record in self.search_all(app_id, and_query(query, f"$id >= {lo} and $id < {hi}"), fields):
+                partial.add(record)
+            return partial
+
+        ranges = self._id_partitions(app_id, query, min(partitions, MAX_CURSORS))
+        for partial in _run_concurrently(aggregate_range, ranges, len(ranges)):
+            result.merge(partial)
+        return result
+
+    def lookup_many(
+        self,
+        app_id: int,
+        field: str,
+        values: list,
+        fields: Optional[list[str]] = None,
+        max_workers: int = 4,
+        use_cache: bool = True,
+    ) -> dict[str, list[dict]]:
+        """キー値のリストでレコードをまとめて取得（in クエリ自動分割・並列実行）
+
+        値リストを URL 長が安全な in (...) クエリに分割して並列に取得し、
+        キー値ごとにまとめます。取得済みのキー値（該当なしを含む）は
+        キャッシュされ、同じインスタンスからは再度 API を呼びません。
+
+        Args:
+            app_id: アプリ ID
+            field: 検索キーのフィールドコード
+            values: キー値のリスト
+            fields: 取得フィールド（省略時は全フィールド）
+            max_workers: 並列実行数（カーソル上限10に注意）
+            use_cache: False ならインスタンスのキャッシュを読み書きしない（呼び出し側で管理する場合）
+
+        Returns:
+            dict[str, list[dict]]: キー値（文字列）→ 一致したレコード（該当なしのキーは含まない）
+        """
+        if fields and field not in fields:
+            fields = [*fields, field]
+        if use_cache:
+            cache = self._lookup_cache.setdefault((app_id, field, tuple(fields or ())), {})
+        else:
+            cache = {}
+
+        keys = list(dict.fromkeys(str(v) for v in values))
+        chunks = chunk_in_values(field, [k for k in keys if k not in cache])
+        pages = _run_concurrently(
+            lambda chunk: self._read_all(app_id, build_query().in_list(field, chunk).build(), fields),
+            chunks,
+            max_workers,
+        )
+
+        for chunk in chunks:
+            for key in chunk:
+                cache[key] = []
+        for records in pages:
+            for record in records:
+                key = field_value(record, field)
+                if key is not None and str(key) in cache:
+                    cache[str(key)].append(record)
+
+        return {key: cache[key] for key in keys if cache[key]}
+
+    def clear_lookup_cache(self):
+        """lookup_many のキャッシュをクリア"""
+        self._lookup_cache.clear()
+
+    def _read_all(
+        self,
+        app_id: int,
+        query: str,
+        fields: Optional[list[str]] = None,
+    ) -> list[dict]:
+        """クエリに一致する全レコードを取得（500件未満なら1リクエストで完了）"""
+        response = self.client.get_records(app_id, f"{query} limit 500".strip(), fields)
+        if not response.success:
+            raise RuntimeError(f"Failed to get records: {response.error}")
+        records = response.data.get("records", [])
+        if len(records) < 500:
+            return records
+        return list(self.search_all(app_id, query, fields))
 
     def add(self, app_id: int, record: dict) -> KintoneResponse:
         """レコードを1件追加"""
@@ -175,6 +788,124 @@ class KintoneCRUD:
         """レコードを削除"""
         return self.client.delete_records(app_id, record_ids)
 
+    def count(self, app_id: int, query: str = "") -> int:
+        """クエリに一致するレコード数（limit 1 + totalCount、query の limit / offset は無視）"""
+        response = self.client.get_records(
+            app_id, f"{query_condition(query)} limit 1".strip(), ["$id"], total_count=True
+        )
+        if not response.success:
+            raise RuntimeError(f"Failed to count records: {response.error}")
+        return int(response.data.get("totalCount") or 0)
+
+    def _delete_chunk(self, app_id: int, ids: list[int]) -> DeleteResult:
+        """失敗したチャンクを1件ずつ削除し直して、失敗レコードを特定"""
+        result = DeleteResult()
+        for record_id in ids:
+            response = self.client.delete_records(app_id, [record_id])
+            result.requests += 1
+            if response.success:
+                result.deleted += 1
+            elif response.error_code == RECORD_NOT_FOUND_CODE:
+                result.missing += 1
+            else:
+                result.failed[record_id] = response
+        return result
+
+    def _delete_batch(self, app_id: int, ids: list[int], chunk_size: int, bulk: bool) -> DeleteResult:
+        """$id のバッチを削除（bulk なら bulkRequest 1回、失敗したらチャンクごとに削除）"""
+        result = DeleteResult()
+        chunks = [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        if bulk and len(chunks) > 1:
+            response = self.client.bulk_request([
+                {"method": "DELETE", "api": "/k/v1/records.json", "payload": {"app": app_id, "ids": chunk}}
+                for chunk in chunks
+            ])
+            result.requests += 1
+            if response.success:
+                result.deleted += len(ids)
+                return result
+        for chunk in chunks:
+            response = self.client.delete_records(app_id, chunk)
+            result.requests += 1
+            if response.success:
+                result.deleted += len(chunk)
+            elif len(chunk) == 1 and response.error_code == RECORD_NOT_FOUND_CODE:
+                result.missing += 1
+            else:
+                result.merge(self._delete_chunk(app_id, chunk))
+        return result
+
+    def delete_where(
+        self,
+        app_id: int,
+        query: str,
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        bulk: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        max_passes: int = 3,
+    ) -> DeleteResult:
+        """クエリに一致するレコードをすべて削除（カーソルで $id だけを取得して並列に削除）
+
+        $id のみを取得するカーソルから chunk_size 件（最大100件）ずつ削除し、
+        max_workers 件のリクエストを並列に実行します。bulk=True では bulkRequest
+        （20チャンク = 最大2000件）単位で送信してリクエスト数を減らします。
+        失敗したチャンクは1件ずつ削除し直して失敗レコードを特定し、すでに
+        削除されていたレコードは missing に数えます。
+        削除中にカーソルの結果が変わる場合に備え、一致するレコードがなくなるか
+        削除が進まなくなるまで最大 max_passes 回繰り返します。
+
+        Args:
+            app_id: アプリ ID
+            query: 削除するレコードの条件（全件削除は "$id > 0" と明示）
+            chunk_size: 1リクエストの削除件数（最大100）
+            max_workers: 並列実行数
+            bulk: bulkRequest でまとめて削除するか（途中で失敗したバッチはロールバックされ、チャンクごとに再実行）
+            progress: バッチを削除するたびに (削除済み件数, 対象件数) で呼ばれる関数
+            max_passes: 検索と削除を繰り返す最大回数
+
+        Returns:
+            DeleteResult: 削除件数と失敗したレコード
+        """
+        if not query.strip():
+            raise ValueError("query is required (use '$id > 0' to delete every record)")
+        chunk_size = min(max(chunk_size, 1), 100)
+        batch_size = chunk_size * (BULK_REQUEST_LIMIT if bulk else 1)
+        started = time.monotonic()
+        result = DeleteResult()
+        total = None
+
+        for _ in range(max_passes):
+            remaining = self.count(app_id, query)
+            result.requests += 1
+            total = remaining if total is None else total
+            if remaining <= len(result.failed):
+                break
+            done_before = result.deleted + result.missing
+            ids = (int(r["$id"]["value"]) for r in self.search_all(app_id, query, fields=["$id"]))
+            ids = (record_id for record_id in ids if record_id not in result.failed)
+            with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+                pending: set = set()
+
+                def collect(futures):
+                    for future in futures:
+                        result.merge(future.result())
+                    if progress is not None:
+                        progress(result.deleted + result.missing, max(total, result.deleted + result.missing))
+
+                for batch in batched(ids, batch_size):
+                    # 取得が削除より先に進みすぎないよう、実行中のバッチ数を抑える
+                    if len(pending) >= max_workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(self._delete_batch, app_id, batch, chunk_size, bulk))
+                collect(pending)
+            if result.deleted + result.missing == done_before:
+                break
+
+        result.elapsed = time.monotonic() - started
+        return result
+
     # === ステータス操作 ===
 
     def change_status(
@@ -194,6 +925,107 @@ class KintoneCRUD:
         """
         return self.client.update_status(app_id, record_id, action, assignee)
 
+    def change_status_many(
+        self,
+        app_id: int,
+        records: list,
+        action: str,
+        assignee: Optional[str] = None,
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        max_retries: int = 2,
+        ignore_revision_conflicts: bool = False,
+    ) -> StatusChangeResult:
+        """複数レコードのステータスを一括更新（自動チャンク分割・並列実行）
+
+        records/status.json（最大100件）でまとめて更新し、失敗したチャンクは
+        record/status.json で1件ずつ再実行して失敗レコードを特定します。
+        リビジョン不一致（他の人が先に更新した）のレコードは failed に入れ、再試行しません。
+
+        Args:
+            app_id: アプリ ID
+            records: レコード ID のリスト、または $id/$revision を含むレコードのリスト
+            action: アクション名
+            assignee: 次の作業者（ログイン名）
+            chunk_size: 1回の更新件数（最大100）
+            max_workers: 並列実行数
+            max_retries: 1件ずつの再試行回数
+            ignore_revision_conflicts: リビジョン不一致のレコードをリビジョン指定なしで再試行する
+                （その間の変更を確かめずに上書きする）
+
+        Returns:
+            StatusChangeResult: 成功・失敗したレコード
+        """
+        items = []
+        for r in records:
+            if isinstance(r, dict):
+                record_id = field_value(r, "id", "$id")
+                revision = field_value(r, "revision", "$revision")
+            else:
+                record_id, revision = r, None
+            if not record_id:
+                raise ValueError("Each record must have 'id' field")
+            item: dict[str, Any] = {"id": int(record_id), "action": action}
+            if assignee:
+                item["assignee"] = assignee
+            if revision is not None:
+                item["revision"] = int(revision)
+            items.append(item)
+
+        chunk_size = min(chunk_size, 100)
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        responses = _run_concurrently(
+            lambda chunk: self.client.update_statuses(app_id, chunk),
+            chunks,
+            max_workers,
+        )
+
+        result = StatusChangeResult()
+        pending = []
+        for chunk, response in zip(chunks, responses):
+            if response.success:
+                for r in response.data.get("records", []):
+                    result.succeeded[int(r["id"])] = r.get("revision")
+            else:
+                for item in chunk:
+                    result.failed[item["id"]] = response
+                pending.extend(chunk)
+
+        # 失敗したチャンクのみ1件ずつ再試行
+        for attempt in range(max_retries):
+            if not pending:
+                break
+
+            def update(item: dict) -> KintoneResponse:
+                if attempt:
+                    count_retry()  # 1件ずつ更新して失敗したレコードのやり直し
+                return self.client.update_status(
+                    app_id,
+                    item["id"],
+                    item["action"],
+                    item.get("assignee"),
+                    item.get("revision"),
+                )
+
+            responses = _run_concurrently(update, pending, max_workers)
+            retry = []
+            for item, response in zip(pending, responses):
+                if response.success:
+                    result.succeeded[item["id"]] = response.data.get("revision")
+                    result.failed.pop(item["id"], None)
+                    continue
+                result.failed[item["id"]] = response
+                if response.error_code == REVISION_CONFLICT_CODE:
+                    if ignore_revision_conflicts:
+                        item.pop("revision", None)
+                        retry.append(item)
+                elif response.error_code is None:
+                    # 通信エラーなどは再試行する
+                    retry.append(item)
+            pending = retry
+
+        return result
+
     # === コメント操作 ===
 
     def add_comment(
@@ -321,32 +1153,128 @@ def print_records_iterator(records: Iterator[dict], as_json: bool = False, limit
             print(f"(showing first 5 records)")
 
 
+def _display_width(text: str) -> int:
+    """端末上の表示幅（全角文字は2）"""
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def _format_number(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        # 平均などの長い小数は4桁に丸め、末尾の0は省く
+        if value != value.to_integral_value():
+            value = value.quantize(Decimal("0.0001")).normalize()
+        return f"{value:f}"
+    return str(value)
+
+
+def print_aggregation(result: Aggregation, as_json: bool = False):
+    """集計結果を表で表示"""
+    rows = result.rows()
+    if as_json:
+        print(json.dumps(
+            [{k: _format_number(v) if isinstance(v, Decimal) else v for k, v in row.items()} for row in rows],
+            ensure_ascii=False, indent=2,
+        ))
+        return
+
+    columns = result.columns
+    numeric = set(columns[len(result.group_by):])
+    table = [columns] + [[_format_number(row[c]) if c in numeric else row[c] for c in columns] for row in rows]
+    widths = [max(_display_width(line[i]) for line in table) for i in range(len(columns))]
+    for line in table:
+        cells = []
+        for i, cell in enumerate(line):
+            pad = " " * (widths[i] - _display_width(cell))
+            cells.append(pad + cell if columns[i] in numeric else cell + pad)
+        print("  ".join(cells).rstrip())
+    print(f"\n✅ Groups: {len(rows)}")
+
+
+def print_delete_result(result: DeleteResult, as_json: bool = False):
+    """クエリ指定の一括削除の結果を表示"""
+    if as_json:
+        print(json.dumps({
+            "deleted": result.deleted,
+            "missing": result.missing,
+            "requests": result.requests,
+            "elapsed": round(result.elapsed, 3),
+            "failed": {
+                str(k): {"error": r.error, "error_code": r.error_code}
+                for k, r in result.failed.items()
+            },
+        }, ensure_ascii=False, indent=2))
+        return
+    rate = result.deleted / result.elapsed if result.elapsed else 0
+    print(f"✅ Deleted: {result.deleted} 件 ({result.requests} requests, {result.elapsed:.1f}s, {rate:.0f} 件/s)")
+    if result.missing:
+        print(f"ℹ️  Already deleted: {result.missing} 件")
+    if result.failed:
+        print(f"❌ Failed: {len(result.failed)} 件")
+        for record_id, response in sorted(result.failed.items())[:20]:
+            print(f"   Record {record_id}: {response.error}")
+
+
+def print_status_result(result: StatusChangeResult, as_json: bool = False):
+    """ステータス一括更新の結果を表示"""
+    if as_json:
+        print(json.dumps({
+            "succeeded": {str(k): v for k, v in result.succeeded.items()},
+            "failed": {
+                str(k): {"error": r.error, "error_code": r.error_code}
+                for k, r in result.failed.items()
+            },
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"✅ Updated: {len(result.succeeded)} 件")
+        if result.failed:
+            print(f"❌ Failed: {len(result.failed)} 件")
+            for record_id, response in sorted(result.failed.items()):
+                print(f"   Record {record_id}: {response.error}")
+
+
 def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="KINTONE CRUD Operations")
     parser.add_argument(
         "command",
-        choices=["get", "search", "add", "update", "delete", "status", "comment", "apps"],
+        choices=["get", "search", "add", "update", "delete", "status", "comment", "apps", "agg"],
         help="CRUD command",
     )
     parser.add_argument("--app", "-a", type=int, help="App ID")
     parser.add_argument("--id", "-i", type=int, help="Record ID (for get/update/status/comment)")
     parser.add_argument("--ids", type=str, help="Record IDs comma-separated (for delete)")
-    parser.add_argument("--query", "-q", type=str, default="", help="Search query")
+    parser.add_argument("--query", "-q", type=str, default="",
+                        help="Search query (also selects records for status/delete)")
     parser.add_argument("--data", "-d", type=str, help="Record data as JSON")
     parser.add_argument("--file", "-f", type=str, help="Record data from JSON file")
     parser.add_argument("--limit", type=int, default=100, help="Search limit")
     parser.add_argument("--offset", type=int, default=0, help="Search offset")
-    parser.add_argument("--all", action="store_true", help="Search all records using cursor API")
+    parser.add_argument("--all", action="store_true", help="Search all records (strategy chosen by planner)")
+    parser.add_argument("--explain", action="store_true", help="Print the read plan to stderr (search --all)")
+    parser.add_argument("--spool", action="store_true",
+                        help="Drain the cursor to a compressed disk spool and read from it (search --all)")
+    parser.add_argument("--columns", type=str, help="Output columns comma-separated (search fetches only these)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
     # Status options
     parser.add_argument("--action", type=str, help="Status action name")
     parser.add_argument("--assignee", type=str, help="Next assignee (login name)")
+    parser.add_argument("--ignore-revision", action="store_true",
+                        help="Retry records changed by others without the revision check (status --query)")
     # Comment options
     parser.add_argument("--comment-action", type=str, choices=["add", "list", "delete"], help="Comment action")
     parser.add_argument("--text", "-t", type=str, help="Comment text")
     parser.add_argument("--comment-id", type=int, help="Comment ID (for delete)")
+    # Aggregation options
+    parser.add_argument("--group-by", type=str, help="Group-by fields comma-separated (for agg)")
+    for function in AGGREGATE_FUNCTIONS:
+        parser.add_argument(f"--{function}", type=str, help=f"Fields to {function} comma-separated (for agg)")
+    parser.add_argument("--partitions", type=int, default=1, help="Parallel $id-range partitions (for agg)")
+    # Delete options
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent delete requests (for delete --query)")
+    parser.add_argument("--bulk", action="store_true", help="Delete 2000 records per bulkRequest (for delete --query)")
     # Apps options
     parser.add_argument("--name", type=str, help="App name filter (for apps)")
     parser.add_argument("--app-ids", type=str, help="App IDs comma-separated (for apps)")
@@ -354,6 +1282,15 @@ def main():
     args = parser.parse_args()
 
     crud = KintoneCRUD()
+    # 日次リクエスト数を他のプロセスと共有して記録（kintone quota で確認）
+    from kintone_quota import QuotaTracker
+
+    crud.client.add_hook(QuotaTracker(crud.config))
+    if args.command in ("search", "agg", "status", "delete"):
+        # 同じドメインを使う他のプロセスとカーソル枠を共有（終了したプロセスのカーソルも回収）
+        from kintone_lease import CursorLeaseManager
+
+        crud.leases = CursorLeaseManager(crud.client)
 
     # データの読み込み
     record_data = None
@@ -385,10 +1322,32 @@ def main():
         print_response(response, args.json)
 
     elif args.command == "search":
+        # --columns があれば出力列とクエリから取得フィールドを絞る
+        if args.columns:
+            from kintone_projection import FieldProjector
+            from kintone_schema import SchemaManager
+
+            crud.projector = FieldProjector(SchemaManager(client=crud.client))
+            try:
+                crud.projector.declare(
+                    args.app,
+                    query=args.query,
+                    columns=[c.strip() for c in args.columns.split(",") if c.strip()],
+                )
+            except ValueError as e:
+                print(f"❌ Error: {e}")
+                sys.exit(1)
+
         if args.all:
-            # カーソル API を使用した全件取得
+            # 件数に応じて単一ページ・キーセット・カーソル・並列カーソルを選択して全件取得
             try:
-                records = crud.search_all(args.app, args.query)
+                if args.spool:
+                    records = crud.search_all(args.app, args.query, spool=True)
+                else:
+                    plan = crud.plan_read(args.app, args.query)
+                    if args.explain:
+                        print(plan.explain(), file=sys.stderr)
+                    records = crud.read(args.app, args.query, plan=plan)
                 print_records_iterator(records, args.json, args.limit if args.limit != 100 else 0)
             except RuntimeError as e:
                 print(f"❌ Error: {e}")
@@ -426,22 +1385,70 @@ def main():
         print_response(response, args.json)
 
     elif args.command == "delete":
-        if not args.ids:
-            print("Error: --ids is required for 'delete' command")
+        if not args.ids and not args.query:
+            print("Error: --ids or --query is required for 'delete' command")
             sys.exit(1)
-        record_ids = [int(x.strip()) for x in args.ids.split(",")]
-        response = crud.delete(args.app, record_ids)
-        print_response(response, args.json)
+        if args.ids:
+            record_ids = [int(x.strip()) for x in args.ids.split(",")]
+            response = crud.delete(args.app, record_ids)
+            print_response(response, args.json)
+        else:
+            # クエリに一致するレコードをカーソルで取得しながら削除
+            def report(done: int, total: int):
+                print(f"\r🗑  {done}/{total} 件", end="", file=sys.stderr, flush=True)
+
+            try:
+                result = crud.delete_where(
+                    args.app, args.query, max_workers=args.workers, bulk=args.bulk,
+                    progress=None if args.json else report,
+                )
+            except RuntimeError as e:
+                print(f"❌ Error: {e}")
+                sys.exit(1)
+            if not args.json:
+                print(file=sys.stderr)
+            print_delete_result(result, args.json)
+            if not result.success:
+                sys.exit(1)
 
     elif args.command == "status":
-        if not args.id:
-            print("Error: --id is required for 'status' command")
+        if not args.id and not args.query:
+            print("Error: --id or --query is required for 'status' command")
             sys.exit(1)
         if not args.action:
             print("Error: --action is required for 'status' command")
             sys.exit(1)
-        response = crud.change_status(args.app, args.id, args.action, args.assignee)
-        print_response(response, args.json)
+        if args.id:
+            response = crud.change_status(args.app, args.id, args.action, args.assignee)
+            print_response(response, args.json)
+        else:
+            # クエリに一致するレコードをまとめて更新
+            try:
+                targets = list(crud.search_all(args.app, args.query, fields=["$id", "$revision"]))
+            except RuntimeError as e:
+                print(f"❌ Error: {e}")
+                sys.exit(1)
+            result = crud.change_status_many(
+                args.app, targets, args.action, args.assignee, ignore_revision_conflicts=args.ignore_revision
+            )
+            print_status_result(result, args.json)
+            if not result.success:
+                sys.exit(1)
+
+    elif args.command == "agg":
+        group_by = [c.strip() for c in (args.group_by or "").split(",") if c.strip()]
+        metrics = [
+            (function, code.strip())
+            for function in AGGREGATE_FUNCTIONS
+            for code in (getattr(args, function) or "").split(",")
+            if code.strip()
+        ]
+        try:
+            result = crud.aggregate(args.app, group_by, metrics, args.query, partitions=args.partitions)
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+        print_aggregation(result, args.json)
 
     elif args.command == "comment":
         if not args.id:
@@ -0,0 +1,986 @@
+#!/usr/bin/env python3
+"""KINTONE REST API のローカル代替サーバー（ベンチマーク・負荷テスト用）
+
+asyncio で動く HTTP/1.1 サーバーで、主要なエンドポイントをメモリ上の状態で実装します。
+遅延・エラー注入・カーソル上限・同時接続数上限を設定できます。
+
+使用例:
+    with FakeKintoneServer(latency=0.01) as server:
+        server.add_app(1, "顧客", {"顧客名": "SINGLE_LINE_TEXT", "金額": "NUMBER"})
+        server.add_records(1, [{"顧客名": "A社", "金額": 100}])
+        client = KintoneClient(KintoneConfig(domain=server.base_url, api_token="fake"))
+"""
+
+import asyncio
+import copy
+import datetime
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+NUMERIC_TYPES = frozenset({"NUMBER", "CALC", "RECORD_NUMBER", "__ID__", "__REVISION__"})
+
+# レコードに自動で付与されるフィールド
+SYSTEM_FIELDS = {
+    "$id": "__ID__",
+    "$revision": "__REVISION__",
+    "レコード番号": "RECORD_NUMBER",
+    "作成日時": "CREATED_TIME",
+    "更新日時": "UPDATED_TIME",
+}
+
+MAX_LIMIT = 500
+MAX_OFFSET = 10000
+
+
+class ApiError(Exception):
+    """KINTONE 形式のエラーレスポンス"""
+
+    def __init__(self, status: int, code: str, message: str, **extra: Any):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.extra = extra
+
+    def to_body(self) -> dict:
+        return {"code": self.code, "id": uuid.uuid4().hex[:20], "message": self.message, **self.extra}
+
+
+# === クエリ評価 ===
+
+_TOKEN_RE = re.compile(
+    r'\s*(?:(?P<string>"(?:\\.|[^"\\])*")'
+    r"|(?P<number>-?\d+(?:\.\d+)?)(?![^\s()=!<>,])"
+    r"|(?P<op>!=|>=|<=|=|>|<|\(|\)|,)"
+    r'|(?P<word>[^\s()=!<>,"]+))'
+)
+
+
+def _tokenize(query: str) -> list[tuple[str, Any]]:
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN_RE.match(query, position)
+        if not match or match.end() == position:
+            raise ApiError(400, "GAIA_IQ03", f"Invalid query near: {query[position:position + 20]}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            tokens.append(("value", re.sub(r"\\(.)", r"\1", text[1:-1])))
+        elif kind == "number":
+            tokens.append(("value", text))
+        elif kind == "op":
+            tokens.append(("op", text))
+        else:
+            tokens.append(("word", text))
+    return tokens
+
+
+def _function_value(name: str) -> str:
+    """クエリ関数の値（ローカル時刻ベースの簡易実装）"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    name = name.upper()
+    if name == "TODAY":
+        return now.strftime("%Y-%m-%d")
+    if name == "NOW":
+        return now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if name == "THIS_MONTH":
+        return now.strftime("%Y-%m-01")
+    if name == "THIS_YEAR":
+        return now.strftime("%Y-01-01")
+    if name == "LOGINUSER":
+        return "fake-user"
+    return name
+
+
+class _QueryParser:
+    """KINTONE クエリのサブセットを解析して述語関数に変換"""
+
+    def __init__(self, query: str):
+        self.tokens = _tokenize(query)
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> tuple[str, Any]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else ("end", None)
+
+    def next(self) -> tuple[str, Any]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def keyword(self, *words: str) -> bool:
+        kind, text = self.peek()
+        return kind == "word" and text.lower() in words
+
+    def expect(self, kind: str, text: Optional[str] = None):
+        token = self.next()
+        if token[0] != kind or (text is not None and str(token[1]).lower() != text):
+            raise ApiError(400, "GAIA_IQ03", f"Unexpected token: {token[1]}")
+        return token
+
+    def parse(self) -> tuple[Callable[[dict], bool], list[tuple[str, bool]], Optional[int], Optional[int]]:
+        predicate: Callable[[dict], bool] = lambda record: True
+        if self.peek()[0] != "end" and not self.keyword("order", "limit", "offset"):
+            predicate = self.expression()
+        order: list[tuple[str, bool]] = []
+        limit = offset = None
+        seen: set[str] = set()
+        while self.peek()[0] != "end":
+            # KINTONE と同じく order by / limit / offset はそれぞれ1回だけ
+            clause = str(self.peek()[1]).lower()
+            if clause in seen:
+                raise ApiError(400, "GAIA_IQ03", f"Duplicate {clause} clause")
+            seen.add(clause)
+            if self.keyword("order"):
+                self.next()
+                self.expect("word", "by")
+                while True:
+                    field_code = self.next()[1]
+                    descending = False
+                    if self.keyword("asc", "desc"):
+                        descending = self.next()[1].lower() == "desc"
+                    order.append((field_code, descending))
+                    if self.peek() != ("op", ","):
+                        break
+                    self.next()
+            elif self.keyword("limit"):
+                self.next()
+                limit = int(self.next()[1])
+            elif self.keyword("offset"):
+                self.next()
+                offset = int(self.next()[1])
+            else:
+                raise ApiError(400, "GAIA_IQ03", f"Unexpected token: {self.peek()[1]}")
+        return predicate, order, limit, offset
+
+    def expression(self) -> Callable[[dict], bool]:
+        terms = [self.term()]
+        while self.keyword("or"):
+            self.next()
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else (lambda r: any(t(r) for t in terms))
+
+    def term(self) -> Callable[[dict], bool]:
+        factors = [self.factor()]
+        while self.keyword("and"):
+            self.next()
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else (lambda r: all(f(r) for f in factors))
+
+    def factor(self) -> Callable[[dict], bool]:
+        if self.peek() == ("op", "("):
+            self.next()
+            inner = self.expression()
+            self.expect("op", ")")
+            return inner
+        return self.condition()
+
+    def value(self) -> str:
+        kind, text = self.next()
+        if kind == "value":
+            return text
+        if kind == "word" and self.peek() == ("op", "("):
+            self.next()
+            while self.peek() != ("op", ")"):
+                self.next()
+            self.next()
+            return _function_value(text)
+        raise ApiError(400, "GAIA_IQ03", f"Invalid value: {text}")
+
+    def condition(self) -> Callable[[dict], bool]:
+        kind, field_code = self.next()
+        if kind != "word":
+            raise ApiError(400, "GAIA_IQ03", f"Field code expected: {field_code}")
+        negate = False
+        if self.keyword("not"):
+            self.next()
+            negate = True
+        if self.keyword("in"):
+            self.next()
+            self.expect("op", "(")
+            values = []
+            while self.peek() != ("op", ")"):
+                values.append(self.value())
+                if self.peek() == ("op", ","):
+                    self.next()
+            self.next()
+            return lambda r: _match_in(r, field_code, values) != negate
+        if self.keyword("like"):
+            self.next()
+            needle = self.value().lower()
+            return lambda r: any(needle in str(v).lower() for v in _values(r, field_code)) != negate
+        if negate:
+            raise ApiError(400, "GAIA_IQ03", "not must be followed by in or like")
+        op = self.expect("op")[1]
+        operand = self.value()
+        return lambda r: _compare(r, field_code, op, operand)
+
+
+def _values(record: dict, field_code: str) -> list:
+    """フィールドの値をリストで返す（複数値フィールドは要素ごと）"""
+    entry = record.get(field_code)
+    if entry is None:
+        return [""]
+    value = entry.get("value")
+    if isinstance(value, list):
+        return [v.get("code", v.get("name", "")) if isinstance(v, dict) else v for v in value] or [""]
+    if isinstance(value, dict):
+        return [value.get("code", "")]
+    return ["" if value is None else value]
+
+
+def _sort_key(record: dict, field_code: str):
+    entry = record.get(field_code, {})
+    value = _values(record, field_code)[0]
+    if entry.get("type") in NUMERIC_TYPES:
+        try:
+            return (0, float(value))
+        except (TypeError, ValueError):
+            return (1, 0.0)
+    return (0, str(value))
+
+
+def _match_in(record: dict, field_code: str, values: list) -> bool:
+    targets = set(values)
+    return any(str(v) in targets for v in _values(record, field_code))
+
+
+def _compare(record: dict, field_code: str, op: str, operand: str) -> bool:
+    numeric = record.get(field_code, {}).get("type") in NUMERIC_TYPES
+    for value in _values(record, field_code):
+        if numeric and value != "" and operand != "":
+            left, right = float(value), float(operand)
+        else:
+            left, right = str(value), str(operand)
+        if op == "=" and left == right:
+            return True
+        if op == "!=" and left != right:
+            return True
+        if op == ">" and left > right:
+            return True
+        if op == ">=" and left >= right:
+            return True
+        if op == "<" and left < right:
+            return True
+        if op == "<=" and left <= right:
+            return True
+    return False
+
+
+def run_query(records: list[dict], query: str) -> tuple[list[dict], Optional[int], Optional[int]]:
+    """クエリで絞り込み・並び替えしたレコードと (limit, offset) を返す"""
+    predicate, order, limit, offset = _QueryParser(query or "").parse()
+    matched = [r for r in records if predicate(r)]
+    if not order:
+        order = [("$id", True)]  # KINTONE の既定は $id 降順
+    for field_code, descending in reversed(order):
+        matched.sort(key=lambda r: _sort_key(r, field_code), reverse=descending)
+    return matched, limit, offset
+
+
+# === 状態 ===
+
+def _property(code: str, field_type: Any) -> dict:
+    """フィールドの設定（辞書はテーブル内のフィールド）"""
+    if isinstance(field_type, dict):
+        inner = {inner_code: _property(inner_code, inner_type) for inner_code, inner_type in field_type.items()}
+        return {"type": "SUBTABLE", "code": code, "label": code, "fields": inner}
+    return {"type": field_type, "code": code, "label": code}
+
+
+@dataclass
+class _App:
+    app_id: int
+    name: str
+    fields: dict[str, dict]
+    records: dict[int, dict] = field(default_factory=dict)
+    comments: dict[int, list[dict]] = field(default_factory=dict)
+    actions: dict[str, tuple[str, str]] = field(default_factory=dict)  # アクション名 -> (現在, 次)
+    next_id: int = 1
+    next_row_id: int = 1
+    revision: int = 1
+
+
+@dataclass
+class _Cursor:
+    app_id: int
+    ids: list[int]
+    fields: Optional[list[str]]
+    size: int
+    expires_at: float
+    position: int = 0
+
+
+def _timestamp() -> str:
+    """KINTONE と同じ分単位の UTC 日時"""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:00Z")
+
+
+class FakeKintoneServer:
+    """KINTONE REST API 互換のインメモリサーバー
+
+    Args:
+        host: 待ち受けアドレス
+        port: ポート（0 で自動割り当て）
+        latency: 各リクエストに加える遅延（秒）
+        jitter: 遅延に加えるランダム幅（秒）
+        error_rate: ランダムに 500 エラーを返す確率（0-1）
+        max_cursors: 同時に存在できるカーソル数
+        cursor_ttl: カーソルの有効期限（秒）
+        max_concurrent: 同時処理リクエスト数の上限（超過分は 429）
+        seed: 乱数シード（遅延・エラー注入を再現可能にする）
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        max_cursors: int = 10,
+        cursor_ttl: float = 600.0,
+        max_concurrent: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_cursors = max_cursors
+        self.cursor_ttl = cursor_ttl
+        self.max_concurrent = max_concurrent
+        self.random = random.Random(seed)
+
+        self.apps: dict[int, _App] = {}
+        self.files: dict[str, tuple[str, str, bytes]] = {}  # fileKey -> (name, contentType, content)
+        self.cursors: dict[str, _Cursor] = {}
+        self.request_counts: dict[tuple[str, str], int] = {}
+        self.request_tokens: list[tuple[str, str, str]] = []  # (method, endpoint, X-Cybozu-API-Token)
+        self.bytes_sent = 0
+
+        self._lock = threading.RLock()
+        self._injected: list[tuple[Optional[str], int, str]] = []  # (endpoint, status, code)
+        self._in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # === データ投入 ===
+
+    def add_app(
+        self,
+        app_id: int,
+        name: str,
+        fields: Optional[dict[str, Any]] = None,
+        actions: Optional[dict[str, tuple[str, str]]] = None,
+    ) -> None:
+        """アプリを追加
+
+        Args:
+            fields: フィールドコード -> 型（例: {"金額": "NUMBER"}）。
+                型の代わりに辞書を指定するとテーブル（例: {"明細": {"品名": "SINGLE_LINE_TEXT"}}）
+            actions: ワークフローのアクション名 -> (現在のステータス, 次のステータス)
+        """
+        properties = {
+            code: _property(code, field_type)
+            for code, field_type in {**SYSTEM_FIELDS, **(fields or {})}.items()
+        }
+        if actions:
+            properties["ステータス"] = {"type": "STATUS", "code": "ステータス", "label": "ステータス"}
+        with self._lock:
+            self.apps[app_id] = _App(app_id, name, properties, actions=dict(actions or {}))
+
+    def add_records(self, app_id: int, records: list[dict]) -> list[int]:
+        """レコードを追加（値は KINTONE 形式でも通常の値でもよい）"""
+        with self._lock:
+            app = self._app(app_id)
+            return [self._insert(app, record) for record in records]
+
+    def add_file(self, content: bytes, name: str = "file.bin", content_type: str = "application/octet-stream") -> str:
+        """ファイルを追加して fileKey を返す"""
+        file_key = uuid.uuid4().hex
+        with self._lock:
+            self.files[file_key] = (name, content_type, content)
+        return file_key
+
+    def inject_errors(self, count: int = 1, status: int = 503, code: str = "FAKE_INJECTED", endpoint: Optional[str] = None):
+        """次の count 件のリクエスト（endpoint 指定時はそのエンドポイントのみ）をエラーにする"""
+        with self._lock:
+            self._injected.extend([(endpoint, status, code)] * count)
+
+    def records(self, app_id: int) -> list[dict]:
+        """アプリのレコード一覧（$id 昇順）"""
+        with self._lock:
+            app = self._app(app_id)
+            return [copy.deepcopy(app.records[i]) for i in sorted(app.records)]
+
+    def count(self, method: str, endpoint: str) -> int:
+        """エンドポイントへのリクエスト数"""
+        return self.request_counts.get((method, endpoint), 0)
+
+    # === 起動・停止 ===
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeKintoneServer":
+        """バックグラウンドスレッドでサーバーを起動"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-kintone", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        """サーバーを停止"""
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "FakeKintoneServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # === HTTP ===
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, content_type, payload = await self._respond(method, target, headers, body)
+                response_headers = [
+                    f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+                    f"Content-Type: {content_type}",
+                ]
+                accept_encoding = headers.get("accept-encoding", "")
+                if len(payload) > 256 and "gzip" in accept_encoding:
+                    payload = gzip.compress(payload, compresslevel=1)
+                    response_headers.append("Content-Encoding: gzip")
+                elif len(payload) > 256 and "deflate" in accept_encoding:
+                    payload = zlib.compress(payload, 1)
+                    response_headers.append("Content-Encoding: deflate")
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                response_headers.append(f"Content-Length: {len(payload)}")
+                response_headers.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+                writer.write(("\r\n".join(response_headers) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                self.bytes_sent += len(payload)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, headers: dict, body: bytes) -> tuple[int, str, bytes]:
+        parsed = urllib.parse.urlsplit(target)
+        endpoint = re.sub(r"^/k/(guest/\d+/)?v1/", "", parsed.path)
+        with self._lock:
+            self.request_counts[(method, endpoint)] = self.request_counts.get((method, endpoint), 0) + 1
+
+        self._in_flight += 1
+        try:
+            if self.max_concurrent is not None and self._in_flight > self.max_concurrent:
+                raise ApiError(429, "FAKE_RATE_LIMITED", "Too many concurrent requests")
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay:
+                await asyncio.sleep(delay)
+            self._maybe_fail(endpoint)
+            if "x-cybozu-api-token" not in headers:
+                raise ApiError(401, "CB_WA01", "API token is required")
+            with self._lock:
+                self.request_tokens.append((method, endpoint, headers["x-cybozu-api-token"]))
+
+            if method == "GET":
+                params = _parse_params(parsed.query)
+            elif headers.get("content-type", "").startswith("multipart/form-data"):
+                params = {"_multipart": (headers["content-type"], body)}
+            else:
+                params = json.loads(body) if body else {}
+
+            with self._lock:
+                result = self._dispatch(method, endpoint, params)
+            if isinstance(result, tuple):  # ファイルのダウンロード
+                return 200, result[0], result[1]
+            return 200, "application/json; charset=utf-8", json.dumps(result, ensure_ascii=False).encode("utf-8")
+        except ApiError as e:
+            return e.status, "application/json; charset=utf-8", json.dumps(e.to_body(), ensure_ascii=False).encode("utf-8")
+        except (KeyError, TypeError, ValueError) as e:
+            error = ApiError(400, "CB_VA01", f"Invalid request: {e}")
+            return 400, "application/json; charset=utf-8", json.dumps(error.to_body()).encode("utf-8")
+        finally:
+            self._in_flight -= 1
+
+    def _maybe_fail(self, endpoint: str):
+        with self._lock:
+            for i, (target, status, code) in enumerate(self._injected):
+                if target is None or target == endpoint:
+                    del self._injected[i]
+                    raise ApiError(status, code, "Injected error")
+            if self.error_rate and self.random.random() < self.error_rate:
+                raise ApiError(500, "FAKE_INJECTED", "Injected random error")
+
+    # === ルーティング ===
+
+    def _dispatch(self, method: str, endpoint: str, params: dict) -> Any:
+        handler = _ROUTES.get((method, endpoint))
+        if handler is None:
+            raise ApiError(404, "CB_NO02", f"Unknown API: {method} {endpoint}")
+        return handler(self, params)
+
+    def _app(self, app_id: Any) -> _App:
+        app = self.apps.get(int(app_id))
+        if app is None:
+            raise ApiError(404, "GAIA_AP01", f"App {app_id} not found")
+        return app
+
+    def _record(self, app: _App, record_id: Any) -> dict:
+        record = app.records.get(int(record_id))
+        if record is None:
+            raise ApiError(404, "GAIA_RE01", f"Record {record_id} not found")
+        return record
+
+    def _insert(self, app: _App, values: dict) -> int:
+        record_id = app.next_id
+        app.next_id += 1
+        now = _timestamp()
+        record = {
+            "$id": {"type": "__ID__", "value": str(record_id)},
+            "$revision": {"type": "__REVISION__", "value": "1"},
+            "レコード番号": {"type": "RECORD_NUMBER", "value": str(record_id)},
+            "作成日時": {"type": "CREATED_TIME", "value": now},
+            "更新日時": {"type": "UPDATED_TIME", "value": now},
+        }
+        if app.actions:
+            record["ステータス"] = {"type": "STATUS", "value": next(iter(app.actions.values()))[0]}
+        self._apply(app, record, values)
+        app.records[record_id] = record
+        return record_id
+
+    def _apply(self, app: _App, record: dict, values: dict):
+        for code, value in values.items():
+            if code in SYSTEM_FIELDS:
+                continue
+            if isinstance(value, dict) and "value" in value:
+                value = value["value"]
+            if code not in app.fields:
+                app.fields[code] = {"type": "SINGLE_LINE_TEXT", "code": code, "label": code}
+            field_type = app.fields[code]["type"]
+            if field_type in NUMERIC_TYPES and value is not None and not isinstance(value, str):
+                value = str(value)
+            if field_type == "FILE" and value:
+                value = [self._file_info(item) for item in value]
+            if field_type == "SUBTABLE" and value:
+                value = [self._row(app, app.fields[code].get("fields", {}), row) for row in value]
+            record[code] = {"type": field_type, "value": value}
+
+    def _row(self, app: _App, fields: dict[str, dict], row: dict) -> dict:
+        """テーブルの行（行 ID と行内のフィールドの型を付ける）"""
+        cells = row.get("value", {}) if "value" in row else row
+        row_id = row.get("id")
+        if row_id is None:
+            row_id = app.next_row_id
+            app.next_row_id += 1
+        value = {}
+        for code, cell in cells.items():
+            if isinstance(cell, dict) and "value" in cell:
+                cell = cell["value"]
+            field_type = fields.get(code, {}).get("type", "SINGLE_LINE_TEXT")
+            if field_type in NUMERIC_TYPES and cell is not None and not isinstance(cell, str):
+                cell = str(cell)
+            if field_type == "FILE" and cell:
+                cell = [self._file_info(item) for item in cell]
+            value[code] = {"type": field_type, "value": cell}
+        return {"id": str(row_id), "value": value}
+
+    def _touch(self, record: dict) -> str:
+        revision = str(int(record["$revision"]["value"]) + 1)
+        record["$revision"]["value"] = revision
+        record["更新日時"]["value"] = _timestamp()
+        return revision
+
+    def _check_revision(self, record: dict, revision: Any):
+        if revision not in (None, -1, "-1") and str(revision) != record["$revision"]["value"]:
+            raise ApiError(409, "GAIA_CO02", "The revision is not the latest")
+
+    @staticmethod
+    def _project(record: dict, fields: Optional[list[str]]) -> dict:
+        if not fields:
+            return copy.deepcopy(record)
+        return {code: copy.deepcopy(record[code]) for code in fields if code in record}
+
+    # === レコード ===
+
+    def _get_record(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        return {"record": self._project(self._record(app, params["id"]), None)}
+
+    def _get_records(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        matched, limit, offset = run_query(list(app.records.values()), params.get("query", ""))
+        limit = 100 if limit is None else limit
+        offset = offset or 0
+        if limit > MAX_LIMIT or offset > MAX_OFFSET:
+            raise ApiError(400, "GAIA_QU01", "limit must be <= 500 and offset <= 10000")
+        fields = params.get("fields")
+        result: dict[str, Any] = {
+            "records": [self._project(r, fields) for r in matched[offset:offset + limit]],
+            "totalCount": str(len(matched)) if str(params.get("totalCount")).lower() == "true" else None,
+        }
+        return result
+
+    def _add_record(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        record_id = self._insert(app, params.get("record", {}))
+        return {"id": str(record_id), "revision": "1"}
+
+    def _add_records(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        records = params["records"]
+        if len(records) > 100:
+            raise ApiError(400, "CB_VA01", "records must be 100 or fewer")
+        ids = [self._insert(app, r) for r in records]
+        return {"ids": [str(i) for i in ids], "revisions": ["1"] * len(ids)}
+
+    def _update_one(self, app: _App, item: dict) -> dict:
+        if "updateKey" in item:
+            key = item["updateKey"]
+            matches = [r for r in app.records.values() if _values(r, key["field"])[0] == str(key["value"])]
+            if not matches:
+                raise ApiError(404, "GAIA_RE01", "Record not found by updateKey")
+            record = matches[0]
+        else:
+            record = self._record(app, item["id"])
+        self._check_revision(record, item.get("revision"))
+        self._apply(app, record, item.get("record", {}))
+        return {"id": record["$id"]["value"], "revision": self._touch(record)}
+
+    def _update_record(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        return {"revision": self._update_one(app, params)["revision"]}
+
+    def _update_records(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        if len(params["records"]) > 100:
+            raise ApiError(400, "CB_VA01", "records must be 100 or fewer")
+        return {"records": [self._update_one(app, item) for item in params["records"]]}
+
+    def _delete_records(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        ids = [int(i) for i in params["ids"]]
+        if len(ids) > 100:
+            raise ApiError(400, "CB_VA01", "ids must be 100 or fewer")
+        revisions = params.get("revisions") or [None] * len(ids)
+        for record_id, revision in zip(ids, revisions):
+            self._check_revision(self._record(app, record_id), revision)
+        for record_id in ids:
+            del app.records[record_id]
+            app.comments.pop(record_id, None)
+        return {}
+
+    # === カーソル ===
+
+    def _expire_cursors(self):
+        now = time.monotonic()
+        for cursor_id in [c for c, cursor in self.cursors.items() if cursor.expires_at <= now]:
+            del self.cursors[cursor_id]
+
+    def _create_cursor(self, params: dict) -> dict:
+        self._expire_cursors()
+        if len(self.cursors) >= self.max_cursors:
+            raise ApiError(400, "GAIA_TM12", "Too many cursors")
+        app = self._app(params["app"])
+        matched, limit, offset = run_query(list(app.records.values()), params.get("query", ""))
+        if limit is not None or offset is not None:
+            raise ApiError(400, "GAIA_QU01", "limit and offset cannot be used with cursors")
+        cursor_id = str(uuid.uuid4())
+        self.cursors[cursor_id] = _Cursor(
+            app_id=app.app_id,
+            ids=[int(r["$id"]["value"]) for r in matched],
+            fields=params.get("fields"),
+            size=min(max(int(params.get("size", 100)), 1), MAX_LIMIT),
+            expires_at=time.monotonic() + self.cursor_ttl,
+        )
+        return {"id": cursor_id, "totalCount": str(len(matched))}
+
+    def _get_cursor(self, params: dict) -> dict:
+        self._expire_cursors()
+        cursor = self.cursors.get(params["id"])
+        if cursor is None:
+            raise ApiError(400, "GAIA_CR02", "Cursor not found or expired")
+        app = self._app(cursor.app_id)
+        page_ids = cursor.ids[cursor.position:cursor.position + cursor.size]
+        cursor.position += len(page_ids)
+        records = [self._project(app.records[i], cursor.fields) for i in page_ids if i in app.records]
+        has_next = cursor.position < len(cursor.ids)
+        if not has_next:
+            del self.cursors[params["id"]]  # 最後まで読むと自動で削除される
+        return {"records": records, "next": has_next}
+
+    def _delete_cursor(self, params: dict) -> dict:
+        if self.cursors.pop(params["id"], None) is None:
+            raise ApiError(400, "GAIA_CR02", "Cursor not found or expired")
+        return {}
+
+    # === アプリ ===
+
+    def _get_app(self, params: dict) -> dict:
+        app = self._app(params["id"])
+        return {"appId": str(app.app_id), "name": app.name, "description": "", "spaceId": None}
+
+    def _get_apps(self, params: dict) -> dict:
+        ids = {int(i) for i in params.get("ids", [])}
+        name = params.get("name")
+        apps = [
+            {"appId": str(a.app_id), "name": a.name, "description": ""}
+            for a in sorted(self.apps.values(), key=lambda a: a.app_id)
+            if (not ids or a.app_id in ids) and (not name or name in a.name)
+        ]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        return {"apps": apps[offset:offset + limit]}
+
+    def _get_form_fields(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        return {"properties": copy.deepcopy(app.fields), "revision": str(app.revision)}
+
+    # === ステータス ===
+
+    def _change_status(self, app: _App, item: dict) -> dict:
+        record = self._record(app, item["id"])
+        self._check_revision(record, item.get("revision"))
+        transition = app.actions.get(item["action"])
+        current = record.get("ステータス", {}).get("value")
+        if transition is None or transition[0] != current:
+            raise ApiError(400, "GAIA_IL03", f"Action {item['action']} is not available")
+        record["ステータス"]["value"] = transition[1]
+        return {"id": str(item["id"]), "revision": self._touch(record)}
+
+    def _update_status(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        return {"revision": self._change_status(app, params)["revision"]}
+
+    def _update_statuses(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        if len(params["records"]) > 100:
+            raise ApiError(400, "CB_VA01", "records must be 100 or fewer")
+        snapshot = copy.deepcopy(app.records)
+        try:
+            return {"records": [self._change_status(app, item) for item in params["records"]]}
+        except ApiError:
+            app.records = snapshot
+            raise
+
+    # === コメント ===
+
+    def _add_comment(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        self._record(app, params["record"])
+        comments = app.comments.setdefault(int(params["record"]), [])
+        comment_id = str(max((int(c["id"]) for c in comments), default=0) + 1)
+        comments.append({
+            "id": comment_id,
+            "text": params["comment"]["text"],
+            "createdAt": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "creator": {"code": "fake-user", "name": "Fake User"},
+            "mentions": params["comment"].get("mentions", []),
+        })
+        return {"id": comment_id}
+
+    def _get_comments(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        self._record(app, params["record"])
+        comments = list(app.comments.get(int(params["record"]), []))
+        if params.get("order", "desc") == "desc":
+            comments.reverse()
+        offset = int(params.get("offset", 0))
+        limit = min(int(params.get("limit", 10)), 10)
+        return {
+            "comments": comments[offset:offset + limit],
+            "older": offset + limit < len(comments),
+            "newer": offset > 0,
+        }
+
+    def _delete_comment(self, params: dict) -> dict:
+        app = self._app(params["app"])
+        comments = app.comments.get(int(params["record"]), [])
+        remaining = [c for c in comments if c["id"] != str(params["comment"])]
+        if len(remaining) == len(comments):
+            raise ApiError(404, "GAIA_RE02", "Comment not found")
+        app.comments[int(params["record"])] = remaining
+        return {}
+
+    # === ファイル ===
+
+    def _upload_file(self, params: dict) -> dict:
+        content_type, body = params["_multipart"]
+        boundary = content_type.split("boundary=", 1)[1].encode("latin-1")
+        for part in body.split(b"--" + boundary):
+            head, _, content = part.partition(b"\r\n\r\n")
+            if b'name="file"' not in head:
+                continue
+            name_match = re.search(rb'filename="([^"]*)"', head)
+            type_match = re.search(rb"Content-Type: ([^\r\n]+)", head)
+            return {"fileKey": self.add_file(
+                content[:-2] if content.endswith(b"\r\n") else content,
+                name_match.group(1).decode("utf-8") if name_match else "file.bin",
+                type_match.group(1).decode("latin-1") if type_match else "application/octet-stream",
+            )}
+        raise ApiError(400, "CB_VA01", "file part is required")
+
+    def _file_info(self, item: dict) -> dict:
+        """添付ファイルフィールドに保存する値（アップロード済みの fileKey を情報付きにする）"""
+        entry = self.files.get(item.get("fileKey", ""))
+        if entry is None:
+            raise ApiError(400, "GAIA_FN01", f"File not found: {item.get('fileKey')}")
+        name, content_type, content = entry
+        return {"fileKey": item["fileKey"], "name": name, "contentType": content_type, "size": str(len(content))}
+
+    def _download_file(self, params: dict) -> tuple[str, bytes]:
+        entry = self.files.get(params["fileKey"])
+        if entry is None:
+            raise ApiError(404, "GAIA_BL01", "File not found")
+        return entry[1], entry[2]
+
+    # === Bulk Request ===
+
+    def _bulk_request(self, params: dict) -> dict:
+        requests = params["requests"]
+        if len(requests) > 20:
+            raise ApiError(400, "CB_VA01", "requests must be 20 or fewer")
+        snapshot = copy.deepcopy(self.apps)
+        results = []
+        for i, request in enumerate(requests):
+            endpoint = re.sub(r"^/k/(guest/\d+/)?v1/", "", request["api"])
+            try:
+                results.append(self._dispatch(request["method"], endpoint, request["payload"]))
+            except ApiError as e:
+                self.apps = snapshot  # 1件でも失敗したら全体をロールバック
+                errors = [{} for _ in requests]
+                errors[i] = e.to_body()
+                raise ApiError(e.status, e.code, e.message, results=errors)
+        return {"results": results}
+
+
+_ROUTES: dict[tuple[str, str], Callable[[FakeKintoneServer, dict], Any]] = {
+    ("GET", "record.json"): FakeKintoneServer._get_record,
+    ("POST", "record.json"): FakeKintoneServer._add_record,
+    ("PUT", "record.json"): FakeKintoneServer._update_record,
+    ("GET", "records.json"): FakeKintoneServer._get_records,
+    ("POST", "records.json"): FakeKintoneServer._add_records,
+    ("PUT", "records.json"): FakeKintoneServer._update_records,
+    ("DELETE", "records.json"): FakeKintoneServer._delete_records,
+    ("POST", "records/cursor.json"): FakeKintoneServer._create_cursor,
+    ("GET", "records/cursor.json"): FakeKintoneServer._get_cursor,
+    ("DELETE", "records/cursor.json"): FakeKintoneServer._delete_cursor,
+    ("GET", "app.json"): FakeKintoneServer._get_app,
+    ("GET", "apps.json"): FakeKintoneServer._get_apps,
+    ("GET", "app/form/fields.json"): FakeKintoneServer._get_form_fields,
+    ("PUT", "record/status.json"): FakeKintoneServer._update_status,
+    ("PUT", "records/status.json"): FakeKintoneServer._update_statuses,
+    ("POST", "record/comment.json"): FakeKintoneServer._add_comment,
+    ("GET", "record/comments.json"): FakeKintoneServer._get_comments,
+    ("DELETE", "record/comment.json"): FakeKintoneServer._delete_comment,
+    ("POST", "file.json"): FakeKintoneServer._upload_file,
+    ("GET", "file.json"): FakeKintoneServer._download_file,
+    ("POST", "bulkRequest.json"): FakeKintoneServer._bulk_request,
+}
+
+
+def _parse_params(query_string: str) -> dict:
+    """GET パラメータを解析（fields[0]=a&fields[1]=b 形式は配列にまとめる）"""
+    params: dict[str, Any] = {}
+    for key, value in urllib.parse.parse_qsl(query_string, keep_blank_values=True):
+        match = re.fullmatch(r"(.+)\[(\d+)\]", key)
+        if match:
+            params.setdefault(match.group(1), []).append(value)
+        else:
+            params[key] = value
+    return params
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local fake KINTONE server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Random 500 error probability")
+    parser.add_argument("--max-cursors", type=int, default=10)
+    parser.add_argument("--max-concurrent", type=int, default=None)
+    parser.add_argument("--records", type=int, default=1000, help="Seed app 1 with N records")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeKintoneServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        max_cursors=args.max_cursors,
+        max_concurrent=args.max_concurrent,
+        seed=args.seed,
+    )
+    server.add_app(1, "Sample", {"タイトル": "SINGLE_LINE_TEXT", "金額": "NUMBER"})
+    rng = random.Random(args.seed)
+    server.add_records(1, [
+        {"タイトル": f"Record {i}", "金額": rng.randint(0, 100000)} for i in range(args.records)
+    ])
+    server.start()
+    print(f"Fake KINTONE server: {server.base_url}")
+    print(f'  export KINTONE_DOMAIN="{server.base_url}" KINTONE_API_TOKEN="fake"')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
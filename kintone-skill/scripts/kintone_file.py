@@ -13,15 +13,24 @@ from kintone_client import KintoneClient, KintoneResponse
 class KintoneFileManager:
     """KINTONE 添付ファイル管理"""
 
-    def __init__(self):
-        self.config = get_config()
-        self.client = KintoneClient(self.config)
+    def __init__(self, client: Optional[KintoneClient] = None):
+        if client is None:
+            self.config = get_config()
+            self.client = KintoneClient(self.config)
+        else:
+            self.config = client.config
+            self.client = client
         self.download_dir = self.config.cache_dir / "downloads"
         self.download_dir.mkdir(parents=True, exist_ok=True)
 
-    def upload(self, file_path: str, file_name: Optional[str] = None) -> KintoneResponse:
+    def upload(
+        self,
+        file_path: str,
+        file_name: Optional[str] = None,
+        app_id: Optional[int] = None,
+    ) -> KintoneResponse:
         """
-        ファイルをアップロード
+        ファイルをアップロード（app_id は添付先アプリ、トークンの選択に使用）
 
         Returns:
             KintoneResponse with data containing {"fileKey": "..."}
@@ -31,22 +40,23 @@ class KintoneFileManager:
             return KintoneResponse(success=False, error=f"File not found: {file_path}")
 
         name = file_name or path.name
-        return self.client.upload_file(str(path), name)
+        return self.client.upload_file(str(path), name, app_id=app_id)
 
     def download(
         self,
         file_key: str,
         output_path: Optional[str] = None,
         file_name: Optional[str] = None,
+        app_id: Optional[int] = None,
     ) -> tuple[bool, str]:
         """
-        ファイルをダウンロード
+        ファイルをダウンロード（app_id はファイルのあるアプリ、トークンの選択に使用）
 
         Returns:
             (success, file_path or error_message)
         """
         try:
-            content = self.client.download_file(file_key)
+            content = self.client.download_file(file_key, app_id=app_id)
 
             if output_path:
                 save_path = Path(output_path)
@@ -109,7 +119,7 @@ class KintoneFileManager:
             file_key = file_info.get("fileKey")
             file_name = file_info.get("name", f"file_{file_key[:8]}")
 
-            success, result = self.download(file_key, str(out_dir / file_name))
+            success, result = self.download(file_key, str(out_dir / file_name), app_id=app_id)
             if success:
                 results.append((file_name, result))
             else:
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""KINTONE レコードのオフライン全文検索インデックス
+
+レコードのテキストを文字 2-gram の転置インデックス（SQLite）に登録し、
+API を呼ばずに複数アプリをまとめて検索します。形態素解析の辞書は不要で、
+日本語も語の区切りに関係なく部分一致で検索できます。
+
+- 登録元: API からの差分同期（ChangeWatcher のウォーターマーク）、バックアップの
+  スナップショット、kintone watch の NDJSON イベント
+- 同じ $revision のレコードは登録し直さない（差分だけを更新）
+- 検索語は NFKC 正規化・小文字化し、空白区切りの各語をすべて含むレコードを BM25 で順位付け
+- 2-gram で候補を絞ってから保存したテキストで照合するため、誤ヒットはありません
+"""
+
+import json
+import math
+import re
+import sqlite3
+import unicodedata
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from kintone_crud import batched, field_value
+
+# 登録するフィールドの型
+TEXT_TYPES = frozenset({
+    "SINGLE_LINE_TEXT", "MULTI_LINE_TEXT", "RICH_TEXT", "LINK",
+    "DROP_DOWN", "RADIO_BUTTON", "CHECK_BOX", "MULTI_SELECT",
+    "USER_SELECT", "ORGANIZATION_SELECT", "GROUP_SELECT", "CREATOR", "MODIFIER",
+})
+SNIPPET_CONTEXT = 30  # スニペットの一致箇所の前後の文字数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 候補の絞り込みに使う 2-gram の数（出現の少ないものから。長い語でも INTERSECT が増えすぎないように）
+MAX_FILTER_GRAMS = 8
+RARITY_SCAN_LIMIT = 10000  # 2-gram の出現数を数える上限（これ以上はどれも同じくらい多い）
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+_END = "\x00"  # 末尾の文字も 2-gram の先頭になるよう付ける番兵
+_MAX_CHAR = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    """検索用に正規化（NFKC・小文字・空白をまとめる）"""
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+
+def _grams(text: str) -> set[str]:
+    """正規化済みテキストの文字 2-gram（末尾は番兵付き）"""
+    padded = text + _END
+    return {padded[i:i + 2] for i in range(len(text))}
+
+
+def _text(cell: Any) -> str:
+    """フィールドの値を登録するテキストにする"""
+    value = cell.get("value")
+    if not value:
+        return ""
+    field_type = cell.get("type")
+    if field_type == "RICH_TEXT":
+        return _TAG_RE.sub(" ", value)
+    if isinstance(value, list):
+        return " ".join(v.get("name") or v.get("code", "") if isinstance(v, dict) else str(v) for v in value)
+    if isinstance(value, dict):
+        return value.get("name") or value.get("code", "")
+    return str(value)
+
+
+def record_texts(record: dict, fields: Optional[set[str]] = None) -> dict[str, str]:
+    """レコードの登録対象のフィールド -> テキスト（テーブル内のフィールドは行を連結）"""
+    texts: dict[str, list[str]] = {}
+    for code, cell in record.items():
+        if not isinstance(cell, dict):
+            continue
+        if cell.get("type") == "SUBTABLE":
+            for row in cell.get("value") or []:
+                for inner_code, inner in row.get("value", {}).items():
+                    if inner.get("type") in TEXT_TYPES and (fields is None or inner_code in fields):
+                        texts.setdefault(inner_code, []).append(_text(inner))
+        elif cell.get("type") in TEXT_TYPES and (fields is None or code in fields):
+            texts.setdefault(code, []).append(_text(cell))
+    return {code: "\n".join(t for t in parts if t) for code, parts in texts.items() if any(parts)}
+
+
+@dataclass
+class SearchHit:
+    """検索結果のレコード"""
+    app_id: int
+    record_id: int
+    score: float
+    field: str  # スニペットのフィールド
+    snippet: str
+
+
+class FullTextIndex:
+    """複数アプリのレコードの全文検索インデックス
+
+    使用例:
+        index = FullTextIndex(config.cache_dir / "fts.sqlite")
+        index.sync(crud, [123, 456])              # 前回以降の変更だけを登録
+        for hit in index.search("請求書 株式会社", fields=["件名", "備考"]):
+            print(hit.app_id, hit.record_id, hit.snippet)
+    """
+
+    def __init__(self, path: Union[str, Path], fields: Optional[dict[int, list[str]]] = None):
+        """
+        Args:
+            path: インデックスの SQLite ファイル
+            fields: アプリ ID -> 登録するフィールド（省略したアプリはテキスト系の全フィールド）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fields = {app_id: set(codes) for app_id, codes in (fields or {}).items()}
+        with self._connect() as conn:
+            # 同期では1イベントずつコミットするため WAL にする
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " doc INTEGER PRIMARY KEY, app INTEGER NOT NULL, record INTEGER NOT NULL, revision TEXT,"
+                " UNIQUE (app, record));"
+                "CREATE TABLE IF NOT EXISTS texts ("
+                " doc INTEGER NOT NULL, field TEXT NOT NULL, text TEXT NOT NULL, norm TEXT NOT NULL,"
+                " PRIMARY KEY (doc, field)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " gram TEXT NOT NULL, doc INTEGER NOT NULL, field TEXT NOT NULL,"
+                " PRIMARY KEY (gram, doc, field)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+                "INSERT OR IGNORE INTO stats VALUES ('texts', 0), ('length', 0);"
+            )
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # 64MB（登録時の B-tree の書き込みを減らす）
+        return closing(conn)
+
+    # === 登録 ===
+
+    @staticmethod
+    def _remove_doc(conn: sqlite3.Connection, doc: int):
+        texts = conn.execute("SELECT field, norm FROM texts WHERE doc = ?", (doc,)).fetchall()
+        # 保存したテキストから 2-gram を作り直し、主キーで削除する
+        conn.executemany("DELETE FROM postings WHERE gram = ? AND doc = ? AND field = ?",
+                         [(gram, doc, code) for code, norm in texts for gram in _grams(norm)])
+        conn.execute("DELETE FROM texts WHERE doc = ?", (doc,))
+        conn.execute("DELETE FROM docs WHERE doc = ?", (doc,))
+        conn.execute("UPDATE stats SET value = value - ? WHERE key = 'texts'", (len(texts),))
+        conn.execute("UPDATE stats SET value = value - ? WHERE key = 'length'", (sum(len(norm) for _, norm in texts),))
+
+    def add(self, app_id: int, records: Iterable[dict], batch_size: int = 500) -> int:
+        """レコードを登録（同じ $revision のレコードは登録し直さない）
+
+        Returns:
+            int: 登録（更新）したレコード数
+        """
+        fields = self.fields.get(app_id)
+        indexed = 0
+        for batch in batched(iter(records), batch_size):
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for record in batch:
+                    record_id = int(field_value(record, "$id"))
+                    revision = record.get("$revision", {}).get("value")
+                    row = conn.execute(
+                        "SELECT doc, revision FROM docs WHERE app = ? AND record = ?", (app_id, record_id)
+                    ).fetchone()
+                    if row is not None:
+                        if revision is not None and row[1] == revision:
+                            continue
+                        self._remove_doc(conn, row[0])
+                    doc = conn.execute(
+                        "INSERT INTO docs (app, record, revision) VALUES (?, ?, ?)", (app_id, record_id, revision)
+                    ).lastrowid
+                    length = 0
+                    texts = record_texts(record, fields)
+                    for code, text in texts.items():
+                        norm = normalize(text)
+                        conn.execute("INSERT INTO texts VALUES (?, ?, ?, ?)", (doc, code, text, norm))
+                        conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                         [(gram, doc, code) for gram in _grams(norm)])
+                        length += len(norm)
+                    conn.execute("UPDATE stats SET value = value + ? WHERE key = 'texts'", (len(texts),))
+                    conn.execute("UPDATE stats SET value = value + ? WHERE key = 'length'", (length,))
+                    indexed += 1
+                conn.execute("COMMIT")
+        return indexed
+
+    def remove(self, app_id: int, record_ids: Iterable[int]) -> int:
+        """レコードを削除
+
+        Returns:
+            int: 削除したレコード数
+        """
+        removed = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for record_id in record_ids:
+                row = conn.execute(
+                    "SELECT doc FROM docs WHERE app = ? AND record = ?", (app_id, int(record_id))
+                ).fetchone()
+                if row is not None:
+                    self._remove_doc(conn, row[0])
+                    removed += 1
+            conn.execute("COMMIT")
+        return removed
+
+    def retain(self, app_id: int, record_ids: Iterable[int]) -> int:
+        """record_ids にないアプリのレコードを削除（スナップショットとの同期用）"""
+        keep = {int(i) for i in record_ids}
+        with self._connect() as conn:
+            indexed = [row[0] for row in conn.execute("SELECT record FROM docs WHERE app = ?", (app_id,))]
+        return self.remove(app_id, [i for i in indexed if i not in keep])
+
+    def apply(self, events: Iterable[Any]) -> int:
+        """kintone watch のイベント（ChangeEvent または NDJSON の辞書）を反映
+
+        Returns:
+            int: 反映したイベント数
+        """
+        count = 0
+        pending: dict[int, list[dict]] = {}
+
+        def flush():
+            for app_id, records in pending.items():
+                self.add(app_id, records)
+            pending.clear()
+
+        for event in events:
+            data = event.to_dict() if hasattr(event, "to_dict") else event
+            app_id = int(data["app"])
+            if data["type"] == "delete":
+                flush()
+                self.remove(app_id, [int(data["id"])])
+            elif data.get("record") is not None:
+                pending.setdefault(app_id, []).append(data["record"])
+            count += 1
+        flush()
+        return count
+
+    def sync(self, crud: Any, app_ids: list[int], detect_deletes: bool = True) -> int:
+        """前回の同期以降に変更されたレコードを API から取得して反映
+
+        ChangeWatcher のウォーターマークをインデックスと並べて保存し（<index>.watch.json）、
+        初回は全件、以降は変更分だけを取得します。detect_deletes では毎回 $id 一覧で削除を確認します。
+
+        Returns:
+            int: 反映したイベント数
+        """
+        from kintone_watch import ChangeWatcher
+
+        count = 0
+
+        def handle(event: Any):
+            # ウォーターマークはイベントの出力後に保存されるため、1件ずつすぐに反映する
+            nonlocal count
+            count += self.apply([event])
+
+        watcher = ChangeWatcher(
+            crud, app_ids,
+            on_event=handle,
+            checkpoint=self.path.with_name(f"{self.path.stem}.watch.json"),
+            start="beginning",
+            delete_scan_every=1 if detect_deletes else 0,
+        )
+        for app_id in watcher.app_ids:
+            watcher.poll(app_id)
+        return count
+
+    def import_snapshot(self, manager: Any, name: Optional[str] = None, app_ids: Optional[list[int]] = None) -> int:
+        """バックアップのスナップショット時点のレコードを登録（スナップショットにないレコードは削除）
+
+        Returns:
+            int: 登録（更新）したレコード数
+        """
+        snapshot = manager.snapshot(name)
+        indexed = 0
+        for app_id in app_ids or sorted(snapshot.apps):
+            indexed += self.add(app_id, manager.latest_records(snapshot, app_id))
+            self.retain(app_id, manager.read_ids(manager.app_chain(snapshot, app_id)[0][0], app_id))
+        return indexed
+
+    # === 検索 ===
+
+    def _candidates(
+        self, conn: sqlite3.Connection, term: str, app_ids: Optional[list[int]], fields: Optional[list[str]]
+    ) -> Iterator[tuple[int, int, str, str, str]]:
+        """語を含む (doc, app, field, text, norm)（2-gram で絞り込んでテキストで照合）"""
+        field_filter = f" AND field IN ({', '.join('?' * len(fields))})" if fields else ""
+        if len(term) == 1:
+            # 1文字は、その文字で始まる 2-gram の範囲で探す
+            grams_sql = f"SELECT DISTINCT doc, field FROM postings WHERE gram BETWEEN ? AND ?{field_filter}"
+            params: list[Any] = [term, term + _MAX_CHAR, *(fields or [])]
+        else:
+            grams = sorted(_grams(term) - {term[-1] + _END})
+            if len(grams) > MAX_FILTER_GRAMS:
+                # 一致はテキストで確かめるので、絞り込みは出現の少ない 2-gram だけで足りる
+                counts = {
+                    gram: conn.execute(
+                        "SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE gram = ? LIMIT ?)", (gram, RARITY_SCAN_LIMIT)
+                    ).fetchone()[0]
+                    for gram in grams
+                }
+                grams = sorted(grams, key=lambda gram: (counts[gram], gram))[:MAX_FILTER_GRAMS]
+            grams_sql = " INTERSECT ".join([f"SELECT doc, field FROM postings WHERE gram = ?{field_filter}"] * len(grams))
+            params = [p for gram in grams for p in (gram, *(fields or []))]
+        sql = (f"SELECT c.doc, d.app, c.field, t.text, t.norm FROM ({grams_sql}) c "
+               "JOIN texts t ON t.doc = c.doc AND t.field = c.field JOIN docs d ON d.doc = c.doc")
+        if app_ids:
+            sql += f" WHERE d.app IN ({', '.join('?' * len(app_ids))})"
+            params += list(app_ids)
+        for row in conn.execute(sql, params):
+            if term in row[4]:
+                yield row
+
+    def search(
+        self,
+        text: str,
+        app_ids: Optional[list[int]] = None,
+        fields: Optional[list[str]] = None,
+        limit: int = 20,
+    ) -> list[SearchHit]:
+        """空白区切りの語をすべて含むレコードを関連度順に返す
+
+        Args:
+            text: 検索語（空白区切りで AND）
+            app_ids: 検索するアプリ（省略時はすべて）
+            fields: 検索するフィールド（省略時はすべて）
+            limit: 返す件数
+        """
+        terms = list(dict.fromkeys(normalize(text).split()))
+        if not terms:
+            raise ValueError("Search text is empty")
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            stats = dict(conn.execute("SELECT key, value FROM stats"))
+            average = stats["length"] / stats["texts"] if stats["texts"] else 1.0
+
+            docs: Optional[dict[int, dict]] = None  # doc -> {app, score, best}
+            for term in terms:
+                matches: dict[int, dict] = {}
+                frequency: set[int] = set()  # 語を含む文書（前の語での絞り込みの前に数える）
+                for doc, app_id, code, original, norm in self._candidates(conn, term, app_ids, fields):
+                    frequency.add(doc)
+                    if docs is not None and doc not in docs:
+                        continue
+                    tf = norm.count(term)
+                    weight = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(norm) / average))
+                    match = matches.setdefault(doc, {"app": app_id, "score": 0.0, "fields": {}})
+                    match["fields"][code] = (weight, original, norm)
+                if not matches:
+                    return []
+                idf = _idf(total, len(frequency))
+                for doc, match in matches.items():
+                    previous = docs[doc] if docs is not None else {"score": 0.0, "best": None}
+                    term_score = idf * sum(w for w, _, _ in match["fields"].values())
+                    code, (weight, original, norm) = max(match["fields"].items(), key=lambda item: item[1][0])
+                    best = previous["best"]
+                    if best is None or idf * weight > best[0]:
+                        best = (idf * weight, code, original, norm, term)
+                    matches[doc] = {"app": match["app"], "score": previous["score"] + term_score, "best": best}
+                docs = matches
+
+            ranked = sorted(docs.items(), key=lambda item: (-item[1]["score"], item[0]))[:limit]
+            hits = []
+            for doc, match in ranked:
+                record_id = conn.execute("SELECT record FROM docs WHERE doc = ?", (doc,)).fetchone()[0]
+                _, code, original, norm, term = match["best"]
+                hits.append(SearchHit(match["app"], record_id, round(match["score"], 4), code,
+                                      _snippet(original, norm, term)))
+        return hits
+
+    def stats(self) -> dict[str, Any]:
+        """登録件数（アプリごと）とファイルサイズ"""
+        with self._connect() as conn:
+            apps = dict(conn.execute("SELECT app, COUNT(*) FROM docs GROUP BY app ORDER BY app"))
+            grams = conn.execute("SELECT COUNT(DISTINCT gram) FROM postings").fetchone()[0]
+        return {"apps": apps, "records": sum(apps.values()), "grams": grams,
+                "bytes": self.path.stat().st_size if self.path.exists() else 0}
+
+
+def _idf(total: int, matched: int) -> float:
+    return math.log(1 + (total - matched + 0.5) / (matched + 0.5))
+
+
+def _snippet(original: str, norm: str, term: str) -> str:
+    """一致箇所の前後を切り出して【】で囲む"""
+    # 正規化で長さが変わらなければ元のテキストの同じ位置を使う
+    text = original if len(original) == len(norm) else norm
+    start = norm.find(term)
+    end = start + len(term)
+    before = text[max(0, start - SNIPPET_CONTEXT):start]
+    after = text[end:end + SNIPPET_CONTEXT]
+    snippet = f"{'…' if start > SNIPPET_CONTEXT else ''}{before}【{text[start:end]}】{after}"
+    return _SPACE_RE.sub(" ", snippet + ("…" if end + SNIPPET_CONTEXT < len(text) else ""))
+
+
+def main():
+    import argparse
+    import sys
+    import time
+
+    from kintone_config import get_config
+
+    parser = argparse.ArgumentParser(description="Offline full-text search over KINTONE records")
+    parser.add_argument("text", nargs="?", help="Search text (space-separated terms are ANDed)")
+    parser.add_argument("--app", type=str, help="App IDs comma-separated (search filter / apps to sync)")
+    parser.add_argument("--field", type=str, help="Field codes comma-separated (search filter)")
+    parser.add_argument("--limit", type=int, default=20, help="Number of results")
+    parser.add_argument("--sync", action="store_true", help="Fetch changes of --app apps from KINTONE and index them")
+    parser.add_argument("--import", dest="import_dir", type=str, help="Index the latest snapshot of a backup directory")
+    parser.add_argument("--snapshot", type=str, help="Snapshot name for --import (default: latest)")
+    parser.add_argument("--events", type=str, help="Apply kintone watch NDJSON events from a file ('-' for stdin)")
+    parser.add_argument("--stats", action="store_true", help="Show index statistics")
+    parser.add_argument("--index", type=str, help="Index file (default: <cache_dir>/fts.sqlite)")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    config = get_config()
+    index = FullTextIndex(args.index or config.cache_dir / "fts.sqlite")
+    app_ids = [int(i) for i in args.app.split(",") if i.strip()] if args.app else None
+
+    try:
+        if args.sync:
+            if not app_ids:
+                raise ValueError("--app is required for --sync")
+            from kintone_crud import KintoneCRUD
+            from kintone_quota import QuotaTracker
+
+            crud = KintoneCRUD()
+            crud.client.add_hook(QuotaTracker(crud.config))
+            print(f"✅ Synced: {index.sync(crud, app_ids)} changes", file=sys.stderr)
+        if args.import_dir:
+            from kintone_backup import BackupManager
+            from kintone_crud import KintoneCRUD
+
+            manager = BackupManager(KintoneCRUD(), args.import_dir)
+            print(f"✅ Imported: {index.import_snapshot(manager, args.snapshot, app_ids)} records", file=sys.stderr)
+        if args.events:
+            stream = sys.stdin if args.events == "-" else open(args.events)
+            with stream:
+                count = index.apply(json.loads(line) for line in stream if line.strip())
+            print(f"✅ Applied: {count} events", file=sys.stderr)
+        if args.stats:
+            print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+        if args.text is None:
+            if not (args.sync or args.import_dir or args.events or args.stats):
+                parser.error("search text or one of --sync / --import / --events / --stats is required")
+            return
+
+        started = time.perf_counter()
+        fields = [f.strip() for f in args.field.split(",") if f.strip()] if args.field else None
+        hits = index.search(args.text, app_ids, fields, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+    except (ValueError, RuntimeError, sqlite3.Error) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps([asdict(hit) for hit in hits], ensure_ascii=False, indent=2))
+        return
+    print(f"🔍 {len(hits)} hits ({elapsed:.1f} ms)")
+    for hit in hits:
+        print(f"  [{hit.app_id}:{hit.record_id}] {hit.field}: {hit.snippet}  ({hit.score:.2f})")
+
+
+if __name__ == "__main__":
+    main()
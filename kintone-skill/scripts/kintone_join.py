@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""KINTONE アプリ間結合モジュール
+
+駆動アプリ（例: 注文）をカーソルで読みながら外部キーを一定件数ごとにまとめ、
+関連アプリ（例: 顧客）を in クエリで一括取得して結合したレコードを返します。
+レコードごとに get_record を呼ぶ N+1 回の往復が、数回の一括読み取りになります。
+
+取得した関連レコードはキー値ごとにキャッシュします（メモリ LRU、任意でディスク）。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from kintone_crud import KintoneCRUD, field_value
+
+DEFAULT_CACHE_ENTRIES = 10000  # メモリに保持するキー値の数
+DEFAULT_BATCH_SIZE = 500  # 外部キーをまとめる駆動レコード数
+
+
+class LookupCache:
+    """キー値 → 関連レコードのキャッシュ（メモリ LRU + 任意のディスク層）
+
+    該当なしのキー値も空リストとしてキャッシュし、再度 API を呼びません。
+    ディスク層は SQLite ファイルで、ttl 秒を過ぎたエントリは無視します。
+
+    使用例:
+        cache = LookupCache(path=config.cache_dir / "join.sqlite", ttl=3600)
+        joiner = RecordJoiner(crud, cache=cache)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+        path: Optional[Union[str, Path]] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: OrderedDict[tuple[str, str], list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS lookup ("
+                "namespace TEXT, key TEXT, records TEXT, cached_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def _remember(self, entry: tuple[str, str], records: list[dict]):
+        self._memory[entry] = records
+        self._memory.move_to_end(entry)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, namespace: str, keys: list[str]) -> dict[str, list[dict]]:
+        """キャッシュにあるキー値だけを返す（該当なしは空リスト）"""
+        found: dict[str, list[dict]] = {}
+        with self._lock:
+            for key in keys:
+                records = self._memory.get((namespace, key))
+                if records is not None:
+                    self._memory.move_to_end((namespace, key))
+                    found[key] = records
+
+            missing = [key for key in keys if key not in found]
+            if self._db is not None and missing:
+                oldest = time.time() - self.ttl if self.ttl is not None else 0.0
+                # SQLite のパラメーター数上限に収まるよう分割
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, records FROM lookup WHERE namespace = ? AND cached_at >= ? "
+                        f"AND key IN ({', '.join('?' * len(chunk))})",
+                        [namespace, oldest, *chunk],
+                    ).fetchall()
+                    for key, data in rows:
+                        found[key] = json.loads(data)
+                        self._remember((namespace, key), found[key])
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, namespace: str, entries: dict[str, list[dict]]):
+        """キー値ごとの関連レコードを保存"""
+        with self._lock:
+            for key, records in entries.items():
+                self._remember((namespace, key), records)
+            if self._db is not None and entries:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO lookup VALUES (?, ?, ?, ?)",
+                    [(namespace, key, json.dumps(records, ensure_ascii=False), now) for key, records in entries.items()],
+                )
+                self._db.commit()
+
+    def clear(self):
+        """すべてのエントリを削除"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM lookup")
+                self._db.commit()
+
+    def close(self):
+        """ディスク層を閉じる"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+@dataclass
+class JoinSpec:
+    """結合条件"""
+
+    related_app: int
+    key: str  # 駆動アプリのキーフィールド
+    related_key: str  # 関連アプリのキーフィールド
+    related_fields: Optional[list[str]] = None  # 関連アプリから取得するフィールド（省略時は全フィールド）
+    prefix: Optional[str] = None  # 結合したフィールドコードの接頭辞（省略時は "<key>."）
+
+    @property
+    def field_prefix(self) -> str:
+        return self.prefix if self.prefix is not None else f"{self.key}."
+
+    @property
+    def namespace(self) -> str:
+        """キャッシュの名前空間（アプリ・キー・取得フィールドが同じなら共有）"""
+        return f"{self.related_app}:{self.related_key}:{','.join(self.related_fields or ())}"
+
+
+def lookup_join_spec(schema: Any, field_code: str, related_fields: Optional[list[str]] = None) -> JoinSpec:
+    """ルックアップフィールドの設定から結合条件を作る
+
+    Raises:
+        ValueError: フィールドがない、またはルックアップフィールドではない
+    """
+    info = schema.fields.get(field_code)
+    if info is None:
+        raise ValueError(f"Unknown field in app {schema.app_id}: {field_code}")
+    if not info.lookup:
+        raise ValueError(f"Field is not a lookup field: {field_code}")
+    return JoinSpec(
+        related_app=int(info.lookup["relatedApp"]["app"]),
+        key=field_code,
+        related_key=info.lookup["relatedKeyField"],
+        related_fields=related_fields,
+    )
+
+
+def merge_records(record: dict, related: Optional[dict], prefix: str) -> dict:
+    """駆動レコードに関連レコードのフィールドを接頭辞付きで追加"""
+    merged = dict(record)
+    if related is not None:
+        for code, value in related.items():
+            merged[f"{prefix}{code}"] = value
+    return merged
+
+
+class RecordJoiner:
+    """アプリ間結合
+
+    使用例:
+        joiner = RecordJoiner(KintoneCRUD())
+        for row in joiner.join(10, JoinSpec(20, key="顧客コード", related_key="顧客コード")):
+            row["顧客コード.会社名"]["value"]
+
+        # ルックアップフィールドの設定をそのまま使う
+        for row in joiner.join_lookup(10, "顧客コード", query='注文日 >= "2024-01-01"'):
+            ...
+    """
+
+    def __init__(
+        self,
+        crud: KintoneCRUD,
+        cache: Optional[LookupCache] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            crud: 使用する KintoneCRUD
+            cache: 関連レコードのキャッシュ（省略時はメモリ LRU）
+            batch_size: 外部キーをまとめる駆動レコード数
+            max_workers: 関連アプリの in クエリの並列数
+        """
+        self.crud = crud
+        self.cache = cache if cache is not None else LookupCache()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._schema_manager: Optional[Any] = None
+
+    def resolve(self, spec: JoinSpec, keys: list) -> dict[str, list[dict]]:
+        """キー値ごとの関連レコード（キャッシュになければ一括取得）"""
+        keys = list(dict.fromkeys(str(k) for k in keys if k not in (None, "")))
+        found = self.cache.get_many(spec.namespace, keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.crud.lookup_many(
+                spec.related_app, spec.related_key, missing, spec.related_fields,
+                max_workers=self.max_workers, use_cache=False,
+            )
+            entries = {key: fetched.get(key, []) for key in missing}
+            self.cache.put_many(spec.namespace, entries)
+            found.update(entries)
+        return found
+
+    def join(
+        self,
+        app_id: int,
+        spec: JoinSpec,
+        query: str = "",
+        fields: Optional[list[str]] = None,
+        how: str = "left",
+    ) -> Iterator[dict]:
+        """駆動アプリのレコードに関連レコードを結合して返す
+
+        関連レコードが複数一致した場合は一致ごとに1件返します。
+
+        Args:
+            app_id: 駆動アプリ ID
+            spec: 結合条件
+            query: 駆動アプリの検索条件
+            fields: 駆動アプリの取得フィールド（キーフィールドは自動で追加）
+            how: left（一致なしも返す）または inner（一致したものだけ）
+
+        Yields:
+            dict: 結合したレコード（関連アプリのフィールドは "<接頭辞><コード>"）
+        """
+        if how not in ("left", "inner"):
+            raise ValueError(f"how must be 'left' or 'inner': {how}")
+        if fields and spec.key not in fields:
+            fields = [*fields, spec.key]
+
+        batch: list[dict] = []
+        for record in self.crud.search_all(app_id, query, fields, stream=True):
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield from self._join_batch(batch, spec, how)
+                batch = []
+        if batch:
+            yield from self._join_batch(batch, spec, how)
+
+    def _join_batch(self, batch: list[dict], spec: JoinSpec, how: str) -> Iterator[dict]:
+        related = self.resolve(spec, [field_value(record, spec.key) for record in batch])
+        prefix = spec.field_prefix
+        for record in batch:
+            key = field_value(record, spec.key)
+            matches = related.get(str(key), []) if key not in (None, "") else []
+            if matches:
+                for match in matches:
+                    yield merge_records(record, match, prefix)
+            elif how == "left":
+                yield merge_records(record, None, prefix)
+
+    def join_lookup(
+        self,
+        app_id: int,
+        lookup_field: str,
+        query: str = "",
+        fields: Optional[list[str]] = None,
+        related_fields: Optional[list[str]] = None,
+        how: str = "left",
+    ) -> Iterator[dict]:
+        """ルックアップフィールドの参照先アプリを結合
+
+        スキーマのルックアップ設定（関連アプリ・キーフィールド）を使います。
+        """
+        if self._schema_manager is None:
+            from kintone_schema import SchemaManager
+
+            self._schema_manager = SchemaManager(self.crud.config, self.crud.client)
+        schema = self._schema_manager.get_schema(app_id)
+        if schema is None:
+            raise RuntimeError(f"Failed to get schema for app {app_id}")
+        spec = lookup_join_spec(schema, lookup_field, related_fields)
+        return self.join(app_id, spec, query, fields, how)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""KINTONE カーソル枠のリース管理（プロセス間で共有）
+
+KINTONE のカーソルはドメインあたり10本まで、最後のアクセスから10分で失効します。
+cache_dir の SQLite ファイルに使用中のカーソルを記録し、同じドメインを使う
+プロセス・スレッドの間で枠を貸し出します。
+
+- 枠が空いていなければ先着順で待つ（タイムアウトで RuntimeError）
+- 所有プロセスが終了した、または TTL を過ぎたリースは回収し、カーソルを削除
+- 起動時（インスタンス生成時）に回収を実行
+"""
+
+import os
+import socket
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from kintone_crud import MAX_CURSORS
+
+CURSOR_TTL = 600  # カーソルの有効期限（秒、最後のアクセスから）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    domain TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    cursor_id TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    domain TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CursorLease:
+    """カーソル1本分の枠（with 文で使うと終了時に返却）"""
+
+    def __init__(self, manager: "CursorLeaseManager", lease_id: int):
+        self.manager = manager
+        self.id = lease_id
+        self.cursor_id: Optional[str] = None
+        self.released = False
+
+    def attach(self, cursor_id: str):
+        """作成したカーソル ID を記録（回収時に削除するため）"""
+        self.cursor_id = cursor_id
+        self.manager._update(self.id, cursor_id=cursor_id)
+
+    def touch(self):
+        """カーソルにアクセスしたことを記録し、有効期限を延ばす"""
+        self.manager._update(self.id)
+
+    def release(self):
+        """枠を返却"""
+        if not self.released:
+            self.released = True
+            self.manager._delete(self.id)
+
+    def __enter__(self) -> "CursorLease":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CursorLeaseManager:
+    """ドメイン単位のカーソル枠の貸し出し
+
+    使用例:
+        crud = KintoneCRUD()
+        crud.leases = CursorLeaseManager(crud.client)
+        crud.search_all(123)  # 枠が空くまで待ってからカーソルを作成
+
+        with crud.leases.acquire(timeout=60) as lease:
+            cursor = client.create_cursor(123)
+            lease.attach(cursor.data["id"])
+            ...
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        limit: int = MAX_CURSORS,
+        path: Optional[Union[str, Path]] = None,
+        ttl: float = CURSOR_TTL,
+        poll_interval: float = 0.5,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            client: カーソルの削除に使う KintoneClient
+            limit: ドメインあたりのカーソル数（他のツールと共有するなら小さくする）
+            path: リースを記録する SQLite ファイル（省略時は cache_dir/cursor_leases.sqlite）
+            ttl: 最後のアクセスからリースを有効とみなす秒数
+            poll_interval: 枠が空くのを待つ間の確認間隔（秒）
+            timeout: acquire() で待つ最大秒数の既定値（None なら無期限）
+        """
+        self.client = client
+        self.domain = client.config.base_url
+        self.limit = limit
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.path = Path(path) if path else client.config.ensure_cache_dir() / "cursor_leases.sqlite"
+        self.host = socket.gethostname()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.reclaimed = self.reclaim()  # 起動時に回収したカーソル数
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        # 呼び出しごとに接続を作る（スレッド間で共有しない）
+        # autocommit で使い、複数の文をまとめるときは BEGIN IMMEDIATE で明示する
+        return closing(sqlite3.connect(str(self.path), timeout=30, isolation_level=None))
+
+    def _is_orphan(self, host: str, pid: int, expires_at: Optional[float], now: float) -> bool:
+        if expires_at is not None and expires_at < now:
+            return True
+        # 他のホストのプロセスは確認できないため、期限切れだけで判定
+        return host == self.host and not _pid_alive(pid)
+
+    def _reap(self, conn: sqlite3.Connection, now: float) -> list[str]:
+        """孤立したリース・待機を削除し、削除すべきカーソル ID を返す（トランザクション内で呼ぶ）"""
+        orphans = []
+        cursor_ids = []
+        for lease_id, host, pid, cursor_id, expires_at in conn.execute(
+            "SELECT id, host, pid, cursor_id, expires_at FROM leases WHERE domain = ?", (self.domain,)
+        ):
+            if self._is_orphan(host, pid, expires_at, now):
+                orphans.append(lease_id)
+                if cursor_id:
+                    cursor_ids.append(cursor_id)
+        conn.executemany("DELETE FROM leases WHERE id = ?", [(i,) for i in orphans])
+
+        dead_waiters = [
+            (waiter_id,)
+            for waiter_id, host, pid in conn.execute(
+                "SELECT id, host, pid FROM waiters WHERE domain = ?", (self.domain,)
+            )
+            if self._is_orphan(host, pid, None, now)
+        ]
+        conn.executemany("DELETE FROM waiters WHERE id = ?", dead_waiters)
+        return cursor_ids
+
+    def _delete_cursors(self, cursor_ids: list[str]):
+        # 失効済みのカーソルは削除に失敗するが、枠はすでに空いているので無視する
+        for cursor_id in cursor_ids:
+            self.client.delete_cursor(cursor_id)
+
+    def reclaim(self) -> int:
+        """終了したプロセス・期限切れのリースを回収
+
+        Returns:
+            int: 削除したカーソル数
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor_ids = self._reap(conn, time.time())
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._delete_cursors(cursor_ids)
+        return len(cursor_ids)
+
+    def active(self) -> list[dict]:
+        """このドメインの有効なリース一覧"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, host, pid, cursor_id, created_at, expires_at FROM leases WHERE domain = ? ORDER BY id",
+                (self.domain,),
+            ).fetchall()
+        keys = ("id", "host", "pid", "cursor_id", "created_at", "expires_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def available(self) -> int:
+        """今すぐ使えるカーソル数"""
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM leases WHERE domain = ? AND expires_at >= ?",
+                                    (self.domain, time.time())).fetchone()
+        return max(0, self.limit - count)
+
+    def acquire(self, timeout: Optional[float] = None) -> CursorLease:
+        """カーソル1本分の枠を取得（空くまで先着順で待つ）
+
+        Args:
+            timeout: 待つ最大秒数（省略時はインスタンスの timeout）
+
+        Raises:
+            RuntimeError: timeout までに枠が空かなかった
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pid = os.getpid()
+        with self._connect() as conn:
+            ticket = conn.execute(
+                "INSERT INTO waiters (domain, host, pid, created_at) VALUES (?, ?, ?, ?)",
+                (self.domain, self.host, pid, time.time()),
+            ).lastrowid
+            try:
+                while True:
+                    now = time.time()
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        cursor_ids = self._reap(conn, now)
+                        (active,) = conn.execute(
+                            "SELECT COUNT(*) FROM leases WHERE domain = ?", (self.domain,)
+                        ).fetchone()
+                        (ahead,) = conn.execute(
+                            "SELECT COUNT(*) FROM waiters WHERE domain = ? AND id < ?", (self.domain, ticket)
+                        ).fetchone()
+                        lease_id = None
+                        if active + ahead < self.limit:
+                            lease_id = conn.execute(
+                                "INSERT INTO leases (domain, host, pid, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                                (self.domain, self.host, pid, now, now + self.ttl),
+                            ).lastrowid
+                            conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+                    self._delete_cursors(cursor_ids)
+                    if lease_id is not None:
+                        ticket = None
+                        return CursorLease(self, lease_id)
+
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise RuntimeError(
+                            f"Timed out waiting for a cursor slot ({active} of {self.limit} in use)"
+                        )
+                    time.sleep(self.poll_interval)
+            finally:
+                if ticket is not None:
+                    conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+
+    def _update(self, lease_id: int, cursor_id: Optional[str] = None):
+        with self._connect() as conn:
+            if cursor_id is None:
+                conn.execute("UPDATE leases SET expires_at = ? WHERE id = ?", (time.time() + self.ttl, lease_id))
+            else:
+                conn.execute(
+                    "UPDATE leases SET cursor_id = ?, expires_at = ? WHERE id = ?",
+                    (cursor_id, time.time() + self.ttl, lease_id),
+                )
+
+    def _delete(self, lease_id: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+
+def main():
+    import argparse
+    from datetime import datetime
+
+    from kintone_client import KintoneClient
+
+    parser = argparse.ArgumentParser(
+        description="KINTONE cursor leases shared across processes (reclaims orphaned cursors)"
+    )
+    parser.parse_args()
+
+    manager = CursorLeaseManager(KintoneClient())
+    if manager.reclaimed:
+        print(f"✅ Reclaimed: {manager.reclaimed} orphaned cursors")
+
+    leases = manager.active()
+    print(f"📋 Cursor leases: {len(leases)} / {manager.limit} ({manager.domain})")
+    for lease in leases:
+        started = datetime.fromtimestamp(lease["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"  {lease['host']}:{lease['pid']}  cursor={lease['cursor_id'] or '-'}  since {started}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""KINTONE API リクエスト計測モジュール"""
+
+import http.client
+import json
+import math
+import os
+import socket
+import threading
+import time
+import urllib.request
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+# Prometheus 形式のヒストグラムのバケット境界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# パーセンタイル計算に保持する直近のサンプル数（エンドポイントごと）
+MAX_SAMPLES = 10000
+
+
+@dataclass
+class RequestMetrics:
+    """1リクエストの計測結果（時間はすべて秒）"""
+    method: str
+    endpoint: str
+    status: Optional[int] = None
+    request_bytes: int = 0
+    response_bytes: int = 0
+    dns: Optional[float] = None  # 名前解決（新規接続時のみ）
+    connect: Optional[float] = None  # TCP/TLS 接続（新規接続時のみ）
+    ttfb: Optional[float] = None  # レスポンスヘッダー受信まで
+    total: float = 0.0
+    retries: int = 0  # 再送した回数（切れた接続での再送や、失敗したリクエストのやり直し）
+    error_code: Optional[str] = None
+    apps: tuple[int, ...] = ()  # 対象アプリ ID（日次リクエスト数の集計用）
+
+
+# === 接続時間の計測 ===
+
+_connection_timing = threading.local()
+
+
+def reset_connection_timing():
+    """現在のスレッドの接続時間をリセット"""
+    _connection_timing.dns = None
+    _connection_timing.connect = None
+
+
+def get_connection_timing() -> tuple[Optional[float], Optional[float]]:
+    """現在のスレッドで直近に計測した (dns, connect) を返す"""
+    return getattr(_connection_timing, "dns", None), getattr(_connection_timing, "connect", None)
+
+
+def count_retry(count: int = 1):
+    """現在のスレッドで次に送信するリクエスト（送信中ならそのリクエスト）を再送として数える"""
+    _connection_timing.retries = getattr(_connection_timing, "retries", 0) + count
+
+
+def take_retries() -> int:
+    """count_retry() で数えた回数を返してリセット"""
+    retries = getattr(_connection_timing, "retries", 0)
+    _connection_timing.retries = 0
+    return retries
+
+
+class _TimedConnectionMixin:
+    """名前解決と接続にかかった時間を記録する http.client 接続"""
+
+    def connect(self):
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        _connection_timing.dns = resolved - start
+
+        create_connection = self._create_connection
+
+        def connect_any(_, timeout, source):
+            # socket.create_connection と同じく、解決したアドレスを順に試す
+            error = None
+            for *_, address in addresses:
+                try:
+                    return create_connection(address[:2], timeout, source)
+                except OSError as e:
+                    error = e
+            raise error
+
+        self._create_connection = connect_any
+        try:
+            super().connect()
+        finally:
+            self._create_connection = create_connection
+        _connection_timing.connect = time.perf_counter() - resolved
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, http.client.HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, http.client.HTTPSConnection):
+    pass
+
+
+class TimedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(TimedHTTPConnection, req)
+
+
+class TimedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(TimedHTTPSConnection, req, context=self._context)
+
+
+def build_timed_opener() -> urllib.request.OpenerDirector:
+    """DNS/接続時間を記録する urllib オープナーを作成"""
+    return urllib.request.build_opener(TimedHTTPHandler(), TimedHTTPSHandler())
+
+
+# === 集計 ===
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """ソート済みの値から q パーセンタイル（0-100）を返す"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _EndpointStats:
+    """エンドポイントごとの集計"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors: dict[str, int] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples: dict[str, deque] = {
+            phase: deque(maxlen=MAX_SAMPLES) for phase in ("dns", "connect", "ttfb", "total")
+        }
+
+    def add(self, metrics: RequestMetrics):
+        self.count += 1
+        self.request_bytes += metrics.request_bytes
+        self.response_bytes += metrics.response_bytes
+        self.retries += metrics.retries
+        self.total_seconds += metrics.total
+        if metrics.error_code or (metrics.status or 0) >= 400:
+            code = metrics.error_code or str(metrics.status)
+            self.errors[code] = self.errors.get(code, 0) + 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if metrics.total <= bound:
+                self.buckets[i] += 1
+        for phase, samples in self.samples.items():
+            value = getattr(metrics, phase)
+            if value is not None:
+                samples.append(value)
+
+    def snapshot(self) -> dict:
+        latency = {}
+        for phase, samples in self.samples.items():
+            values = sorted(samples)
+            if values:
+                latency[phase] = {
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                    "p99": _percentile(values, 99),
+                }
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "latency": latency,
+        }
+
+
+class MetricsRecorder:
+    """リクエスト計測結果の集計（KintoneClient のフックとして登録）
+
+    使用例:
+        recorder = MetricsRecorder()
+        client = KintoneClient(hooks=[recorder])
+        ...
+        print(recorder.percentiles("records.json"))
+        recorder.export("/tmp/kintone.prom")
+    """
+
+    def __init__(self, keep_last: int = 0):
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str], _EndpointStats] = {}
+        self.recent: deque = deque(maxlen=keep_last)  # 直近の RequestMetrics（keep_last 件）
+
+    def __call__(self, metrics: RequestMetrics):
+        """計測結果を記録"""
+        key = (metrics.method, metrics.endpoint)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.add(metrics)
+            self.recent.append(metrics)
+
+    def percentiles(self, endpoint: str, method: Optional[str] = None, phase: str = "total") -> dict[str, float]:
+        """エンドポイントのレイテンシ p50/p95/p99 を返す（method 省略時は全メソッド）"""
+        with self._lock:
+            values = sorted(
+                v
+                for (m, e), stats in self._stats.items()
+                if e == endpoint and (method is None or m == method)
+                for v in stats.samples[phase]
+            )
+        return {
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+        }
+
+    def snapshot(self) -> dict:
+        """集計結果を辞書で返す"""
+        with self._lock:
+            return {
+                "generated_at": time.time(),
+                "endpoints": [
+                    {"method": method, "endpoint": endpoint, **stats.snapshot()}
+                    for (method, endpoint), stats in sorted(self._stats.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus テキスト形式で出力"""
+        lines = [
+            "# HELP kintone_request_duration_seconds KINTONE API request latency",
+            "# TYPE kintone_request_duration_seconds histogram",
+        ]
+        counters: list[str] = []
+        with self._lock:
+            for (method, endpoint), stats in sorted(self._stats.items()):
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(f'kintone_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'kintone_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f"kintone_request_duration_seconds_sum{{{labels}}} {stats.total_seconds:.6f}")
+                lines.append(f"kintone_request_duration_seconds_count{{{labels}}} {stats.count}")
+                counters.append(f"kintone_request_bytes_total{{{labels},direction=\"sent\"}} {stats.request_bytes}")
+                counters.append(f"kintone_request_bytes_total{{{labels},direction=\"received\"}} {stats.response_bytes}")
+                counters.append(f"kintone_request_retries_total{{{labels}}} {stats.retries}")
+                for code, count in sorted(stats.errors.items()):
+                    counters.append(f'kintone_request_errors_total{{{labels},code="{code}"}} {count}')
+        lines += [
+            "# HELP kintone_request_bytes_total Payload bytes sent and received",
+            "# TYPE kintone_request_bytes_total counter",
+            *[c for c in counters if c.startswith("kintone_request_bytes_total")],
+            "# HELP kintone_request_retries_total Retried requests",
+            "# TYPE kintone_request_retries_total counter",
+            *[c for c in counters if c.startswith("kintone_request_retries_total")],
+            "# HELP kintone_request_errors_total Failed requests by error code",
+            "# TYPE kintone_request_errors_total counter",
+            *[c for c in counters if c.startswith("kintone_request_errors_total")],
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Union[str, Path], format: Optional[str] = None) -> Path:
+        """スナップショットをファイルに書き出す（拡張子 .json なら JSON、それ以外は Prometheus 形式）"""
+        path = Path(path)
+        format = format or ("json" if path.suffix == ".json" else "prometheus")
+        if format == "json":
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+    def reset(self):
+        """集計をクリア"""
+        with self._lock:
+            self._stats.clear()
+            self.recent.clear()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KINTONE request metrics")
+    parser.add_argument("snapshot", help="JSON snapshot written by MetricsRecorder.export")
+    args = parser.parse_args()
+
+    with open(args.snapshot) as f:
+        data = json.load(f)
+
+    print(f"{'メソッド':<8} {'エンドポイント':<28} {'件数':>7} {'p50':>8} {'p95':>8} {'p99':>8}  エラー")
+    print("-" * 80)
+    for e in data["endpoints"]:
+        total = e["latency"].get("total", {})
+        errors = ", ".join(f"{k}:{v}" for k, v in e["errors"].items())
+        print(
+            f"{e['method']:<8} {e['endpoint']:<28} {e['count']:>7} "
+            f"{total.get('p50', 0):>8.3f} {total.get('p95', 0):>8.3f} {total.get('p99', 0):>8.3f}  {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
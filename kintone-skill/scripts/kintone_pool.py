@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""KINTONE API 用の HTTP コネクションプール
+
+keep-alive 接続をスレッド間で再利用します。KintoneClient.shared() が使用します。
+"""
+
+import http.client
+import io
+import queue
+import ssl
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Optional
+
+from kintone_metrics import TimedHTTPConnection, TimedHTTPSConnection, count_retry
+
+DEFAULT_MAX_CONNECTIONS = 32
+
+# 再利用した接続がサーバー側で閉じられていたときに出る例外（新しい接続で1回だけ再送）
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# 送信し終えた後に接続が切れても再送してよいメソッド（サーバーが処理済みでも結果が変わらない）
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+
+class PooledResponse:
+    """プールの接続に紐づくレスポンス（urllib のレスポンスと同じように使える）
+
+    読み切ってから閉じると接続をプールに戻し、途中で閉じると接続を破棄します。
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        self._pool = pool
+        self._conn: Optional[http.client.HTTPConnection] = conn
+        self._response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+
+    def read1(self, amt: int = -1) -> bytes:
+        return self._response.read1(amt)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        reusable = self._response.isclosed() and not self._response.will_close
+        if not reusable:
+            self._response.close()
+        self._pool._release(conn, reusable)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """1つのホストへの keep-alive 接続プール（スレッドセーフ）
+
+    同時に使用する接続は max_connections までに制限し、空いた接続は
+    LIFO で再利用します（直近に使った接続ほどサーバーに閉じられていない）。
+    """
+
+    def __init__(self, base_url: str, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.max_connections = max_connections
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._context = ssl.create_default_context() if self.scheme == "https" else None
+        self._stats_lock = threading.Lock()
+        self.created = 0  # 作成した接続数
+        self.reused = 0  # 再利用したリクエスト数
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        with self._stats_lock:
+            self.created += 1
+        if self.scheme == "https":
+            return TimedHTTPSConnection(self.host, self.port, timeout=timeout, context=self._context)
+        return TimedHTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        with self._stats_lock:
+            self.reused += 1
+        return conn, True
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def open(self, req: urllib.request.Request, timeout: float = 30) -> PooledResponse:
+        """リクエストを送信してレスポンスを返す
+
+        再利用した接続が閉じられていた場合は新しい接続で1回だけ再送します。
+        リクエストを送信し終えた後に切れた場合、サーバーが処理した可能性があるため
+        再送するのは GET / HEAD だけです。
+
+        Raises:
+            urllib.error.HTTPError: ステータスが 400 以上（本文は e.read() で取得）
+        """
+        method = req.get_method()
+        self._slots.acquire()
+        try:
+            for attempt in range(2):
+                conn, reused = self._acquire(timeout)
+                sent = False
+                try:
+                    conn.request(method, req.selector, body=req.data, headers=dict(req.header_items()))
+                    sent = True
+                    response = conn.getresponse()
+                    break
+                except _STALE_ERRORS:
+                    conn.close()
+                    if not reused or attempt or (sent and method not in _IDEMPOTENT_METHODS):
+                        raise
+                    count_retry()
+                except BaseException:
+                    conn.close()
+                    raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        pooled = PooledResponse(self, conn, response)
+        if response.status >= 400:
+            with pooled:
+                body = pooled.read()
+            raise urllib.error.HTTPError(req.full_url, response.status, response.reason, response.headers, io.BytesIO(body))
+        return pooled
+
+    def close(self):
+        """空いている接続をすべて閉じる"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""KINTONE 取得フィールドの自動射影モジュール
+
+レコードを使う側が必要とするフィールド（出力列・クエリで参照するフィールド）を
+アプリごとに登録し、fields 未指定の取得をそのフィールドだけに絞ります。
+登録のない幅広アプリを全フィールドで取得しようとすると警告します。
+"""
+
+import os
+import threading
+import warnings
+from typing import Any, Optional
+
+from kintone_search import query_fields
+
+# このフィールド数を超えるアプリの全フィールド取得を警告
+WIDE_APP_FIELDS = int(os.environ.get("KINTONE_WIDE_APP_FIELDS", "50"))
+
+# 射影しても必ず取得するフィールド（キーセット読み取りや更新で使う）
+REQUIRED_FIELDS = ("$id",)
+
+
+class FullWidthFetchWarning(UserWarning):
+    """幅広アプリを全フィールドで取得しようとしたときの警告"""
+
+
+def resolve_fields(schema: Any, names: list[str], strict: bool = True) -> list[str]:
+    """フィールドコードまたはラベルをフィールドコードに解決
+
+    Raises:
+        ValueError: スキーマに存在しないフィールド（strict=False なら除外）
+    """
+    if schema is None:
+        return list(dict.fromkeys(names))
+    labels = {}
+    for code, info in schema.fields.items():
+        labels.setdefault(info.label, code)
+
+    codes = []
+    for name in names:
+        if name in schema.fields or name.startswith("$"):
+            code = name
+        elif name in labels:
+            code = labels[name]
+        elif strict:
+            raise ValueError(f"Unknown field in app {schema.app_id}: {name}")
+        else:
+            continue
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def infer_fields(query: str = "", columns: Optional[list[str]] = None, schema: Any = None) -> list[str]:
+    """出力列とクエリテンプレートから必要なフィールドを推定
+
+    出力列に加えて、クエリの条件・並び順で参照するフィールドを含めます
+    （取得後の絞り込みや並び替えに使えるように）。テーブル内フィールドなど
+    スキーマにないクエリ側のフィールドは除外します。
+    """
+    codes = resolve_fields(schema, [*REQUIRED_FIELDS, *(columns or [])])
+    for code in resolve_fields(schema, query_fields(query), strict=False):
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+class FieldProjector:
+    """アプリごとの取得フィールドを管理
+
+    使用例:
+        projector = FieldProjector(SchemaManager(client=crud.client))
+        projector.declare(123, columns=["顧客名", "金額"], query='ステータス = "完了"')
+        crud.projector = projector
+        crud.search_all(123)  # fields=["$id", "顧客名", "金額", "ステータス"] で取得
+    """
+
+    def __init__(self, schema_manager: Any = None, max_fields: int = WIDE_APP_FIELDS):
+        self.schema_manager = schema_manager
+        self.max_fields = max_fields
+        self._declared: dict[int, list[str]] = {}
+        self._schemas: dict[int, Any] = {}
+        self._warned: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _schema(self, app_id: int) -> Any:
+        if self.schema_manager is None:
+            return None
+        with self._lock:
+            if app_id not in self._schemas:
+                self._schemas[app_id] = self.schema_manager.get_schema(app_id)
+            return self._schemas[app_id]
+
+    def declare(
+        self,
+        app_id: int,
+        fields: Optional[list[str]] = None,
+        query: str = "",
+        columns: Optional[list[str]] = None,
+    ) -> list[str]:
+        """使う側のフィールドを登録
+
+        Args:
+            app_id: アプリ ID
+            fields: 使用するフィールド（コードまたはラベル）
+            query: クエリテンプレート（参照フィールドを含める）
+            columns: 出力列（コードまたはラベル）
+
+        Returns:
+            list[str]: 登録したフィールドコード
+        """
+        codes = infer_fields(query, [*(fields or []), *(columns or [])], self._schema(app_id))
+        with self._lock:
+            self._declared[app_id] = codes
+        return list(codes)
+
+    def forget(self, app_id: int):
+        """登録を解除"""
+        with self._lock:
+            self._declared.pop(app_id, None)
+
+    def fields_for(self, app_id: int, fields: Optional[list[str]] = None) -> Optional[list[str]]:
+        """取得に使うフィールド（明示指定 > 登録 > 全フィールド）"""
+        if fields:
+            return fields
+        with self._lock:
+            declared = self._declared.get(app_id)
+        if declared:
+            return list(declared)
+
+        schema = self._schema(app_id)
+        if schema is not None and len(schema.fields) > self.max_fields and app_id not in self._warned:
+            self._warned.add(app_id)
+            warnings.warn(
+                f"App {app_id} has {len(schema.fields)} fields and is fetched with all of them; "
+                "pass fields or declare a projection to reduce the payload",
+                FullWidthFetchWarning,
+                stacklevel=3,
+            )
+        return None
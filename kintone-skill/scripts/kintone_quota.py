@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""KINTONE API の日次リクエスト数の管理
+
+kintone はアプリごとに1日あたりのリクエスト数を制限しています（既定 10,000 回）。
+
+- QuotaTracker: KintoneClient のフックとして、送信したリクエストをアプリ・日付ごとに
+  数えます。同じドメインを使うプロセス間で SQLite に共有します。
+- QuotaScheduler: ジョブごとの見積もりリクエスト数と残りの枠から、優先度の低い
+  ジョブを後回し（deferred）にして、優先度の高いジョブの枠を残します。
+
+このツール以外（ブラウザ・他の連携サービス）からのリクエストは数えられないため、
+共有しているアプリでは limits を実際の上限より小さくしてください。
+"""
+
+import atexit
+import json
+import math
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, TextIO, Union
+
+from kintone_crud import PAGE_SIZE, ReadPlan
+
+DAILY_LIMIT = 10000  # アプリあたりの1日のリクエスト数
+QUOTA_TZ = timezone(timedelta(hours=9))  # 日付の区切り（日本時間の0時にリセット）
+KEEP_DAYS = 7  # 記録を残す日数
+
+# ジョブの優先度（小さいほど優先）
+HIGH, NORMAL, LOW = 0, 1, 2
+PRIORITIES = {"high": HIGH, "normal": NORMAL, "low": LOW}
+# 優先度ごとに、ジョブの実行後も残しておく日次上限の割合（上位の優先度のための枠）
+DEFAULT_RESERVES = {HIGH: 0.0, NORMAL: 0.1, LOW: 0.3}
+
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    """リクエスト数を集計する日付（YYYY-MM-DD）"""
+    return (now or datetime.now(QUOTA_TZ)).astimezone(QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+def estimate_read(plan: ReadPlan) -> int:
+    """plan_read() の計画で全件取得するリクエスト数"""
+    pages = plan.total_count // PAGE_SIZE + 1
+    if plan.strategy == "single_page":
+        return 1
+    if plan.strategy == "keyset":
+        return pages
+    # カーソルの作成と削除を含む
+    return pages + 2 * max(1, len(plan.partitions))
+
+
+def estimate_write(records: int, chunk_size: int = 100) -> int:
+    """レコードの追加・更新・削除のリクエスト数（1リクエスト最大100件）"""
+    return math.ceil(records / min(chunk_size, 100)) if records > 0 else 0
+
+
+class QuotaTracker:
+    """アプリ・日付ごとのリクエスト数（KintoneClient のフック）
+
+    使用例:
+        tracker = QuotaTracker(client.config)
+        client.add_hook(tracker)
+        ...
+        tracker.remaining(123)   # 今日の残り回数
+
+    サーバーに届いたリクエスト（エラー応答を含む）を数え、通信エラーや
+    キャッシュ・single-flight で送信しなかったリクエストは数えません。
+    記録は flush_interval 秒ごと（と参照時・終了時）にまとめて書き込みます。
+    """
+
+    def __init__(
+        self,
+        config: Any,
+        limit: int = DAILY_LIMIT,
+        limits: Optional[dict[int, int]] = None,
+        path: Optional[Union[str, Path]] = None,
+        flush_interval: float = 1.0,
+    ):
+        """
+        Args:
+            config: KintoneConfig（ドメインと cache_dir を使用）
+            limit: アプリあたりの1日のリクエスト数
+            limits: アプリごとの上限（limit を上書き）
+            path: 記録する SQLite ファイル（省略時は cache_dir/quota.sqlite）
+            flush_interval: 記録をまとめて書き込む間隔（秒）
+        """
+        self.domain = config.base_url
+        self.limit = limit
+        self.limits = {int(app_id): n for app_id, n in (limits or {}).items()}
+        self.path = Path(path) if path else config.cache_dir / "quota.sqlite"
+        self.flush_interval = flush_interval
+        self._pending: dict[tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        cutoff = quota_day(datetime.now(QUOTA_TZ) - timedelta(days=KEEP_DAYS))
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                "domain TEXT, app INTEGER, day TEXT, count INTEGER, PRIMARY KEY (domain, app, day))"
+            )
+            conn.execute("DELETE FROM usage WHERE day < ?", (cutoff,))
+        atexit.register(self.flush)
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        return closing(sqlite3.connect(str(self.path), timeout=30, isolation_level=None))
+
+    def __call__(self, metrics: Any):
+        """フック: サーバーに届いたリクエストを対象アプリごとに数える"""
+        if metrics.status is None or not metrics.apps:
+            return
+        self.record(metrics.apps)
+
+    def record(self, app_ids: Iterable[int], count: int = 1):
+        """リクエスト数を加算（bulkRequest など複数アプリは各アプリに加算）"""
+        day = quota_day()
+        with self._lock:
+            for app_id in set(app_ids):
+                key = (int(app_id), day)
+                self._pending[key] = self._pending.get(key, 0) + count
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """未書き込みの記録を SQLite に書き込む"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+            if not pending:
+                return
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO usage VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (domain, app, day) DO UPDATE SET count = count + excluded.count",
+                    [(self.domain, app_id, day, count) for (app_id, day), count in pending.items()],
+                )
+                conn.execute("COMMIT")
+
+    def usage(self, day: Optional[str] = None) -> dict[int, int]:
+        """アプリごとのリクエスト数（全プロセスの合計）"""
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT app, count FROM usage WHERE domain = ? AND day = ? ORDER BY app",
+                (self.domain, day or quota_day()),
+            ).fetchall()
+        return dict(rows)
+
+    def used(self, app_id: int, day: Optional[str] = None) -> int:
+        """アプリの今日（または day）のリクエスト数"""
+        return self.usage(day).get(int(app_id), 0)
+
+    def limit_for(self, app_id: int) -> int:
+        """アプリの1日のリクエスト数の上限"""
+        return self.limits.get(int(app_id), self.limit)
+
+    def remaining(self, app_id: int) -> int:
+        """アプリの今日の残り回数"""
+        return max(0, self.limit_for(app_id) - self.used(app_id))
+
+
+@dataclass
+class Projection:
+    """ジョブ実行後のアプリごとの見込み"""
+    app_id: int
+    limit: int
+    used: int
+    estimate: int  # ジョブの見積もりリクエスト数
+    reserve: int  # ジョブの実行後も残しておく回数
+
+    @property
+    def after(self) -> int:
+        """実行後の残り回数（見込み）"""
+        return self.limit - self.used - self.estimate
+
+    @property
+    def allowed(self) -> bool:
+        return self.after >= self.reserve
+
+    def describe(self) -> str:
+        mark = "✅" if self.allowed else "⏸"
+        return (
+            f"{mark} app {self.app_id}: used {self.used}/{self.limit}, "
+            f"estimate {self.estimate}, after {self.after} (reserve {self.reserve})"
+        )
+
+
+@dataclass
+class QuotaJob:
+    """スケジューラーに登録したジョブ"""
+    name: str
+    run: Callable[[], Any]
+    estimate: dict[int, int]  # アプリ ID -> 見積もりリクエスト数
+    priority: int = NORMAL
+    status: str = "pending"  # pending | done | deferred | failed
+    result: Any = None
+    error: Optional[BaseException] = None
+    consumed: dict[int, int] = field(default_factory=dict)  # 実際のリクエスト数
+
+
+class QuotaScheduler:
+    """日次リクエスト数の枠を見ながらジョブを優先度順に実行
+
+    使用例:
+        scheduler = QuotaScheduler(tracker)
+        scheduler.submit("sync", sync, {123: 400}, priority=HIGH)
+        scheduler.submit("harvest", harvest, {123: estimate_read(plan)}, priority=LOW)
+        for job in scheduler.run():
+            print(job.name, job.status)
+
+    優先度ごとに日次上限の一定割合（reserves）を残せる場合だけ実行し、
+    残せないジョブは deferred のまま次回の run() まで保留します。
+    """
+
+    def __init__(
+        self,
+        tracker: QuotaTracker,
+        reserves: Optional[dict[int, float]] = None,
+        output: Optional[TextIO] = None,
+    ):
+        """
+        Args:
+            tracker: リクエスト数を記録している QuotaTracker
+            reserves: 優先度 -> 実行後も残す上限の割合（DEFAULT_RESERVES を上書き）
+            output: 実行前の見込みの出力先（省略時は stderr）
+        """
+        self.tracker = tracker
+        self.reserves = {**DEFAULT_RESERVES, **(reserves or {})}
+        self.output = output if output is not None else sys.stderr
+        self.jobs: list[QuotaJob] = []
+
+    def submit(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        estimate: dict[int, int],
+        priority: int = NORMAL,
+    ) -> QuotaJob:
+        """ジョブを登録"""
+        job = QuotaJob(name, run, {int(app_id): n for app_id, n in estimate.items()}, priority)
+        self.jobs.append(job)
+        return job
+
+    def project(self, estimate: dict[int, int], priority: int = NORMAL) -> list[Projection]:
+        """見積もりのリクエストを今から実行した場合の見込み"""
+        usage = self.tracker.usage()
+        reserve = self.reserves.get(priority, max(self.reserves.values()))
+        projections = []
+        for app_id, count in sorted(estimate.items()):
+            limit = self.tracker.limit_for(app_id)
+            projections.append(Projection(app_id, limit, usage.get(app_id, 0), count, math.ceil(limit * reserve)))
+        return projections
+
+    def run(self) -> list[QuotaJob]:
+        """未実行・保留中のジョブを優先度順（同じ優先度は登録順）に実行
+
+        Returns:
+            list[QuotaJob]: 今回対象にしたジョブ（status に結果）
+        """
+        queue = sorted(
+            (job for job in self.jobs if job.status in ("pending", "deferred")),
+            key=lambda job: job.priority,
+        )
+        for job in queue:
+            projections = self.project(job.estimate, job.priority)
+            print(f"[{job.name}] priority {job.priority}", file=self.output)
+            for projection in projections:
+                print(f"  {projection.describe()}", file=self.output)
+            if not all(p.allowed for p in projections):
+                job.status = "deferred"
+                continue
+
+            before = self.tracker.usage()
+            try:
+                job.result = job.run()
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = e
+            after = self.tracker.usage()
+            job.consumed = {app_id: after.get(app_id, 0) - before.get(app_id, 0) for app_id in job.estimate}
+        return queue
+
+
+def print_usage(tracker: QuotaTracker, app_ids: list[int], day: Optional[str], as_json: bool):
+    """アプリごとのリクエスト数を表示"""
+    usage = tracker.usage(day)
+    rows = [
+        {"app": app_id, "used": usage.get(app_id, 0), "limit": tracker.limit_for(app_id),
+         "remaining": max(0, tracker.limit_for(app_id) - usage.get(app_id, 0))}
+        for app_id in (app_ids or sorted(usage))
+    ]
+    if as_json:
+        print(json.dumps({"day": day or quota_day(), "apps": rows}, ensure_ascii=False, indent=2))
+        return
+    print(f"📅 {day or quota_day()}")
+    for row in rows:
+        print(f"  app {row['app']:>6}: {row['used']:>6} / {row['limit']} used, {row['remaining']} remaining")
+    if not rows:
+        print("  (no requests recorded)")
+
+
+def main():
+    import argparse
+    from kintone_config import get_config
+
+    parser = argparse.ArgumentParser(description="KINTONE daily API request quota")
+    parser.add_argument("apps", nargs="?", default="", help="App IDs comma-separated (default: all recorded)")
+    parser.add_argument("--day", type=str, help="Day to show (YYYY-MM-DD, default: today)")
+    parser.add_argument("--limit", type=int, default=DAILY_LIMIT, help="Daily request limit per app")
+    parser.add_argument("--read", type=int, default=0, help="Project a job reading N records per app")
+    parser.add_argument("--write", type=int, default=0, help="Project a job writing N records per app")
+    parser.add_argument("--requests", type=int, default=0, help="Project a job of N requests per app")
+    parser.add_argument("--priority", choices=list(PRIORITIES), default="normal", help="Priority of the projected job")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    app_ids = [int(x.strip()) for x in args.apps.split(",") if x.strip()]
+    tracker = QuotaTracker(get_config(), limit=args.limit)
+
+    estimate = (
+        args.requests
+        + estimate_write(args.write)
+        + (estimate_read(ReadPlan(strategy="cursor", total_count=args.read, width=0)) if args.read else 0)
+    )
+    if not estimate:
+        print_usage(tracker, app_ids, args.day, args.json)
+        return
+    if not app_ids:
+        print("Error: app IDs are required to project a job")
+        sys.exit(1)
+
+    # 見込みだけを表示し、実行すると保留になる場合は終了コード 2
+    projections = QuotaScheduler(tracker).project(
+        {app_id: estimate for app_id in app_ids}, PRIORITIES[args.priority]
+    )
+    for projection in projections:
+        print(projection.describe())
+    if not all(p.allowed for p in projections):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 """KINTONE スキーマ管理・キャッシュモジュール"""
 
 import json
+import sys
+import threading
 import time
 from pathlib import Path
 from typing import Optional
@@ -20,6 +22,31 @@ class FieldInfo:
     required: bool = False
     unique: bool = False
     options: Optional[dict] = None  # ドロップダウンなどの選択肢
+    lookup: Optional[dict] = None  # ルックアップ設定（relatedApp, relatedKeyField, fieldMappings）
+    fields: Optional[dict[str, "FieldInfo"]] = None  # テーブル（SUBTABLE）内のフィールド
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FieldInfo":
+        """辞書から生成（テーブル内のフィールドも FieldInfo にする）"""
+        data = dict(data)
+        if data.get("fields") is not None:
+            data["fields"] = {code: cls.from_dict(inner) for code, inner in data["fields"].items()}
+        return cls(**data)
+
+    @classmethod
+    def from_property(cls, code: str, field_data: dict) -> "FieldInfo":
+        """フォームのフィールド設定（API の properties の値）から生成"""
+        inner = field_data.get("fields")
+        return cls(
+            code=code,
+            label=field_data.get("label", code),
+            type=field_data.get("type", "UNKNOWN"),
+            required=field_data.get("required", False),
+            unique=field_data.get("unique", False),
+            options=field_data.get("options"),
+            lookup=field_data.get("lookup"),
+            fields={c: cls.from_property(c, d) for c, d in inner.items()} if inner is not None else None,
+        )
 
 
 @dataclass
@@ -45,7 +72,7 @@ class AppSchema:
     def from_dict(cls, data: dict) -> "AppSchema":
         """辞書から生成"""
         fields = {
-            code: FieldInfo(**field_data)
+            code: FieldInfo.from_dict(field_data)
             for code, field_data in data["fields"].items()
         }
         return cls(
@@ -56,15 +83,38 @@ class AppSchema:
         )
 
 
+# プロセス共有のメモリキャッシュ: (スキーマディレクトリ, app_id) -> AppSchema
+# 読み取りはロックなし、取得・更新は同じアプリごとに1スレッドだけが行う
+_memory_cache: dict[tuple[str, int], AppSchema] = {}
+_fetch_locks: dict[tuple[str, int], threading.Lock] = {}
+_fetch_locks_guard = threading.Lock()
+
+
+def _fetch_lock(key: tuple[str, int]) -> threading.Lock:
+    with _fetch_locks_guard:
+        return _fetch_locks.setdefault(key, threading.Lock())
+
+
 class SchemaManager:
-    """スキーマキャッシュ管理"""
+    """スキーマキャッシュ管理
 
-    def __init__(self, config: Optional[KintoneConfig] = None):
-        self.config = config or get_config()
-        self.client = KintoneClient(self.config)
+    ファイルキャッシュに加えてプロセス内のメモリキャッシュを共有するため、
+    複数のインスタンス・スレッドから呼び出してもファイルの読み込みや API 呼び出しは重複しません。
+    返される AppSchema は共有オブジェクトなので変更しないでください。
+    """
+
+    def __init__(self, config: Optional[KintoneConfig] = None, client: Optional[KintoneClient] = None):
+        self.config = config or (client.config if client else get_config())
+        self.client = client or KintoneClient(self.config)
         self.schema_dir = self.config.ensure_cache_dir() / "schemas"
         self.schema_dir.mkdir(exist_ok=True)
 
+    def _memory_key(self, app_id: int) -> tuple[str, int]:
+        return (str(self.schema_dir), app_id)
+
+    def _fresh(self, schema: Optional[AppSchema]) -> bool:
+        return schema is not None and (time.time() - schema.cached_at) < self.config.cache_ttl
+
     def _cache_path(self, app_id: int) -> Path:
         """キャッシュファイルパス"""
         return self.schema_dir / f"app_{app_id}.json"
@@ -81,29 +131,41 @@ class SchemaManager:
         return (time.time() - cached_at) < self.config.cache_ttl
 
     def get_schema(self, app_id: int, refresh: bool = False) -> Optional[AppSchema]:
-        """スキーマを取得（キャッシュ優先）"""
-        cache_path = self._cache_path(app_id)
+        """スキーマを取得（メモリキャッシュ > ファイルキャッシュ > API）"""
+        key = self._memory_key(app_id)
+        if not refresh and self._fresh(_memory_cache.get(key)):
+            return _memory_cache[key]
+
+        with _fetch_lock(key):
+            # 待っている間に他のスレッドが取得していればそれを使う
+            if not refresh and self._fresh(_memory_cache.get(key)):
+                return _memory_cache[key]
+
+            cache_path = self._cache_path(app_id)
 
-        # キャッシュが有効で refresh でなければキャッシュを返す
-        if not refresh and self._is_cache_valid(cache_path):
-            with open(cache_path) as f:
-                return AppSchema.from_dict(json.load(f))
+            # キャッシュが有効で refresh でなければキャッシュを返す
+            if not refresh and self._is_cache_valid(cache_path):
+                with open(cache_path) as f:
+                    schema = AppSchema.from_dict(json.load(f))
+                _memory_cache[key] = schema
+                return schema
 
-        # API からスキーマを取得
-        schema = self._fetch_schema(app_id)
-        if schema:
-            # キャッシュに保存
-            with open(cache_path, "w") as f:
-                json.dump(schema.to_dict(), f, ensure_ascii=False, indent=2)
+            # API からスキーマを取得
+            schema = self._fetch_schema(app_id)
+            if schema:
+                # キャッシュに保存
+                with open(cache_path, "w") as f:
+                    json.dump(schema.to_dict(), f, ensure_ascii=False, indent=2)
+                _memory_cache[key] = schema
 
-        return schema
+            return schema
 
     def _fetch_schema(self, app_id: int) -> Optional[AppSchema]:
         """API からスキーマを取得"""
         # アプリ情報取得
         app_response = self.client.get_app(app_id)
         if not app_response.success:
-            print(f"Error getting app info: {app_response.error}")
+            print(f"Error getting app info: {app_response.error}", file=sys.stderr)
             return None
 
         app_name = app_response.data.get("name", f"App {app_id}")
@@ -111,19 +173,13 @@ class SchemaManager:
         # フィールド定義取得
         fields_response = self.client.get_form_fields(app_id)
         if not fields_response.success:
-            print(f"Error getting fields: {fields_response.error}")
+            print(f"Error getting fields: {fields_response.error}", file=sys.stderr)
             return None
 
-        fields = {}
-        for code, field_data in fields_response.data.get("properties", {}).items():
-            fields[code] = FieldInfo(
-                code=code,
-                label=field_data.get("label", code),
-                type=field_data.get("type", "UNKNOWN"),
-                required=field_data.get("required", False),
-                unique=field_data.get("unique", False),
-                options=field_data.get("options"),
-            )
+        fields = {
+            code: FieldInfo.from_property(code, field_data)
+            for code, field_data in fields_response.data.get("properties", {}).items()
+        }
 
         return AppSchema(
             app_id=app_id,
@@ -147,6 +203,11 @@ class SchemaManager:
 
     def clear_cache(self, app_id: Optional[int] = None):
         """キャッシュをクリア"""
+        schema_dir = str(self.schema_dir)
+        for key in list(_memory_cache):
+            if key[0] == schema_dir and (not app_id or key[1] == app_id):
+                _memory_cache.pop(key, None)
+
         if app_id:
             cache_path = self._cache_path(app_id)
             if cache_path.exists():
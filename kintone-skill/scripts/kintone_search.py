@@ -2,6 +2,13 @@
 """KINTONE 検索クエリビルダーモジュール"""
 
 import json
+import re
+import threading
+import urllib.parse
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
 from typing import Any, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
@@ -21,6 +28,52 @@ class Operator(Enum):
     NOT_IN = "not in"
 
 
+@dataclass(frozen=True)
+class Param:
+    """プレースホルダー（PreparedQuery.bind で値を埋め込む）"""
+    name: str
+
+    def __str__(self) -> str:
+        return f":{self.name}"
+
+
+def param(name: str) -> Param:
+    """プレースホルダーを作成"""
+    return Param(name)
+
+
+def quote(value: Any) -> str:
+    """値を文字列リテラルに変換（バックスラッシュと二重引用符をエスケープ）"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _scalar(value: Any) -> str:
+    """1つの値をクエリのリテラルに変換
+
+    文字列は引用符付き、数値はそのまま、日付・日時は ISO 形式の文字列にします。
+    それ以外（None、bool など）はクエリに埋め込めないため TypeError を送出します。
+    """
+    if isinstance(value, str):
+        return quote(value)
+    if isinstance(value, bool):
+        raise TypeError(f"Cannot use bool as a query value: {value!r}")
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return quote(value.isoformat())
+    raise TypeError(f"Cannot use {type(value).__name__} as a query value: {value!r}")
+
+
+def _literal(value: Any) -> str:
+    """値をクエリのリテラルに変換（リストは in (...) 用にカンマ区切り）"""
+    if isinstance(value, Param):
+        return str(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ", ".join(_scalar(v) for v in value)
+    return _scalar(value)
+
+
 @dataclass
 class Condition:
     """検索条件"""
@@ -30,18 +83,124 @@ class Condition:
 
     def to_query(self) -> str:
         """クエリ文字列に変換"""
-        if self.operator == Operator.IN:
-            values = ", ".join(f'"{v}"' for v in self.value)
-            return f'{self.field} in ({values})'
-        elif self.operator == Operator.NOT_IN:
-            values = ", ".join(f'"{v}"' for v in self.value)
-            return f'{self.field} not in ({values})'
-        elif self.operator in (Operator.LIKE, Operator.NOT_LIKE):
-            return f'{self.field} {self.operator.value} "{self.value}"'
-        elif isinstance(self.value, str):
-            return f'{self.field} {self.operator.value} "{self.value}"'
+        if self.operator in (Operator.IN, Operator.NOT_IN):
+            if isinstance(self.value, Param):
+                return f"{self.field} {self.operator.value} ({self.value})"
+            values = ", ".join(quote(v) for v in self.value)
+            return f"{self.field} {self.operator.value} ({values})"
+        elif self.operator in (Operator.LIKE, Operator.NOT_LIKE) and not isinstance(self.value, Param):
+            return f"{self.field} {self.operator.value} {quote(self.value)}"
         else:
-            return f'{self.field} {self.operator.value} {self.value}'
+            return f"{self.field} {self.operator.value} {_literal(self.value)}"
+
+
+# 文字列リテラルを読み飛ばしつつ :name 形式のプレースホルダーを検出
+_PLACEHOLDER_RE = re.compile(r'"(?:\\.|[^"\\])*"|:(\w+)')
+
+
+@dataclass(frozen=True)
+class PreparedQuery:
+    """コンパイル済みクエリテンプレート
+
+    テンプレートは一度だけ解析され、bind() ではリテラル部分と
+    エスケープ済みの値を連結するだけでクエリを生成します。
+    """
+    template: str
+    segments: tuple[str, ...]  # リテラル部分（len(params) + 1 個）
+    params: tuple[str, ...]  # プレースホルダー名（出現順）
+
+    def bind(self, **values: Any) -> str:
+        """プレースホルダーに値を埋め込んでクエリ文字列を生成
+
+        文字列はエスケープして引用符で囲み、数値はそのまま、
+        リストは in (...) 用にカンマ区切りで展開します。
+        """
+        parts = [self.segments[0]]
+        for name, segment in zip(self.params, self.segments[1:]):
+            if name not in values:
+                raise ValueError(f"Missing query parameter: {name}")
+            parts.append(_literal(values[name]))
+            parts.append(segment)
+        return "".join(parts)
+
+    def __str__(self) -> str:
+        return self.template
+
+
+@lru_cache(maxsize=256)
+def prepare(template: str) -> PreparedQuery:
+    """クエリテンプレートをコンパイル（LRU キャッシュ付き）
+
+    例:
+        prepare('顧客コード = :code and 金額 >= :min').bind(code="C001", min=1000)
+        → '顧客コード = "C001" and 金額 >= 1000'
+    """
+    segments = []
+    params = []
+    last = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        if match.group(1) is None:
+            continue  # 文字列リテラル内はそのまま
+        segments.append(template[last:match.start()])
+        params.append(match.group(1))
+        last = match.end()
+    segments.append(template[last:])
+    return PreparedQuery(template, tuple(segments), tuple(params))
+
+
+# in (...) クエリの安全な長さ（URL エンコード後の文字数）
+MAX_QUERY_LENGTH = 4000
+
+
+def chunk_in_values(field: str, values: list, max_length: int = MAX_QUERY_LENGTH) -> list[list]:
+    """in (...) クエリが max_length を超えないよう値リストを分割
+
+    GET の URL に載せても安全な長さになるよう、URL エンコード後の長さで判定します。
+    """
+    encode = urllib.parse.quote
+    base = len(encode(f"{field} in ()"))
+    separator = len(encode(", "))
+
+    chunks: list[list] = []
+    current: list = []
+    length = base
+    for value in values:
+        size = len(encode(quote(value)))
+        if current and length + separator + size > max_length:
+            chunks.append(current)
+            current = []
+            length = base
+        if current:
+            length += separator
+        current.append(value)
+        length += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+_QUERY_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|!=|>=|<=|[=<>(),]|[^\s()=!<>,"]+')
+_COMPARISONS = frozenset({"=", "!=", ">", "<", ">=", "<=", "in", "like", "not"})
+_QUERY_WORDS = frozenset({"and", "or", "not", "in", "like", "order", "by", "asc", "desc", "limit", "offset"})
+
+
+def query_fields(query: str) -> list[str]:
+    """クエリが参照するフィールドコード（条件の左辺と order by の対象）を出現順に返す"""
+    tokens = _QUERY_TOKEN_RE.findall(query)
+    fields: list[str] = []
+    in_order_by = False
+    for i, token in enumerate(tokens):
+        lower = token.lower()
+        following = tokens[i + 1].lower() if i + 1 < len(tokens) else ""
+        if lower in ("limit", "offset"):
+            in_order_by = False
+        elif lower == "by" and i and tokens[i - 1].lower() == "order":
+            in_order_by = True
+        elif token[0] in '"(),=!<>:' or lower in _QUERY_WORDS:
+            continue
+        elif (in_order_by or following in _COMPARISONS) and token not in fields:
+            fields.append(token)
+    return fields
 
 
 class QueryBuilder:
@@ -132,6 +291,10 @@ class QueryBuilder:
 
         return query.strip()
 
+    def compile(self) -> PreparedQuery:
+        """Param を含むクエリをコンパイル（同じ形のクエリはキャッシュを共有）"""
+        return prepare(self.build())
+
     def __str__(self) -> str:
         return self.build()
 
@@ -142,44 +305,151 @@ def query() -> QueryBuilder:
     return QueryBuilder()
 
 
-def parse_natural_query(text: str, schema: Optional[dict] = None) -> str:
+# === 自然言語クエリ ===
+
+# 数値として比較するフィールド型
+NUMERIC_FIELD_TYPES = frozenset({"NUMBER", "CALC", "RECORD_NUMBER", "__ID__", "__REVISION__"})
+
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+# 複文の区切り（かつ → and、または → or）
+_CONNECTOR_RE = re.compile(r"(かつ|または)")
+
+# 「〜が」「〜は」「〜を含む」で始まる節かどうか（「ではない」の は は除く）
+_CLAUSE_RE = re.compile(r"[^\s\"]+?(?:が|は(?!ない)|を含む)")
+
+# (パターン, フィールドのグループ番号, 変換関数(field, groups, literal))
+# 変換関数の groups は match.groups()（0-indexed）、literal はフィールド型に応じた値の変換
+_NATURAL_PATTERNS = [
+    (re.compile(r"(.+?)が(.+?)と(.+)"), 0, lambda f, g, lit: f"{f} in ({quote(g[1])}, {quote(g[2])})"),  # AがBとC
+    (re.compile(r"(.+?)が(.+?)または(.+)"), 0, lambda f, g, lit: f"{f} in ({quote(g[1])}, {quote(g[2])})"),  # AがBまたはC
+    (re.compile(r"(.+?)が今日"), 0, lambda f, g, lit: f"{f} = TODAY()"),  # が今日
+    (re.compile(r"(.+?)が今月"), 0, lambda f, g, lit: f"{f} >= THIS_MONTH()"),  # が今月
+    (re.compile(r"(.+?)が自分"), 0, lambda f, g, lit: f"{f} = LOGINUSER()"),  # が自分
+    (re.compile(r"(.+?)が空でない"), 0, lambda f, g, lit: f'{f} != ""'),  # が空でない（空より先にマッチ）
+    (re.compile(r"(.+?)が空"), 0, lambda f, g, lit: f'{f} = ""'),  # が空
+    (re.compile(r"(.+?)を含む(.+)"), 1, lambda f, g, lit: f"{f} like {quote(g[0])}"),  # を含む
+    (re.compile(r"(.+?)が(.+?)以上"), 0, lambda f, g, lit: f"{f} >= {lit(g[1])}"),  # 以上
+    (re.compile(r"(.+?)が(.+?)以下"), 0, lambda f, g, lit: f"{f} <= {lit(g[1])}"),  # 以下
+    (re.compile(r"(.+?)が(.+?)より大きい"), 0, lambda f, g, lit: f"{f} > {lit(g[1])}"),  # より大きい
+    (re.compile(r"(.+?)が(.+?)より小さい"), 0, lambda f, g, lit: f"{f} < {lit(g[1])}"),  # より小さい
+    (re.compile(r"(.+?)が(.+?)ではない"), 0, lambda f, g, lit: f"{f} != {lit(g[1])}"),  # ではない
+    (re.compile(r"(.+?)が(.+)"), 0, lambda f, g, lit: f"{f} = {lit(g[1])}"),  # 基本形（が）
+    (re.compile(r"(.+?)は(.+)"), 0, lambda f, g, lit: f"{f} = {lit(g[1])}"),  # 基本形（は）
+]
+
+# スキーマごとのフィールド索引: (app_id, cached_at) -> {ラベル/コード: (コード, 型)}
+# （複数スレッドから使われるため _SCHEMA_LOCK を持って読み書きし、最近使っていないものから捨てる）
+_SCHEMA_INDEXES: "OrderedDict[tuple, dict[str, tuple[str, str]]]" = OrderedDict()
+_SCHEMA_LOCK = threading.Lock()
+MAX_SCHEMA_INDEXES = 64
+
+
+def _schema_key(schema: Any) -> Optional[tuple]:
+    """スキーマのフィールド索引を登録してキーを返す"""
+    if schema is None:
+        return None
+    if isinstance(schema, dict):
+        app_id, cached_at, fields = schema["app_id"], schema["cached_at"], schema["fields"]
+    else:
+        app_id, cached_at, fields = schema.app_id, schema.cached_at, schema.fields
+
+    key = (app_id, cached_at)
+    with _SCHEMA_LOCK:
+        if key in _SCHEMA_INDEXES:
+            _SCHEMA_INDEXES.move_to_end(key)
+            return key
+
+    index: dict[str, tuple[str, str]] = {}
+    for code, info in fields.items():
+        if isinstance(info, dict):
+            label, field_type = info.get("label", code), info.get("type", "")
+        else:
+            label, field_type = info.label, info.type
+        index.setdefault(label, (code, field_type))
+    for code, info in fields.items():
+        index[code] = (code, info["type"] if isinstance(info, dict) else info.type)
+    with _SCHEMA_LOCK:
+        _SCHEMA_INDEXES[key] = index
+        while len(_SCHEMA_INDEXES) > MAX_SCHEMA_INDEXES:
+            _SCHEMA_INDEXES.popitem(last=False)
+    return key
+
+
+def _compile_clause(text: str, index: dict[str, tuple[str, str]]) -> Optional[str]:
+    """1つの節をクエリに変換（マッチしなければ None）"""
+    for pattern, field_group, converter in _NATURAL_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+        groups = match.groups()
+        name = groups[field_group].strip()
+        code, field_type = index.get(name, (name, ""))
+
+        def literal(value: str) -> str:
+            value = value.strip()
+            if field_type in NUMERIC_FIELD_TYPES and _NUMBER_RE.fullmatch(value):
+                return value.replace(",", "")
+            return quote(value)
+
+        return converter(code, groups, literal)
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _compile_natural(text: str, schema_key: Optional[tuple]) -> str:
+    """自然言語クエリをコンパイル（結果はキャッシュされる）"""
+    with _SCHEMA_LOCK:
+        index = _SCHEMA_INDEXES.get(schema_key, {}) if schema_key else {}
+
+    # 「かつ」「または」で区切り、節になっていない断片は直前の節に戻す
+    # （「ステータスが完了または進行中」は1つの節として in (...) に変換）
+    pieces = _CONNECTOR_RE.split(text)
+    clauses = [pieces[0]]
+    connectors = []
+    for connector, piece in zip(pieces[1::2], pieces[2::2]):
+        if _CLAUSE_RE.match(piece):
+            connectors.append("and" if connector == "かつ" else "or")
+            clauses.append(piece)
+        else:
+            clauses[-1] += connector + piece
+
+    compiled = [_compile_clause(c.strip(), index) for c in clauses]
+    if any(c is None for c in compiled):
+        # マッチしない場合はそのまま返す（既にクエリ形式の可能性）
+        return text
+
+    # and を or より先に結合（or を含む場合は and のグループを括弧で囲む）
+    groups = [[compiled[0]]]
+    for connector, clause in zip(connectors, compiled[1:]):
+        if connector == "and":
+            groups[-1].append(clause)
+        else:
+            groups.append([clause])
+    if len(groups) == 1:
+        return " and ".join(groups[0])
+    return " or ".join(
+        f"({' and '.join(g)})" if len(g) > 1 else g[0]
+        for g in groups
+    )
+
+
+def parse_natural_query(text: str, schema: Optional[Any] = None) -> str:
     """
     自然言語風のクエリをKINTONEクエリに変換
 
+    パターンはモジュール読み込み時にコンパイル済みで、同じ入力の変換結果は
+    キャッシュされます。schema（AppSchema または AppSchema.to_dict() の辞書）を
+    渡すと、ラベルをフィールドコードに解決し、数値フィールドの値を
+    クォートなしで出力します。
+
     例:
     - "名前が田中" → '名前 = "田中"'
     - "作成日が今日" → '作成日 = TODAY()'
     - "ステータスが完了または進行中" → 'ステータス in ("完了", "進行中")'
+    - "ステータスが完了かつ金額が1000以上" → 'ステータス = "完了" and 金額 >= "1000"'
     """
-    # 基本的なパターンマッチング
-    import re
-
-    # 「が」「は」で分割（match.groups() は 0-indexed）
-    patterns = [
-        (r"(.+?)が(.+?)と(.+)", lambda m: f'{m[0]} in ("{m[1]}", "{m[2]}")'),  # AがBとC
-        (r"(.+?)が(.+?)または(.+)", lambda m: f'{m[0]} in ("{m[1]}", "{m[2]}")'),  # AがBまたはC
-        (r"(.+?)が今日", lambda m: f'{m[0]} = TODAY()'),  # が今日
-        (r"(.+?)が今月", lambda m: f'{m[0]} >= THIS_MONTH()'),  # が今月
-        (r"(.+?)が自分", lambda m: f'{m[0]} = LOGINUSER()'),  # が自分
-        (r"(.+?)が空でない", lambda m: f'{m[0]} != ""'),  # が空でない（空より先にマッチ）
-        (r"(.+?)が空", lambda m: f'{m[0]} = ""'),  # が空
-        (r"(.+?)を含む(.+)", lambda m: f'{m[1]} like "{m[0]}"'),  # を含む
-        (r"(.+?)が(.+?)以上", lambda m: f'{m[0]} >= "{m[1]}"'),  # 以上
-        (r"(.+?)が(.+?)以下", lambda m: f'{m[0]} <= "{m[1]}"'),  # 以下
-        (r"(.+?)が(.+?)より大きい", lambda m: f'{m[0]} > "{m[1]}"'),  # より大きい
-        (r"(.+?)が(.+?)より小さい", lambda m: f'{m[0]} < "{m[1]}"'),  # より小さい
-        (r"(.+?)が(.+?)ではない", lambda m: f'{m[0]} != "{m[1]}"'),  # ではない
-        (r"(.+?)が(.+)", lambda m: f'{m[0]} = "{m[1]}"'),  # 基本形（が）
-        (r"(.+?)は(.+)", lambda m: f'{m[0]} = "{m[1]}"'),  # 基本形（は）
-    ]
-
-    for pattern, converter in patterns:
-        match = re.match(pattern, text)
-        if match:
-            return converter(match.groups())
-
-    # マッチしない場合はそのまま返す（既にクエリ形式の可能性）
-    return text
+    return _compile_natural(text.strip(), _schema_key(schema))
 
 
 def main():
@@ -187,12 +457,17 @@ def main():
 
     parser = argparse.ArgumentParser(description="KINTONE Query Builder")
     parser.add_argument("--natural", "-n", type=str, help="Natural language query")
+    parser.add_argument("--app", "-a", type=int, help="App ID (resolve labels and field types from schema)")
     parser.add_argument("--demo", action="store_true", help="Show demo queries")
 
     args = parser.parse_args()
 
     if args.natural:
-        result = parse_natural_query(args.natural)
+        schema = None
+        if args.app:
+            from kintone_schema import SchemaManager
+            schema = SchemaManager().get_schema(args.app)
+        result = parse_natural_query(args.natural, schema)
         print(f"Input: {args.natural}")
         print(f"Query: {result}")
 
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""KINTONE レコードのディスクスプール
+
+カーソルからの取得をバックグラウンドで全速で進め、gzip 圧縮した NDJSON の
+セグメントファイルに書き出します。呼び出し側は書き終わったセグメントから
+自分のペースで読み進めます。
+
+処理の遅い呼び出し側でもカーソルの有効期限（最後のアクセスから10分）に
+影響されず、取得が終わった時点でカーソルを削除できます。
+"""
+
+import gzip
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from kintone_client import json_dumps, json_loads
+
+DEFAULT_SEGMENT_RECORDS = 5000  # 1セグメントのレコード数（書き終わると読み出し可能になる）
+
+
+class RecordSpool:
+    """レコードをディスクに退避しながら返すイテレーター
+
+    使用例:
+        spool = RecordSpool(crud.search_all(123), directory=config.cache_dir / "spool")
+        for record in spool:
+            slow_process(record)   # カーソルは取得完了時に削除済み
+
+    途中で読むのをやめても close()（with 文・イテレーターの終了）で
+    取得を止めてスプールを削除します。
+    """
+
+    def __init__(
+        self,
+        source: Iterable[dict],
+        directory: Optional[Union[str, Path]] = None,
+        segment_records: int = DEFAULT_SEGMENT_RECORDS,
+        compresslevel: int = 1,
+    ):
+        """
+        Args:
+            source: レコードの取得元（search_all などのイテレーター）
+            directory: スプールを作るディレクトリ（省略時は一時ディレクトリ）
+            segment_records: 1セグメントのレコード数
+            compresslevel: gzip の圧縮レベル（1 が最速）
+        """
+        if segment_records < 1:
+            raise ValueError(f"segment_records must be positive: {segment_records}")
+        self._source = source
+        self.segment_records = segment_records
+        self.compresslevel = compresslevel
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix="spool-", dir=directory))
+
+        self._segments: list[Path] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.records = 0  # 書き出したレコード数
+        self.spooled_bytes = 0  # 書き出した圧縮後のバイト数
+        self.drain_seconds: Optional[float] = None  # 取得元を読み終えるまでの秒数
+
+    @property
+    def drained(self) -> bool:
+        """取得元を読み終えたか（カーソルは削除済み）"""
+        with self._cond:
+            return self._done
+
+    def start(self) -> "RecordSpool":
+        """バックグラウンドで取得を開始（__iter__ からも呼ばれる）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._drain, name="kintone-spool", daemon=True)
+            self._thread.start()
+        return self
+
+    def _publish(self, path: Path):
+        self.spooled_bytes += path.stat().st_size
+        with self._cond:
+            self._segments.append(path)
+            self._cond.notify_all()
+
+    def _drain(self):
+        started = time.monotonic()
+        source = iter(self._source)
+        writer = None
+        path = None
+        count = 0
+        try:
+            for record in source:
+                if self._stop.is_set():
+                    break
+                if writer is None:
+                    path = self.path / f"{len(self._segments):06d}.ndjson.gz"
+                    writer = gzip.open(path, "wb", compresslevel=self.compresslevel)
+                writer.write(json_dumps(record) + b"\n")
+                self.records += 1
+                count += 1
+                if count >= self.segment_records:
+                    writer.close()
+                    writer = None
+                    count = 0
+                    self._publish(path)
+            if writer is not None:
+                writer.close()
+                writer = None
+                self._publish(path)
+        except BaseException as e:
+            # 取得済みのレコードを先に読めるよう、書きかけのセグメントも公開してからエラーにする
+            if writer is not None:
+                try:
+                    writer.close()
+                    writer = None
+                    if count:
+                        self._publish(path)
+                except OSError:
+                    pass
+            self._error = e
+        finally:
+            if writer is not None:
+                writer.close()
+            # 取得元がジェネレーターなら閉じてカーソルを削除させる
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+            self.drain_seconds = time.monotonic() - started
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[dict]:
+        self.start()
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    while index >= len(self._segments) and not self._done:
+                        self._cond.wait()
+                    if index >= len(self._segments):
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    path = self._segments[index]
+                with gzip.open(path, "rb") as f:
+                    for line in f:
+                        yield json_loads(line)
+                path.unlink()
+                index += 1
+        finally:
+            self.close()
+
+    def close(self):
+        """取得を止めてスプールを削除"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "RecordSpool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
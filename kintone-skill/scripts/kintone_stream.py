@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""KINTONE API レスポンスの逐次 JSON パーサー
+
+{"records": [...], "next": true} のようなレスポンスを chunk ごとに読み進め、
+records 配列の要素をバイト列が揃った時点で1件ずつ返します。
+バッファに保持するのは受信途中の chunk と解析中の1レコード分だけです。
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+# トップレベルの走査用: 文字列（閉じ引用符まで）または構造文字
+# 閉じ引用符がない一致は chunk の境界で切れた文字列
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*("?)|[{}\[\],:]')
+_SPACE_RE = re.compile(r"\s*")
+
+# 配列要素は C 実装のデコーダーで1件ずつ解析する
+_decoder = json.JSONDecoder()
+
+
+class JsonArrayStream:
+    """トップレベルオブジェクトの配列フィールドを要素ごとに返すイテレーター
+
+    使用例:
+        stream = JsonArrayStream(chunks, key="records")
+        for record in stream:
+            ...
+        stream.fields["next"]  # 配列以外のトップレベル値（読み終わった後）
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str = "records"):
+        self._chunks = chunks
+        self.key = key
+        self.fields: dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[Any]:
+        chunks = iter(self._chunks)
+        try:
+            yield from self._parse(chunks)
+        finally:
+            # 途中で読むのをやめても接続を解放できるよう読み込み元を閉じる
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _parse(self, chunks: Iterator[bytes]) -> Iterator[Any]:
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        buf = ""
+        pos = 0
+        depth = 0
+        key = None
+        expect_key = False
+        value_start = None  # 配列以外のトップレベル値の開始位置
+        pending_array = False
+        in_array = False
+        retry_at = 0  # 要素が未完成だったとき、次に解析を試みるバッファ長
+        eof = False
+
+        while not eof:
+            chunk = next(chunks, None)
+            eof = chunk is None
+            buf += utf8.decode(chunk or b"", final=eof)
+
+            while True:
+                if in_array:
+                    pos = _SPACE_RE.match(buf, pos).end()
+                    if pos >= len(buf):
+                        break
+                    char = buf[pos]
+                    if char == "]":
+                        in_array = False
+                        depth -= 1
+                        pos += 1
+                        continue
+                    if char == ",":
+                        pos += 1
+                        continue
+                    if len(buf) < retry_at and not eof:
+                        break
+                    try:
+                        item, pos = _decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError as e:
+                        if eof:
+                            raise ValueError(f"Incomplete JSON response: {e}") from e
+                        # 受信済みの2倍になるまで待って再解析（巨大な要素でも O(n) に抑える）
+                        retry_at = pos + 2 * (len(buf) - pos)
+                        break
+                    retry_at = 0
+                    yield item
+                    continue
+
+                match = _TOKEN_RE.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                token = match.group()
+                if token[0] == '"':
+                    if not match.group(1):
+                        pos = match.start()  # 文字列の続きを待つ
+                        break
+                    pos = match.end()
+                    if depth == 1 and expect_key:
+                        key = json.loads(token)
+                        expect_key = False
+                    continue
+
+                pos = match.end()
+                if token in "{[":
+                    depth += 1
+                    if depth == 1:
+                        expect_key = True
+                    elif depth == 2 and pending_array and token == "[":
+                        pending_array = False
+                        in_array = True
+                elif token in "}]":
+                    if depth == 1 and value_start is not None:
+                        self.fields[key] = json.loads(buf[value_start:match.start()])
+                        value_start = None
+                    depth -= 1
+                elif token == "," and depth == 1:
+                    if value_start is not None:
+                        self.fields[key] = json.loads(buf[value_start:match.start()])
+                        value_start = None
+                    expect_key = True
+                elif token == ":" and depth == 1:
+                    if key == self.key:
+                        pending_array = True
+                    else:
+                        value_start = pos
+
+            # 解析済みの部分を捨てる
+            keep = pos if value_start is None else min(pos, value_start)
+            if keep:
+                buf = buf[keep:]
+                pos -= keep
+                retry_at = max(0, retry_at - keep)
+                value_start = value_start - keep if value_start is not None else None
+
+        if depth != 0 or buf[pos:].strip():
+            raise ValueError("Incomplete JSON response")
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""KINTONE 変更フィード（ポーリングによる変更検知）
+
+アプリごとに 更新日時 と $id のウォーターマークを保持し、前回以降に変更された
+レコードだけを取得して create / update / delete イベントとして出力します。
+変更のないアプリはポーリング間隔を伸ばし、API 呼び出しを抑えます。
+
+- 変更なしのポーリングは1リクエスト（更新日時 >= ウォーターマーク の1ページ）
+- 更新日時は分単位のため、同じ分のレコードは $revision で重複を除外
+- 削除は $id 一覧の差分で検知（任意、N 回に1回）
+- イベントを出力してからチェックポイントを保存（少なくとも1回の配信）
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, TextIO, Union
+
+from kintone_crud import PAGE_SIZE, KintoneCRUD
+from kintone_search import quote
+
+UPDATED_FIELD = "更新日時"
+CHECKPOINT_VERSION = 1
+
+# 停止要求を確認する間隔（秒）
+_TICK = 0.5
+
+
+@dataclass
+class ChangeEvent:
+    """レコードの変更イベント"""
+
+    type: str  # create / update / delete
+    app_id: int
+    record_id: str
+    revision: Optional[str] = None
+    updated_at: Optional[str] = None
+    record: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        data = {"type": self.type, "app": self.app_id, "id": self.record_id}
+        if self.revision is not None:
+            data["revision"] = self.revision
+        if self.updated_at is not None:
+            data["updated_at"] = self.updated_at
+        if self.record is not None:
+            data["record"] = self.record
+        return data
+
+
+@dataclass
+class AppWatermark:
+    """アプリごとの読み取り位置
+
+    updated_at と同じ分に更新されたレコードの revision を保持し、
+    次回の 更新日時 >= updated_at で再取得したときに重複を除きます。
+    """
+
+    updated_at: str = ""
+    revisions: dict[str, str] = field(default_factory=dict)
+    max_id: int = 0
+    known_ids: Optional[set[int]] = None  # 削除検知を有効にしたときのみ
+    polls: int = 0
+
+    def to_dict(self) -> dict:
+        data = {
+            "updated_at": self.updated_at,
+            "revisions": dict(self.revisions),
+            "max_id": self.max_id,
+            "polls": self.polls,
+        }
+        if self.known_ids is not None:
+            data["known_ids"] = sorted(self.known_ids)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AppWatermark":
+        known_ids = data.get("known_ids")
+        return cls(
+            updated_at=data.get("updated_at", ""),
+            revisions=dict(data.get("revisions", {})),
+            max_id=int(data.get("max_id", 0)),
+            known_ids=set(known_ids) if known_ids is not None else None,
+            polls=int(data.get("polls", 0)),
+        )
+
+
+def _value(record: dict, code: str) -> str:
+    return record[code]["value"]
+
+
+def _write_json(path: Path, data: Any):
+    """JSON を一時ファイル経由で置き換えて保存"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class ChangeWatcher:
+    """複数アプリの変更をポーリングしてイベントを出力
+
+    使用例:
+        watcher = ChangeWatcher(KintoneCRUD(), [123, 456], on_event=handle)
+        watcher.run()  # Ctrl+C または stop イベントまで
+
+        # 1回だけ全アプリをポーリング（cron 実行など）
+        watcher.run_once()
+    """
+
+    def __init__(
+        self,
+        crud: KintoneCRUD,
+        app_ids: list[int],
+        on_event: Optional[Callable[[ChangeEvent], None]] = None,
+        output: Optional[TextIO] = None,
+        checkpoint: Optional[Union[str, Path]] = None,
+        fields: Optional[list[str]] = None,
+        start: str = "now",
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        backoff: float = 2.0,
+        delete_scan_every: int = 0,
+        max_workers: int = 4,
+        updated_field: str = UPDATED_FIELD,
+    ):
+        """
+        Args:
+            crud: 使用する KintoneCRUD
+            app_ids: 監視するアプリ ID
+            on_event: イベントを受け取る関数（省略時は output に NDJSON で出力）
+            output: NDJSON の出力先（省略時は標準出力）
+            checkpoint: チェックポイントファイル（省略時は cache_dir/watch/checkpoint.json）
+            fields: イベントに含めるフィールド（省略時は全フィールド）
+            start: チェックポイントがないアプリの開始位置（now: 以降の変更のみ、beginning: 全件を create）
+            min_interval: ポーリング間隔の最小値（秒、変更があったアプリ）
+            max_interval: ポーリング間隔の最大値（秒）
+            backoff: 変更がなかったときに間隔に掛ける倍率
+            delete_scan_every: N 回のポーリングごとに $id 一覧で削除を検知（0 で無効）
+            max_workers: 同時にポーリングするアプリ数
+            updated_field: 更新日時フィールドのコード
+        """
+        if start not in ("now", "beginning"):
+            raise ValueError(f"start must be 'now' or 'beginning': {start}")
+        self.crud = crud
+        self.app_ids = list(dict.fromkeys(app_ids))
+        self.output = output
+        self.on_event = on_event or self._write_ndjson
+        self.checkpoint_path = Path(checkpoint) if checkpoint else crud.config.cache_dir / "watch" / "checkpoint.json"
+        self.updated_field = updated_field
+        self.fields = None
+        if fields:
+            self.fields = list(dict.fromkeys(["$id", "$revision", updated_field, *fields]))
+        self.start = start
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.delete_scan_every = delete_scan_every
+        self.max_workers = max_workers
+
+        self.watermarks: dict[int, AppWatermark] = {}
+        self.intervals: dict[int, float] = {app_id: min_interval for app_id in self.app_ids}
+        self._state: dict[str, dict] = {}  # 保存用のウォーターマーク（アプリごとのスナップショット）
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._load_checkpoint()
+
+    # === チェックポイント ===
+
+    def _ids_path(self, app_id: int) -> Path:
+        """削除検知用の $id 一覧のファイル（アプリごと）"""
+        path = self.checkpoint_path
+        return path.with_name(f"{path.stem}.ids-{app_id}.json")
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return
+        data = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {data.get('version')}")
+        for key, state in data.get("apps", {}).items():
+            self._state[key] = state
+            if int(key) not in self.intervals:
+                continue
+            state = dict(state)
+            ids_path = self._ids_path(int(key))
+            if state.pop("known_ids_saved", False) and ids_path.exists():
+                state["known_ids"] = json.loads(ids_path.read_text(encoding="utf-8"))
+            # 一覧がなければ次の削除検知で作り直す
+            self.watermarks[int(key)] = AppWatermark.from_dict(state)
+
+    def _save_checkpoint(self, app_id: int, watermark: AppWatermark, with_ids: bool = False):
+        """アプリのウォーターマークを保存（一時ファイル経由で置き換え）
+
+        $id 一覧は大きいため別のファイルに分け、削除検知の後（with_ids=True）だけ書き込みます。
+        ページごとの保存は小さなウォーターマークだけです。その間に追加された $id は
+        次の削除検知で一覧に入ります。
+        """
+        state = watermark.to_dict()
+        known_ids = state.pop("known_ids", None)
+        if known_ids is not None:
+            if with_ids or not self._ids_path(app_id).exists():
+                _write_json(self._ids_path(app_id), known_ids)
+            state["known_ids_saved"] = True
+        with self._lock:
+            self._state[str(app_id)] = state
+            _write_json(self.checkpoint_path, {"version": CHECKPOINT_VERSION, "apps": self._state})
+
+    # === イベント出力 ===
+
+    def _write_ndjson(self, event: ChangeEvent):
+        output = self.output or sys.stdout
+        output.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+        output.flush()
+
+    def _emit(self, event: ChangeEvent):
+        # 複数アプリを並列にポーリングするため、出力先への書き込みは直列化
+        with self._emit_lock:
+            self.on_event(event)
+
+    # === ポーリング ===
+
+    def _pages(self, app_id: int, watermark: AppWatermark) -> Iterator[list[dict]]:
+        """ウォーターマーク以降に更新されたレコードを (更新日時, $id) 順にページ単位で返す"""
+        code = self.updated_field
+        condition = f"{code} >= {quote(watermark.updated_at)}" if watermark.updated_at else ""
+        while True:
+            query = f"{condition} order by {code} asc, $id asc limit {PAGE_SIZE}".strip()
+            response = self.crud.client.get_records(app_id, query, self.fields)
+            if not response.success:
+                raise RuntimeError(f"Failed to poll app {app_id}: {response.error}")
+            records = response.data.get("records", [])
+            if records:
+                yield records
+            if len(records) < PAGE_SIZE:
+                return
+            # 同じ更新日時のレコードが多くても進めるよう (更新日時, $id) のキーセットで続きを取得
+            last_updated = quote(_value(records[-1], code))
+            last_id = _value(records[-1], "$id")
+            condition = f"({code} > {last_updated} or ({code} = {last_updated} and $id > {last_id}))"
+
+    def _advance(self, app_id: int, watermark: AppWatermark, emit: bool = True) -> int:
+        """変更を取得してウォーターマークを進める（emit=False なら読み飛ばすだけ）"""
+        count = 0
+        # ポーリング中に max_id が進んでも、このポーリングより前からあったかどうかで判定する
+        known_max_id = watermark.max_id
+        for records in self._pages(app_id, watermark):
+            for record in records:
+                record_id = _value(record, "$id")
+                revision = _value(record, "$revision")
+                updated_at = _value(record, self.updated_field)
+                if updated_at == watermark.updated_at and watermark.revisions.get(record_id) == revision:
+                    continue  # 前回のポーリングで出力済み
+
+                if emit:
+                    event_type = "create" if int(record_id) > known_max_id else "update"
+                    self._emit(ChangeEvent(event_type, app_id, record_id, revision, updated_at, record))
+                    count += 1
+
+                if updated_at > watermark.updated_at:
+                    watermark.updated_at = updated_at
+                    watermark.revisions = {}
+                if updated_at == watermark.updated_at:
+                    watermark.revisions[record_id] = revision
+                watermark.max_id = max(watermark.max_id, int(record_id))
+                if watermark.known_ids is not None:
+                    watermark.known_ids.add(int(record_id))
+            self._save_checkpoint(app_id, watermark)
+        return count
+
+    def _scan_deletes(self, app_id: int, watermark: AppWatermark, emit: bool = True) -> int:
+        """$id 一覧を取得し、前回から消えたレコードを delete として出力"""
+        current = {int(_value(r, "$id")) for r in self.crud.read(app_id, fields=["$id"])}
+        deleted = sorted(watermark.known_ids - current) if watermark.known_ids is not None else []
+        if emit:
+            for record_id in deleted:
+                self._emit(ChangeEvent("delete", app_id, str(record_id)))
+        watermark.known_ids = current
+        if current:
+            watermark.max_id = max(watermark.max_id, max(current))
+        self._save_checkpoint(app_id, watermark, with_ids=True)
+        return len(deleted)
+
+    def _baseline(self, app_id: int) -> AppWatermark:
+        """チェックポイントのないアプリの開始位置を決める"""
+        watermark = AppWatermark()
+        if self.start == "beginning":
+            if self.delete_scan_every:
+                watermark.known_ids = set()
+            return watermark
+
+        code = self.updated_field
+        response = self.crud.client.get_records(app_id, f"order by {code} desc limit 1", ["$id", code])
+        if not response.success:
+            raise RuntimeError(f"Failed to poll app {app_id}: {response.error}")
+        records = response.data.get("records", [])
+        if records:
+            # 最新の分に更新されたレコードを出力済みとして記録
+            watermark.updated_at = _value(records[0], code)
+            self._advance(app_id, watermark, emit=False)
+        if self.delete_scan_every:
+            self._scan_deletes(app_id, watermark, emit=False)
+        else:
+            response = self.crud.client.get_records(app_id, "order by $id desc limit 1", ["$id"])
+            if not response.success:
+                raise RuntimeError(f"Failed to poll app {app_id}: {response.error}")
+            for record in response.data.get("records", []):
+                watermark.max_id = int(_value(record, "$id"))
+        self._save_checkpoint(app_id, watermark)
+        return watermark
+
+    def poll(self, app_id: int) -> int:
+        """アプリを1回ポーリングしてイベントを出力
+
+        Returns:
+            int: 出力したイベント数
+
+        Raises:
+            RuntimeError: API エラー
+        """
+        watermark = self.watermarks.get(app_id)
+        if watermark is None:
+            watermark = self._baseline(app_id)
+            self.watermarks[app_id] = watermark
+            if self.start == "now":
+                return 0
+
+        count = self._advance(app_id, watermark)
+        watermark.polls += 1
+        if self.delete_scan_every and watermark.polls % self.delete_scan_every == 0:
+            if watermark.known_ids is None:
+                # 削除検知を途中から有効にした場合は今回の一覧を基準にする
+                self._scan_deletes(app_id, watermark, emit=False)
+            else:
+                count += self._scan_deletes(app_id, watermark)
+        self._save_checkpoint(app_id, watermark)
+        return count
+
+    def _next_interval(self, app_id: int, count: int) -> float:
+        """変更があれば最小間隔に戻し、なければ（エラー時も）間隔を伸ばす"""
+        if count:
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self.intervals[app_id] * self.backoff)
+        self.intervals[app_id] = interval
+        return interval
+
+    def _poll_safely(self, app_id: int) -> int:
+        try:
+            return self.poll(app_id)
+        except RuntimeError as e:
+            print(f"⚠️  App {app_id}: {e}", file=sys.stderr)
+            return 0
+
+    def run_once(self) -> dict[int, int]:
+        """全アプリを1回ずつ並列にポーリング
+
+        Returns:
+            dict[int, int]: アプリ ID ごとのイベント数
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.app_ids)))) as executor:
+            counts = list(executor.map(self._poll_safely, self.app_ids))
+        return dict(zip(self.app_ids, counts))
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """stop がセットされるまでポーリングを続ける
+
+        アプリごとに次回のポーリング時刻を持ち、期限の来たアプリから
+        max_workers 本まで並列に実行します。
+        """
+        stop = stop or threading.Event()
+        due = {app_id: time.monotonic() for app_id in self.app_ids}
+        running: dict[Any, int] = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            while not stop.is_set():
+                now = time.monotonic()
+                for app_id, at in list(due.items()):
+                    if at <= now and len(running) < self.max_workers:
+                        del due[app_id]
+                        running[executor.submit(self._poll_safely, app_id)] = app_id
+
+                timeout = min([_TICK, *(max(0.0, at - now) for at in due.values())])
+                if not running:
+                    stop.wait(timeout)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    app_id = running.pop(future)
+                    due[app_id] = time.monotonic() + self._next_interval(app_id, future.result())
+            # 実行中のポーリングは完了を待つ（チェックポイントを書き終えるため）
+            wait(running)
+
+
+def main():
+    import argparse
+
+    from kintone_client import KintoneClient
+    from kintone_quota import QuotaTracker
+
+    parser = argparse.ArgumentParser(description="KINTONE change feed (NDJSON events)")
+    parser.add_argument("apps", type=str, help="App IDs comma-separated")
+    parser.add_argument("--checkpoint", type=str, help="Checkpoint file (default: <cache_dir>/watch/checkpoint.json)")
+    parser.add_argument("--from", dest="start", choices=["now", "beginning"], default="now",
+                        help="Start position for apps without checkpoint")
+    parser.add_argument("--fields", type=str, help="Fields to include in events (comma-separated)")
+    parser.add_argument("--min-interval", type=float, default=5.0, help="Minimum polling interval in seconds")
+    parser.add_argument("--max-interval", type=float, default=300.0, help="Maximum polling interval in seconds")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Interval multiplier for quiet apps")
+    parser.add_argument("--detect-deletes", type=int, default=0, metavar="N",
+                        help="Scan $id list every N polls to detect deletes (0: disabled)")
+    parser.add_argument("--workers", type=int, default=4, help="Apps polled concurrently")
+    parser.add_argument("--once", action="store_true", help="Poll every app once and exit")
+
+    args = parser.parse_args()
+
+    try:
+        app_ids = [int(x) for x in args.apps.split(",") if x.strip()]
+    except ValueError:
+        parser.error(f"invalid app IDs: {args.apps}")
+
+    client = KintoneClient.shared()
+    client.add_hook(QuotaTracker(client.config))
+    watcher = ChangeWatcher(
+        KintoneCRUD(client),
+        app_ids,
+        checkpoint=args.checkpoint,
+        fields=[f.strip() for f in args.fields.split(",")] if args.fields else None,
+        start=args.start,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        backoff=args.backoff,
+        delete_scan_every=args.detect_deletes,
+        max_workers=args.workers,
+    )
+    if args.once:
+        watcher.run_once()
+        return
+
+    stop = threading.Event()
+    try:
+        watcher.run(stop)
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
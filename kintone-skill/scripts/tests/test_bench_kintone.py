@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Tests for benchmarks/bench_kintone.py"""
+
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "benchmarks"))
+
+import unittest
+import bench_kintone
+from bench_kintone import compare, run_benchmarks
+
+
+def _results(**values):
+    return {"results": {
+        name: {"value": value, "unit": "", "higher_is_better": name != "format_record"}
+        for name, value in values.items()
+    }}
+
+
+class TestCompare(unittest.TestCase):
+    """Tests for regression detection"""
+
+    def test_throughput_drop_is_regression(self):
+        regressions = compare(_results(search_all=70.0), _results(search_all=100.0), threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("search_all", regressions[0])
+
+    def test_within_threshold(self):
+        self.assertEqual(compare(_results(search_all=85.0), _results(search_all=100.0), 0.2), [])
+
+    def test_lower_is_better(self):
+        self.assertEqual(compare(_results(format_record=5.0), _results(format_record=10.0), 0.2), [])
+        self.assertEqual(len(compare(_results(format_record=13.0), _results(format_record=10.0), 0.2)), 1)
+
+    def test_missing_baseline_entry_is_ignored(self):
+        self.assertEqual(compare(_results(upload=1.0), {"results": {}}), [])
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """Smoke test against the embedded fake server"""
+
+    def test_small_run(self):
+        results = run_benchmarks(["search_all", "add_many", "schema_cache_hit"], records=50, repeat=1)
+        self.assertEqual(set(results["results"]), {"search_all", "add_many", "schema_cache_hit"})
+        self.assertGreater(results["results"]["search_all"]["value"], 0)
+        self.assertEqual(results["meta"]["seed"], 42)
+
+    def test_real_credentials_not_used(self):
+        """Test that KINTONE_* variables of the user never reach the fake server"""
+        servers = []
+
+        class Recording(bench_kintone.FakeKintoneServer):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                servers.append(self)
+
+        env = {"KINTONE_APP_TOKENS": "1:real-token", "KINTONE_DEFAULT_APP": "9", "KINTONE_CACHE_TTL": "5"}
+        with mock.patch.dict(os.environ, env), mock.patch.object(bench_kintone, "FakeKintoneServer", Recording):
+            run_benchmarks(["search_all"], records=10, repeat=1)
+            self.assertEqual(os.environ["KINTONE_APP_TOKENS"], "1:real-token")  # 終了後に元に戻す
+        tokens = {token for _, _, token in servers[0].request_tokens}
+        self.assertEqual(tokens, {"benchmark"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Tests for kintone_backup module"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+import kintone_backup
+from kintone_backup import BackupManager
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_quota import QuotaScheduler, QuotaTracker
+
+FIELDS = {"名前": "SINGLE_LINE_TEXT", "金額": "NUMBER", "添付": "FILE"}
+
+
+class TestBackupManager(unittest.TestCase):
+    """Tests for BackupManager against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "Orders", FIELDS)
+        self.server.add_app(2, "Customers", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_app(3, "Restored", FIELDS)
+        records = [{"名前": f"R{i}", "金額": i} for i in range(1200)]
+        for i in (5, 6):  # 同じ内容のファイルは1つだけ保存
+            records[i]["添付"] = [{"fileKey": self.server.add_file(b"same", f"f{i}.txt", "text/plain")}]
+        self.server.add_records(1, records)
+        self.server.add_records(2, [{"名前": "X"}])
+        # 差分バックアップを確かめるため、既存レコードの更新日時を過去にする
+        for app in self.server.apps.values():
+            for record in app.records.values():
+                record["更新日時"]["value"] = "2020-01-01T00:00:00Z"
+        self.server.apps[1].records[1200]["更新日時"]["value"] = "2020-01-02T00:00:00Z"
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(self.config))
+        self.directory = Path(tempfile.mkdtemp())
+
+    def manager(self, **kwargs):
+        return BackupManager(self.crud, self.directory, segment_records=500, **kwargs)
+
+    def test_full_backup(self):
+        with mock.patch.object(kintone_backup, "APPS_PAGE_SIZE", 2):
+            snapshot = self.manager().backup()
+        self.assertTrue(snapshot.success)
+        self.assertEqual(sorted(snapshot.apps), [1, 2, 3])
+        orders = snapshot.apps[1]
+        self.assertEqual((orders.full, orders.records, orders.files), (True, 1200, 2))
+        self.assertEqual(len(orders.segments), 3)
+        self.assertEqual(orders.updated_at, "2020-01-02T00:00:00Z")
+        self.assertEqual(len(list((self.directory / "files").glob("*/*"))), 1)
+        self.assertTrue((snapshot.path / "apps" / "1" / "schema.json").exists())
+        self.assertEqual(self.server.cursors, {})
+
+        manager = self.manager()
+        self.assertEqual([s.name for s in manager.snapshots()], [snapshot.name])
+        records = list(manager.read_records(snapshot, orders))
+        self.assertEqual([r["$id"]["value"] for r in records[:3]], ["1", "2", "3"])
+        self.assertIn("sha256", records[5]["添付"]["value"][0])
+
+    def test_incremental_backup_and_restore(self):
+        manager = self.manager()
+        first = manager.backup(app_ids=[1])
+        self.crud.client.update_record(1, 10, {"名前": {"value": "updated"}})
+        self.crud.client.delete_records(1, [11])
+        self.crud.client.add_record(1, {"名前": {"value": "new"}})
+
+        with mock.patch("kintone_backup._snapshot_name", return_value="20990101T000000Z"):
+            second = manager.backup(app_ids=[1])
+        self.assertEqual(second.base, first.name)
+        # 更新・追加した2件と、ウォーターマークと同じ分に更新された $id 1200
+        self.assertEqual((second.apps[1].full, second.apps[1].records), (False, 3))
+        self.assertEqual(manager.files.downloaded, 2)  # 2回目はダウンロードしない
+
+        [result] = manager.restore(apps={1: 3}).values()
+        self.assertTrue(result.success)
+        self.assertEqual((result.copied, result.files), (1200, 2))
+        restored = {r["名前"]["value"]: r for r in self.server.records(3)}
+        self.assertIn("updated", restored)
+        self.assertIn("new", restored)
+        self.assertNotIn("R9", restored)   # $id 10 は更新後の版
+        self.assertNotIn("R10", restored)  # $id 11 は削除済み
+        [info] = restored["R5"]["添付"]["value"]
+        self.assertEqual(self.server.files[info["fileKey"]][2], b"same")
+
+        # 完了したリストアを再実行しても追加しない
+        [result] = manager.restore(apps={1: 3}).values()
+        self.assertEqual(result.copied, 0)
+        self.assertEqual(len(self.server.records(3)), 1200)
+
+    def test_deferred_by_quota(self):
+        tracker = QuotaTracker(self.config, limit=10)
+        self.crud.client.add_hook(tracker)
+        scheduler = QuotaScheduler(tracker, output=io.StringIO())
+        snapshot = self.manager(scheduler=scheduler).backup(app_ids=[1, 2])
+        self.assertEqual(snapshot.apps[1].status, "deferred")
+        self.assertEqual(snapshot.apps[2].status, "done")
+        self.assertFalse(snapshot.success)
+
+        # 保留したアプリは次回に全件を保存
+        tracker.limits[1] = 10000
+        snapshot = self.manager(scheduler=scheduler).backup(app_ids=[1, 2])
+        self.assertEqual((snapshot.apps[1].full, snapshot.apps[1].records), (True, 1200))
+        self.assertFalse(snapshot.apps[2].full)
+
+    def test_restore_errors(self):
+        manager = self.manager(include_files=False)
+        with self.assertRaises(ValueError):
+            manager.restore()
+        manager.backup(app_ids=[2])
+        with self.assertRaises(ValueError):
+            manager.restore(apps={1: 3})
+        # 同じアプリへ書き戻すとレコードが重複するので、force がなければ拒否する
+        with self.assertRaises(ValueError):
+            manager.restore()
+        self.assertEqual(len(self.server.records(2)), 1)
+        [result] = manager.restore(force=True).values()
+        self.assertEqual(result.copied, 1)
+        self.assertEqual(len(self.server.records(2)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
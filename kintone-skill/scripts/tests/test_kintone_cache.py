@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Tests for kintone_cache module"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_cache import ResponseCache
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_fake_server import FakeKintoneServer
+
+
+class TestResponseCache(unittest.TestCase):
+    """Tests for KintoneClient with ResponseCache against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "App1", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_app(2, "App2", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": "A"}, {"名前": "B"}])
+        self.server.add_records(2, [{"名前": "X"}])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+
+    def client(self, **kwargs):
+        kwargs.setdefault("ttls", {"records.json": 60})
+        return KintoneClient(self.config, cache=ResponseCache(**kwargs))
+
+    def test_repeated_reads_hit_cache(self):
+        client = self.client()
+        for _ in range(3):
+            self.assertEqual(client.get_record(1, 1).data["record"]["名前"]["value"], "A")
+            self.assertTrue(client.get_app(1).success)
+            self.assertTrue(client.get_form_fields(1).success)
+        self.assertEqual(self.server.count("GET", "record.json"), 1)
+        self.assertEqual(self.server.count("GET", "app.json"), 1)
+        self.assertEqual(client.cache.stats()["hits"], 6)
+        self.assertEqual(client.cache.stats()["misses"], 3)
+
+    def test_cached_data_is_copied(self):
+        client = self.client()
+        client.get_record(1, 1).data["record"]["名前"]["value"] = "changed"
+        self.assertEqual(client.get_record(1, 1).data["record"]["名前"]["value"], "A")
+
+    def test_update_invalidates_record_and_queries(self):
+        client = self.client()
+        client.get_record(1, 1)
+        client.get_record(1, 2)
+        client.get_records(1, "order by $id asc")
+        client.get_record(2, 1)
+
+        self.assertTrue(client.update_record(1, 1, {"名前": {"value": "A2"}}).success)
+        self.assertEqual(client.get_record(1, 1).data["record"]["名前"]["value"], "A2")
+        self.assertEqual(client.get_records(1, "order by $id asc").data["records"][0]["名前"]["value"], "A2")
+        client.get_record(1, 2)
+        client.get_record(2, 1)
+        self.assertEqual(self.server.count("GET", "record.json"), 4)  # 1/1 を再取得、1/2 と 2/1 はキャッシュ
+        self.assertEqual(self.server.count("GET", "records.json"), 2)
+
+    def test_add_delete_and_bulk_invalidate(self):
+        client = self.client()
+        self.assertEqual(len(client.get_records(1).data["records"]), 2)
+        client.add_record(1, {"名前": {"value": "C"}})
+        self.assertEqual(len(client.get_records(1).data["records"]), 3)
+        client.delete_records(1, [3])
+        self.assertEqual(len(client.get_records(1).data["records"]), 2)
+
+        client.get_record(1, 2)
+        client.bulk_request([{"method": "PUT", "api": "/k/v1/record.json",
+                              "payload": {"app": 1, "id": 2, "record": {"名前": {"value": "B2"}}}}])
+        self.assertEqual(client.get_record(1, 2).data["record"]["名前"]["value"], "B2")
+
+    def test_failed_write_keeps_cache(self):
+        client = self.client()
+        client.get_record(1, 1)
+        self.assertFalse(client.update_record(1, 1, {"名前": {"value": "x"}}, revision=99).success)
+        client.get_record(1, 1)
+        self.assertEqual(self.server.count("GET", "record.json"), 1)
+
+    def test_errors_and_uncached_endpoints(self):
+        client = self.client(ttls={"records.json": 0})
+        client.get_record(1, 99)
+        client.get_record(1, 99)
+        client.get_records(1)
+        client.get_records(1)
+        self.assertEqual(self.server.count("GET", "record.json"), 2)
+        self.assertEqual(self.server.count("GET", "records.json"), 2)
+
+    def test_lru_bound(self):
+        client = self.client(max_entries=1)
+        client.get_record(1, 1)
+        client.get_record(1, 2)
+        client.get_record(1, 1)
+        self.assertEqual(self.server.count("GET", "record.json"), 3)
+        self.assertEqual(client.cache.stats()["entries"], 1)
+
+    def test_disk_tier_shared_between_clients(self):
+        path = self.config.cache_dir / "responses.sqlite"
+        first, second = self.client(path=path), self.client(path=path)
+        first.get_record(1, 1)
+        second.get_record(1, 1)
+        self.assertEqual(self.server.count("GET", "record.json"), 1)
+        self.assertEqual(second.cache.stats()["disk_hits"], 1)
+
+        first.update_record(1, 1, {"名前": {"value": "A2"}})
+        third = self.client(path=path)
+        self.assertEqual(third.get_record(1, 1).data["record"]["名前"]["value"], "A2")
+
+    def test_token_is_part_of_key(self):
+        other = KintoneConfig(domain=self.server.base_url, api_token="other", cache_dir=self.config.cache_dir)
+        self.assertNotEqual(ResponseCache.key(self.config, "record.json", {"app": 1, "id": 1}),
+                            ResponseCache.key(other, "record.json", {"app": 1, "id": 1}))
+        self.assertEqual(ResponseCache.key(self.config, "record.json", {"app": 1, "id": 1}),
+                         ResponseCache.key(self.config, "record.json", {"id": 1, "app": 1}))
+        self.assertNotEqual(ResponseCache.key(self.config, "record.json", {"app": 1, "id": 1}),
+                            ResponseCache.key(self.config, "record.json", {"app": 1, "id": 1}, "app-token"))
+
+    def test_stale_response_not_stored_after_invalidation(self):
+        cache = ResponseCache()
+        key = ResponseCache.key(self.config, "record.json", {"app": 1, "id": 1})
+        generation = cache.generation
+        cache.invalidate(1, [1])
+        cache.put(key, "record.json", {"app": 1, "id": 1}, {"record": {}}, generation)
+        self.assertIsNone(cache.get(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
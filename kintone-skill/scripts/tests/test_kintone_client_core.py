@@ -2,7 +2,9 @@
 """Tests for kintone_client core methods (CRUD, app info, files)"""
 
 import sys
+import gzip
 import json
+import zlib
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 import urllib.error
@@ -10,7 +12,7 @@ import urllib.error
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import unittest
-from kintone_client import KintoneClient, KintoneResponse, KintoneConfig
+from kintone_client import KintoneClient, KintoneResponse, KintoneConfig, _decompress, json_loads
 
 
 class TestKintoneResponse(unittest.TestCase):
@@ -130,6 +132,61 @@ class TestMakeRequest(unittest.TestCase):
         self.assertIn("timeout", result.error)
 
 
+class TestCompression(unittest.TestCase):
+    """Tests for compressed transfer and JSON decoding"""
+
+    def setUp(self):
+        self.client = KintoneClient(KintoneConfig(domain="test.cybozu.com", api_token="test-token"))
+        self.payload = json.dumps({"records": [{"名前": {"value": "田中"}}] * 50}).encode("utf-8")
+
+    def test_decompress(self):
+        """Test gzip, zlib deflate and raw deflate bodies"""
+        raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw_deflate = raw.compress(self.payload) + raw.flush()
+        self.assertEqual(_decompress(gzip.compress(self.payload), "gzip"), self.payload)
+        self.assertEqual(_decompress(zlib.compress(self.payload), "deflate"), self.payload)
+        self.assertEqual(_decompress(raw_deflate, "deflate"), self.payload)
+        self.assertEqual(_decompress(self.payload, None), self.payload)
+
+    def test_json_loads_from_bytes(self):
+        """Test decoding UTF-8 bytes directly"""
+        self.assertEqual(json_loads(self.payload)["records"][0]["名前"]["value"], "田中")
+
+    @patch("urllib.request.urlopen")
+    def test_gzip_response(self, mock_urlopen):
+        """Test Accept-Encoding header and gzip response decoding"""
+        mock_response = MagicMock()
+        mock_response.read.return_value = gzip.compress(self.payload)
+        mock_response.headers = {"Content-Encoding": "gzip"}
+        mock_response.__enter__ = MagicMock(return_value=mock_response)
+        mock_response.__exit__ = MagicMock(return_value=False)
+        mock_urlopen.return_value = mock_response
+
+        result = self.client._make_request("GET", "records.json", params={"app": 1})
+
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.data["records"]), 50)
+        request = mock_urlopen.call_args[0][0]
+        self.assertIn("gzip", request.get_header("Accept-encoding"))
+
+    @patch("urllib.request.urlopen")
+    def test_gzip_error_response(self, mock_urlopen):
+        """Test compressed error bodies"""
+        body = gzip.compress(b'{"message": "Not found", "code": "GAIA_RE01"}')
+        mock_urlopen.side_effect = urllib.error.HTTPError(
+            url="https://test.cybozu.com/k/v1/record.json",
+            code=404,
+            msg="Not Found",
+            hdrs={"Content-Encoding": "gzip"},
+            fp=MagicMock(read=MagicMock(return_value=body)),
+        )
+
+        result = self.client._make_request("GET", "record.json")
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_code, "GAIA_RE01")
+
+
 class TestRecordOperations(unittest.TestCase):
     """Tests for record CRUD operations"""
 
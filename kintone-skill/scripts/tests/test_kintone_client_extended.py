@@ -2,6 +2,8 @@
 """Tests for extended kintone_client features (Cursor, Status, Comment, Bulk)"""
 
 import sys
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -9,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import unittest
 from kintone_client import KintoneClient, KintoneResponse, KintoneConfig
+from kintone_fake_server import FakeKintoneServer
 
 
 class TestCursorAPI(unittest.TestCase):
@@ -177,6 +180,33 @@ class TestStatusAPI(unittest.TestCase):
         call_args = mock_request.call_args[1]["data"]
         self.assertEqual(call_args["revision"], 4)
 
+    @patch.object(KintoneClient, "_make_request")
+    def test_update_statuses(self, mock_request):
+        """Test bulk status update uses records/status.json"""
+        mock_request.return_value = KintoneResponse(
+            success=True,
+            data={"records": [{"id": "1", "revision": "3"}]},
+        )
+        records = [{"id": 1, "action": "Approve"}]
+
+        result = self.client.update_statuses(app_id=123, records=records)
+
+        self.assertTrue(result.success)
+        mock_request.assert_called_once_with(
+            "PUT",
+            "records/status.json",
+            data={"app": 123, "records": records},
+        )
+
+    def test_update_statuses_limit_exceeded(self):
+        """Test bulk status update fails when exceeding 100 records"""
+        records = [{"id": i, "action": "Approve"} for i in range(101)]
+
+        result = self.client.update_statuses(app_id=123, records=records)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_code, "LIMIT_EXCEEDED")
+
 
 class TestCommentAPI(unittest.TestCase):
     """Tests for Comment API"""
@@ -346,5 +376,137 @@ class TestBulkRequestAPI(unittest.TestCase):
         self.assertIn("20", result.error)
 
 
+class TestSingleFlight(unittest.TestCase):
+    """Tests for coalescing identical concurrent GETs"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer(latency=0.2).start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "App", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": "A"}, {"名前": "B"}])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake")
+
+    def run_concurrently(self, *calls):
+        results = [None] * len(calls)
+        barrier = threading.Barrier(len(calls))
+
+        def run(i, call):
+            barrier.wait()
+            results[i] = call()
+
+        threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        return results
+
+    def test_identical_gets_share_one_request(self):
+        client = KintoneClient(self.config)
+        results = self.run_concurrently(*[lambda: client.get_record(1, 1)] * 8)
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(self.server.count("GET", "record.json"), 1)
+        self.assertEqual(client.coalesced, 7)
+        # 呼び出し側ごとに別のオブジェクト
+        results[0].data["record"]["名前"]["value"] = "changed"
+        self.assertEqual(results[1].data["record"]["名前"]["value"], "A")
+
+    def test_different_params_not_coalesced(self):
+        client = KintoneClient(self.config)
+        self.run_concurrently(lambda: client.get_record(1, 1), lambda: client.get_record(1, 2))
+        self.assertEqual(self.server.count("GET", "record.json"), 2)
+
+    def test_errors_shared(self):
+        client = KintoneClient(self.config)
+        results = self.run_concurrently(*[lambda: client.get_record(1, 99)] * 4)
+        self.assertEqual({r.error_code for r in results}, {"GAIA_RE01"})
+        self.assertEqual(self.server.count("GET", "record.json"), 1)
+
+    def test_read_after_write_not_coalesced(self):
+        """Test that a GET started after a write does not join an earlier GET"""
+        client = KintoneClient(self.config)
+        self.server.latency = 1.0
+        slow = threading.Thread(target=client.get_record, args=(1, 1))
+        slow.start()
+        time.sleep(0.2)
+        self.server.latency = 0
+        self.assertTrue(client.update_record(1, 1, {"名前": {"value": "changed"}}).success)
+        started = time.monotonic()
+        result = client.get_record(1, 1)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(result.data["record"]["名前"]["value"], "changed")
+        self.assertEqual(client.coalesced, 0)
+        slow.join(timeout=10)
+        self.assertEqual(self.server.count("GET", "record.json"), 2)
+
+    def test_cursor_gets_and_disabled_client_not_coalesced(self):
+        client = KintoneClient(self.config, coalesce=False)
+        self.run_concurrently(*[lambda: client.get_record(1, 1)] * 3)
+        self.assertEqual(self.server.count("GET", "record.json"), 3)
+
+        client = KintoneClient(self.config)
+        cursor_id = client.create_cursor(1, size=1).data["id"]
+        pages = self.run_concurrently(*[lambda: client.get_cursor_records(cursor_id)] * 2)
+        ids = sorted(p.data["records"][0]["$id"]["value"] for p in pages)
+        self.assertEqual(ids, ["1", "2"])
+
+
+
+class TestTokenRouting(unittest.TestCase):
+    """Tests for per-app API token routing against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        for app_id in (1, 2, 3):
+            self.server.add_app(app_id, f"App{app_id}", {"名前": "SINGLE_LINE_TEXT"})
+            self.server.add_records(app_id, [{"名前": "A"}])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="default",
+                                    app_tokens={1: "tok-1", 2: "tok-2"})
+
+    def tokens(self, endpoint):
+        return [token for _, e, token in self.server.request_tokens if e == endpoint]
+
+    def test_requests_use_app_token(self):
+        client = KintoneClient(self.config)
+        client.get_record(1, 1)
+        client.get_record(2, 1)
+        client.get_record(3, 1)
+        client.get_app(2)
+        client.update_record(1, 1, {"名前": {"value": "B"}})
+        self.assertEqual(self.tokens("record.json"), ["tok-1", "tok-2", "default", "tok-1"])
+        self.assertEqual(self.tokens("app.json"), ["tok-2"])
+
+    def test_bulk_request_joins_tokens(self):
+        client = KintoneClient(self.config)
+        client.bulk_request([
+            {"method": "PUT", "api": "/k/v1/record.json", "payload": {"app": 1, "id": 1, "record": {}}},
+            {"method": "PUT", "api": "/k/v1/record.json", "payload": {"app": 2, "id": 1, "record": {}}},
+        ])
+        self.assertEqual(self.tokens("bulkRequest.json"), ["tok-1,tok-2"])
+
+    def test_cursor_requests_use_cursor_app_token(self):
+        client = KintoneClient(self.config)
+        cursor_id = client.create_cursor(2).data["id"]
+        client.get_cursor_records(cursor_id)
+        client.delete_cursor(cursor_id)
+        self.assertEqual(self.tokens("records/cursor.json"), ["tok-2"] * 3)
+        self.assertEqual(client._cursor_apps, {})
+
+    def test_pool_per_token(self):
+        client = KintoneClient.shared(self.config)
+        self.addCleanup(KintoneClient.reset_shared)
+        for _ in range(2):
+            client.get_records(1)
+            client.get_records(2)
+            client.get_records(3)
+        self.assertEqual(set(client._token_pools), {"tok-1", "tok-2"})
+        self.assertEqual(client.pool.created, 1)
+        self.assertEqual(client._token_pools["tok-1"].reused, 1)
+
+        other = KintoneConfig(domain=self.server.base_url, api_token="default")
+        self.assertIsNot(KintoneClient.shared(other), client)
+
+
 if __name__ == "__main__":
     unittest.main()
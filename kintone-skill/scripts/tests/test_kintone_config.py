@@ -37,6 +37,14 @@ class TestKintoneConfig(unittest.TestCase):
         )
         self.assertEqual(config.base_url, "https://test.cybozu.com")
 
+    def test_base_url_with_scheme(self):
+        """Test base_url keeps an explicit scheme (local test servers)"""
+        config = KintoneConfig(
+            domain="http://127.0.0.1:8080/",
+            api_token="test-token",
+        )
+        self.assertEqual(config.base_url, "http://127.0.0.1:8080")
+
     def test_ensure_cache_dir(self):
         """Test ensure_cache_dir creates directory"""
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -105,6 +113,70 @@ class TestKintoneConfig(unittest.TestCase):
             finally:
                 os.unlink(f.name)
 
+    def test_from_file_app_tokens(self):
+        """Test app_tokens in config file (string or list)"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump({
+                "domain": "file.cybozu.com",
+                "app_tokens": {"10": "tok-a", "20": ["tok-b", "tok-c"]},
+            }, f)
+        try:
+            config = KintoneConfig.from_file(Path(f.name))
+            self.assertEqual(config.api_token, "")
+            self.assertEqual(config.app_tokens, {10: "tok-a", 20: "tok-b,tok-c"})
+        finally:
+            os.unlink(f.name)
+
+
+class TestAppTokens(unittest.TestCase):
+    """Tests for per-app API token routing"""
+
+    def setUp(self):
+        self.config = KintoneConfig(
+            domain="test.cybozu.com",
+            api_token="default",
+            app_tokens={1: "tok-1", 2: "tok-2a,tok-2b"},
+        )
+
+    def test_token_for_single_app(self):
+        self.assertEqual(self.config.token_for([1]), "tok-1")
+        self.assertEqual(self.config.token_for(["2"]), "tok-2a,tok-2b")
+
+    def test_token_for_unknown_or_no_app_uses_default(self):
+        self.assertEqual(self.config.token_for([99]), "default")
+        self.assertEqual(self.config.token_for(), "default")
+
+    def test_token_for_multiple_apps_joins(self):
+        self.assertEqual(self.config.token_for([1, 2, 1]), "tok-1,tok-2a,tok-2b")
+        self.assertEqual(self.config.token_for([1, 99]), "tok-1,default")
+
+    def test_add_app_token(self):
+        self.config.add_app_token(1, "tok-1", "tok-lookup")
+        self.assertEqual(self.config.app_tokens[1], "tok-1,tok-lookup")
+        with self.assertRaises(ValueError):
+            self.config.add_app_token(3)
+
+    def test_credentials_include_app_tokens(self):
+        other = KintoneConfig(domain="test.cybozu.com", api_token="default")
+        self.assertNotEqual(self.config.credentials, other.credentials)
+
+    def test_from_env_app_tokens(self):
+        with patch.dict(os.environ, {
+            "KINTONE_DOMAIN": "env.cybozu.com",
+            "KINTONE_APP_TOKENS": "123:tokA,tokB; 456:tokC",
+        }, clear=True):
+            config = KintoneConfig.from_env()
+            self.assertEqual(config.app_tokens, {123: "tokA,tokB", 456: "tokC"})
+            self.assertEqual(get_config().app_tokens, config.app_tokens)
+
+    def test_from_env_invalid_app_tokens(self):
+        with patch.dict(os.environ, {
+            "KINTONE_DOMAIN": "env.cybozu.com",
+            "KINTONE_APP_TOKENS": "abc:tokA",
+        }, clear=True):
+            with self.assertRaises(ValueError):
+                KintoneConfig.from_env()
+
 
 class TestGetConfig(unittest.TestCase):
     """Tests for get_config function"""
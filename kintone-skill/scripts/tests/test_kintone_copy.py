@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Tests for kintone_copy module"""
+
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_copy import FieldMap, RecordCopier, compatible, parse_mapping
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_schema import AppSchema, FieldInfo
+
+
+def schema(app_id, fields, lookup=None):
+    infos = {code: FieldInfo(code, code, field_type) for code, field_type in fields.items()}
+    if lookup:
+        infos[lookup["key"]].lookup = {"fieldMappings": [{"field": f} for f in lookup["fields"]]}
+    return AppSchema(app_id, f"App{app_id}", infos, 0.0)
+
+
+class TestFieldMap(unittest.TestCase):
+    """Tests for FieldMap.compile"""
+
+    def setUp(self):
+        self.source = schema(1, {
+            "$id": "__ID__", "レコード番号": "RECORD_NUMBER", "作成者": "CREATOR", "作成日時": "CREATED_TIME",
+            "名前": "SINGLE_LINE_TEXT", "金額": "NUMBER", "区分": "DROP_DOWN", "タグ": "CHECK_BOX",
+            "顧客ID": "SINGLE_LINE_TEXT", "顧客名": "SINGLE_LINE_TEXT", "合計": "NUMBER",
+        })
+        self.target = schema(2, {
+            "$id": "__ID__", "レコード番号": "RECORD_NUMBER", "登録者": "CREATOR", "作成日時": "CREATED_TIME",
+            "氏名": "SINGLE_LINE_TEXT", "金額": "MULTI_LINE_TEXT", "区分": "RADIO_BUTTON", "タグ": "DATE",
+            "顧客ID": "SINGLE_LINE_TEXT", "顧客名": "SINGLE_LINE_TEXT", "合計": "CALC",
+        }, lookup={"key": "顧客ID", "fields": ["顧客名"]})
+
+    def test_compile(self):
+        field_map = FieldMap.compile(self.source, self.target, {"名前": "氏名"})
+        rules = {rule.source: rule.target for rule in field_map.rules}
+        self.assertEqual(rules, {
+            "作成者": "登録者", "作成日時": "作成日時", "名前": "氏名", "金額": "金額", "区分": "区分", "顧客ID": "顧客ID",
+        })
+        self.assertEqual(field_map.skipped["タグ"], "type CHECK_BOX -> DATE")
+        self.assertEqual(field_map.skipped["顧客名"], "filled by lookup in target")
+        self.assertEqual(field_map.skipped["合計"], "read-only in target (CALC)")
+        self.assertEqual(field_map.source_fields[0], "$id")
+        self.assertNotIn("タグ", field_map.source_fields)
+
+    def test_without_meta_and_excluded(self):
+        field_map = FieldMap.compile(self.source, self.target, {"名前": None}, preserve_meta=False)
+        sources = {rule.source for rule in field_map.rules}
+        self.assertFalse(sources & {"作成者", "作成日時", "名前"})
+        self.assertEqual(field_map.skipped["名前"], "excluded")
+
+    def test_explicit_mapping_errors(self):
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"タグ": "タグ"})  # 型が合わない
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"名前": "ない"})
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"ない": "氏名"})
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"名前": "顧客ID"})  # 顧客ID が重複
+
+    def test_subtable_inner_fields(self):
+        def table(fields):
+            return FieldInfo("明細", "明細", "SUBTABLE", fields={
+                code: FieldInfo(code, code, field_type) for code, field_type in fields.items()
+            })
+
+        self.source.fields["明細"] = table({"品名": "SINGLE_LINE_TEXT", "数量": "NUMBER", "小計": "CALC", "備考": "DATE"})
+        self.target.fields["明細"] = table({"商品": "SINGLE_LINE_TEXT", "数量": "SINGLE_LINE_TEXT", "小計": "CALC", "備考": "NUMBER"})
+        field_map = FieldMap.compile(self.source, self.target, {"明細.品名": "商品"})
+        [rule] = [rule for rule in field_map.rules if rule.source == "明細"]
+        self.assertEqual(
+            [(inner.source, inner.target, inner.target_type) for inner in rule.rules],
+            [("品名", "商品", "SINGLE_LINE_TEXT"), ("数量", "数量", "SINGLE_LINE_TEXT")],
+        )
+        self.assertEqual(field_map.skipped["明細.小計"], "read-only in target (CALC)")
+        self.assertEqual(field_map.skipped["明細.備考"], "type DATE -> NUMBER")
+        self.assertIn("明細.品名 -> 明細.商品", field_map.describe())
+
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"明細.備考": "備考"})  # 型が合わない
+        with self.assertRaises(ValueError):
+            FieldMap.compile(self.source, self.target, {"明細.ない": "商品"})
+        self.target.fields["明細"] = table({"小計": "CALC"})
+        field_map = FieldMap.compile(self.source, self.target)
+        self.assertEqual(field_map.skipped["明細"], "no copyable fields in table")
+
+    def test_compatible(self):
+        self.assertTrue(compatible("NUMBER", "SINGLE_LINE_TEXT"))
+        self.assertTrue(compatible("MULTI_SELECT", "CHECK_BOX"))
+        self.assertTrue(compatible("CREATOR", "USER_SELECT"))
+        self.assertFalse(compatible("SINGLE_LINE_TEXT", "DATE"))
+
+    def test_parse_mapping(self):
+        self.assertEqual(parse_mapping("旧=新, メモ="), {"旧": "新", "メモ": None})
+        with self.assertRaises(ValueError):
+            parse_mapping("旧")
+
+
+class TestRecordCopier(unittest.TestCase):
+    """Tests for RecordCopier against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "Source", {"名前": "SINGLE_LINE_TEXT", "金額": "NUMBER", "添付": "FILE", "メモ": "MULTI_LINE_TEXT"})
+        self.server.add_app(2, "Target", {"氏名": "SINGLE_LINE_TEXT", "金額": "SINGLE_LINE_TEXT", "添付": "FILE"})
+        records = [{"名前": f"R{i}", "金額": i, "メモ": "x"} for i in range(250)]
+        records[3]["添付"] = [{"fileKey": self.server.add_file(b"hello", "a.txt", "text/plain")}]
+        self.server.add_records(1, records)
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(config))
+
+    def copier(self, **kwargs):
+        return RecordCopier(self.crud, 1, 2, mapping={"名前": "氏名"}, **kwargs)
+
+    def test_copy(self):
+        copier = self.copier()
+        self.assertEqual(copier.field_map.skipped["メモ"], "not in target")
+        result = copier.copy()
+        self.assertTrue(result.success)
+        self.assertEqual((result.read, result.copied, result.files, result.last_id), (250, 250, 1, 250))
+
+        copied = self.server.records(2)
+        self.assertEqual(sorted(r["氏名"]["value"] for r in copied), sorted(f"R{i}" for i in range(250)))
+        [with_file] = [r for r in copied if r.get("添付", {}).get("value")]
+        self.assertEqual(with_file["氏名"]["value"], "R3")
+        [info] = with_file["添付"]["value"]
+        self.assertEqual(info["name"], "a.txt")
+        self.assertEqual(self.server.files[info["fileKey"]][2], b"hello")
+        self.assertEqual(self.server.cursors, {})
+
+    def test_copy_subtable(self):
+        """Test that fields inside a table are mapped and converted by the field map"""
+        self.server.add_app(3, "Source", {"明細": {"品名": "SINGLE_LINE_TEXT", "数量": "NUMBER", "担当": "USER_SELECT", "小計": "CALC"}})
+        self.server.add_app(4, "Target", {"明細": {"商品": "SINGLE_LINE_TEXT", "数量": "SINGLE_LINE_TEXT", "担当": "USER_SELECT", "小計": "CALC"}})
+        self.server.add_records(3, [{"明細": [
+            {"value": {"品名": {"value": "りんご"}, "数量": {"value": 3}, "担当": {"value": [{"code": "sato", "name": "佐藤"}]}, "小計": {"value": "300"}}},
+            {"value": {"品名": {"value": "みかん"}, "数量": {"value": 5}, "担当": {"value": []}, "小計": {"value": "250"}}},
+        ]}])
+        copier = RecordCopier(self.crud, 3, 4, mapping={"明細.品名": "商品"})
+        self.assertEqual(copier.field_map.skipped["明細.小計"], "read-only in target (CALC)")
+        result = copier.copy()
+        self.assertTrue(result.success)
+
+        [record] = self.server.records(4)
+        rows = [{code: cell["value"] for code, cell in row["value"].items()} for row in record["明細"]["value"]]
+        self.assertEqual(rows, [
+            {"商品": "りんご", "数量": "3", "担当": [{"code": "sato"}]},
+            {"商品": "みかん", "数量": "5", "担当": []},
+        ])
+
+    def test_query_and_incremental_keyset(self):
+        result = self.copier().copy("金額 < 100", reader="keyset")
+        self.assertEqual(result.copied, 100)
+        self.server.add_records(1, [{"名前": "new", "金額": 1}])
+        result = self.copier().copy("金額 < 100", reader="keyset")  # チェックポイント以降だけ
+        self.assertEqual((result.read, result.copied), (1, 1))
+        self.assertEqual(len(self.server.records(2)), 101)
+        with self.assertRaises(ValueError):
+            self.copier().copy("order by $id desc")
+
+    def test_failed_records_retried_on_resume(self):
+        self.server.inject_errors(1, 400, "CB_VA01", endpoint="records.json")
+        self.server.inject_errors(2, 400, "CB_VA01", endpoint="record.json")
+        copier = self.copier(write_workers=1)
+        result = copier.copy()
+        self.assertEqual((result.copied, len(result.failed)), (248, 2))
+        saved = json.loads(copier.checkpoint_path("").read_text())
+        self.assertEqual((saved["last_id"], saved["failed"]), (250, sorted(result.failed)))
+
+        result = self.copier().copy()
+        self.assertTrue(result.success)
+        self.assertEqual((result.read, result.copied), (2, 2))
+        self.assertEqual(len(self.server.records(2)), 250)
+
+        result = self.copier().copy(resume=False)
+        self.assertEqual(result.copied, 250)
+
+    def test_out_of_order_batches_not_copied_again(self):
+        """Test that batches written ahead of an interrupted one are skipped on resume"""
+        copier = self.copier(batch_size=10, write_workers=2, file_workers=1)
+        written = threading.Event()
+        original = copier._write
+
+        def write(batch):
+            if batch[0][0] == 1:  # 最初のバッチは後のバッチが済んでから失敗する
+                written.wait(10)
+                raise RuntimeError("interrupted")
+            original(batch)
+            written.set()
+
+        copier._write = write
+        with self.assertRaises(RuntimeError):
+            copier.copy()
+        saved = json.loads(copier.checkpoint_path("").read_text())
+        self.assertEqual(saved["last_id"], 0)
+        self.assertTrue(saved["ranges"])
+        copied = len(self.server.records(2))
+        self.assertGreater(copied, 0)
+
+        result = self.copier().copy()
+        self.assertTrue(result.success)
+        self.assertEqual(result.copied, 250 - copied)
+        self.assertEqual(len(self.server.records(2)), 250)
+        self.assertEqual(json.loads(copier.checkpoint_path("").read_text())["ranges"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,19 @@
 """Tests for extended kintone_crud features (search_all, chunking, status, comment)"""
 
 import sys
+import io
+import tempfile
+from contextlib import redirect_stdout
+from decimal import Decimal
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import unittest
-from kintone_crud import KintoneCRUD
-from kintone_client import KintoneResponse
+from kintone_crud import Aggregation, KintoneCRUD, ReadPlan, print_aggregation
+from kintone_client import KintoneClient, KintoneConfig, KintoneResponse
+from kintone_fake_server import FakeKintoneServer
 
 
 class TestSearchAll(unittest.TestCase):
@@ -125,6 +130,188 @@ class TestSearchAll(unittest.TestCase):
         mock_client.delete_cursor.assert_called_once_with("cursor-1")
 
 
+class TestReadPlanner(unittest.TestCase):
+    """Tests for plan_read / read"""
+
+    def setUp(self):
+        self.patcher = patch("kintone_crud.get_config")
+        self.mock_config = self.patcher.start()
+        self.mock_config.return_value = MagicMock()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    @staticmethod
+    def _count(total):
+        return KintoneResponse(success=True, data={"records": [], "totalCount": str(total)})
+
+    @patch("kintone_crud.KintoneClient")
+    def test_plan_single_page(self, MockClient):
+        """Test small result sets use a single request"""
+        MockClient.return_value.get_records.return_value = self._count(120)
+
+        plan = KintoneCRUD().plan_read(123)
+
+        self.assertEqual(plan.strategy, "single_page")
+        self.assertEqual(plan.total_count, 120)
+        self.assertIn("totalCount=120", plan.explain())
+        args = MockClient.return_value.get_records.call_args
+        self.assertEqual(args[0][1], "limit 1")
+        self.assertTrue(args[1]["total_count"])
+
+    @patch("kintone_crud.KintoneClient")
+    def test_plan_keyset_without_cursors(self, MockClient):
+        """Test keyset pagination is chosen when no cursor is free"""
+        MockClient.return_value.get_records.return_value = self._count(5000)
+
+        plan = KintoneCRUD().plan_read(123, available_cursors=0)
+
+        self.assertEqual(plan.strategy, "keyset")
+
+    @patch("kintone_crud.KintoneClient")
+    def test_plan_cursor_for_ordered_query(self, MockClient):
+        """Test ordered queries keep a single cursor"""
+        MockClient.return_value.get_records.return_value = self._count(100000)
+
+        plan = KintoneCRUD().plan_read(123, "order by 更新日時 desc")
+
+        self.assertEqual(plan.strategy, "cursor")
+
+    @patch("kintone_crud.KintoneClient")
+    def test_plan_parallel_cursor(self, MockClient):
+        """Test large wide reads are split into $id ranges"""
+        mock_client = MockClient.return_value
+        mock_client.get_records.side_effect = [
+            self._count(100000),
+            KintoneResponse(success=True, data={"records": [{"$id": {"value": "1"}}]}),
+            KintoneResponse(success=True, data={"records": [{"$id": {"value": "100000"}}]}),
+        ]
+
+        plan = KintoneCRUD().plan_read(123, max_partitions=4)
+
+        self.assertEqual(plan.strategy, "parallel_cursor")
+        self.assertEqual(len(plan.partitions), 4)
+        self.assertEqual(plan.partitions[0][0], 1)
+        self.assertEqual(plan.partitions[-1][1], 100001)
+
+    @patch("kintone_crud.KintoneClient")
+    def test_read_keyset_pages(self, MockClient):
+        """Test keyset read advances on the last $id"""
+        mock_client = MockClient.return_value
+        first = [{"$id": {"value": str(i)}} for i in range(1, 501)]
+        mock_client.get_records.side_effect = [
+            KintoneResponse(success=True, data={"records": first}),
+            KintoneResponse(success=True, data={"records": [{"$id": {"value": "501"}}]}),
+        ]
+
+        plan = ReadPlan("keyset", 501, 1)
+        records = list(KintoneCRUD().read(123, 'Status = "A"', plan=plan))
+
+        self.assertEqual(len(records), 501)
+        second_query = mock_client.get_records.call_args_list[1][0][1]
+        self.assertEqual(second_query, '(Status = "A") and $id > 500 order by $id asc limit 500')
+
+    @patch("kintone_crud.KintoneClient")
+    def test_read_parallel_cursor_merges_partitions(self, MockClient):
+        """Test parallel cursors read every partition"""
+        mock_client = MockClient.return_value
+        mock_client.create_cursor.side_effect = lambda app, q, f, size: KintoneResponse(
+            success=True, data={"id": q}
+        )
+        mock_client.get_cursor_records.side_effect = lambda cursor_id: KintoneResponse(
+            success=True, data={"records": [{"q": cursor_id}], "next": False}
+        )
+
+        plan = ReadPlan("parallel_cursor", 2000, 10, partitions=[(1, 50), (50, 100)])
+        records = list(KintoneCRUD().read(123, plan=plan))
+
+        self.assertEqual(
+            sorted(r["q"] for r in records),
+            ["$id >= 1 and $id < 50", "$id >= 50 and $id < 100"],
+        )
+        self.assertEqual(mock_client.delete_cursor.call_count, 2)
+
+
+class TestLookupMany(unittest.TestCase):
+    """Tests for lookup_many"""
+
+    def setUp(self):
+        self.patcher = patch("kintone_crud.get_config")
+        self.mock_config = self.patcher.start()
+        self.mock_config.return_value = MagicMock()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    @staticmethod
+    def _records_for(app_id, query, fields=None):
+        codes = query[query.index("(") + 1 : query.index(")")].replace('"', "").split(", ")
+        records = [
+            {"Code": {"value": c}, "$id": {"value": str(i)}}
+            for i, c in enumerate(codes)
+            if not c.startswith("missing")
+        ]
+        return KintoneResponse(success=True, data={"records": records})
+
+    @patch("kintone_crud.KintoneClient")
+    def test_lookup_many_merges_by_key(self, MockClient):
+        """Test results are keyed by lookup value and missing keys are omitted"""
+        mock_client = MockClient.return_value
+        mock_client.get_records.side_effect = self._records_for
+
+        crud = KintoneCRUD()
+        result = crud.lookup_many(123, "Code", ["A", "B", "missing-1", "A"])
+
+        self.assertEqual(set(result), {"A", "B"})
+        self.assertEqual(result["A"][0]["Code"]["value"], "A")
+        mock_client.get_records.assert_called_once()
+        self.assertIn('Code in ("A", "B", "missing-1")', mock_client.get_records.call_args[0][1])
+
+    @patch("kintone_crud.KintoneClient")
+    def test_lookup_many_splits_long_lists(self, MockClient):
+        """Test long key lists are split into several requests"""
+        mock_client = MockClient.return_value
+        mock_client.get_records.side_effect = self._records_for
+
+        crud = KintoneCRUD()
+        values = [f"KEY-{i:06d}" for i in range(2000)]
+        result = crud.lookup_many(123, "Code", values)
+
+        self.assertEqual(len(result), 2000)
+        self.assertGreater(mock_client.get_records.call_count, 1)
+
+    @patch("kintone_crud.KintoneClient")
+    def test_lookup_many_uses_cache(self, MockClient):
+        """Test repeated keys (including misses) do not hit the API again"""
+        mock_client = MockClient.return_value
+        mock_client.get_records.side_effect = self._records_for
+
+        crud = KintoneCRUD()
+        crud.lookup_many(123, "Code", ["A", "missing-1"])
+        result = crud.lookup_many(123, "Code", ["A", "missing-1"])
+
+        self.assertEqual(set(result), {"A"})
+        mock_client.get_records.assert_called_once()
+
+    @patch("kintone_crud.KintoneClient")
+    def test_lookup_many_falls_back_to_cursor(self, MockClient):
+        """Test chunks with 500+ matches are re-read with the cursor API"""
+        mock_client = MockClient.return_value
+        page = [{"Code": {"value": "A"}} for _ in range(500)]
+        mock_client.get_records.return_value = KintoneResponse(success=True, data={"records": page})
+        mock_client.create_cursor.return_value = KintoneResponse(success=True, data={"id": "c1"})
+        mock_client.get_cursor_records.return_value = KintoneResponse(
+            success=True,
+            data={"records": page + [{"Code": {"value": "A"}}], "next": False},
+        )
+
+        crud = KintoneCRUD()
+        result = crud.lookup_many(123, "Code", ["A"])
+
+        self.assertEqual(len(result["A"]), 501)
+        mock_client.delete_cursor.assert_called_once_with("c1")
+
+
 class TestAddManyChunking(unittest.TestCase):
     """Tests for add_many auto-chunking"""
 
@@ -289,6 +476,83 @@ class TestStatusOperations(unittest.TestCase):
         self.assertTrue(result.success)
         mock_client.update_status.assert_called_once_with(123, 1, "Approve", "tanaka")
 
+    @patch("kintone_crud.KintoneClient")
+    def test_change_status_many_chunks(self, MockClient):
+        """Test change_status_many splits records into chunks of 100"""
+        mock_client = MockClient.return_value
+        mock_client.update_statuses.side_effect = lambda app_id, records: KintoneResponse(
+            success=True,
+            data={"records": [{"id": str(r["id"]), "revision": "2"} for r in records]},
+        )
+
+        crud = KintoneCRUD()
+        result = crud.change_status_many(app_id=123, records=list(range(1, 251)), action="Approve")
+
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.succeeded), 250)
+        self.assertEqual(mock_client.update_statuses.call_count, 3)
+        mock_client.update_status.assert_not_called()
+
+    @patch("kintone_crud.KintoneClient")
+    def test_change_status_many_accepts_cursor_records(self, MockClient):
+        """Test change_status_many reads $id/$revision from KINTONE format records"""
+        mock_client = MockClient.return_value
+        mock_client.update_statuses.return_value = KintoneResponse(
+            success=True,
+            data={"records": [{"id": "7", "revision": "4"}]},
+        )
+
+        crud = KintoneCRUD()
+        records = [{"$id": {"type": "__ID__", "value": "7"}, "$revision": {"type": "__REVISION__", "value": "3"}}]
+        crud.change_status_many(app_id=123, records=records, action="Approve", assignee="tanaka")
+
+        mock_client.update_statuses.assert_called_once_with(
+            123,
+            [{"id": 7, "action": "Approve", "assignee": "tanaka", "revision": 3}],
+        )
+
+    @patch("kintone_crud.KintoneClient")
+    def test_change_status_many_retries_only_failed_items(self, MockClient):
+        """Test failed chunk is retried per record and conflicts are reported"""
+        mock_client = MockClient.return_value
+        mock_client.update_statuses.return_value = KintoneResponse(
+            success=False,
+            error="Revision mismatch",
+            error_code="GAIA_CO02",
+        )
+        calls = []
+
+        def update_status(app_id, record_id, action, assignee, revision):
+            calls.append((record_id, revision))
+            if record_id == 2 and revision is not None:
+                return KintoneResponse(success=False, error="Revision mismatch", error_code="GAIA_CO02")
+            if record_id == 3:
+                return KintoneResponse(success=False, error="Invalid action", error_code="GAIA_IL03")
+            return KintoneResponse(success=True, data={"revision": "9"})
+
+        mock_client.update_status.side_effect = update_status
+
+        crud = KintoneCRUD()
+        records = [{"id": i, "revision": 1} for i in (1, 2, 3)]
+        result = crud.change_status_many(app_id=123, records=records, action="Approve", max_workers=1)
+
+        self.assertEqual(set(result.succeeded), {1})
+        self.assertEqual(set(result.failed), {2, 3})
+        self.assertEqual(result.failed[2].error_code, "GAIA_CO02")
+        self.assertEqual(result.failed[3].error_code, "GAIA_IL03")
+        self.assertEqual(len(calls), 3)  # 競合したレコードは再試行しない
+
+        # 明示した場合だけリビジョン指定を外して再試行する
+        calls.clear()
+        records = [{"id": i, "revision": 1} for i in (1, 2, 3)]
+        result = crud.change_status_many(
+            app_id=123, records=records, action="Approve", max_workers=1, ignore_revision_conflicts=True
+        )
+        self.assertEqual(set(result.succeeded), {1, 2})
+        self.assertEqual(set(result.failed), {3})
+        self.assertIn((2, None), calls)
+        self.assertEqual(len(calls), 4)  # 1, 2, 3 + 2 without revision
+
 
 class TestCommentOperations(unittest.TestCase):
     """Tests for comment operations"""
@@ -344,5 +608,144 @@ class TestCommentOperations(unittest.TestCase):
         mock_client.add_comment.assert_called_once_with(123, 1, "Test comment", None)
 
 
+def _agg_record(status, amount, user=None):
+    record = {"ステータス": {"value": status}, "金額": {"value": amount}}
+    if user is not None:
+        record["作成者"] = {"value": {"code": user, "name": user.upper()}}
+    return record
+
+
+class TestAggregation(unittest.TestCase):
+    """Tests for Aggregation"""
+
+    def test_group_sum_avg_min_max(self):
+        agg = Aggregation(["ステータス"], [("sum", "金額"), ("avg", "金額"), ("min", "金額"), ("max", "金額")])
+        for status, amount in [("完了", "100"), ("完了", "50.5"), ("未処理", "7"), ("未処理", "")]:
+            agg.add(_agg_record(status, amount))
+        rows = agg.rows()
+        self.assertEqual([r["ステータス"] for r in rows], ["完了", "未処理"])
+        self.assertEqual(rows[0]["sum(金額)"], Decimal("150.5"))
+        self.assertEqual(rows[0]["avg(金額)"], Decimal("75.25"))
+        self.assertEqual((rows[1]["count"], rows[1]["min(金額)"], rows[1]["avg(金額)"]), (2, Decimal(7), Decimal(7)))
+
+    def test_user_values_and_no_group(self):
+        agg = Aggregation(["作成者"], [])
+        agg.add(_agg_record("完了", "1", user="sato"))
+        self.assertEqual(agg.rows(), [{"作成者": "SATO", "count": 1}])
+
+        total = Aggregation([], [("sum", "金額")])
+        total.add(_agg_record("完了", "1"))
+        self.assertEqual(total.rows(), [{"count": 1, "sum(金額)": Decimal(1)}])
+
+    def test_merge(self):
+        metrics = [("sum", "金額"), ("max", "金額")]
+        left, right = Aggregation(["ステータス"], metrics), Aggregation(["ステータス"], metrics)
+        left.add(_agg_record("完了", "10"))
+        right.add(_agg_record("完了", "30"))
+        right.add(_agg_record("却下", "5"))
+        rows = {r["ステータス"]: r for r in left.merge(right).rows()}
+        self.assertEqual((rows["完了"]["count"], rows["完了"]["sum(金額)"], rows["完了"]["max(金額)"]), (2, 40, 30))
+        self.assertEqual(rows["却下"]["count"], 1)
+
+    def test_unknown_function(self):
+        with self.assertRaises(ValueError):
+            Aggregation([], [("median", "金額")])
+
+    def test_print_table(self):
+        agg = Aggregation(["ステータス"], [("avg", "金額")])
+        agg.add(_agg_record("完了", "1"))
+        agg.add(_agg_record("完了", "2"))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            print_aggregation(agg)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(), ["ステータス", "count", "avg(金額)"])
+        self.assertEqual(lines[1].split(), ["完了", "2", "1.5"])
+
+
+class TestAggregate(unittest.TestCase):
+    """Tests for KintoneCRUD.aggregate against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "案件", {"担当": "SINGLE_LINE_TEXT", "金額": "NUMBER", "メモ": "MULTI_LINE_TEXT"})
+        self.server.add_records(1, [{"担当": f"U{i % 3}", "金額": i, "メモ": "x" * 100} for i in range(1500)])
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(config))
+
+    def expected(self):
+        return {f"U{k}": sum(i for i in range(1500) if i % 3 == k) for k in range(3)}
+
+    def test_aggregate_sequential(self):
+        rows = self.crud.aggregate(1, ["担当"], [("sum", "金額")], query="金額 >= 0").rows()
+        self.assertEqual({r["担当"]: r["sum(金額)"] for r in rows}, self.expected())
+
+    def test_aggregate_partitions(self):
+        rows = self.crud.aggregate(1, ["担当"], [("sum", "金額")], partitions=3).rows()
+        self.assertEqual({r["担当"]: r["sum(金額)"] for r in rows}, self.expected())
+        self.assertEqual(sum(r["count"] for r in rows), 1500)
+        self.assertEqual(self.server.count("POST", "records/cursor.json"), 3)
+
+    def test_aggregate_partitions_with_order_by(self):
+        rows = self.crud.aggregate(1, ["担当"], [("sum", "金額")], query="金額 >= 0 order by 金額 desc", partitions=3).rows()
+        self.assertEqual({r["担当"]: r["sum(金額)"] for r in rows}, self.expected())
+        with self.assertRaises(ValueError):
+            self.crud.aggregate(1, ["担当"], query="金額 >= 0 limit 10", partitions=3)
+
+    def test_count_and_plan_with_limit(self):
+        """Test that the probe does not add a second limit (rejected by KINTONE)"""
+        self.assertEqual(self.crud.count(1, "金額 < 100 order by 金額 desc limit 10 offset 5"), 100)
+        plan = self.crud.plan_read(1, "金額 < 100 limit 10")
+        self.assertEqual((plan.strategy, plan.total_count), ("single_page", 100))
+        self.assertEqual(len(list(self.crud.read(1, "金額 < 100 limit 10", plan=plan))), 10)
+
+
+
+class TestDeleteWhere(unittest.TestCase):
+    """Tests for KintoneCRUD.delete_where against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "ログ", {"レベル": "SINGLE_LINE_TEXT", "番号": "NUMBER"})
+        self.server.add_records(1, [{"レベル": "DEBUG" if i % 5 else "ERROR", "番号": i} for i in range(1500)])
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(config))
+
+    def test_deletes_matching_records_concurrently(self):
+        progress = []
+        result = self.crud.delete_where(1, 'レベル = "DEBUG"', max_workers=4,
+                                        progress=lambda done, total: progress.append((done, total)))
+        self.assertTrue(result.success)
+        self.assertEqual(result.deleted, 1200)
+        self.assertEqual(self.server.count("DELETE", "records.json"), 12)
+        self.assertEqual(progress[-1], (1200, 1200))
+        self.assertEqual(len(self.server.records(1)), 300)
+        self.assertEqual(self.crud.count(1, 'レベル = "DEBUG"'), 0)
+        self.assertEqual(self.server.cursors, {})
+
+    def test_bulk_mode(self):
+        result = self.crud.delete_where(1, "番号 >= 0", bulk=True)
+        self.assertEqual(result.deleted, 1500)
+        self.assertEqual(self.server.count("POST", "bulkRequest.json"), 1)
+        self.assertEqual(self.server.records(1), [])
+
+    def test_failed_chunk_retried_per_record(self):
+        self.server.inject_errors(1, 500, endpoint="records.json")
+        result = self.crud._delete_batch(1, [1, 2, 3], 100, False)
+        self.assertEqual((result.deleted, result.missing, result.failed), (3, 0, {}))
+        self.assertEqual(result.requests, 4)
+
+    def test_already_deleted_records_counted_as_missing(self):
+        self.crud.delete(1, [2])
+        result = self.crud._delete_batch(1, [1, 2, 3], 100, True)
+        self.assertEqual((result.deleted, result.missing), (2, 1))
+
+    def test_query_required(self):
+        with self.assertRaises(ValueError):
+            self.crud.delete_where(1, " ")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Tests for kintone_fake_server module"""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer, run_query
+from kintone_metrics import MetricsRecorder
+
+
+def _record(record_id, **values):
+    record = {"$id": {"type": "__ID__", "value": str(record_id)}}
+    for code, value in values.items():
+        field_type = "NUMBER" if isinstance(value, int) else "SINGLE_LINE_TEXT"
+        record[code] = {"type": field_type, "value": str(value) if isinstance(value, int) else value}
+    return record
+
+
+class TestRunQuery(unittest.TestCase):
+    """Tests for the query evaluator"""
+
+    def setUp(self):
+        self.records = [
+            _record(1, 名前="A社", 金額=100),
+            _record(2, 名前="B社", 金額=20),
+            _record(3, 名前="C商店", 金額=300),
+        ]
+
+    def ids(self, query):
+        matched, _, _ = run_query(self.records, query)
+        return [r["$id"]["value"] for r in matched]
+
+    def test_default_order_is_id_desc(self):
+        self.assertEqual(self.ids(""), ["3", "2", "1"])
+
+    def test_numeric_comparison(self):
+        self.assertEqual(self.ids("金額 > 50 order by $id asc"), ["1", "3"])
+
+    def test_and_or_parentheses(self):
+        self.assertEqual(
+            self.ids('(名前 like "社" and 金額 < 50) or $id = 3 order by 金額 desc'),
+            ["3", "2"],
+        )
+
+    def test_in_and_not_in(self):
+        self.assertEqual(self.ids('名前 in ("A社", "C商店") order by $id asc'), ["1", "3"])
+        self.assertEqual(self.ids('名前 not in ("A社")'), ["3", "2"])
+
+    def test_escaped_string(self):
+        self.records.append(_record(4, 名前='say "hi"'))
+        self.assertEqual(self.ids('名前 = "say \\"hi\\""'), ["4"])
+
+    def test_limit_offset(self):
+        _, limit, offset = run_query(self.records, "order by $id asc limit 2 offset 1")
+        self.assertEqual((limit, offset), (2, 1))
+
+
+class TestFakeServer(unittest.TestCase):
+    """Tests for KintoneClient/KintoneCRUD against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer(max_cursors=2).start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "顧客", {"名前": "SINGLE_LINE_TEXT", "金額": "NUMBER"},
+                            actions={"承認": ("未処理", "承認済")})
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake",
+                                    cache_dir=Path(tempfile.mkdtemp()))
+        self.client = KintoneClient(self.config)
+        with patch("kintone_crud.get_config", return_value=self.config):
+            self.crud = KintoneCRUD()
+
+    def test_record_crud(self):
+        """Test add, get, update with revision conflict"""
+        result = self.crud.add(1, {"名前": "A社", "金額": 100})
+        self.assertTrue(result.success)
+        record_id = int(result.data["id"])
+
+        record = self.client.get_record(1, record_id).data["record"]
+        self.assertEqual(record["金額"]["value"], "100")
+
+        self.assertTrue(self.crud.update(1, record_id, {"金額": 200}, revision=1).success)
+        conflict = self.crud.update(1, record_id, {"金額": 300}, revision=1)
+        self.assertFalse(conflict.success)
+        self.assertEqual(conflict.error_code, "GAIA_CO02")
+
+    def test_get_records_with_fields_and_total_count(self):
+        """Test fields[] encoding and totalCount"""
+        self.server.add_records(1, [{"名前": f"R{i}", "金額": i} for i in range(5)])
+        result = self.client.get_records(1, "金額 >= 2 limit 2", ["$id", "金額"], total_count=True)
+        self.assertTrue(result.success)
+        self.assertEqual(result.data["totalCount"], "3")
+        self.assertEqual(len(result.data["records"]), 2)
+        self.assertEqual(set(result.data["records"][0]), {"$id", "金額"})
+
+    def test_search_all_with_cursor(self):
+        """Test cursor paging through all records"""
+        self.server.add_records(1, [{"名前": f"R{i}", "金額": i} for i in range(1200)])
+        records = list(self.crud.search_all(1, "金額 >= 100", ["$id"]))
+        self.assertEqual(len(records), 1100)
+        self.assertEqual(self.server.count("GET", "records/cursor.json"), 3)
+        self.assertEqual(self.server.cursors, {})
+
+    def test_search_all_streaming(self):
+        """Test incremental parsing of cursor pages"""
+        self.server.add_records(1, [{"名前": f"R{i}", "金額": i} for i in range(1200)])
+        streamed = list(self.crud.search_all(1, "金額 >= 100", stream=True))
+        self.assertEqual(streamed, list(self.crud.search_all(1, "金額 >= 100")))
+        self.assertEqual(len(streamed), 1100)
+
+    def test_stream_cursor_error(self):
+        """Test that a failed streamed page raises RuntimeError"""
+        with self.assertRaises(RuntimeError):
+            list(self.client.stream_cursor_records("missing"))
+
+    def test_cursor_limit(self):
+        """Test too many cursors error"""
+        self.server.add_records(1, [{"名前": "A"}])
+        self.assertTrue(self.client.create_cursor(1).success)
+        self.assertTrue(self.client.create_cursor(1).success)
+        result = self.client.create_cursor(1)
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_code, "GAIA_TM12")
+
+    def test_read_planner_keyset(self):
+        """Test planned read without cursors"""
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(1100)])
+        records = list(self.crud.read(1, fields=["$id"], available_cursors=0))
+        self.assertEqual(sorted(int(r["$id"]["value"]) for r in records), list(range(1, 1101)))
+
+    def test_add_many_and_delete(self):
+        """Test chunked add and delete"""
+        results = self.crud.add_many(1, [{"名前": f"R{i}"} for i in range(250)])
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(len(self.server.records(1)), 250)
+        self.assertTrue(self.crud.delete(1, [1, 2, 3]).success)
+        self.assertEqual(len(self.server.records(1)), 247)
+
+    def test_bulk_request_rolls_back(self):
+        """Test that a failing sub-request rolls back the bulk request"""
+        self.server.add_records(1, [{"名前": "A"}])
+        result = self.client.bulk_request([
+            {"method": "PUT", "api": "/k/v1/record.json",
+             "payload": {"app": 1, "id": 1, "record": {"名前": {"value": "B"}}}},
+            {"method": "PUT", "api": "/k/v1/record.json",
+             "payload": {"app": 1, "id": 99, "record": {}}},
+        ])
+        self.assertFalse(result.success)
+        self.assertEqual(self.server.records(1)[0]["名前"]["value"], "A")
+
+    def test_status_and_comments(self):
+        """Test status actions and comments"""
+        self.server.add_records(1, [{"名前": "A"}, {"名前": "B"}])
+        result = self.crud.change_status_many(1, [1, 2], "承認")
+        self.assertTrue(result.success)
+        self.assertEqual(self.server.records(1)[0]["ステータス"]["value"], "承認済")
+
+        self.assertTrue(self.crud.add_comment(1, 1, "確認しました").success)
+        comments = self.client.get_comments(1, 1).data["comments"]
+        self.assertEqual(comments[0]["text"], "確認しました")
+
+    def test_file_round_trip(self):
+        """Test upload and download"""
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(b"\x00\x01payload")
+        result = self.client.upload_file(f.name, "data.bin")
+        self.assertTrue(result.success)
+        self.assertEqual(self.client.download_file(result.data["fileKey"]), b"\x00\x01payload")
+
+    def test_schema(self):
+        """Test form fields and app info"""
+        fields = self.client.get_form_fields(1).data["properties"]
+        self.assertEqual(fields["金額"]["type"], "NUMBER")
+        self.assertEqual(self.client.get_app(1).data["name"], "顧客")
+
+    def test_compressed_transfer(self):
+        """Test that responses are gzip-compressed on the wire"""
+        self.server.add_records(1, [{"名前": "同じ名前", "金額": i} for i in range(200)])
+        recorder = MetricsRecorder(keep_last=1)
+        client = KintoneClient(self.config, hooks=[recorder])
+        result = client.get_records(1, "limit 200")
+        self.assertEqual(len(result.data["records"]), 200)
+        decoded = len(json.dumps(result.data, ensure_ascii=False).encode("utf-8"))
+        self.assertLess(recorder.recent[0].response_bytes, decoded / 5)
+
+    def test_error_injection(self):
+        """Test injected errors for a specific endpoint"""
+        self.server.inject_errors(1, status=503, endpoint="records.json")
+        first = self.client.get_records(1)
+        self.assertFalse(first.success)
+        self.assertEqual(first.error_code, "FAKE_INJECTED")
+        self.assertTrue(self.client.get_records(1).success)
+
+    def test_unknown_app(self):
+        """Test error for a missing app"""
+        result = self.client.get_records(99)
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_code, "GAIA_AP01")
+
+
+if __name__ == "__main__":
+    unittest.main()
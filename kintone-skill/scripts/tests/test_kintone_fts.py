@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Tests for kintone_fts module"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_backup import BackupManager
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_fts import FullTextIndex, normalize, record_texts
+
+
+def record(record_id, revision="1", **fields):
+    data = {"$id": {"type": "__ID__", "value": str(record_id)},
+            "$revision": {"type": "__REVISION__", "value": revision}}
+    for code, value in fields.items():
+        data[code] = {"type": "MULTI_LINE_TEXT" if code == "備考" else "SINGLE_LINE_TEXT", "value": value}
+    return data
+
+
+class TestTexts(unittest.TestCase):
+    """Tests for text extraction and normalization"""
+
+    def test_normalize(self):
+        self.assertEqual(normalize("ＡＢＣ　ｶﾅ  Tokyo"), "abc カナ tokyo")
+
+    def test_record_texts(self):
+        data = {
+            "$id": {"type": "__ID__", "value": "1"},
+            "本文": {"type": "RICH_TEXT", "value": "<p>見積<b>依頼</b></p>"},
+            "担当": {"type": "USER_SELECT", "value": [{"code": "sato", "name": "佐藤"}]},
+            "タグ": {"type": "CHECK_BOX", "value": ["重要", "至急"]},
+            "金額": {"type": "NUMBER", "value": "100"},
+            "明細": {"type": "SUBTABLE", "value": [
+                {"id": "1", "value": {"品名": {"type": "SINGLE_LINE_TEXT", "value": "りんご"}}},
+                {"id": "2", "value": {"品名": {"type": "SINGLE_LINE_TEXT", "value": "みかん"}}},
+            ]},
+        }
+        texts = record_texts(data)
+        self.assertEqual(texts["担当"], "佐藤")
+        self.assertEqual(texts["タグ"], "重要 至急")
+        self.assertEqual(texts["品名"], "りんご\nみかん")
+        self.assertNotIn("金額", texts)
+        self.assertNotIn("<", texts["本文"])
+        self.assertEqual(set(record_texts(data, {"品名"})), {"品名"})
+
+
+class TestFullTextIndex(unittest.TestCase):
+    """Tests for FullTextIndex"""
+
+    def setUp(self):
+        self.index = FullTextIndex(Path(tempfile.mkdtemp()) / "fts.sqlite")
+        self.index.add(1, [
+            record(1, 件名="請求書の送付", 備考="東京 京都"),
+            record(2, 件名="見積依頼", 備考="請求書は来月。請求書を再発行"),
+            record(3, 件名="打ち合わせ", 備考="特になし"),
+        ])
+        self.index.add(2, [record(1, 件名="株式会社サンプル 請求書")])
+
+    def ids(self, hits):
+        return [(hit.app_id, hit.record_id) for hit in hits]
+
+    def test_search_across_apps(self):
+        hits = self.index.search("請求書")
+        self.assertEqual(sorted(self.ids(hits)), [(1, 1), (1, 2), (2, 1)])
+        self.assertIn("【請求書】", hits[0].snippet)
+        self.assertEqual(self.ids(self.index.search("請求書", app_ids=[2])), [(2, 1)])
+        self.assertEqual(self.ids(self.index.search("請求書", fields=["備考"])), [(1, 2)])
+
+    def test_and_terms_and_verification(self):
+        self.assertEqual(self.ids(self.index.search("請求書 株式会社")), [(2, 1)])
+        self.assertEqual(self.index.search("東京都"), [])  # 2-gram はすべてあるが連続していない
+        self.assertEqual(self.ids(self.index.search("ＫＹＯＴＯ 東京")), [])
+        self.assertEqual(self.ids(self.index.search("特")), [(1, 3)])  # 1文字
+        with self.assertRaises(ValueError):
+            self.index.search("  ")
+
+    def test_long_term(self):
+        """Test terms with more bigrams than SQLite allows in one compound SELECT"""
+        text = "".join(chr(0x4E00 + i * 7 % 2000) for i in range(800))
+        self.index.add(3, [record(1, 備考=f"前置き{text}後書き")])
+        self.assertEqual(self.ids(self.index.search(text[100:700])), [(3, 1)])
+        self.assertEqual(self.index.search(text[100:700] + "請求書"), [])
+
+    def test_ranking(self):
+        hits = self.index.search("請求書", app_ids=[1])
+        self.assertEqual(hits[0].record_id, 2)  # 2回出現
+        self.assertGreater(hits[0].score, hits[1].score)
+
+    def test_term_order_does_not_change_ranking(self):
+        """Test that each term is weighted by its own document frequency, not by the docs left after AND"""
+        self.index.add(3, [
+            record(1, 件名="請求書 請求書 送付"),
+            record(2, 件名="請求書 送付 送付"),
+            record(3, 件名="請求書"),
+        ])
+        forward = [(hit.app_id, hit.record_id, hit.score) for hit in self.index.search("請求書 送付")]
+        backward = [(hit.app_id, hit.record_id, hit.score) for hit in self.index.search("送付 請求書")]
+        self.assertEqual(forward, backward)
+        self.assertEqual(len(forward), 3)
+
+    def test_incremental_update_and_remove(self):
+        self.assertEqual(self.index.add(1, [record(1, 件名="請求書の送付", 備考="東京 京都")]), 0)
+        self.assertEqual(self.index.add(1, [record(1, revision="2", 件名="納品書の送付")]), 1)
+        self.assertEqual(self.ids(self.index.search("請求書", app_ids=[1])), [(1, 2)])
+        self.assertEqual(self.ids(self.index.search("納品書")), [(1, 1)])
+
+        self.assertEqual(self.index.remove(1, [2, 99]), 1)
+        self.assertEqual(self.index.retain(2, []), 1)
+        self.assertEqual(self.index.search("請求書"), [])
+        self.assertEqual(self.index.stats()["apps"], {1: 2})
+
+    def test_apply_events(self):
+        count = self.index.apply([
+            {"type": "update", "app": 1, "id": "3", "revision": "2", "record": record(3, revision="2", 件名="請求書")},
+            {"type": "delete", "app": 2, "id": "1"},
+        ])
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(self.ids(self.index.search("請求書"))), [(1, 1), (1, 2), (1, 3)])
+
+
+class TestIndexSources(unittest.TestCase):
+    """Tests for building the index from the API and from backups"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "Tickets", {"件名": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"件名": f"問い合わせ {i}"} for i in range(600)] + [{"件名": "請求書の件"}])
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(config))
+        self.index = FullTextIndex(config.cache_dir / "fts.sqlite")
+
+    def test_sync(self):
+        self.assertEqual(self.index.sync(self.crud, [1]), 601)
+        self.assertEqual(len(self.index.search("問い合わせ", limit=1000)), 600)
+
+        self.crud.client.update_record(1, 601, {"件名": {"value": "領収書の件"}})
+        self.crud.client.delete_records(1, [1])
+        self.assertEqual(self.index.sync(self.crud, [1]), 2)  # 更新と削除だけ
+        self.assertEqual(self.index.search("請求書"), [])
+        self.assertEqual([hit.record_id for hit in self.index.search("領収書")], [601])
+        self.assertEqual(self.index.stats()["records"], 600)
+
+    def test_import_snapshot(self):
+        manager = BackupManager(self.crud, Path(tempfile.mkdtemp()))
+        manager.backup()
+        self.index.add(1, [record(9999, 件名="古いレコード")])
+        self.assertEqual(self.index.import_snapshot(manager), 601)
+        self.assertEqual(self.index.stats()["records"], 601)
+        self.assertEqual(self.index.search("古い"), [])
+        self.assertEqual(self.index.import_snapshot(manager), 0)  # $revision が同じなら登録しない
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Tests for kintone_join module"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_join import JoinSpec, LookupCache, RecordJoiner, lookup_join_spec
+from kintone_schema import AppSchema, FieldInfo
+
+
+class TestLookupCache(unittest.TestCase):
+    """Tests for LookupCache"""
+
+    def test_lru_eviction(self):
+        cache = LookupCache(max_entries=2)
+        cache.put_many("ns", {"a": [], "b": [{"x": 1}]})
+        cache.get_many("ns", ["a"])
+        cache.put_many("ns", {"c": []})
+        self.assertEqual(set(cache.get_many("ns", ["a", "b", "c"])), {"a", "c"})
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_disk_tier(self):
+        path = Path(tempfile.mkdtemp()) / "join.sqlite"
+        cache = LookupCache(path=path)
+        cache.put_many("ns", {"a": [{"x": {"value": "1"}}]})
+        cache.close()
+
+        reopened = LookupCache(path=path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get_many("ns", ["a", "b"]), {"a": [{"x": {"value": "1"}}]})
+        self.assertEqual(reopened.get_many("other", ["a"]), {})
+
+    def test_disk_ttl(self):
+        cache = LookupCache(path=Path(tempfile.mkdtemp()) / "join.sqlite", ttl=-1)
+        self.addCleanup(cache.close)
+        cache.put_many("ns", {"a": []})
+        cache._memory.clear()
+        self.assertEqual(cache.get_many("ns", ["a"]), {})
+
+
+class TestLookupJoinSpec(unittest.TestCase):
+    """Tests for lookup_join_spec"""
+
+    def setUp(self):
+        lookup = {"relatedApp": {"app": "2", "code": ""}, "relatedKeyField": "コード", "fieldMappings": []}
+        self.schema = AppSchema(1, "注文", {
+            "顧客": FieldInfo("顧客", "顧客", "SINGLE_LINE_TEXT", lookup=lookup),
+            "金額": FieldInfo("金額", "金額", "NUMBER"),
+        }, 0)
+
+    def test_spec_from_lookup(self):
+        spec = lookup_join_spec(self.schema, "顧客")
+        self.assertEqual((spec.related_app, spec.key, spec.related_key), (2, "顧客", "コード"))
+        self.assertEqual(spec.field_prefix, "顧客.")
+
+    def test_not_a_lookup(self):
+        with self.assertRaises(ValueError):
+            lookup_join_spec(self.schema, "金額")
+        with self.assertRaises(ValueError):
+            lookup_join_spec(self.schema, "missing")
+
+
+class TestRecordJoiner(unittest.TestCase):
+    """Tests for RecordJoiner against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "注文", {"顧客": "SINGLE_LINE_TEXT", "金額": "NUMBER"})
+        self.server.add_app(2, "顧客", {"コード": "SINGLE_LINE_TEXT", "会社名": "SINGLE_LINE_TEXT"})
+        self.server.apps[1].fields["顧客"]["lookup"] = {
+            "relatedApp": {"app": "2", "code": ""}, "relatedKeyField": "コード", "fieldMappings": [],
+        }
+        self.server.add_records(2, [{"コード": f"C{i}", "会社名": f"会社{i}"} for i in range(50)])
+        self.server.add_records(1, [{"顧客": f"C{i % 60}", "金額": i} for i in range(1200)])
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(config))
+        self.spec = JoinSpec(2, key="顧客", related_key="コード", related_fields=["コード", "会社名"])
+
+    def test_left_join_batches_lookups(self):
+        """Test merged records with a few batched reads instead of N+1"""
+        rows = list(RecordJoiner(self.crud, batch_size=500).join(1, self.spec))
+        self.assertEqual(len(rows), 1200)
+        by_amount = {int(r["金額"]["value"]): r for r in rows}
+        self.assertEqual(by_amount[7]["顧客.会社名"]["value"], "会社7")
+        self.assertNotIn("顧客.会社名", by_amount[55])
+        # 3バッチのうち最初の1回だけ取得（以降のキーはキャッシュ済み）
+        self.assertEqual(self.server.count("GET", "records.json"), 1)
+        self.assertEqual(self.server.count("GET", "record.json"), 0)
+
+    def test_inner_join(self):
+        rows = list(RecordJoiner(self.crud).join(1, self.spec, query="金額 < 100", fields=["金額"], how="inner"))
+        self.assertEqual(len(rows), 90)
+        self.assertIn("顧客", rows[0])
+
+    def test_join_lookup_uses_schema(self):
+        """Test that the lookup field settings drive the join"""
+        rows = list(RecordJoiner(self.crud).join_lookup(1, "顧客", query="金額 < 10", how="inner"))
+        self.assertEqual(sorted(r["顧客.会社名"]["value"] for r in rows), [f"会社{i}" for i in range(10)])
+
+    def test_invalid_how(self):
+        with self.assertRaises(ValueError):
+            list(RecordJoiner(self.crud).join(1, self.spec, how="outer"))
+
+
+if __name__ == "__main__":
+    unittest.main()
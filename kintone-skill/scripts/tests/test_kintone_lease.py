@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Tests for kintone_lease module"""
+
+import sys
+import subprocess
+import tempfile
+import textwrap
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_lease import CursorLeaseManager
+
+SCRIPTS_DIR = Path(__file__).parent.parent
+
+
+class TestCursorLeaseManager(unittest.TestCase):
+    """Tests for CursorLeaseManager against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer(max_cursors=2).start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "App", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(1200)])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.client = KintoneClient(self.config)
+
+    def manager(self, **kwargs):
+        kwargs.setdefault("poll_interval", 0.01)
+        return CursorLeaseManager(self.client, limit=2, **kwargs)
+
+    def test_limit_and_release(self):
+        manager = self.manager()
+        first, second = manager.acquire(), manager.acquire()
+        self.assertEqual(manager.available(), 0)
+        with self.assertRaises(RuntimeError):
+            manager.acquire(timeout=0.05)
+        first.release()
+        with manager.acquire(timeout=1):
+            self.assertEqual(len(manager.active()), 2)
+        second.release()
+        self.assertEqual(manager.available(), 2)
+
+    def test_waiter_gets_released_slot(self):
+        manager = self.manager()
+        held = [manager.acquire(), manager.acquire()]
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(manager.acquire(timeout=5)))
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(acquired, [])
+        held[0].release()
+        thread.join(timeout=5)
+        self.assertEqual(len(acquired), 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        manager = self.manager(ttl=-1)
+        lease = manager.acquire()
+        cursor_id = self.client.create_cursor(1).data["id"]
+        lease.attach(cursor_id)
+        self.assertEqual(manager.reclaim(), 1)
+        self.assertEqual(self.server.cursors, {})
+
+    def test_dead_process_cursor_reclaimed_on_startup(self):
+        """Test that a killed worker's cursor is deleted by the next manager"""
+        child = subprocess.Popen(
+            [sys.executable, "-c", textwrap.dedent(f"""
+                import sys, time
+                from pathlib import Path
+                from kintone_client import KintoneClient, KintoneConfig
+                from kintone_lease import CursorLeaseManager
+                config = KintoneConfig(domain={self.server.base_url!r}, api_token="fake",
+                                       cache_dir=Path({str(self.config.cache_dir)!r}))
+                client = KintoneClient(config)
+                lease = CursorLeaseManager(client, limit=2).acquire()
+                lease.attach(client.create_cursor(1).data["id"])
+                print("ready", flush=True)
+                time.sleep(60)
+            """)],
+            cwd=SCRIPTS_DIR, stdout=subprocess.PIPE, text=True,
+        )
+        self.addCleanup(child.wait)
+        self.assertEqual(child.stdout.readline().strip(), "ready")
+        child.stdout.close()
+        self.assertEqual(len(self.server.cursors), 1)
+        self.assertEqual(self.manager().available(), 1)
+
+        child.kill()
+        child.wait()
+        manager = self.manager()
+        self.assertEqual(manager.reclaimed, 1)
+        self.assertEqual(manager.available(), 2)
+        self.assertEqual(self.server.cursors, {})
+
+    def test_search_all_waits_for_slot(self):
+        """Test that concurrent search_all calls queue instead of failing with GAIA_TM12"""
+        crud = KintoneCRUD(self.client)
+        crud.leases = self.manager()
+        results = []
+
+        def export():
+            results.append(len(list(crud.search_all(1, fields=["$id"]))))
+
+        threads = [threading.Thread(target=export) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(results, [1200] * 4)
+        self.assertEqual(crud.leases.active(), [])
+        self.assertEqual(self.server.cursors, {})
+
+    def test_search_all_releases_on_error(self):
+        crud = KintoneCRUD(self.client)
+        crud.leases = self.manager()
+        with self.assertRaises(RuntimeError):
+            list(crud.search_all(99))
+        self.assertEqual(crud.leases.available(), 2)
+
+    def test_plan_read_uses_available_slots(self):
+        crud = KintoneCRUD(self.client)
+        crud.leases = self.manager()
+        crud.leases.acquire()
+        crud.leases.acquire()
+        self.assertEqual(crud.plan_read(1).strategy, "keyset")
+
+
+if __name__ == "__main__":
+    unittest.main()
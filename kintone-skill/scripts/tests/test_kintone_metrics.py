@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Tests for kintone_metrics module"""
+
+import sys
+import json
+import socket
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_metrics import MetricsRecorder, RequestMetrics, count_retry
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """records.json は成功、それ以外は 404 を返すテスト用ハンドラー"""
+
+    def do_GET(self):
+        if self.path.startswith("/k/v1/records.json"):
+            status, body = 200, {"records": [{"$id": {"value": "1"}}]}
+        else:
+            status, body = 404, {"message": "Not found", "code": "GAIA_NF01"}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    """Tests for MetricsRecorder aggregation"""
+
+    def test_percentiles(self):
+        """Test p50/p95/p99 per endpoint"""
+        recorder = MetricsRecorder()
+        for i in range(1, 101):
+            recorder(RequestMetrics(method="GET", endpoint="records.json", total=i / 100))
+
+        result = recorder.percentiles("records.json")
+
+        self.assertAlmostEqual(result["p50"], 0.50)
+        self.assertAlmostEqual(result["p95"], 0.95)
+        self.assertAlmostEqual(result["p99"], 0.99)
+
+    def test_errors_counted_by_code(self):
+        """Test error codes are counted"""
+        recorder = MetricsRecorder()
+        recorder(RequestMetrics(method="GET", endpoint="record.json", status=404, error_code="GAIA_NF01"))
+        recorder(RequestMetrics(method="GET", endpoint="record.json", status=200))
+
+        endpoint = recorder.snapshot()["endpoints"][0]
+
+        self.assertEqual(endpoint["count"], 2)
+        self.assertEqual(endpoint["errors"], {"GAIA_NF01": 1})
+
+    def test_prometheus_histogram(self):
+        """Test Prometheus text output contains cumulative buckets"""
+        recorder = MetricsRecorder()
+        recorder(RequestMetrics(method="GET", endpoint="app.json", total=0.2, response_bytes=10))
+
+        text = recorder.to_prometheus()
+
+        self.assertIn('kintone_request_duration_seconds_bucket{method="GET",endpoint="app.json",le="0.1"} 0', text)
+        self.assertIn('kintone_request_duration_seconds_bucket{method="GET",endpoint="app.json",le="0.25"} 1', text)
+        self.assertIn('kintone_request_duration_seconds_count{method="GET",endpoint="app.json"} 1', text)
+        self.assertIn('direction="received"} 10', text)
+
+    def test_export_formats(self):
+        """Test export writes JSON or Prometheus text by suffix"""
+        recorder = MetricsRecorder()
+        recorder(RequestMetrics(method="GET", endpoint="app.json", total=0.1))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = recorder.export(Path(tmp) / "metrics.json")
+            prom_path = recorder.export(Path(tmp) / "metrics.prom")
+
+            self.assertEqual(json.loads(json_path.read_text())["endpoints"][0]["endpoint"], "app.json")
+            self.assertIn("# TYPE kintone_request_duration_seconds histogram", prom_path.read_text())
+
+
+class TestClientHooks(unittest.TestCase):
+    """Tests for KintoneClient instrumentation against a local HTTP server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.recorder = MetricsRecorder(keep_last=10)
+        config = KintoneConfig(
+            domain=f"http://127.0.0.1:{self.server.server_address[1]}",
+            api_token="test-token",
+        )
+        self.client = KintoneClient(config, hooks=[self.recorder])
+
+    def test_success_metrics(self):
+        """Test timings and sizes are recorded for a successful call"""
+        result = self.client.get_records(app_id=1)
+
+        self.assertTrue(result.success)
+        metrics = self.recorder.recent[-1]
+        self.assertEqual(metrics.endpoint, "records.json")
+        self.assertEqual(metrics.method, "GET")
+        self.assertEqual(metrics.status, 200)
+        self.assertGreater(metrics.response_bytes, 0)
+        self.assertIsNotNone(metrics.dns)
+        self.assertIsNotNone(metrics.connect)
+        self.assertLessEqual(metrics.ttfb, metrics.total)
+
+    def test_error_metrics(self):
+        """Test error code is recorded from the error body"""
+        result = self.client.get_record(app_id=1, record_id=1)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_code, "GAIA_NF01")
+        metrics = self.recorder.recent[-1]
+        self.assertEqual(metrics.status, 404)
+        self.assertEqual(metrics.error_code, "GAIA_NF01")
+
+    def test_retries_recorded(self):
+        """Test that count_retry() marks the next request on the thread"""
+        count_retry()
+        self.client.get_records(app_id=1)
+        self.client.get_records(app_id=1)
+        self.assertEqual([m.retries for m in list(self.recorder.recent)[-2:]], [1, 0])
+
+    def test_connect_tries_every_address(self):
+        """Test that an unreachable first address falls back to the next one"""
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            unreachable = closed.getsockname()
+        addresses = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", unreachable),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", self.server.server_address),
+        ]
+        with mock.patch("kintone_metrics.socket.getaddrinfo", return_value=addresses):
+            result = self.client.get_records(app_id=1)
+        self.assertTrue(result.success)
+        self.assertIsNotNone(self.recorder.recent[-1].dns)
+
+
+if __name__ == "__main__":
+    unittest.main()
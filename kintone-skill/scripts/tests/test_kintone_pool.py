@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Tests for kintone_pool module and the shared client"""
+
+import http.client
+import http.server
+import sys
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_file import KintoneFileManager
+from kintone_metrics import MetricsRecorder, take_retries
+from kintone_pool import ConnectionPool
+from kintone_schema import SchemaManager
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Tests for pooled keep-alive connections against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "顧客", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(600)])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake",
+                                    cache_dir=Path(tempfile.mkdtemp()))
+        self.addCleanup(KintoneClient.reset_shared)
+
+    def test_sequential_requests_reuse_one_connection(self):
+        pool = ConnectionPool(self.config.base_url)
+        client = KintoneClient(self.config, pool=pool)
+        for _ in range(20):
+            self.assertTrue(client.get_records(1, "limit 1").success)
+        self.assertEqual(pool.created, 1)
+        self.assertEqual(pool.reused, 19)
+
+    def test_concurrent_requests_are_bounded(self):
+        """Test 32 workers on one shared client"""
+        client = KintoneClient.shared(self.config, max_connections=8)
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(lambda _: client.get_records(1, "limit 10"), range(200)))
+        self.assertTrue(all(r.success for r in results))
+        self.assertLessEqual(client.pool.created, 8)
+
+    def test_error_response_keeps_connection_usable(self):
+        pool = ConnectionPool(self.config.base_url)
+        client = KintoneClient(self.config, pool=pool)
+        error = client.get_records(99)
+        self.assertFalse(error.success)
+        self.assertEqual(error.error_code, "GAIA_AP01")
+        self.assertTrue(client.get_records(1, "limit 1").success)
+        self.assertEqual(pool.created, 1)
+
+    def test_abandoned_stream_releases_connection(self):
+        """Test that closing a stream early frees its slot"""
+        client = KintoneClient(self.config, pool=ConnectionPool(self.config.base_url, max_connections=1))
+        crud = KintoneCRUD(client=client)
+        records = crud.search_all(1, stream=True)
+        next(records)
+        records.close()
+        self.assertTrue(client.get_records(1, "limit 1").success)
+
+    def test_hooks_with_pool(self):
+        recorder = MetricsRecorder(keep_last=2)
+        client = KintoneClient(self.config, hooks=[recorder], pool=ConnectionPool(self.config.base_url))
+        client.get_records(1, "limit 1")
+        client.get_records(1, "limit 1")
+        first, second = recorder.recent
+        self.assertIsNotNone(first.connect)
+        self.assertIsNone(second.connect)  # 再利用した接続
+
+
+class _DroppingHandler(http.server.BaseHTTPRequestHandler):
+    """1つの接続で2つ目以降のリクエストは読んだだけで応答せずに切断する"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.methods.append(self.command)
+        self.handled = getattr(self, "handled", 0) + 1
+        if self.handled > 1:
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStaleConnectionRetry(unittest.TestCase):
+    """Tests for re-sending on a connection closed by the server"""
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _DroppingHandler)
+        self.server.methods = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.pool = ConnectionPool(self.url)
+        with self.pool.open(urllib.request.Request(self.url)) as response:
+            response.read()  # 読み切った接続はプールに戻る
+
+    def test_get_is_resent(self):
+        with self.pool.open(urllib.request.Request(self.url)) as response:
+            self.assertEqual(response.read(), b"{}")
+        self.assertEqual(self.server.methods, ["GET", "GET", "GET"])
+        self.assertEqual(self.pool.created, 2)
+        self.assertEqual(take_retries(), 1)  # RequestMetrics.retries に入る
+
+    def test_post_is_not_resent(self):
+        """Test that a POST written to the connection is not sent twice"""
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.pool.open(urllib.request.Request(self.url, data=b"{}", method="POST"))
+        self.assertEqual(self.server.methods, ["GET", "POST"])
+        self.assertEqual(self.pool.created, 1)
+
+
+class TestSharedClient(unittest.TestCase):
+    """Tests for KintoneClient.shared and managers reusing it"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "顧客", {"名前": "SINGLE_LINE_TEXT"})
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake",
+                                    cache_dir=Path(tempfile.mkdtemp()))
+        self.addCleanup(KintoneClient.reset_shared)
+
+    def test_same_instance(self):
+        client = KintoneClient.shared(self.config)
+        self.assertIs(KintoneClient.shared(self.config), client)
+        other = KintoneConfig(domain=self.server.base_url, api_token="other")
+        self.assertIsNot(KintoneClient.shared(other), client)
+
+    def test_managers_reuse_client(self):
+        client = KintoneClient.shared(self.config)
+        self.assertIs(KintoneCRUD(client=client).client, client)
+        self.assertIs(KintoneFileManager(client=client).client, client)
+        self.assertIs(SchemaManager(client=client).client, client)
+        self.assertIs(SchemaManager(client=client).config, self.config)
+
+    def test_schema_cache_is_shared(self):
+        """Test that schema managers share one in-memory cache"""
+        client = KintoneClient.shared(self.config)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            schemas = list(executor.map(lambda _: SchemaManager(client=client).get_schema(1), range(16)))
+        self.assertTrue(all(s is schemas[0] for s in schemas))
+        self.assertEqual(self.server.count("GET", "app/form/fields.json"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Tests for kintone_projection module"""
+
+import sys
+import warnings
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneResponse
+from kintone_crud import KintoneCRUD
+from kintone_projection import FieldProjector, FullWidthFetchWarning, infer_fields, resolve_fields
+from kintone_schema import AppSchema, FieldInfo
+
+
+def _schema(extra_fields: int = 0) -> AppSchema:
+    fields = {
+        "customer": FieldInfo(code="customer", label="顧客名", type="SINGLE_LINE_TEXT"),
+        "amount": FieldInfo(code="amount", label="金額", type="NUMBER"),
+        "status": FieldInfo(code="status", label="ステータス", type="DROP_DOWN"),
+    }
+    for i in range(extra_fields):
+        fields[f"f{i}"] = FieldInfo(code=f"f{i}", label=f"項目{i}", type="SINGLE_LINE_TEXT")
+    return AppSchema(app_id=1, app_name="Test", fields=fields, cached_at=1.0)
+
+
+class TestResolveFields(unittest.TestCase):
+    """Tests for label/code resolution and inference"""
+
+    def test_labels_resolve_to_codes(self):
+        self.assertEqual(resolve_fields(_schema(), ["顧客名", "amount", "$id"]), ["customer", "amount", "$id"])
+
+    def test_unknown_column_raises(self):
+        with self.assertRaises(ValueError):
+            resolve_fields(_schema(), ["存在しない"])
+
+    def test_infer_from_query_and_columns(self):
+        """Test that query fields are added and unknown query fields are skipped"""
+        fields = infer_fields(
+            'ステータス = "完了" and 明細数量 > 1 order by amount desc',
+            ["顧客名"],
+            _schema(),
+        )
+        self.assertEqual(fields, ["$id", "customer", "status", "amount"])
+
+    def test_infer_without_schema(self):
+        self.assertEqual(infer_fields("金額 > 0", ["名前"]), ["$id", "名前", "金額"])
+
+
+class TestFieldProjector(unittest.TestCase):
+    """Tests for FieldProjector"""
+
+    def setUp(self):
+        self.schema_manager = MagicMock()
+        self.schema_manager.get_schema.return_value = _schema(extra_fields=10)
+        self.projector = FieldProjector(self.schema_manager, max_fields=5)
+
+    def test_explicit_fields_win(self):
+        self.projector.declare(1, columns=["顧客名"])
+        self.assertEqual(self.projector.fields_for(1, ["amount"]), ["amount"])
+
+    def test_declared_fields(self):
+        self.projector.declare(1, columns=["顧客名", "金額"])
+        self.assertEqual(self.projector.fields_for(1), ["$id", "customer", "amount"])
+        self.schema_manager.get_schema.assert_called_once_with(1)
+
+    def test_warns_once_for_wide_app(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertIsNone(self.projector.fields_for(1))
+            self.assertIsNone(self.projector.fields_for(1))
+        self.assertEqual([w.category for w in caught], [FullWidthFetchWarning])
+
+    def test_no_warning_for_narrow_app(self):
+        projector = FieldProjector(self.schema_manager, max_fields=50)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertIsNone(projector.fields_for(1))
+
+
+class TestCRUDProjection(unittest.TestCase):
+    """Tests for projection applied by KintoneCRUD"""
+
+    def setUp(self):
+        self.patcher = patch("kintone_crud.get_config")
+        self.patcher.start().return_value = MagicMock(domain="test.cybozu.com", api_token="test-token")
+        self.addCleanup(self.patcher.stop)
+
+    @patch("kintone_crud.KintoneClient")
+    def test_search_all_uses_declared_fields(self, MockClient):
+        mock_client = MockClient.return_value
+        mock_client.create_cursor.return_value = KintoneResponse(success=True, data={"id": "c1"})
+        mock_client.get_cursor_records.return_value = KintoneResponse(
+            success=True, data={"records": [], "next": False}
+        )
+        crud = KintoneCRUD()
+        crud.projector = FieldProjector()
+        crud.projector.declare(1, columns=["名前"])
+
+        list(crud.search_all(1))
+
+        mock_client.create_cursor.assert_called_once_with(1, "", ["$id", "名前"], 500)
+
+    @patch("kintone_crud.KintoneClient")
+    def test_search_without_projector(self, MockClient):
+        mock_client = MockClient.return_value
+        mock_client.get_records.return_value = KintoneResponse(success=True, data={"records": []})
+        crud = KintoneCRUD()
+
+        crud.search(1, "")
+
+        self.assertIsNone(mock_client.get_records.call_args[0][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
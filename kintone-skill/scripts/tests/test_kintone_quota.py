@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Tests for kintone_quota module"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD, ReadPlan
+from kintone_fake_server import FakeKintoneServer
+from kintone_quota import (
+    HIGH, LOW, NORMAL, QuotaScheduler, QuotaTracker, estimate_read, estimate_write,
+)
+
+
+class TestEstimates(unittest.TestCase):
+    """Tests for request estimates"""
+
+    def test_estimate_read(self):
+        self.assertEqual(estimate_read(ReadPlan("single_page", 300, 5)), 1)
+        self.assertEqual(estimate_read(ReadPlan("keyset", 1200, 5)), 3)
+        self.assertEqual(estimate_read(ReadPlan("cursor", 1200, 5)), 5)
+        self.assertEqual(estimate_read(ReadPlan("parallel_cursor", 1200, 5, partitions=[(1, 601), (601, 1201)])), 7)
+
+    def test_estimate_write(self):
+        self.assertEqual(estimate_write(0), 0)
+        self.assertEqual(estimate_write(250), 3)
+        self.assertEqual(estimate_write(250, chunk_size=500), 3)
+
+
+class TestQuotaTracker(unittest.TestCase):
+    """Tests for QuotaTracker against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "App1", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_app(2, "App2", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(1200)])
+        self.server.add_records(2, [{"名前": "X"}])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+
+    def client(self, tracker):
+        client = KintoneClient(self.config)
+        client.add_hook(tracker)
+        return client
+
+    def test_counts_requests_per_app(self):
+        tracker = QuotaTracker(self.config, limit=100)
+        client = self.client(tracker)
+        client.get_record(1, 1)
+        client.get_record(1, 99)  # エラー応答も数える
+        client.get_record(2, 1)
+        client.get_apps()  # アプリを特定できないリクエストは数えない
+        self.assertEqual(tracker.usage(), {1: 2, 2: 1})
+        self.assertEqual(tracker.remaining(1), 98)
+
+    def test_cursor_and_bulk_requests(self):
+        tracker = QuotaTracker(self.config)
+        client = self.client(tracker)
+        self.assertEqual(len(list(KintoneCRUD(client).search_all(1, fields=["$id"]))), 1200)
+        self.assertEqual(tracker.used(1), estimate_read(ReadPlan("cursor", 1200, 1)))  # 作成 + 3ページ + 削除
+        client.bulk_request([
+            {"method": "PUT", "api": "/k/v1/record.json", "payload": {"app": 1, "id": 1, "record": {}}},
+            {"method": "PUT", "api": "/k/v1/record.json", "payload": {"app": 2, "id": 1, "record": {}}},
+        ])
+        self.assertEqual(tracker.usage(), {1: 6, 2: 1})
+
+    def test_shared_between_trackers(self):
+        first = QuotaTracker(self.config, flush_interval=60)
+        second = QuotaTracker(self.config)
+        self.client(first).get_record(1, 1)
+        self.assertEqual(second.used(1), 0)  # まだ書き込まれていない
+        first.flush()
+        self.client(second).get_record(1, 2)
+        self.assertEqual(second.used(1), 2)
+
+    def test_per_app_limits(self):
+        tracker = QuotaTracker(self.config, limit=100, limits={2: 10})
+        tracker.record([2], count=4)
+        self.assertEqual(tracker.remaining(2), 6)
+        self.assertEqual(tracker.remaining(1), 100)
+
+
+class TestQuotaScheduler(unittest.TestCase):
+    """Tests for QuotaScheduler"""
+
+    def setUp(self):
+        config = KintoneConfig(domain="test.cybozu.com", api_token="x", cache_dir=Path(tempfile.mkdtemp()))
+        self.tracker = QuotaTracker(config, limit=100)
+        self.output = io.StringIO()
+        self.scheduler = QuotaScheduler(self.tracker, output=self.output)
+
+    def job(self, name, requests, order):
+        def run():
+            order.append(name)
+            self.tracker.record([1], count=requests)
+            return name
+        return run
+
+    def test_priority_order_and_consumption(self):
+        order = []
+        low = self.scheduler.submit("harvest", self.job("harvest", 5, order), {1: 5}, priority=LOW)
+        high = self.scheduler.submit("sync", self.job("sync", 3, order), {1: 3}, priority=HIGH)
+        self.scheduler.run()
+        self.assertEqual(order, ["sync", "harvest"])
+        self.assertEqual((high.status, high.result, high.consumed), ("done", "sync", {1: 3}))
+        self.assertEqual(low.status, "done")
+        self.assertIn("[sync]", self.output.getvalue())
+
+    def test_low_priority_deferred_to_keep_headroom(self):
+        order = []
+        self.tracker.record([1], count=60)
+        low = self.scheduler.submit("harvest", self.job("harvest", 20, order), {1: 20}, priority=LOW)
+        normal = self.scheduler.submit("bulk", self.job("bulk", 20, order), {1: 20}, priority=NORMAL)
+        self.scheduler.run()
+        self.assertEqual(low.status, "deferred")  # bulk の後: 100 - 80 - 20 = 0 < 30 を残せない
+        self.assertEqual(normal.status, "done")
+        self.assertEqual(order, ["bulk"])
+
+        # 保留中のジョブは次回の run() で再判定（上限の引き上げ後に実行）
+        self.tracker.limits[1] = 200
+        self.scheduler.run()
+        self.assertEqual(low.status, "done")
+
+    def test_projection(self):
+        self.tracker.record([1], count=50)
+        [projection] = self.scheduler.project({1: 30}, NORMAL)
+        self.assertEqual((projection.used, projection.after, projection.reserve), (50, 20, 10))
+        self.assertTrue(projection.allowed)
+        self.assertFalse(self.scheduler.project({1: 30}, LOW)[0].allowed)
+
+    def test_failed_job(self):
+        def fail():
+            raise RuntimeError("boom")
+        job = self.scheduler.submit("fail", fail, {1: 1}, priority=HIGH)
+        self.scheduler.run()
+        self.assertEqual(job.status, "failed")
+        self.assertIsInstance(job.error, RuntimeError)
+
+
+if __name__ == "__main__":
+    unittest.main()
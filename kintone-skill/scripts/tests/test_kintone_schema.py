@@ -116,6 +116,16 @@ class TestAppSchema(unittest.TestCase):
         self.assertEqual(restored.app_name, original.app_name)
         self.assertEqual(len(restored.fields), len(original.fields))
 
+    def test_roundtrip_subtable(self):
+        """Test that fields inside a table survive to_dict -> from_dict"""
+        table = FieldInfo("明細", "明細", "SUBTABLE", fields={"品名": FieldInfo("品名", "品名", "SINGLE_LINE_TEXT")})
+        original = AppSchema(789, "Roundtrip Test", {"明細": table}, time.time())
+
+        restored = AppSchema.from_dict(json.loads(json.dumps(original.to_dict())))
+
+        self.assertEqual(restored.fields["明細"], table)
+        self.assertIsInstance(restored.fields["明細"].fields["品名"], FieldInfo)
+
 
 class TestSchemaManager(unittest.TestCase):
     """Tests for SchemaManager class"""
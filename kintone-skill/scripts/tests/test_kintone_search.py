@@ -2,13 +2,20 @@
 """Tests for kintone_search module"""
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import unittest
-from kintone_search import QueryBuilder, query, parse_natural_query, Operator
+import urllib.parse
+from kintone_schema import AppSchema, FieldInfo
+from kintone_search import (
+    QueryBuilder, query, parse_natural_query, Operator, param, prepare, chunk_in_values, query_fields,
+)
 
 
 class TestQueryBuilder(unittest.TestCase):
@@ -87,6 +94,104 @@ class TestQueryBuilder(unittest.TestCase):
         self.assertEqual(q.build(), expected)
 
 
+    def test_escapes_quotes(self):
+        """Test string values containing quotes are escaped"""
+        q = query().equals("タイトル", 'say "hi"').or_where("パス", "=", "C:\\tmp")
+        self.assertEqual(q.build(), 'タイトル = "say \\"hi\\"" or パス = "C:\\\\tmp"')
+
+    def test_in_list_escapes_quotes(self):
+        """Test IN values are escaped"""
+        q = query().in_list("コード", ['A"1', "B"])
+        self.assertEqual(q.build(), 'コード in ("A\\"1", "B")')
+
+
+class TestPreparedQuery(unittest.TestCase):
+    """Tests for prepared query templates"""
+
+    def test_bind_values(self):
+        """Test binding string and numeric values"""
+        prepared = prepare("顧客コード = :code and 金額 >= :min")
+        self.assertEqual(prepared.params, ("code", "min"))
+        self.assertEqual(
+            prepared.bind(code='C"01', min=1000),
+            '顧客コード = "C\\"01" and 金額 >= 1000',
+        )
+
+    def test_bind_list(self):
+        """Test binding a list expands to quoted values"""
+        prepared = prepare("部署 in (:depts)")
+        self.assertEqual(prepared.bind(depts=["営業", "開発"]), '部署 in ("営業", "開発")')
+
+    def test_bind_value_types(self):
+        """Test numbers stay bare, dates are quoted and other types are rejected"""
+        prepared = prepare("金額 >= :value")
+        self.assertEqual(prepared.bind(value=1.5), "金額 >= 1.5")
+        self.assertEqual(prepared.bind(value=Decimal("1.50")), "金額 >= 1.50")
+        self.assertEqual(prepared.bind(value=date(2024, 1, 1)), '金額 >= "2024-01-01"')
+        self.assertEqual(
+            prepared.bind(value=datetime(2024, 1, 1, 9, 30, tzinfo=timezone.utc)),
+            '金額 >= "2024-01-01T09:30:00+00:00"',
+        )
+        for value in (True, None, object(), {"a": 1}):
+            with self.assertRaises(TypeError):
+                prepared.bind(value=value)
+
+    def test_bind_list_value_types(self):
+        """Test list elements follow the same rules as single values"""
+        prepared = prepare("値 in (:values)")
+        self.assertEqual(prepared.bind(values=("A", 1, date(2024, 1, 1))), '値 in ("A", 1, "2024-01-01")')
+        with self.assertRaises(TypeError):
+            prepared.bind(values=["A", None])
+
+    def test_placeholder_inside_literal_is_ignored(self):
+        """Test colons inside string literals are not placeholders"""
+        prepared = prepare('時刻 = "10:00" and 担当 = :user')
+        self.assertEqual(prepared.params, ("user",))
+        self.assertEqual(prepared.bind(user="tanaka"), '時刻 = "10:00" and 担当 = "tanaka"')
+
+    def test_missing_param(self):
+        """Test missing parameter raises ValueError"""
+        with self.assertRaises(ValueError):
+            prepare("名前 = :name").bind()
+
+    def test_prepare_is_cached(self):
+        """Test identical templates share one compiled query"""
+        self.assertIs(prepare("名前 = :name"), prepare("名前 = :name"))
+
+    def test_compile_builder(self):
+        """Test QueryBuilder with Param compiles to a template"""
+        prepared = (
+            query()
+            .equals("ステータス", param("status"))
+            .in_list("コード", param("codes"))
+            .order_by("$id")
+            .compile()
+        )
+        self.assertEqual(
+            prepared.bind(status="完了", codes=["A", "B"]),
+            'ステータス = "完了" and コード in ("A", "B") order by $id asc',
+        )
+
+
+class TestChunkInValues(unittest.TestCase):
+    """Tests for chunk_in_values"""
+
+    def test_small_list_single_chunk(self):
+        """Test short lists are not split"""
+        self.assertEqual(chunk_in_values("コード", ["A", "B"]), [["A", "B"]])
+
+    def test_chunks_respect_max_length(self):
+        """Test every chunk's encoded query stays under the limit"""
+        values = [f"顧客-{i:05d}" for i in range(2000)]
+        chunks = chunk_in_values("顧客コード", values, max_length=2000)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([v for chunk in chunks for v in chunk], values)
+        for chunk in chunks:
+            built = query().in_list("顧客コード", chunk).build()
+            self.assertLessEqual(len(urllib.parse.quote(built)), 2000)
+
+
 class TestParseNaturalQuery(unittest.TestCase):
     """Tests for parse_natural_query function"""
 
@@ -167,6 +272,80 @@ class TestParseNaturalQuery(unittest.TestCase):
         self.assertEqual(result, existing_query)
 
 
+class TestNaturalQueryCompiler(unittest.TestCase):
+    """Tests for schema-aware and compound natural queries"""
+
+    def setUp(self):
+        self.schema = AppSchema(
+            app_id=1,
+            app_name="Test App",
+            fields={
+                "amount": FieldInfo(code="amount", label="金額", type="NUMBER"),
+                "status": FieldInfo(code="status", label="ステータス", type="DROP_DOWN"),
+            },
+            cached_at=1.0,
+        )
+
+    def test_schema_resolves_label_and_numeric_literal(self):
+        """Test labels map to field codes and numbers are unquoted"""
+        result = parse_natural_query("金額が10,000以上", self.schema)
+        self.assertEqual(result, "amount >= 10000")
+
+    def test_schema_non_number_stays_quoted(self):
+        """Test that a value without digits is not emitted as an empty number"""
+        result = parse_natural_query("金額が,以上", self.schema)
+        self.assertEqual(result, 'amount >= ","')
+
+    def test_schema_keeps_text_fields_quoted(self):
+        """Test non-numeric fields stay quoted"""
+        result = parse_natural_query("ステータスが100", self.schema)
+        self.assertEqual(result, 'status = "100"')
+
+    def test_schema_as_dict(self):
+        """Test schema given as AppSchema.to_dict()"""
+        result = parse_natural_query("金額が5以下", self.schema.to_dict())
+        self.assertEqual(result, "amount <= 5")
+
+    def test_schemas_from_many_threads(self):
+        """Test concurrent compiles with more schemas than the index cache holds"""
+        def compile_all(offset):
+            results = []
+            for i in range(100):
+                app_id = (i + offset) % 100
+                schema = AppSchema(
+                    app_id=app_id, app_name="App",
+                    fields={f"code{app_id}": FieldInfo(code=f"code{app_id}", label="金額", type="NUMBER")},
+                    cached_at=2.0,
+                )
+                results.append((app_id, parse_natural_query("金額が1以上", schema)))
+            return results
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for results in executor.map(compile_all, range(0, 80, 10)):
+                for app_id, result in results:
+                    self.assertEqual(result, f"code{app_id} >= 1")
+
+    def test_and_clauses(self):
+        """Test かつ joins clauses with and"""
+        result = parse_natural_query("ステータスが完了かつ担当者が自分")
+        self.assertEqual(result, 'ステータス = "完了" and 担当者 = LOGINUSER()')
+
+    def test_or_clauses_group_and(self):
+        """Test または between clauses with and-groups in parentheses"""
+        result = parse_natural_query("ステータスが完了または担当者が自分かつ金額が5以下", self.schema)
+        self.assertEqual(result, 'status = "完了" or (担当者 = LOGINUSER() and amount <= 5)')
+
+    def test_value_or_stays_in_list(self):
+        """Test または between values is still converted to in (...)"""
+        result = parse_natural_query("ステータスが完了または進行中かつ金額が1以上", self.schema)
+        self.assertEqual(result, 'status in ("完了", "進行中") and amount >= 1')
+
+    def test_values_are_escaped(self):
+        """Test quotes in values are escaped"""
+        result = parse_natural_query('タイトルが"重要"')
+        self.assertEqual(result, 'タイトル = "\\"重要\\""')
+
+
 class TestOperatorEnum(unittest.TestCase):
     """Tests for Operator enum"""
 
@@ -184,5 +363,17 @@ class TestOperatorEnum(unittest.TestCase):
         self.assertEqual(Operator.NOT_IN.value, "not in")
 
 
+class TestQueryFields(unittest.TestCase):
+    """Tests for query_fields"""
+
+    def test_conditions_and_order_by(self):
+        q = '(名前 like "a = b" and 金額 >= 10) or タグ not in ("A") order by 更新日時 desc, $id asc limit 5'
+        self.assertEqual(query_fields(q), ["名前", "金額", "タグ", "更新日時", "$id"])
+
+    def test_functions_and_placeholders_are_not_fields(self):
+        q = "作成日 = TODAY() and 担当 in (LOGINUSER()) and 顧客 = :code"
+        self.assertEqual(query_fields(q), ["作成日", "担当", "顧客"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for kintone_spool module"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_spool import RecordSpool
+
+
+def _records(count, fail_after=None, closed=None):
+    try:
+        for i in range(count):
+            if fail_after is not None and i == fail_after:
+                raise RuntimeError("Failed to get cursor records: expired")
+            yield {"$id": {"value": str(i)}, "名前": {"value": f"名前{i}"}}
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+class TestRecordSpool(unittest.TestCase):
+    """Tests for RecordSpool"""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def test_round_trip_across_segments(self):
+        spool = RecordSpool(_records(10), directory=self.directory, segment_records=3)
+        records = list(spool)
+        self.assertEqual([r["$id"]["value"] for r in records], [str(i) for i in range(10)])
+        self.assertEqual(records[4]["名前"]["value"], "名前4")
+        self.assertEqual(spool.records, 10)
+        self.assertTrue(spool.drained)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_segments_are_gzip(self):
+        spool = RecordSpool(_records(5), directory=self.directory, segment_records=2).start()
+        spool._thread.join()
+        segments = sorted(spool.path.iterdir())
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(segments[0].read_bytes()[:2], b"\x1f\x8b")
+        spool.close()
+
+    def test_error_raised_after_spooled_records(self):
+        seen = []
+        with self.assertRaises(RuntimeError):
+            for record in RecordSpool(_records(10, fail_after=7), directory=self.directory, segment_records=5):
+                seen.append(record)
+        self.assertEqual(len(seen), 7)
+
+    def test_early_close_stops_source(self):
+        closed = []
+        spool = RecordSpool(_records(100000, closed=closed), directory=self.directory, segment_records=10)
+        for _ in spool:
+            break
+        self.assertEqual(closed, [True])
+        self.assertFalse(spool.path.exists())
+
+    def test_invalid_segment_size(self):
+        with self.assertRaises(ValueError):
+            RecordSpool([], segment_records=0)
+
+
+class TestSearchAllSpool(unittest.TestCase):
+    """Tests for search_all(spool=True) against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add_app(1, "App", {"名前": "SINGLE_LINE_TEXT"})
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(1200)])
+        self.config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=Path(tempfile.mkdtemp()))
+        self.crud = KintoneCRUD(KintoneClient(self.config))
+
+    def test_cursor_released_before_consumer_finishes(self):
+        spool = RecordSpool(self.crud.search_all(1), directory=self.config.cache_dir, segment_records=100)
+        records = iter(spool)
+        first = next(records)
+        spool._thread.join(timeout=10)
+        self.assertTrue(spool.drained)
+        self.assertEqual(self.server.cursors, {})
+        self.assertEqual(1 + sum(1 for _ in records), 1200)
+        self.assertEqual(first["名前"]["value"], "R1199")  # 既定の並び順は $id desc
+
+    def test_search_all_spool_matches_direct(self):
+        spooled = list(self.crud.search_all(1, "$id > 100", ["$id", "名前"], spool=True))
+        self.assertEqual(spooled, list(self.crud.search_all(1, "$id > 100", ["$id", "名前"])))
+        self.assertEqual(list((self.config.cache_dir / "spool").iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for kintone_stream module"""
+
+import sys
+import json
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from kintone_stream import JsonArrayStream
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonArrayStream(unittest.TestCase):
+    """Tests for incremental parsing of records arrays"""
+
+    def setUp(self):
+        self.page = {
+            "records": [
+                {
+                    "$id": {"type": "__ID__", "value": str(i)},
+                    "名前": {"type": "SINGLE_LINE_TEXT", "value": f'引用"符\\と, [括弧] {{}} {i}'},
+                    "明細": {"type": "SUBTABLE", "value": [
+                        {"id": str(j), "value": {"数量": {"type": "NUMBER", "value": str(j)}}}
+                        for j in range(3)
+                    ]},
+                }
+                for i in range(20)
+            ],
+            "next": True,
+        }
+        self.data = json.dumps(self.page, ensure_ascii=False).encode("utf-8")
+
+    def test_every_chunk_size(self):
+        """Test that any chunk boundary yields the same records"""
+        for size in (1, 2, 3, 7, 64, len(self.data)):
+            stream = JsonArrayStream(_chunks(self.data, size))
+            self.assertEqual(list(stream), self.page["records"], size)
+            self.assertEqual(stream.fields, {"next": True})
+
+    def test_random_chunks(self):
+        """Test random chunk boundaries"""
+        rng = random.Random(0)
+        for _ in range(20):
+            chunks, pos = [], 0
+            while pos < len(self.data):
+                size = rng.randint(1, 50)
+                chunks.append(self.data[pos:pos + size])
+                pos += size
+            self.assertEqual(list(JsonArrayStream(chunks)), self.page["records"])
+
+    def test_fields_before_array(self):
+        """Test top-level values on both sides of the array"""
+        data = b'{"totalCount": "2", "records": [{"a": 1}, {"a": 2}], "next": false}'
+        stream = JsonArrayStream(_chunks(data, 5))
+        self.assertEqual(list(stream), [{"a": 1}, {"a": 2}])
+        self.assertEqual(stream.fields, {"totalCount": "2", "next": False})
+
+    def test_empty_array(self):
+        stream = JsonArrayStream([b'{"records": [ ], "next": false}'])
+        self.assertEqual(list(stream), [])
+        self.assertFalse(stream.fields["next"])
+
+    def test_records_are_yielded_before_the_end(self):
+        """Test that the first record is available before later chunks arrive"""
+        chunks = iter(_chunks(self.data, 32))
+        consumed = []
+
+        def source():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        first = next(iter(JsonArrayStream(source())))
+        self.assertEqual(first["$id"]["value"], "0")
+        self.assertLess(sum(map(len, consumed)), len(self.data) / 5)
+
+    def test_incomplete_json(self):
+        with self.assertRaises(ValueError):
+            list(JsonArrayStream([self.data[:-10]]))
+
+
+if __name__ == "__main__":
+    unittest.main()
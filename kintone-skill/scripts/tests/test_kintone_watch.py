@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Tests for kintone_watch module"""
+
+import sys
+import io
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from unittest import mock
+import kintone_watch
+from kintone_client import KintoneClient, KintoneConfig
+from kintone_crud import KintoneCRUD
+from kintone_fake_server import FakeKintoneServer
+from kintone_watch import AppWatermark, ChangeWatcher
+
+
+class TestAppWatermark(unittest.TestCase):
+    """Tests for watermark serialization"""
+
+    def test_round_trip(self):
+        watermark = AppWatermark("2024-01-01T00:00:00Z", {"1": "2"}, max_id=5, known_ids={1, 5}, polls=3)
+        self.assertEqual(AppWatermark.from_dict(json.loads(json.dumps(watermark.to_dict()))), watermark)
+
+    def test_known_ids_optional(self):
+        self.assertNotIn("known_ids", AppWatermark().to_dict())
+        self.assertIsNone(AppWatermark.from_dict({}).known_ids)
+
+
+class TestChangeWatcher(unittest.TestCase):
+    """Tests for ChangeWatcher against the fake server"""
+
+    def setUp(self):
+        self.server = FakeKintoneServer().start()
+        self.addCleanup(self.server.stop)
+        for app_id in (1, 2):
+            self.server.add_app(app_id, f"App{app_id}", {"名前": "SINGLE_LINE_TEXT"})
+        self.cache_dir = Path(tempfile.mkdtemp())
+        config = KintoneConfig(domain=self.server.base_url, api_token="fake", cache_dir=self.cache_dir)
+        self.client = KintoneClient(config)
+        self.crud = KintoneCRUD(self.client)
+        self.events = []
+
+    def watcher(self, **kwargs):
+        kwargs.setdefault("on_event", self.events.append)
+        return ChangeWatcher(self.crud, [1, 2], **kwargs)
+
+    def summary(self):
+        return [(e.type, e.app_id, e.record_id) for e in self.events]
+
+    def test_start_now_skips_existing(self):
+        """Test that existing records are not emitted with start=now"""
+        self.server.add_records(1, [{"名前": "A"}, {"名前": "B"}])
+        watcher = self.watcher()
+        watcher.run_once()
+        watcher.run_once()
+        self.assertEqual(self.events, [])
+
+        self.server.add_records(1, [{"名前": "C"}])
+        self.crud.update(1, 1, {"名前": "A2"})
+        self.assertEqual(watcher.run_once(), {1: 2, 2: 0})
+        self.assertEqual(self.summary(), [("update", 1, "1"), ("create", 1, "3")])
+
+    def test_new_records_out_of_id_order(self):
+        """Test that new records are creates even when a larger $id sorts first"""
+        self.server.add_records(1, [{"名前": "A"}])
+        watcher = self.watcher()
+        watcher.run_once()
+        self.server.add_records(1, [{"名前": "B"}, {"名前": "C"}])
+        self.server.apps[1].records[2]["更新日時"]["value"] = "2099-01-01T00:00:00Z"
+        watcher.run_once()
+        self.assertEqual(self.summary(), [("create", 1, "3"), ("create", 1, "2")])
+
+    def test_same_minute_updates_deduplicated(self):
+        """Test revision-based dedupe within the same 更新日時 minute"""
+        watcher = self.watcher(start="beginning")
+        self.server.add_records(1, [{"名前": "A"}])
+        watcher.run_once()
+        watcher.run_once()
+        self.crud.update(1, 1, {"名前": "A2"})
+        watcher.run_once()
+        watcher.run_once()
+        self.assertEqual(self.summary(), [("create", 1, "1"), ("update", 1, "1")])
+        self.assertEqual(self.events[1].revision, "2")
+        self.assertEqual(self.events[1].record["名前"]["value"], "A2")
+
+    def test_pages_beyond_limit(self):
+        """Test keyset paging when more than one page changed"""
+        self.server.add_records(2, [{"名前": f"R{i}"} for i in range(1200)])
+        watcher = self.watcher(start="beginning", fields=["名前"])
+        self.assertEqual(watcher.run_once(), {1: 0, 2: 1200})
+        self.assertEqual(len({e.record_id for e in self.events}), 1200)
+        self.assertEqual(set(self.events[0].record), {"$id", "$revision", "更新日時", "名前"})
+
+    def test_checkpoint_resumes(self):
+        """Test that a new watcher resumes from the checkpoint"""
+        self.server.add_records(1, [{"名前": "A"}])
+        self.watcher(start="beginning").run_once()
+        self.server.add_records(1, [{"名前": "B"}])
+
+        self.events.clear()
+        self.watcher(start="beginning").run_once()
+        self.assertEqual(self.summary(), [("create", 1, "2")])
+        checkpoint = json.loads((self.cache_dir / "watch" / "checkpoint.json").read_text(encoding="utf-8"))
+        self.assertEqual(checkpoint["apps"]["1"]["max_id"], 2)
+
+    def test_detect_deletes(self):
+        """Test delete events from $id list diff"""
+        self.server.add_records(1, [{"名前": "A"}, {"名前": "B"}])
+        watcher = self.watcher(delete_scan_every=1)
+        watcher.run_once()
+        self.crud.delete(1, [1])
+        watcher.run_once()
+        self.assertEqual(self.summary(), [("delete", 1, "1")])
+
+    def test_known_ids_saved_once_per_scan(self):
+        """Test that page checkpoints don't rewrite the $id list"""
+        self.server.add_records(1, [{"名前": f"R{i}"} for i in range(1200)])
+        writes = []
+        original = kintone_watch._write_json
+
+        def write_json(path, data):
+            writes.append(path.name)
+            original(path, data)
+
+        with mock.patch.object(kintone_watch, "_write_json", write_json):
+            ChangeWatcher(self.crud, [1], on_event=self.events.append, start="beginning", delete_scan_every=1).run_once()
+        self.assertEqual(writes.count("checkpoint.ids-1.json"), 2)  # 開始時の空の一覧と削除検知の後
+        checkpoint = json.loads((self.cache_dir / "watch" / "checkpoint.json").read_text(encoding="utf-8"))
+        self.assertNotIn("known_ids", checkpoint["apps"]["1"])
+
+        # 再開した watcher は保存した一覧で削除を検知する
+        self.crud.delete(1, [5])
+        self.events.clear()
+        ChangeWatcher(self.crud, [1], on_event=self.events.append, delete_scan_every=1).run_once()
+        self.assertEqual(self.summary(), [("delete", 1, "5")])
+
+    def test_ndjson_output(self):
+        """Test NDJSON lines written to output"""
+        output = io.StringIO()
+        watcher = ChangeWatcher(self.crud, [1], output=output, start="beginning")
+        self.server.add_records(1, [{"名前": "A"}])
+        watcher.run_once()
+        line = json.loads(output.getvalue().splitlines()[0])
+        self.assertEqual((line["type"], line["app"], line["id"], line["revision"]), ("create", 1, "1", "1"))
+
+    def test_adaptive_interval(self):
+        """Test back off on quiet apps and reset on changes"""
+        watcher = self.watcher(min_interval=1, max_interval=5, backoff=2)
+        self.assertEqual([watcher._next_interval(1, 0) for _ in range(4)], [2, 4, 5, 5])
+        self.assertEqual(watcher._next_interval(1, 3), 1)
+
+    def test_run_until_stopped(self):
+        """Test the scheduling loop with a stop event"""
+        stop = threading.Event()
+        self.server.add_records(1, [{"名前": "A"}])
+
+        def on_event(event):
+            self.events.append(event)
+            stop.set()
+
+        watcher = self.watcher(on_event=on_event, start="beginning", min_interval=0.05)
+        thread = threading.Thread(target=watcher.run, args=(stop,))
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.summary(), [("create", 1, "1")])
+
+    def test_error_is_reported(self):
+        """Test that a failing app does not stop the others"""
+        self.server.inject_errors(1, status=503, endpoint="records.json")
+        watcher = ChangeWatcher(self.crud, [1, 99], on_event=self.events.append, max_workers=1)
+        self.assertEqual(watcher.run_once(), {1: 0, 99: 0})
+        self.assertNotIn(99, watcher.watermarks)
+
+    def test_invalid_start(self):
+        with self.assertRaises(ValueError):
+            self.watcher(start="yesterday")
+
+
+if __name__ == "__main__":
+    unittest.main()